@@ -0,0 +1,135 @@
+"""Message decoding benchmark.
+
+Reads one session's messages the way StorageManager did before epoch
+millisecond timestamps (``aiosqlite.Row`` lookups, ISO parsing, eager
+metadata JSON) and the way ``get_messages`` does now (plain tuples,
+integer timestamps, metadata parsed on first access).
+
+Usage:
+    python -m benchmarks.bench_decode [--rows N]
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+from nexus_chat.backend.storage_manager import StorageManager
+from nexus_chat.models.chat_session import ChatSession
+from nexus_chat.models.message import Message, MessageRole, MessageStatus
+
+def legacy_row_to_message(row) -> Message:
+    """Row decoding as done before epoch millisecond timestamps."""
+    return Message(
+        id=row["id"],
+        session_id=row["session_id"],
+        content=row["content"],
+        role=MessageRole(row["role"]),
+        model=row["model"],
+        parent_id=row["parent_id"],
+        status=MessageStatus(row["status"]),
+        error=row["error"],
+        created_at=datetime.fromisoformat(row["created_at"]),
+        metadata=json.loads(row["metadata"]) if row["metadata"] else {}
+    )
+
+async def _best_of(func, repeat: int = 3) -> float:
+    """Best wall time of ``func`` in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def _best_of_sync(func, repeat: int = 3) -> float:
+    """Best wall time of ``func`` in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+async def main(rows: int) -> None:
+    """Fill a fresh database and time both decoding paths."""
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = StorageManager(Path(tmp) / "bench.db")
+        session = ChatSession(model="bench")
+        await storage.save_session(session)
+        await storage.save_messages(
+            Message(
+                role=MessageRole.ASSISTANT if i % 2 else MessageRole.USER,
+                content=f"message {i} " * 20,
+                model="bench",
+                session_id=session.id,
+                metadata={"eval_count": 120, "eval_duration": 2_500_000_000}
+            )
+            for i in range(rows)
+        )
+        
+        # Same rows in the old layout, with ISO timestamps
+        async with storage.pool.writer() as db:
+            await db.execute("""
+                CREATE TABLE legacy_messages AS
+                SELECT
+                    id, session_id, content, role, model, parent_id, status, error,
+                    strftime('%Y-%m-%dT%H:%M:%f', created_at / 1000.0, 'unixepoch', 'localtime')
+                        AS created_at,
+                    metadata
+                FROM messages
+            """)
+            await db.execute(
+                "CREATE INDEX idx_legacy_session ON legacy_messages (session_id, created_at, id)"
+            )
+        
+        async def fetch(query, row_factory):
+            async with storage.pool.reader() as db:
+                async with db.execute(query, (session.id,)) as cursor:
+                    if row_factory is None:
+                        cursor.row_factory = None
+                    return await cursor.fetchall()
+        
+        legacy_query = (
+            "SELECT * FROM legacy_messages WHERE session_id = ? "
+            "ORDER BY created_at DESC, id DESC"
+        )
+        current_query = (
+            f"SELECT {', '.join(Message.ROW_COLUMNS)} FROM messages "
+            "WHERE session_id = ? ORDER BY created_at DESC, id DESC"
+        )
+        legacy_rows = await fetch(legacy_query, "row")
+        current_rows = await fetch(current_query, None)
+        
+        results = [
+            (
+                "Row + ISO + eager JSON",
+                await _best_of(lambda: fetch(legacy_query, "row")),
+                _best_of_sync(lambda: [legacy_row_to_message(row) for row in legacy_rows])
+            ),
+            (
+                "tuple + epoch ms + lazy JSON",
+                await _best_of(lambda: fetch(current_query, None)),
+                _best_of_sync(lambda: [Message.from_row(row) for row in current_rows])
+            ),
+        ]
+        
+        print(f"{rows} rows{'fetch':>26}{'decode':>11}{'total':>11}")
+        for name, fetch_time, decode_time in results:
+            print(
+                f"{name:<28} {fetch_time * 1000:>7.0f} ms {decode_time * 1000:>7.0f} ms "
+                f"{(fetch_time + decode_time) * 1000:>7.0f} ms"
+            )
+        (_, legacy_fetch, legacy_decode), (_, fetch_time, decode_time) = results
+        print(
+            f"{'speedup':<28} {legacy_fetch / fetch_time:>8.1f}x {legacy_decode / decode_time:>9.1f}x "
+            f"{(legacy_fetch + legacy_decode) / (fetch_time + decode_time):>9.1f}x"
+        )
+        await storage.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    asyncio.run(main(parser.parse_args().rows))
@@ -0,0 +1,92 @@
+"""Message memory benchmark.
+
+Builds the same messages in the shapes used before the unified message
+type (the ``ChatSession.add_message`` dict and the ``Message``
+dataclass) and as the current slotted ``Message``, and reports the
+memory each shape holds on top of the shared message content.
+
+Usage:
+    python -m benchmarks.bench_memory [--messages N]
+"""
+import argparse
+import gc
+import tracemalloc
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from nexus_chat.models.message import Message, MessageRole, MessageStatus
+
+@dataclass
+class LegacyMessage:
+    """``Message`` as a dataclass, before ``__slots__``."""
+    role: MessageRole
+    content: str
+    model: Optional[str] = None
+    created_at: datetime = None
+    id: Optional[str] = None
+    session_id: Optional[str] = None
+    parent_id: Optional[str] = None
+    status: MessageStatus = MessageStatus.COMPLETE
+    error: Optional[str] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+def legacy_dict(i: int, content: str) -> Dict[str, Any]:
+    """Message dict as built by ``ChatSession.add_message``."""
+    return {
+        "role": "assistant" if i % 2 else "user",
+        "content": content,
+        "timestamp": datetime.now().isoformat()
+    }
+
+def legacy_message(i: int, content: str) -> LegacyMessage:
+    """Dataclass message as built by ``ChatManager``."""
+    return LegacyMessage(
+        role=MessageRole.ASSISTANT if i % 2 else MessageRole.USER,
+        content=content,
+        model="".join(["bench", ":latest"]),
+        created_at=datetime.now(),
+        id=str(uuid.uuid4()),
+        session_id="".join(["bench", "-session"])
+    )
+
+def message(i: int, content: str) -> Message:
+    """Slotted message as built by ``ChatManager``."""
+    return Message(
+        role=MessageRole.ASSISTANT if i % 2 else MessageRole.USER,
+        content=content,
+        model="".join(["bench", ":latest"]),
+        session_id="".join(["bench", "-session"])
+    )
+
+def measure(build, count: int) -> float:
+    """Bytes allocated per message by ``count`` messages from ``build``."""
+    content = "message content " * 20
+    gc.collect()
+    tracemalloc.start()
+    messages = [build(i, content) for i in range(count)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del messages
+    return size / count
+
+def main(count: int) -> None:
+    """Build each shape and print its per-message overhead."""
+    results = [
+        ("ChatSession dict", measure(legacy_dict, count)),
+        ("Message dataclass", measure(legacy_message, count)),
+        ("Message slots", measure(message, count)),
+    ]
+    
+    print(f"{count} messages{'per message':>20}{'total':>12}")
+    for name, per_message in results:
+        print(f"{name:<26} {per_message:>8.0f} B {per_message * count / 2**20:>8.0f} MB")
+    slots = results[-1][1]
+    for name, per_message in results[:-1]:
+        print(f"{'slots / ' + name:<26} {slots / per_message:>10.0%}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    main(parser.parse_args().messages)
@@ -0,0 +1,140 @@
+"""Storage latency benchmark.
+
+Compares the pooled StorageManager against opening a new aiosqlite
+connection per call, as StorageManager did before the connection pool,
+and measures write throughput of group commit and bulk saves.
+
+Usage:
+    python -m benchmarks.bench_storage [--calls N]
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import aiosqlite
+
+from nexus_chat.backend.storage_manager import StorageManager
+from nexus_chat.models.chat_session import ChatSession
+from nexus_chat.models.message import Message, MessageRole
+from nexus_chat.utils.timestamps import now_ms
+
+async def _timed(func, calls: int) -> list:
+    """Run ``func`` ``calls`` times and return per-call latencies in microseconds."""
+    samples = []
+    for i in range(calls):
+        start = time.perf_counter()
+        await func(i)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return samples
+
+def _report(name: str, samples: list) -> None:
+    """Print latency summary."""
+    samples = sorted(samples)
+    p50 = statistics.median(samples)
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"{name:<32} p50 {p50:>9.1f} us   p99 {p99:>9.1f} us")
+
+async def bench_per_call_connect(db_path: str, session_id: str, calls: int) -> None:
+    """Baseline: one connection and one commit per call."""
+    async def write(i):
+        async with aiosqlite.connect(db_path) as db:
+            await db.execute(
+                "INSERT INTO messages (id, session_id, content, role, model, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (f"baseline-{i}", session_id, f"message {i}", "user", "bench", now_ms())
+            )
+            await db.commit()
+
+    async def read(i):
+        async with aiosqlite.connect(db_path) as db:
+            async with db.execute(
+                "SELECT * FROM chat_sessions WHERE id = ?", (session_id,)
+            ) as cursor:
+                await cursor.fetchone()
+
+    _report("per-call connect: write", await _timed(write, calls))
+    _report("per-call connect: read", await _timed(read, calls))
+
+async def bench_pooled(storage: StorageManager, session_id: str, calls: int) -> None:
+    """Pooled StorageManager calls."""
+    async def write(i):
+        await storage.save_message(Message(
+            role=MessageRole.USER,
+            content=f"message {i}",
+            model="bench",
+            session_id=session_id
+        ))
+
+    async def read(i):
+        async with storage.pool.reader() as db:
+            async with db.execute(
+                "SELECT * FROM chat_sessions WHERE id = ?", (session_id,)
+            ) as cursor:
+                await cursor.fetchone()
+
+    _report("pooled: save_message", await _timed(write, calls))
+    _report("pooled: read", await _timed(read, calls))
+
+async def bench_throughput(storage: StorageManager, session_id: str, calls: int) -> None:
+    """Messages per second from concurrent writers, grouped and ungrouped."""
+    def messages(prefix):
+        return [
+            Message(
+                role=MessageRole.USER,
+                content=f"message {i}",
+                model="bench",
+                session_id=session_id,
+                id=f"{prefix}-{i}"
+            )
+            for i in range(calls)
+        ]
+
+    async def concurrent(prefix):
+        start = time.perf_counter()
+        await asyncio.gather(*(storage.save_message(m) for m in messages(prefix)))
+        return calls / (time.perf_counter() - start)
+
+    batcher = storage.message_batcher
+    window, max_batch = batcher.window, batcher.max_batch
+
+    await batcher.close()
+    batcher.window, batcher.max_batch = 0, 1
+    ungrouped = await concurrent("single")
+
+    await batcher.close()
+    batcher.window, batcher.max_batch = window, max_batch
+    grouped = await concurrent("grouped")
+
+    batch = messages("bulk")
+    start = time.perf_counter()
+    await storage.save_messages(batch)
+    bulk = calls / (time.perf_counter() - start)
+
+    print(f"{'concurrent, one commit each':<32} {ungrouped:>9.0f} msg/s")
+    print(f"{'concurrent, group commit':<32} {grouped:>9.0f} msg/s")
+    print(f"{'save_messages bulk':<32} {bulk:>9.0f} msg/s")
+
+async def main(calls: int) -> None:
+    """Run benchmarks against a fresh database."""
+    with tempfile.TemporaryDirectory() as tmp:
+        storage = StorageManager(Path(tmp) / "bench.db")
+        session = ChatSession(model="bench")
+        await storage.save_session(session)
+        await storage.close()
+
+        # The baseline ran with the default rollback journal
+        async with aiosqlite.connect(storage.db_path) as db:
+            await db.execute("PRAGMA journal_mode = DELETE")
+
+        await bench_per_call_connect(storage.db_path, session.id, calls)
+        await bench_pooled(storage, session.id, calls)
+        await bench_throughput(storage, session.id, calls)
+        await storage.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=500)
+    asyncio.run(main(parser.parse_args().calls))
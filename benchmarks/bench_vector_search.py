@@ -0,0 +1,66 @@
+"""Vector search benchmark.
+
+Fills a ``VectorIndex`` with random unit vectors spread over sessions
+and models and times top-k searches over all of them and filtered by
+session and by model, next to the same product over a float16 matrix.
+
+Usage:
+    python -m benchmarks.bench_vector_search [--rows N] [--dim D] [--k K]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from nexus_chat.backend.vector_index import VectorIndex
+
+def _best_of(func, repeat: int = 5) -> float:
+    """Best wall time of ``func`` in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main(rows: int, dim: int, k: int) -> None:
+    """Fill an index and time searches."""
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        index = VectorIndex(Path(tmp) / "bench.npy", "bench", dim, "bench", capacity=rows)
+        batch = 50_000
+        for start in range(0, rows, batch):
+            count = min(batch, rows - start)
+            vectors = rng.standard_normal((count, dim), dtype=np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            index.set_rows(
+                (
+                    (slot, f"message-{slot}", f"session-{slot % 5000}", f"model-{slot % 4}")
+                    for slot in range(start, start + count)
+                ),
+                vectors
+            )
+        query = rng.standard_normal(dim, dtype=np.float32)
+        half = np.asarray(index.matrix[:rows], dtype=np.float16)
+        
+        results = [
+            ("all rows", _best_of(lambda: index.search(query, k))),
+            ("one session", _best_of(lambda: index.search(query, k, group="session-7"))),
+            ("one model", _best_of(lambda: index.search(query, k, label="model-1"))),
+            ("float16 product", _best_of(lambda: half @ query.astype(np.float16), repeat=1)),
+        ]
+        
+        print(f"{rows} rows x {dim} dims, top {k}")
+        for name, seconds in results:
+            print(f"{name:<26} {seconds * 1000:>8.1f} ms")
+        del index, half
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+    main(args.rows, args.dim, args.k)
@@ -0,0 +1,265 @@
+"""Database backup module."""
+import asyncio
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+from nexus_chat.utils.constants import DATABASE, FILE_EXTENSIONS
+from nexus_chat.utils.progress import ProgressCallback
+
+logger = logging.getLogger(__name__)
+
+BACKUP_SUFFIX = FILE_EXTENSIONS["DATABASE"] + ".gz"
+
+class BackupManager:
+    """Takes compressed snapshots of the chat database.
+    
+    Snapshots use SQLite's online backup API from a separate connection,
+    copying ``step_pages`` pages per step and sleeping ``step_sleep``
+    seconds in between. The copy runs inside one read transaction, so
+    with WAL journaling writers keep committing while it runs and their
+    commits do not restart the backup. The archive database, if any, is
+    copied in the same read transaction into a snapshot with the same
+    timestamp. Finished copies are gzipped and rotated by age and count,
+    each archive snapshot together with its database snapshot; the
+    newest snapshot is always kept.
+    """
+    
+    def __init__(
+        self,
+        db_path: str,
+        archive_path: Optional[str] = None,
+        backup_dir: Optional[str] = None,
+        interval: float = DATABASE["BACKUP_INTERVAL"],
+        max_age: float = DATABASE["MAX_BACKUP_AGE"],
+        max_count: int = DATABASE["MAX_BACKUP_COUNT"],
+        step_pages: int = DATABASE["BACKUP_STEP_PAGES"],
+        step_sleep: float = DATABASE["BACKUP_STEP_SLEEP"],
+        progress: Optional[ProgressCallback] = None
+    ):
+        """Initialize backup manager.
+        
+        Args:
+            db_path: Path to the database file
+            archive_path: Optional path to the archive database backed up with it
+            backup_dir: Directory for snapshots, defaults to ``backups`` next to the database
+            interval: Hours between scheduled backups
+            max_age: Days a snapshot is kept
+            max_count: Maximum number of snapshots kept
+            step_pages: Pages copied per backup step
+            step_sleep: Seconds to sleep between steps
+            progress: Optional callback for scheduled backups
+        """
+        self.db_path = Path(db_path)
+        self.archive_path = Path(archive_path) if archive_path else None
+        self.backup_dir = Path(backup_dir) if backup_dir else self.db_path.parent / "backups"
+        self.interval = interval
+        self.max_age = max_age
+        self.max_count = max_count
+        self.step_pages = step_pages
+        self.step_sleep = step_sleep
+        self.progress = progress
+        
+        self.last_progress: Optional[Tuple[int, int]] = None
+        self._lock = asyncio.Lock()
+        self._trigger = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._last_attempt = 0.0
+    
+    def list_backups(self) -> List[Path]:
+        """List snapshots, newest first."""
+        if not self.backup_dir.exists():
+            return []
+        # Timestamps start with a digit, which keeps out archive snapshots
+        # named after the database, like ``chat-archive-*``
+        backups = self.backup_dir.glob(f"{self.db_path.stem}-[0-9]*{BACKUP_SUFFIX}")
+        return sorted(backups, key=lambda path: path.stat().st_mtime, reverse=True)
+    
+    def archive_snapshot(self, snapshot: Path) -> Optional[Path]:
+        """Path of the archive snapshot taken with a database snapshot.
+        
+        Args:
+            snapshot: Database snapshot from ``list_backups``
+        
+        Returns:
+            Archive snapshot path, None without an archive database
+        """
+        if self.archive_path is None:
+            return None
+        stamp = snapshot.name[len(self.db_path.stem) + 1:-len(BACKUP_SUFFIX)]
+        return snapshot.with_name(f"{self.archive_path.stem}-{stamp}{BACKUP_SUFFIX}")
+    
+    def _copy(
+        self,
+        targets: List[Tuple[str, Path]],
+        report: Callable[[int, int, int], None]
+    ) -> None:
+        """Copy schemas page by page, each into its target file."""
+        source = sqlite3.connect(self.db_path, isolation_level=None)
+        try:
+            if len(targets) > 1:
+                source.execute("ATTACH DATABASE ? AS archive", (str(self.archive_path),))
+            # Pin one snapshot; without it every commit made by another
+            # connection would restart the backup from the first page
+            source.execute("BEGIN")
+            for schema, _ in targets:
+                source.execute(f"SELECT COUNT(*) FROM {schema}.sqlite_master").fetchone()
+            
+            for schema, target in targets:
+                dest = sqlite3.connect(target)
+                try:
+                    source.backup(
+                        dest,
+                        pages=self.step_pages,
+                        progress=report,
+                        name=schema,
+                        sleep=self.step_sleep
+                    )
+                finally:
+                    dest.close()
+            source.execute("ROLLBACK")
+        finally:
+            source.close()
+    
+    @staticmethod
+    def _compress(source: Path, target: Path) -> None:
+        """Gzip ``source`` into ``target``."""
+        with open(source, "rb") as src, gzip.open(target, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+    
+    async def backup(self, progress: Optional[ProgressCallback] = None) -> Path:
+        """Take a snapshot now.
+        
+        Args:
+            progress: Optional callback receiving copied and total pages,
+                called on the event loop after every step
+        
+        Returns:
+            Path of the compressed database snapshot
+        """
+        loop = asyncio.get_running_loop()
+        
+        def report(status: int, remaining: int, total: int) -> None:
+            # Runs in the backup thread
+            loop.call_soon_threadsafe(self._report, progress, total - remaining, total)
+        
+        async with self._lock:
+            self._last_attempt = time.time()
+            self.backup_dir.mkdir(parents=True, exist_ok=True)
+            
+            stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+            target = self.backup_dir / f"{self.db_path.stem}-{stamp}{BACKUP_SUFFIX}"
+            targets = [("main", target)]
+            archive = self.archive_snapshot(target)
+            if archive and self.archive_path.exists():
+                targets.append(("archive", archive))
+            copies = [(schema, path.with_suffix(".tmp")) for schema, path in targets]
+            partials = [path.with_suffix(path.suffix + ".tmp") for _, path in targets]
+            
+            try:
+                started = time.monotonic()
+                await asyncio.to_thread(self._copy, copies, report)
+                for (_, copy), partial in zip(copies, partials):
+                    await asyncio.to_thread(self._compress, copy, partial)
+                # The archive snapshot goes first, so a listed snapshot is complete
+                for (_, path), partial in reversed(list(zip(targets, partials))):
+                    os.replace(partial, path)
+                
+                logger.info(
+                    f"Backed up {self.db_path} to {target} "
+                    f"({sum(path.stat().st_size for _, path in targets) / 1024 / 1024:.1f} MB) "
+                    f"in {time.monotonic() - started:.1f}s"
+                )
+                self.rotate()
+                return target
+            
+            except Exception as e:
+                logger.error(f"Error backing up database: {str(e)}")
+                raise
+            
+            finally:
+                for (_, copy), partial in zip(copies, partials):
+                    copy.unlink(missing_ok=True)
+                    partial.unlink(missing_ok=True)
+    
+    def _report(self, progress: Optional[ProgressCallback], copied: int, total: int) -> None:
+        """Record progress and forward it to the callback."""
+        self.last_progress = (copied, total)
+        if progress:
+            progress(copied, total)
+    
+    def rotate(self) -> List[Path]:
+        """Delete snapshots beyond ``max_count`` or older than ``max_age``.
+        
+        Returns:
+            Deleted snapshots, with their archive snapshots
+        """
+        cutoff = time.time() - self.max_age * 24 * 3600
+        removed = []
+        for index, path in enumerate(self.list_backups()):
+            if index == 0:
+                continue
+            if index >= self.max_count or path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed.append(path)
+                archive = self.archive_snapshot(path)
+                if archive and archive.exists():
+                    archive.unlink()
+                    removed.append(archive)
+        
+        if removed:
+            logger.info(f"Removed {len(removed)} old backups")
+        return removed
+    
+    def seconds_until_due(self) -> float:
+        """Seconds until the next scheduled backup."""
+        backups = self.list_backups()
+        last = max(
+            backups[0].stat().st_mtime if backups else 0.0,
+            self._last_attempt
+        )
+        return max(0.0, last + self.interval * 3600 - time.time())
+    
+    def trigger(self) -> None:
+        """Ask the scheduler to take a backup now."""
+        self._trigger.set()
+    
+    async def _run(self) -> None:
+        """Scheduler loop."""
+        while True:
+            try:
+                await asyncio.wait_for(self._trigger.wait(), self.seconds_until_due())
+            except asyncio.TimeoutError:
+                pass
+            self._trigger.clear()
+            
+            try:
+                await self.backup(self.progress)
+            except Exception:
+                # Already logged, retried after the next interval
+                pass
+    
+    def start(self) -> None:
+        """Start taking scheduled backups."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info(f"Scheduled backups every {self.interval}h to {self.backup_dir}")
+    
+    async def stop(self) -> None:
+        """Stop the scheduler, waiting for a running backup to finish."""
+        if self._task is None:
+            return
+        
+        async with self._lock:
+            self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
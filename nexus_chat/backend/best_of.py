@@ -0,0 +1,288 @@
+"""Best-of-N sampling module."""
+import asyncio
+import contextlib
+import logging
+import random
+import re
+from dataclasses import dataclass, field
+from typing import (
+    Any, AsyncContextManager, Awaitable, Callable, Dict, List, Optional, Sequence, Union
+)
+
+from nexus_chat.backend.ollama_client import OllamaClient
+from nexus_chat.models.message import Message
+from nexus_chat.utils.constants import BEST_OF
+
+logger = logging.getLogger(__name__)
+
+# Rates an answer, partial unless the flag is set, to a prompt; higher is better
+Scorer = Callable[[str, str, bool], Awaitable[float]]
+
+class HeuristicScorer:
+    """Scores answers without a model.
+    
+    An answer scores the share of its word trigrams that are distinct,
+    so one looping on itself falls behind, plus a bonus once complete.
+    Answers running past ``max_chars`` or containing one of
+    ``stop_phrases``, such as a refusal, score 0.
+    """
+    
+    def __init__(
+        self,
+        max_chars: Optional[int] = None,
+        stop_phrases: Sequence[str] = BEST_OF["STOP_PHRASES"]
+    ):
+        """Initialize heuristic scorer.
+        
+        Args:
+            max_chars: Optional length past which an answer loses
+            stop_phrases: Phrases, matched case-insensitively, that make an answer lose
+        """
+        self.max_chars = max_chars
+        self.stop_phrases = [phrase.lower() for phrase in stop_phrases]
+    
+    async def __call__(self, prompt: str, text: str, done: bool) -> float:
+        if self.max_chars is not None and len(text) > self.max_chars:
+            return 0.0
+        lowered = text.lower()
+        if any(phrase in lowered for phrase in self.stop_phrases):
+            return 0.0
+        words = lowered.split()
+        trigrams = list(zip(words, words[1:], words[2:]))
+        distinct = len(set(trigrams)) / len(trigrams) if trigrams else 1.0
+        return distinct + (0.1 if done else 0.0)
+
+class JudgeScorer:
+    """Scores answers by asking a small model to rate them from 0 to 10."""
+    
+    PROMPT = (
+        "Rate how well the answer below responds to the question, from 0 "
+        "(useless) to 10 (excellent). The answer may be cut short; judge "
+        "what is there. Reply with the number only.\n\n"
+        "Question:\n{prompt}\n\nAnswer:\n{text}"
+    )
+    
+    def __init__(self, client: OllamaClient, model: str):
+        """Initialize judge scorer.
+        
+        Args:
+            client: Ollama client
+            model: Small model rating the answers
+        """
+        self.client = client
+        self.model = model
+    
+    async def __call__(self, prompt: str, text: str, done: bool) -> float:
+        reply = ""
+        async for chunk in self.client.chat_stream(
+            self.model,
+            self.PROMPT.format(prompt=prompt, text=text),
+            options={"temperature": 0, "num_predict": 4}
+        ):
+            reply += chunk
+        match = re.search(r"\d+(?:\.\d+)?", reply)
+        return min(float(match.group()), 10.0) / 10 if match else 0.0
+
+@dataclass
+class Candidate:
+    """One sample of a best-of-N run."""
+    index: int
+    options: Dict[str, Any]
+    text: str = ""
+    score: Optional[float] = None
+    started: bool = False
+    done: bool = False
+    lost: bool = False
+    error: Optional[str] = None
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+    
+    @property
+    def live(self) -> bool:
+        """Whether the candidate can still win."""
+        return not self.lost and self.error is None
+
+class BestOfSampler:
+    """Samples several answers to one prompt and streams the best.
+    
+    Candidates differ by seed, and by temperature if several are given.
+    They are generated side by side in slots requested together from
+    ``slots``; with fewer slots than candidates, the others start as
+    slots are freed. Every ``check_chars`` characters a candidate's
+    partial answer is scored; once every running candidate has a score,
+    those more than ``margin`` behind the best are cancelled and their
+    slots go to waiting candidates or back to the scheduler. A winner is
+    decided when one candidate is left, when all are complete, or when
+    the leader reaches ``commit_chars``; its text so far is then passed
+    to the callback and ``stream``, followed by the rest as it streams.
+    """
+    
+    def __init__(
+        self,
+        client: OllamaClient,
+        scorer: Optional[Scorer] = None,
+        check_chars: int = BEST_OF["CHECK_CHARS"],
+        margin: float = BEST_OF["MARGIN"],
+        commit_chars: int = BEST_OF["COMMIT_CHARS"]
+    ):
+        """Initialize best-of-N sampler.
+        
+        Args:
+            client: Ollama client
+            scorer: Scorer of partial and complete answers, defaults to
+                a ``HeuristicScorer``
+            check_chars: Characters generated between scores of a candidate
+            margin: Score gap behind the best at which a candidate is cancelled
+            commit_chars: Length at which the leading candidate wins
+        """
+        self.client = client
+        self.scorer = scorer or HeuristicScorer()
+        self.check_chars = check_chars
+        self.margin = margin
+        self.commit_chars = commit_chars
+    
+    async def sample(
+        self,
+        model: str,
+        message: str,
+        n: int,
+        context: Optional[List[Message]] = None,
+        options: Optional[Dict[str, Any]] = None,
+        keep_alive: Optional[Union[str, float]] = None,
+        temperatures: Optional[Sequence[float]] = None,
+        seed: Optional[int] = None,
+        callback: Optional[Callable[[str], None]] = None,
+        stream: Optional[Callable[[str], Awaitable[None]]] = None,
+        slots: Optional[Callable[[int], AsyncContextManager]] = None
+    ) -> List[Candidate]:
+        """Generate ``n`` candidate answers and stream the winner.
+        
+        Args:
+            model: Model to sample from
+            message: Message to answer
+            n: Number of candidates
+            context: Optional earlier messages of the conversation
+            options: Optional Ollama options shared by the candidates
+            keep_alive: Optional time the model stays loaded after sampling
+            temperatures: Optional temperatures, cycled over the candidates
+            seed: Seed of the first candidate, the others follow; random if omitted
+            callback: Optional callback receiving the winner's text
+            stream: Optional coroutine function receiving the winner's
+                text, such as ``StreamPersister.append``
+            slots: Optional factory of a context manager holding a number
+                of slots, such as ``RequestScheduler.slots``, yielding the
+                number granted and a function handing one back
+        
+        Returns:
+            Candidates, the winner first
+        """
+        base_seed = random.randrange(2 ** 31) if seed is None else seed
+        request = {} if keep_alive is None else {"keep_alive": keep_alive}
+        candidates = []
+        for index in range(n):
+            candidate_options = {**(options or {}), "seed": base_seed + index}
+            if temperatures:
+                candidate_options["temperature"] = temperatures[index % len(temperatures)]
+            candidates.append(Candidate(index, candidate_options))
+        winner: Optional[Candidate] = None
+        # Keeps the winner's text in order while it is caught up and streams on
+        streaming = asyncio.Lock()
+        
+        async def emit(text: str) -> None:
+            if callback:
+                callback(text)
+            if stream:
+                async with streaming:
+                    await stream(text)
+        
+        async def decide(candidate: Candidate) -> None:
+            nonlocal winner
+            winner = candidate
+            losers = [
+                other for other in candidates
+                if other is not candidate and other.live and not other.done
+            ]
+            for other in losers:
+                other.lost = True
+            logger.info(
+                f"Best of {n}: candidate {candidate.index} won at "
+                f"{len(candidate.text)} characters"
+            )
+            if candidate.text:
+                await emit(candidate.text)
+            # Last, as the deciding task may be one of them
+            for other in losers:
+                other.task.cancel()
+        
+        async def prune() -> None:
+            live = [candidate for candidate in candidates if candidate.live]
+            if winner is not None or not live:
+                return
+            running = [candidate for candidate in live if candidate.started]
+            if not running or any(candidate.score is None for candidate in running):
+                return
+            best = max(running, key=lambda candidate: candidate.score)
+            for candidate in running:
+                if candidate.score < best.score - self.margin:
+                    candidate.lost = True
+                    if not candidate.done:
+                        candidate.task.cancel()
+            live = [candidate for candidate in live if not candidate.lost]
+            if len(live) == 1 or all(candidate.done for candidate in live):
+                await decide(best)
+            elif len(best.text) >= self.commit_chars:
+                await decide(best)
+        
+        async def generate(
+            candidate: Candidate,
+            turns: asyncio.Semaphore,
+            release: Optional[Callable[[], None]]
+        ) -> None:
+            check_at = self.check_chars
+            try:
+                async with turns:
+                    candidate.started = True
+                    async for chunk in self.client.chat_stream(
+                        model, message, context, options=candidate.options, **request
+                    ):
+                        candidate.text += chunk
+                        if winner is candidate:
+                            await emit(chunk)
+                        elif winner is None and len(candidate.text) >= check_at:
+                            check_at = len(candidate.text) + self.check_chars
+                            candidate.score = await self.scorer(message, candidate.text, False)
+                            await prune()
+                    candidate.done = True
+                    if winner is None:
+                        candidate.score = await self.scorer(message, candidate.text, True)
+                        await prune()
+            except asyncio.CancelledError:
+                candidate.lost = True
+                raise
+            except Exception as e:
+                candidate.error = str(e)
+                if winner is candidate:
+                    raise
+                # The others may still answer
+                logger.warning(f"Best of {n}: candidate {candidate.index} failed: {e}")
+                await prune()
+            finally:
+                # The slot passes to a waiting candidate, or back to the scheduler
+                if candidate.started and release and not any(
+                    other.live and not other.started for other in candidates
+                ):
+                    release()
+        
+        async with slots(n) if slots else contextlib.nullcontext((n, None)) as (width, release):
+            turns = asyncio.Semaphore(width)
+            loop = asyncio.get_running_loop()
+            for candidate in candidates:
+                candidate.task = loop.create_task(generate(candidate, turns, release))
+            await asyncio.gather(
+                *(candidate.task for candidate in candidates), return_exceptions=True
+            )
+        if winner is None:
+            errors = [candidate.error for candidate in candidates if candidate.error]
+            raise RuntimeError(f"No candidate completed: {errors[0] if errors else 'cancelled'}")
+        if winner.error:
+            raise RuntimeError(winner.error)
+        return [winner] + [candidate for candidate in candidates if candidate is not winner]
@@ -0,0 +1,166 @@
+"""Content-addressed blob store module."""
+import hashlib
+import logging
+import zlib
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from nexus_chat.backend.connection_pool import ConnectionPool
+from nexus_chat.utils.constants import DATABASE
+
+logger = logging.getLogger(__name__)
+
+# Hash, size in bytes, compressed flag and stored data of a blob row
+BlobRow = Tuple[str, int, bool, Union[str, bytes]]
+
+# Bound parameters per lookup, below SQLite's default limit
+_LOOKUP_CHUNK = 500
+
+def compress_text(text: str) -> bytes:
+    """Compress text for the archive database and the blob table."""
+    return zlib.compress(text.encode("utf-8"), 6)
+
+def decompress_text(data: bytes) -> str:
+    """Decompress archived or blob text."""
+    return zlib.decompress(data).decode("utf-8")
+
+def content_hash(text: str) -> str:
+    """Hex SHA-256 of text, the key of its blob."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class BlobStore:
+    """Stores large message bodies once, keyed by their hash.
+    
+    Messages whose content is at least ``threshold`` bytes keep an empty
+    ``content`` and point at a row of the ``blobs`` table through
+    ``blob_hash``, so a log pasted into many sessions is stored once.
+    Triggers keep each blob's ``refcount`` current; ``collect_garbage``
+    removes blobs nothing refers to. Blobs are compressed when that
+    makes them smaller, and decompressed bodies are kept in an LRU cache
+    of at most ``cache_size`` MB.
+    """
+    
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        threshold: int = DATABASE["BLOB_THRESHOLD"],
+        compress: bool = True,
+        cache_size: float = DATABASE["BLOB_CACHE_SIZE"]
+    ):
+        """Initialize blob store.
+        
+        Args:
+            pool: Connection pool of the database holding the blobs table
+            threshold: Content size in bytes from which content is stored as a blob
+            compress: Whether to compress blobs
+            cache_size: Decompressed blobs kept in memory, in MB
+        """
+        self.pool = pool
+        self.threshold = threshold
+        self.compress = compress
+        self.cache_bytes = int(cache_size * 1024 * 1024)
+        
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._cached_bytes = 0
+    
+    def prepare(self, text: str, status: str) -> Optional[BlobRow]:
+        """Build the blob row for a message's content, if it needs one.
+        
+        Partial content of streaming messages is rewritten on every flush
+        and stays inline.
+        
+        Args:
+            text: Message content
+            status: Message status value
+        
+        Returns:
+            Blob row, or None if the content stays in the message row
+        """
+        if len(text) * 4 < self.threshold or status == "streaming":
+            return None
+        raw = text.encode("utf-8")
+        if len(raw) < self.threshold:
+            return None
+        
+        blob_hash = hashlib.sha256(raw).hexdigest()
+        self._remember(blob_hash, text)
+        if self.compress:
+            packed = zlib.compress(raw, 6)
+            if len(packed) < len(raw):
+                return blob_hash, len(raw), True, packed
+        return blob_hash, len(raw), False, text
+    
+    async def put(self, db, blobs: Iterable[BlobRow]) -> None:
+        """Insert blobs not stored yet, inside the caller's write transaction.
+        
+        Args:
+            db: Writer connection
+            blobs: Blob rows from ``prepare``
+        """
+        await db.executemany("""
+            INSERT INTO blobs (hash, size, compressed, data)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (hash) DO NOTHING
+        """, blobs)
+    
+    async def get_many(self, hashes: Iterable[str]) -> Dict[str, str]:
+        """Read blob contents, from the cache where possible.
+        
+        Args:
+            hashes: Blob hashes
+        
+        Returns:
+            Content by hash
+        """
+        found: Dict[str, str] = {}
+        missing: List[str] = []
+        for blob_hash in set(hashes):
+            text = self._cache.get(blob_hash)
+            if text is None:
+                missing.append(blob_hash)
+            else:
+                self._cache.move_to_end(blob_hash)
+                found[blob_hash] = text
+        
+        if missing:
+            async with self.pool.reader() as db:
+                for start in range(0, len(missing), _LOOKUP_CHUNK):
+                    chunk = missing[start:start + _LOOKUP_CHUNK]
+                    async with db.execute(
+                        "SELECT hash, compressed, data FROM blobs "
+                        f"WHERE hash IN ({', '.join('?' * len(chunk))})",
+                        chunk
+                    ) as cursor:
+                        rows = await cursor.fetchall()
+                    for blob_hash, compressed, data in rows:
+                        text = decompress_text(data) if compressed else data
+                        self._remember(blob_hash, text)
+                        found[blob_hash] = text
+        return found
+    
+    def _remember(self, blob_hash: str, text: str) -> None:
+        """Add a decompressed blob to the cache, evicting the least recently used."""
+        if blob_hash in self._cache or len(text) > self.cache_bytes:
+            return
+        self._cache[blob_hash] = text
+        self._cached_bytes += len(text)
+        while self._cached_bytes > self.cache_bytes:
+            _, evicted = self._cache.popitem(last=False)
+            self._cached_bytes -= len(evicted)
+    
+    async def collect_garbage(self) -> Tuple[int, int]:
+        """Delete blobs no message refers to.
+        
+        Returns:
+            Number of deleted blobs and their stored bytes
+        """
+        async with self.pool.writer() as db:
+            async with db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(length(data)), 0) FROM blobs WHERE refcount <= 0"
+            ) as cursor:
+                count, size = await cursor.fetchone()
+            if count:
+                await db.execute("DELETE FROM blobs WHERE refcount <= 0")
+        if count:
+            logger.info(f"Collected {count} unreferenced blobs ({size} bytes)")
+        return count, size
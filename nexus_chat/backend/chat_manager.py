@@ -1,10 +1,25 @@
 """Chat manager module."""
+import asyncio
+import contextlib
 import logging
-from typing import Any, AsyncGenerator, Callable, Dict, List, Optional
+from typing import Any, AsyncGenerator, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
 
+from nexus_chat.backend.best_of import BestOfSampler, Scorer
+from nexus_chat.backend.document_manager import DocumentManager, format_passages
+from nexus_chat.backend.document_reader import estimate_tokens
+from nexus_chat.backend.fan_out import FanOut
 from nexus_chat.backend.history_manager import HistoryManager
+from nexus_chat.backend.image_store import ImageSource, ImageStore
+from nexus_chat.backend.model_metadata import ModelMetadataCache
+from nexus_chat.backend.model_router import ModelRouter
 from nexus_chat.backend.ollama_client import OllamaClient
-from nexus_chat.models.message import Message, MessageRole
+from nexus_chat.backend.option_profiles import OptionProfiles, validate_options
+from nexus_chat.backend.request_scheduler import RequestScheduler
+from nexus_chat.backend.storage_manager import StorageManager
+from nexus_chat.backend.stream_persister import StreamPersister
+from nexus_chat.models.chat_session import ChatSession
+from nexus_chat.models.message import Message, MessageRole, MessageStatus
+from nexus_chat.utils.constants import BEST_OF
 
 logger = logging.getLogger(__name__)
 
@@ -14,13 +29,32 @@ class ChatManager:
     def __init__(
         self,
         ollama_client: OllamaClient,
-        history_manager: HistoryManager
+        history_manager: HistoryManager,
+        storage_manager: Optional[StorageManager] = None,
+        document_manager: Optional[DocumentManager] = None,
+        image_store: Optional[ImageStore] = None,
+        scheduler: Optional[RequestScheduler] = None,
+        router: Optional[ModelRouter] = None,
+        profiles: Optional[OptionProfiles] = None,
+        metadata: Optional[ModelMetadataCache] = None
     ):
         """Initialize chat manager.
         
         Args:
             ollama_client: Ollama client
             history_manager: History manager
+            storage_manager: Optional storage manager persisting messages as they stream
+            document_manager: Optional document manager adding passages of
+                the session's attached documents to prompts
+            image_store: Optional image store encoding images attached to messages
+            scheduler: Optional scheduler sharing the Ollama host's
+                generation slots between sessions
+            router: Optional router sending each new message to the
+                smallest model able to answer it instead of the current model
+            profiles: Optional generation options by model and session,
+                the built-in defaults if omitted
+            metadata: Optional metadata of the installed models, setting
+                how long to wait for answers of large models
         """
         try:
             logger.info("Initializing chat manager")
@@ -28,9 +62,17 @@ class ChatManager:
             # Store references
             self.ollama_client = ollama_client
             self.history_manager = history_manager
+            self.storage_manager = storage_manager
+            self.document_manager = document_manager
+            self.image_store = image_store
+            self.scheduler = scheduler
+            self.router = router
+            self.profiles = profiles or OptionProfiles()
+            self.metadata = metadata
             
             # Initialize state
             self.current_model = None
+            self.current_session: Optional[ChatSession] = None
             
             logger.info("Chat manager initialized")
             
@@ -60,56 +102,621 @@ class ChatManager:
             logger.error(f"Error listing models: {str(e)}")
             raise
             
-    async def send_message(self, message: str, callback: Callable[[str], None] = None) -> str:
-        """Send message to model.
+    async def _open_session(self) -> ChatSession:
+        """Current session, opened with the current model if there is none."""
+        # Check model
+        if not self.current_model:
+            raise ValueError("No model selected")
+            
+        # Open a session for the first message
+        if self.current_session is None:
+            self.current_session = ChatSession(model=self.current_model)
+            await self.history_manager.open_session(self.current_session)
+        return self.current_session
+        
+    async def _record(self, session: ChatSession, message: Message, select: bool = True) -> None:
+        """Add a finished message to its session, history and storage."""
+        self.history_manager.add_message(message, session.id, select)
+        if self.storage_manager and message.role is MessageRole.USER:
+            await self.storage_manager.save_message(message)
+            
+    async def _passages(self, session: ChatSession, prompt: Message) -> Optional[Message]:
+        """System message with the document passages relevant to a prompt, if any."""
+        if self.document_manager is None:
+            return None
+        try:
+            passages = await self.document_manager.retrieve(session.id, prompt.content)
+        except Exception as e:
+            # Already logged; the answer does not depend on it
+            logger.warning(f"Answering without documents: {e}")
+            return None
+        if not passages:
+            return None
+        return Message(
+            role=MessageRole.SYSTEM,
+            content=format_passages(passages),
+            session_id=session.id
+        )
+            
+    async def _attach(self, images: Optional[Sequence[ImageSource]]) -> Dict[str, Any]:
+        """Metadata of a user message listing its encoded images."""
+        if not images:
+            return {}
+        if self.image_store is None:
+            raise ValueError("Image attachments are not available")
+        return {"images": await self.image_store.add_many(images)}
+        
+    async def _images(self, messages: List[Message]) -> Dict[str, str]:
+        """Base64 images of messages sent to the model, by hash."""
+        hashes = [image for message in messages for image in message.images]
+        if not hashes or self.image_store is None:
+            return {}
+        return await self.image_store.payloads(hashes)
+            
+    async def _prepare(
+        self,
+        session: ChatSession,
+        prompt: Message
+    ) -> Tuple[List[Message], Dict[str, str]]:
+        """Context messages sent with a user message, and their images.
+        
+        The branch leading to ``prompt`` is sent as context. Branches
+        share their prefix, so switching between them resends the same
+        leading messages and Ollama can reuse its prompt cache for them.
+        Passages retrieved from attached documents follow the branch,
+        right before the prompt, and leave that prefix unchanged. Images
+        are sent as stored, encoded once when attached.
+        """
+        context = [
+            message
+            for message in session.tree.path(prompt.parent_id)
+            if message.status is MessageStatus.COMPLETE
+        ]
+        passages = await self._passages(session, prompt)
+        if passages:
+            context.append(passages)
+        return context, await self._images(context + [prompt])
+            
+    async def _route(self, prompt: Message) -> Tuple[str, Dict[str, Any]]:
+        """Model answering a user message, and the routing metadata of the answer."""
+        # The model selected when the message was sent
+        if self.router is None:
+            return prompt.model, {}
+        try:
+            decision = await self.router.route(prompt.content, prompt.model)
+        except Exception as e:
+            # Already logged; the selected model answers
+            logger.warning(f"Answering without routing: {e}")
+            return prompt.model, {}
+        return decision.model, {"route": decision.to_metadata()}
+            
+    def _request(self, model: str, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Generation options of a model in a session."""
+        return self.profiles.resolve(model, session_id)
+            
+    async def _refresh_metadata(self) -> None:
+        """Fetch the metadata of newly installed models, if there is a cache of it."""
+        if self.metadata is None:
+            return
+        try:
+            await self.metadata.refresh()
+        except Exception as e:
+            # Already logged; the metadata fetched earlier still applies
+            logger.warning(f"Using earlier model metadata: {e}")
+            
+    def _fit(self, model: str, context: List[Message], prompt: Message) -> List[Message]:
+        """Context without the oldest messages that would overflow the model's ``num_ctx``.
+        
+        Ollama silently cuts prompts longer than its context window;
+        dropping whole messages here, oldest first, keeps the recent
+        ones and the system messages, such as document passages. A
+        quarter of the window, at most ``num_predict`` tokens, is kept
+        for the answer.
+        """
+        options = self._request(model, prompt.session_id)["options"]
+        num_ctx = options.get("num_ctx")
+        if not num_ctx:
+            return context
+        num_predict = options.get("num_predict", -1)
+        reserve = min(num_predict, num_ctx // 4) if num_predict > 0 else num_ctx // 4
+        budget = num_ctx - reserve - estimate_tokens(prompt.content)
+        used = sum(estimate_tokens(message.content) for message in context)
+        
+        dropped = set()
+        for index, message in enumerate(context):
+            if used <= budget:
+                break
+            if message.role is not MessageRole.SYSTEM:
+                dropped.add(index)
+                used -= estimate_tokens(message.content)
+        if not dropped:
+            return context
+        logger.warning(
+            f"Dropped {len(dropped)} oldest messages to fit the {num_ctx} token context of {model}"
+        )
+        return [message for index, message in enumerate(context) if index not in dropped]
+            
+    def _slot(self, session_id: str, model: str) -> contextlib.AbstractAsyncContextManager:
+        """Generation slot of the scheduler, if there is one."""
+        if self.scheduler is None:
+            return contextlib.nullcontext(0.0)
+        return self.scheduler.slot(session_id, model)
+            
+    async def _reply(
+        self,
+        session: ChatSession,
+        prompt: Message,
+        callback: Optional[Callable[[str], None]],
+        model: Optional[str] = None,
+        prepared: Optional[Tuple[List[Message], Dict[str, str]]] = None,
+        select: bool = True,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Message:
+        """Stream a model's answer to a user message.
+        
+        The session is passed in rather than read from
+        ``current_session``, which may change while the answer streams.
+        
+        Args:
+            session: Session of the prompt
+            prompt: User message to answer, already recorded
+            callback: Optional callback to receive response chunks
+            model: Model answering, defaults to the current model
+            prepared: Context and images from ``_prepare``, computed if omitted
+            select: Whether the answer becomes the tip of the selected branch
+            metadata: Optional metadata of the answer, stored with its stats
+            
+        Returns:
+            Complete assistant message
+        """
+        model = model or self.current_model
+        context, images = prepared or await self._prepare(session, prompt)
+        await self._refresh_metadata()
+        context = self._fit(model, context, prompt)
+        
+        # Assistant message is persisted while it streams
+        assistant_message = Message(
+            role=MessageRole.ASSISTANT,
+            content="",
+            model=model,
+            session_id=session.id,
+            parent_id=prompt.id,
+            status=MessageStatus.PENDING
+        )
+        persister = (
+            StreamPersister(self.storage_manager, assistant_message)
+            if self.storage_manager
+            else None
+        )
+        stats: Dict[str, Any] = dict(metadata or {})
+        
+        # Send message and process streaming response
+        try:
+            async with self._slot(session.id, model) as waited:
+                if waited:
+                    stats["queue_duration"] = int(waited * 1e9)
+                async for chunk in self.ollama_client.chat(
+                    model=model,
+                    message=prompt.content,
+                    stats=stats,
+                    context=context,
+                    images=[images[image] for image in prompt.images if image in images],
+                    context_images=images,
+                    timeout=self.metadata.timeout(model) if self.metadata else None,
+                    **self._request(model, session.id)
+                ):
+                    # Update complete response
+                    if persister:
+                        await persister.append(chunk)
+                    else:
+                        assistant_message.content += chunk
+                    
+                    # Call callback if provided
+                    if callback:
+                        callback(chunk)
+                    
+        except (Exception, asyncio.CancelledError) as e:
+            # Keep the partial answer, marked as failed
+            if persister:
+                error = "Cancelled" if isinstance(e, asyncio.CancelledError) else str(e)
+                try:
+                    await persister.fail(error)
+                except Exception as persist_error:
+                    logger.error(f"Error persisting failed message: {persist_error}")
+            raise
+            
+        # Finalize content, status and stats in one write
+        if persister:
+            await persister.finish(stats)
+        else:
+            assistant_message.status = MessageStatus.COMPLETE
+            assistant_message.metadata.update(stats)
+        if self.router:
+            self.router.observe(model, stats)
+        
+        # Add assistant message to the session and history
+        await self._record(session, assistant_message, select)
+        
+        # Move messages evicted from memory to storage
+        await self.history_manager.spill()
+        
+        return assistant_message
+        
+    async def send_message(
+        self,
+        message: str,
+        callback: Callable[[str], None] = None,
+        images: Optional[Sequence[ImageSource]] = None
+    ) -> str:
+        """Send message to model, continuing the selected branch.
         
         Args:
             message: Message text
             callback: Optional callback to receive response chunks
+            images: Optional image files, or their content, attached for
+                vision models
             
         Returns:
             Complete model response
         """
         try:
             logger.info("Sending message")
+            session = await self._open_session()
             
-            # Check model
-            if not self.current_model:
-                raise ValueError("No model selected")
-                
-            # Add user message to history
-            self.history_manager.add_message(
-                Message(
-                    role=MessageRole.USER,
-                    content=message
-                )
+            user_message = Message(
+                role=MessageRole.USER,
+                content=message,
+                model=self.current_model,
+                session_id=session.id,
+                parent_id=session.tree.leaf_id,
+                metadata=await self._attach(images)
             )
+            await self._record(session, user_message)
+            model, route = await self._route(user_message)
+            return (await self._reply(
+                session, user_message, callback, model, metadata=route
+            )).content
+            
+        except Exception as e:
+            logger.error(f"Error sending message: {str(e)}")
+            raise
             
-            # Initialize complete response
-            complete_response = ""
+    async def edit_message(
+        self,
+        message_id: str,
+        content: str,
+        callback: Callable[[str], None] = None
+    ) -> str:
+        """Send an edited user message as a new branch and get its answer.
+        
+        The original message and its answers stay as a sibling branch.
+        Images attached to the original are attached to the edit.
+        
+        Args:
+            message_id: Id of the user message to edit
+            content: New message text
+            callback: Optional callback to receive response chunks
+            
+        Returns:
+            Complete model response
+        """
+        try:
+            logger.info(f"Editing message {message_id}")
+            session = await self._open_session()
+            original = session.tree.nodes[message_id]
+            if original.role is not MessageRole.USER:
+                raise ValueError("Only user messages can be edited")
             
-            # Send message and process streaming response
-            async for chunk in self.ollama_client.chat(
+            user_message = Message(
+                role=MessageRole.USER,
+                content=content,
                 model=self.current_model,
-                message=message
-            ):
-                # Update complete response
-                complete_response += chunk
-                
-                # Call callback if provided
-                if callback:
-                    callback(chunk)
-                    
-            # Add assistant message to history
-            self.history_manager.add_message(
-                Message(
-                    role=MessageRole.ASSISTANT,
-                    content=complete_response
-                )
+                session_id=session.id,
+                parent_id=original.parent_id,
+                metadata={"images": original.images} if original.images else None
             )
+            await self._record(session, user_message)
+            model, route = await self._route(user_message)
+            return (await self._reply(
+                session, user_message, callback, model, metadata=route
+            )).content
+            
+        except Exception as e:
+            logger.error(f"Error editing message: {str(e)}")
+            raise
             
-            return complete_response
+    async def regenerate(self, message_id: str, callback: Callable[[str], None] = None) -> str:
+        """Answer a user message again, adding a sibling of its answers.
+        
+        Args:
+            message_id: Id of an answer to replace, or of the user message
+            callback: Optional callback to receive response chunks
+            
+        Returns:
+            Complete model response
+        """
+        try:
+            logger.info(f"Regenerating answer to {message_id}")
+            session = await self._open_session()
+            prompt = session.tree.nodes[message_id]
+            if prompt.role is MessageRole.ASSISTANT:
+                prompt = session.tree.nodes[prompt.parent_id]
+            
+            # Select the prompt so the new answer is attached below it
+            session.tree.leaf_id = prompt.id
+            return (await self._reply(session, prompt, callback)).content
             
         except Exception as e:
-            logger.error(f"Error sending message: {str(e)}")
+            logger.error(f"Error regenerating answer: {str(e)}")
+            raise
+            
+    async def escalate(self, message_id: str, callback: Callable[[str], None] = None) -> str:
+        """Answer a user message again with a larger model, adding a sibling answer.
+        
+        Args:
+            message_id: Id of the answer that was not good enough
+            callback: Optional callback to receive response chunks
+            
+        Returns:
+            Complete model response
+        """
+        try:
+            if self.router is None:
+                raise ValueError("Escalation needs model routing")
+            logger.info(f"Escalating answer {message_id}")
+            session = await self._open_session()
+            answer = session.tree.nodes[message_id]
+            if answer.role is not MessageRole.ASSISTANT:
+                raise ValueError("Only answers can be escalated")
+            prompt = session.tree.nodes[answer.parent_id]
+            
+            model = await self.router.escalate(prompt.content, answer.model)
+            if model is None:
+                raise ValueError(f"No model larger than {answer.model} is installed")
+            
+            # Select the prompt so the new answer is attached below it
+            session.tree.leaf_id = prompt.id
+            route = {"route": {"escalated_from": answer.model}}
+            return (await self._reply(session, prompt, callback, model, metadata=route)).content
+            
+        except Exception as e:
+            logger.error(f"Error escalating answer: {str(e)}")
+            raise
+            
+    async def fan_out(
+        self,
+        message: str,
+        models: Sequence[str],
+        callback: Optional[Callable[[str, str], None]] = None,
+        images: Optional[Sequence[ImageSource]] = None
+    ) -> FanOut:
+        """Send one message to several models and stream their answers side by side.
+        
+        The answers stream concurrently, as far as the scheduler's
+        limits allow, each as a sibling branch below the message. Time to
+        first token and tokens per second are recorded in the metadata
+        of each answer.
+        
+        Args:
+            message: Message text
+            models: Models to ask, each at most once
+            callback: Optional callback receiving the model and each
+                chunk of its answer
+            images: Optional image files, or their content, for vision models
+            
+        Returns:
+            Fan-out to wait on and pick the winning answer from
+        """
+        try:
+            if not models or len(set(models)) != len(models):
+                raise ValueError("Fan-out needs distinct models")
+            logger.info(f"Fanning out message to {', '.join(models)}")
+            session = await self._open_session()
+            
+            user_message = Message(
+                role=MessageRole.USER,
+                content=message,
+                model=self.current_model,
+                session_id=session.id,
+                parent_id=session.tree.leaf_id,
+                metadata=await self._attach(images)
+            )
+            await self._record(session, user_message)
+            prepared = await self._prepare(session, user_message)
+            
+            def reply(model: str):
+                chunks = (lambda chunk: callback(model, chunk)) if callback else None
+                return self._reply(session, user_message, chunks, model, prepared, select=False)
+            
+            return FanOut(user_message, models, reply, session.tree.select)
+            
+        except Exception as e:
+            logger.error(f"Error fanning out message: {str(e)}")
+            raise
+            
+    async def best_of(
+        self,
+        message: str,
+        n: int = BEST_OF["N"],
+        callback: Optional[Callable[[str], None]] = None,
+        scorer: Optional[Scorer] = None,
+        temperatures: Optional[Sequence[float]] = None
+    ) -> str:
+        """Sample several answers of the current model and keep the best.
+        
+        Candidates differ by seed, and by temperature if several are
+        given, and run side by side in scheduler slots granted together.
+        Those clearly behind are cancelled as they stream and only the
+        winner is streamed to the callback and persisted, like any other
+        answer; its seed, temperature and score are recorded in its
+        metadata.
+        
+        Args:
+            message: Message text
+            n: Number of candidates
+            callback: Optional callback to receive the winner's chunks
+            scorer: Optional scorer of partial answers, defaults to a
+                heuristic one
+            temperatures: Optional temperatures, cycled over the candidates
+            
+        Returns:
+            Winning model response
+        """
+        try:
+            if n < 1:
+                raise ValueError("Best-of sampling needs at least one candidate")
+            logger.info(f"Sampling best of {n} answers")
+            session = await self._open_session()
+            model = self.current_model
+            
+            user_message = Message(
+                role=MessageRole.USER,
+                content=message,
+                model=model,
+                session_id=session.id,
+                parent_id=session.tree.leaf_id
+            )
+            await self._record(session, user_message)
+            context, _ = await self._prepare(session, user_message)
+            await self._refresh_metadata()
+            context = self._fit(model, context, user_message)
+            
+            request = self._request(model, session.id)
+            
+            # The winner is persisted while it streams, like any answer
+            assistant_message = Message(
+                role=MessageRole.ASSISTANT,
+                content="",
+                model=model,
+                session_id=session.id,
+                parent_id=user_message.id,
+                status=MessageStatus.PENDING
+            )
+            persister = (
+                StreamPersister(self.storage_manager, assistant_message)
+                if self.storage_manager
+                else None
+            )
+            
+            async def stream(chunk: str) -> None:
+                if persister:
+                    await persister.append(chunk)
+                else:
+                    assistant_message.content += chunk
+            
+            try:
+                candidates = await BestOfSampler(self.ollama_client, scorer).sample(
+                    model,
+                    message,
+                    n,
+                    context=context,
+                    options=request["options"],
+                    keep_alive=request.get("keep_alive"),
+                    temperatures=temperatures,
+                    callback=callback,
+                    stream=stream,
+                    slots=(
+                        (lambda count: self.scheduler.slots(session.id, model, count))
+                        if self.scheduler
+                        else None
+                    )
+                )
+            except (Exception, asyncio.CancelledError) as e:
+                # Keep the winner's partial answer, marked as failed
+                if persister and persister.writes:
+                    error = "Cancelled" if isinstance(e, asyncio.CancelledError) else str(e)
+                    try:
+                        await persister.fail(error)
+                    except Exception as persist_error:
+                        logger.error(f"Error persisting failed message: {persist_error}")
+                raise
+            winner = candidates[0]
+            
+            stats = {"best_of": {
+                "n": n,
+                "seed": winner.options["seed"],
+                "temperature": winner.options.get("temperature"),
+                "score": winner.score,
+                "cancelled": sum(
+                    candidate.lost and not candidate.done for candidate in candidates
+                )
+            }}
+            if persister:
+                await persister.finish(stats)
+            else:
+                assistant_message.status = MessageStatus.COMPLETE
+                assistant_message.metadata.update(stats)
+            await self._record(session, assistant_message)
+            await self.history_manager.spill()
+            return assistant_message.content
+            
+        except Exception as e:
+            logger.error(f"Error sampling best answer: {str(e)}")
+            raise
+            
+    async def set_session_options(self, options: Optional[Mapping[str, Any]]) -> None:
+        """Override generation options in the current session.
+        
+        The overrides are kept in the session's metadata.
+        
+        Args:
+            options: Options overriding the model's, None to remove them
+            
+        Raises:
+            ValueError: If an option is invalid
+        """
+        try:
+            session = await self._open_session()
+            if options:
+                session.metadata["options"] = validate_options(options)
+            else:
+                session.metadata.pop("options", None)
+            self.profiles.set_session(session.id, options)
+            if self.storage_manager:
+                await self.storage_manager.save_session(session)
+            logger.info(f"Set generation options of session {session.id}")
+            
+        except Exception as e:
+            logger.error(f"Error setting session options: {str(e)}")
+            raise
+            
+    async def close_session(self) -> None:
+        """Close the current session, marking it inactive.
+        
+        Inactive sessions are the ones retention archives first.
+        """
+        session = self.current_session
+        if session is None:
+            return
+        try:
+            session.active = False
+            if self.storage_manager:
+                await self.storage_manager.save_session(session)
+                await self.history_manager.spill()
+            self.history_manager.close_session(session.id)
+            self.current_session = None
+            logger.info(f"Closed session {session.id}")
+            
+        except Exception as e:
+            logger.error(f"Error closing session: {str(e)}")
+            raise
+            
+    def switch_branch(self, message_id: str) -> List[Message]:
+        """Select the newest branch through a message.
+        
+        Args:
+            message_id: Message on the branch, e.g. one of several answers
+            
+        Returns:
+            Messages of the branch in memory, oldest first
+        """
+        try:
+            if self.current_session is None:
+                raise ValueError("No session open")
+            branch = self.current_session.tree.select(message_id)
+            logger.info(f"Switched to branch ending at {self.current_session.tree.leaf_id}")
+            return branch
+            
+        except Exception as e:
+            logger.error(f"Error switching branch: {str(e)}")
             raise
@@ -0,0 +1,170 @@
+"""SQLite connection pool module."""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import aiosqlite
+
+from nexus_chat.utils.constants import DATABASE
+
+logger = logging.getLogger(__name__)
+
+class ConnectionPool:
+    """Long-lived aiosqlite connections for one database file.
+    
+    A single writer connection serializes all writes behind a lock and
+    wraps each ``writer()`` block in one transaction. A small pool of
+    read-only connections serves queries; with WAL journaling they read
+    a consistent snapshot while the writer is committing.
+    
+    Every connection attaches the same ``attached`` databases and
+    registers the same SQL ``functions``, so queries may use them on
+    either side.
+    """
+    
+    def __init__(
+        self,
+        db_path: str,
+        readers: int = DATABASE["READER_POOL_SIZE"],
+        cache_size: int = DATABASE["CACHE_SIZE"],
+        mmap_size: int = DATABASE["MMAP_SIZE"],
+        cached_statements: int = DATABASE["CACHED_STATEMENTS"],
+        attached: Optional[Dict[str, str]] = None,
+        functions: Optional[Dict[str, Tuple[int, Callable]]] = None
+    ):
+        """Initialize connection pool.
+        
+        Args:
+            db_path: Path to the database file
+            readers: Number of reader connections
+            cache_size: Page cache per connection, in MB
+            mmap_size: Memory-mapped I/O window, in MB
+            cached_statements: Prepared statements cached per connection
+            attached: Optional schema names mapped to database files to attach
+            functions: Optional SQL function names mapped to (argument count, function)
+        """
+        self.db_path = db_path
+        self.reader_count = readers
+        self.cache_size = cache_size
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+        self.attached = attached or {}
+        self.functions = functions or {}
+        
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._write_lock = asyncio.Lock()
+        self._readers: List[aiosqlite.Connection] = []
+        self._idle: Optional[asyncio.Queue] = None
+        self._open_lock = asyncio.Lock()
+    
+    @property
+    def is_open(self) -> bool:
+        """Whether the pool's connections are open."""
+        return self._writer is not None
+    
+    async def _connect(self, read_only: bool = False) -> aiosqlite.Connection:
+        """Open a connection and apply tuning pragmas."""
+        db = await aiosqlite.connect(
+            self.db_path,
+            cached_statements=self.cached_statements
+        )
+        db.row_factory = aiosqlite.Row
+        await db.execute("PRAGMA busy_timeout = 5000")
+        await db.execute("PRAGMA synchronous = NORMAL")
+        await db.execute("PRAGMA foreign_keys = ON")
+        await db.execute("PRAGMA temp_store = MEMORY")
+        await db.execute(f"PRAGMA cache_size = -{self.cache_size * 1024}")
+        await db.execute(f"PRAGMA mmap_size = {self.mmap_size * 1024 * 1024}")
+        for name, (arguments, function) in self.functions.items():
+            await db.create_function(name, arguments, function, deterministic=True)
+        for schema, path in self.attached.items():
+            await db.execute(f"ATTACH DATABASE ? AS {schema}", (path,))
+        if read_only:
+            await db.execute("PRAGMA query_only = ON")
+        return db
+    
+    async def open(self) -> None:
+        """Open writer and reader connections."""
+        async with self._open_lock:
+            if self.is_open:
+                return
+            
+            writer = None
+            try:
+                writer = await self._connect()
+                # Both are persistent, set them once from the writer; the
+                # vacuum mode only takes effect on files without tables yet
+                for schema in ["main", *self.attached]:
+                    await writer.execute(f"PRAGMA {schema}.auto_vacuum = INCREMENTAL")
+                    async with writer.execute(
+                        f"PRAGMA {schema}.journal_mode = WAL"
+                    ) as cursor:
+                        mode = (await cursor.fetchone())[0]
+                    if mode != "wal":
+                        logger.warning(f"WAL not available for {schema}, using {mode} journal")
+                
+                self._idle = asyncio.Queue()
+                for _ in range(self.reader_count):
+                    reader = await self._connect(read_only=True)
+                    self._readers.append(reader)
+                    self._idle.put_nowait(reader)
+                
+                self._writer = writer
+                logger.info(
+                    f"Opened connection pool for {self.db_path} "
+                    f"with {self.reader_count} readers"
+                )
+            
+            except Exception as e:
+                logger.error(f"Error opening connection pool: {str(e)}")
+                if writer is not None:
+                    await writer.close()
+                for reader in self._readers:
+                    await reader.close()
+                self._readers.clear()
+                raise
+    
+    async def close(self) -> None:
+        """Close all connections."""
+        async with self._open_lock:
+            if not self.is_open:
+                return
+            
+            async with self._write_lock:
+                await self._writer.close()
+                self._writer = None
+            
+            for reader in self._readers:
+                await reader.close()
+            self._readers.clear()
+            self._idle = None
+            logger.info("Closed connection pool")
+    
+    @asynccontextmanager
+    async def writer(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Acquire the writer connection inside one transaction.
+        
+        Commits when the block exits normally and rolls back on error.
+        """
+        if not self.is_open:
+            await self.open()
+        async with self._write_lock:
+            try:
+                yield self._writer
+                await self._writer.commit()
+            except BaseException:
+                await self._writer.rollback()
+                raise
+    
+    @asynccontextmanager
+    async def reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Acquire a reader connection."""
+        if not self.is_open:
+            await self.open()
+        db = await self._idle.get()
+        try:
+            yield db
+        finally:
+            if self._idle is not None:
+                self._idle.put_nowait(db)
@@ -0,0 +1,475 @@
+"""Document retrieval module."""
+import asyncio
+import logging
+import os
+from concurrent.futures import Executor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from nexus_chat.backend.document_reader import Chunk, read_documents
+from nexus_chat.backend.embedding_manager import StoredIndex
+from nexus_chat.backend.ollama_client import OllamaClient
+from nexus_chat.backend.storage_manager import StorageManager
+from nexus_chat.backend.vector_index import encode_vector, require_numpy
+from nexus_chat.backend.worker_pool import create_pool
+from nexus_chat.utils.constants import DATABASE, DOCUMENTS, MODEL_DEFAULTS
+from nexus_chat.utils.progress import ProgressCallback
+
+logger = logging.getLogger(__name__)
+
+# Path, size, mtime in nanoseconds, content hash and chunks of a read
+# file; None chunks when the content did not change
+ReadDocument = Tuple[str, int, int, str, Optional[List[Chunk]]]
+
+# Files, and bytes, read per call to a worker process
+READ_GROUP_FILES = 32
+READ_GROUP_BYTES = 4 * 1024 * 1024
+
+@dataclass
+class IngestReport:
+    """Outcome of an ingestion pass."""
+    files: int = 0  # files found in the sources
+    unchanged: int = 0  # skipped by size and mtime, or by content hash
+    indexed: int = 0  # read, chunked and embedded
+    removed: int = 0  # no longer on disk
+    failed: int = 0  # could not be read
+    chunks: int = 0  # passages embedded
+
+@dataclass
+class Passage:
+    """A document passage retrieved for a prompt."""
+    path: str
+    heading: Optional[str]
+    content: str
+    tokens: int
+    score: float
+
+def format_passages(passages: Sequence[Passage]) -> str:
+    """Prompt text presenting retrieved passages to the model.
+    
+    Args:
+        passages: Passages, best first
+    
+    Returns:
+        Text of a system message
+    """
+    parts = [
+        "Excerpts from the user's documents follow. Use them if they are "
+        "relevant to the next message and name the files you draw on."
+    ]
+    for number, passage in enumerate(passages, 1):
+        source = f"{passage.path} ({passage.heading})" if passage.heading else passage.path
+        parts.append(f"[{number}] {source}\n{passage.content}")
+    return "\n\n".join(parts)
+
+def _scan(root: Path, suffixes: Sequence[str], max_size: int) -> Iterator[Tuple[str, int, int]]:
+    """Files of a source with their size and mtime in nanoseconds.
+    
+    A folder is walked without following symlinks or entering hidden
+    folders, and yields only files with a supported suffix; an attached
+    file is always read.
+    """
+    if root.is_file():
+        stat = root.stat()
+        yield str(root), stat.st_size, stat.st_mtime_ns
+        return
+    
+    folders = [str(root)]
+    while folders:
+        folder = folders.pop()
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.name.startswith("."):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        folders.append(entry.path)
+                    elif (
+                        entry.is_file()
+                        and os.path.splitext(entry.name)[1].lower() in suffixes
+                    ):
+                        stat = entry.stat()
+                        if stat.st_size <= max_size:
+                            yield entry.path, stat.st_size, stat.st_mtime_ns
+        except OSError as e:
+            logger.warning(f"Cannot scan {folder}: {e}")
+
+def _groups(
+    files: List[Tuple[str, int, int, Optional[str]]]
+) -> Iterator[List[Tuple[str, int, int, Optional[str]]]]:
+    """Split files to read into groups handed to a worker at once."""
+    group: List[Tuple[str, int, int, Optional[str]]] = []
+    size = 0
+    for item in files:
+        group.append(item)
+        size += item[1]
+        if len(group) >= READ_GROUP_FILES or size >= READ_GROUP_BYTES:
+            yield group
+            group, size = [], 0
+    if group:
+        yield group
+
+class DocumentManager:
+    """Ingests files attached to sessions and retrieves passages for prompts.
+    
+    Ingestion scans every attached file and folder. Files whose size and
+    mtime match the stored document are skipped unopened; the others are
+    hashed and chunked in a process pool, and those whose content hash
+    did not change are skipped as well. Chunks of changed files are
+    embedded across files in batches of ``batch_size``, one Ollama
+    request each, and stored with their documents in one transaction.
+    Passages are searched in a second ``VectorIndex`` grouped by source,
+    so retrieval only looks at the sources attached to the session.
+    """
+    
+    def __init__(
+        self,
+        storage: StorageManager,
+        client: OllamaClient,
+        model: str = MODEL_DEFAULTS["EMBEDDING_MODEL"],
+        index_path: Optional[str] = None,
+        workers: Optional[int] = None,
+        batch_size: int = DATABASE["EMBEDDING_BATCH_SIZE"],
+        chunk_tokens: int = DOCUMENTS["CHUNK_TOKENS"],
+        interval: float = DOCUMENTS["INGEST_INTERVAL"]
+    ):
+        """Initialize document manager.
+        
+        Args:
+            storage: Storage manager holding sources, documents and chunks
+            client: Ollama client computing embeddings
+            model: Embedding model
+            index_path: Vector index cache file, defaults to
+                ``<name>-chunks.npy`` next to the database
+            workers: Processes reading files, defaults to the CPU count
+            batch_size: Chunks embedded per request
+            chunk_tokens: Estimated tokens per passage
+            interval: Hours between scans of the attached sources
+        """
+        require_numpy()
+        self.storage = storage
+        self.client = client
+        self.model = model
+        if index_path is None:
+            db_path = Path(storage.db_path)
+            index_path = db_path.with_name(f"{db_path.stem}-chunks.npy")
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.chunk_tokens = chunk_tokens
+        self.interval = interval
+        
+        self.vectors = StoredIndex(storage, "chunks", model, Path(index_path))
+        # Guards the index; ingestion passes run one at a time
+        self._lock = asyncio.Lock()
+        self._ingest_lock = asyncio.Lock()
+        self._pool: Optional[Executor] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    def _executor(self) -> Executor:
+        """Pool reading files, started on first use and kept until ``stop``.
+        
+        Worker processes take a while to start, so they are reused
+        across ingestion passes.
+        """
+        if self._pool is None:
+            self._pool = create_pool(self.workers, "document-reader")
+        return self._pool
+    
+    async def attach(self, session_id: str, path: str) -> str:
+        """Attach a file or folder to a session.
+        
+        Its documents are retrieved from once ingested.
+        
+        Args:
+            session_id: Session id
+            path: File or folder
+        
+        Returns:
+            Absolute path the source is attached with
+        """
+        resolved = Path(path).expanduser().resolve()
+        if not resolved.exists():
+            raise FileNotFoundError(f"No such file or folder: {path}")
+        await self.storage.attach_source(session_id, str(resolved))
+        logger.info(f"Attached {resolved} to session {session_id}")
+        return str(resolved)
+    
+    async def detach(self, session_id: str, path: str) -> bool:
+        """Detach a file or folder from a session.
+        
+        Args:
+            session_id: Session id
+            path: File or folder
+        
+        Returns:
+            Whether it was attached
+        """
+        return await self.storage.detach_source(
+            session_id, str(Path(path).expanduser().resolve())
+        )
+    
+    async def _plan(
+        self,
+        source_id: int,
+        root: str,
+        report: IngestReport
+    ) -> List[Tuple[str, int, int, Optional[str]]]:
+        """Files of a source to read, dropping documents gone from disk."""
+        known = await self.storage.get_documents(source_id)
+        files = await asyncio.to_thread(lambda: list(_scan(
+            Path(root), DOCUMENTS["SUFFIXES"], DOCUMENTS["MAX_FILE_SIZE"] * 1024 * 1024
+        )))
+        report.files += len(files)
+        
+        to_read = []
+        for path, size, mtime_ns in files:
+            stored = known.pop(path, None)
+            if stored is not None and stored[4] == self.model:
+                if stored[1:3] == (size, mtime_ns):
+                    report.unchanged += 1
+                    continue
+                to_read.append((path, size, mtime_ns, stored[3]))
+            else:
+                to_read.append((path, size, mtime_ns, None))
+        
+        # Documents left were deleted, or are no longer supported
+        await self.storage.delete_documents([stored[0] for stored in known.values()])
+        report.removed += len(known)
+        return to_read
+    
+    async def _store(self, source_id: int, documents: List[ReadDocument]) -> int:
+        """Embed the chunks of read documents and store them.
+        
+        Returns:
+            Number of chunks stored
+        """
+        texts = [content for *_, chunks in documents for _, content, _ in chunks or ()]
+        embeddings: List[List[float]] = []
+        for start in range(0, len(texts), self.batch_size):
+            embeddings += await self.client.embed(
+                self.model, texts[start:start + self.batch_size]
+            )
+        
+        async def save(slots: List[int]) -> int:
+            vectors = iter(zip(slots, embeddings))
+            return await self.storage.save_documents(source_id, self.model, [
+                (path, size, mtime_ns, digest, None if chunks is None else [
+                    (heading, content, tokens, slot, encode_vector(embedding))
+                    for (heading, content, tokens), (slot, embedding) in zip(chunks, vectors)
+                ])
+                for path, size, mtime_ns, digest, chunks in documents
+            ])
+        
+        if not embeddings:
+            return await save([])
+        async with self._lock:
+            await self.vectors.add(save, len(embeddings), len(embeddings[0]))
+        return len(embeddings)
+    
+    async def _read_source(
+        self,
+        pool: Executor,
+        source_id: int,
+        to_read: List[Tuple[str, int, int, Optional[str]]],
+        report: IngestReport,
+        progress: Optional[ProgressCallback],
+        skipped: int,
+        total: int
+    ) -> None:
+        """Read files in the pool and store them batch by batch."""
+        loop = asyncio.get_running_loop()
+        groups = iter(_groups(to_read))
+        # Bounded, so memory does not grow with the number of files
+        window = self.workers * 2
+        pending: Dict[asyncio.Future, List[Tuple[str, int, int, Optional[str]]]] = {}
+        batch: List[ReadDocument] = []
+        batch_chunks = 0
+        try:
+            while True:
+                while len(pending) < window:
+                    group = next(groups, None)
+                    if group is None:
+                        break
+                    future = loop.run_in_executor(
+                        pool,
+                        read_documents,
+                        [(path, known_hash) for path, _, _, known_hash in group],
+                        self.chunk_tokens
+                    )
+                    pending[future] = group
+                if not pending:
+                    break
+                
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    group = pending.pop(future)
+                    for (path, size, mtime_ns, _), (digest, chunks, error) in zip(
+                        group, future.result()
+                    ):
+                        if error is not None:
+                            logger.warning(f"Cannot read {path}: {error}")
+                            report.failed += 1
+                            continue
+                        if chunks is None:
+                            report.unchanged += 1
+                        else:
+                            report.indexed += 1
+                            batch_chunks += len(chunks)
+                        batch.append((path, size, mtime_ns, digest, chunks))
+                
+                if batch_chunks >= self.batch_size or len(batch) >= self.batch_size:
+                    report.chunks += await self._store(source_id, batch)
+                    batch, batch_chunks = [], 0
+                if progress:
+                    read = report.indexed + report.unchanged + report.failed - skipped
+                    progress(read, total)
+            
+            if batch:
+                report.chunks += await self._store(source_id, batch)
+        finally:
+            for future in pending:
+                future.cancel()
+    
+    async def ingest(
+        self,
+        paths: Optional[List[str]] = None,
+        progress: Optional[ProgressCallback] = None
+    ) -> IngestReport:
+        """Bring the stored documents up to date with the attached sources.
+        
+        Args:
+            paths: Sources to scan, all attached ones if None
+            progress: Optional callback receiving files read and to read
+        
+        Returns:
+            What was found, skipped, embedded and removed
+        """
+        async with self._ingest_lock:
+            try:
+                sources = await self.storage.get_sources()
+                if paths is not None:
+                    wanted = {str(Path(path).expanduser().resolve()) for path in paths}
+                    sources = [source for source in sources if source[1] in wanted]
+                
+                report = IngestReport()
+                plans = []
+                for source_id, root in sources:
+                    # Kept as is, the source may be on a drive not mounted now
+                    if not os.path.exists(root):
+                        logger.warning(f"Attached source {root} is missing, skipping it")
+                        continue
+                    plans.append((source_id, await self._plan(source_id, root, report)))
+                # Files skipped by size and mtime are not read
+                skipped = report.unchanged
+                total = sum(len(to_read) for _, to_read in plans)
+                
+                if total:
+                    pool = self._executor()
+                    for source_id, to_read in plans:
+                        await self._read_source(
+                            pool, source_id, to_read, report, progress, skipped, total
+                        )
+                
+                await self.flush()
+                logger.info(
+                    f"Ingested {report.files} files: {report.indexed} indexed into "
+                    f"{report.chunks} passages, {report.unchanged} unchanged, "
+                    f"{report.removed} removed, {report.failed} failed"
+                )
+                return report
+            
+            except Exception as e:
+                logger.error(f"Error ingesting documents: {e}")
+                if isinstance(e, BrokenProcessPool):
+                    # A worker died; start a new pool next time
+                    self._pool = None
+                raise
+    
+    async def retrieve(
+        self,
+        session_id: str,
+        query: str,
+        budget: int = DOCUMENTS["CONTEXT_TOKENS"],
+        limit: int = DOCUMENTS["TOP_K"]
+    ) -> List[Passage]:
+        """Find the passages of a session's documents closest to a query.
+        
+        Args:
+            session_id: Session whose attached sources to search
+            query: Text to match, usually the prompt
+            budget: Estimated tokens the passages may take together
+            limit: Maximum number of passages
+        
+        Returns:
+            Passages fitting the budget, best first
+        """
+        try:
+            sources = await self.storage.get_sources(session_id)
+            if not sources:
+                return []
+            async with self._lock:
+                await self.vectors.refresh()
+            if self.vectors.index is None:
+                return []
+            
+            embedding, = await self.client.embed(self.model, [query])
+            async with self._lock:
+                scores = await asyncio.to_thread(
+                    self.vectors.index.search,
+                    embedding,
+                    limit,
+                    [str(source_id) for source_id, _ in sources]
+                )
+            rows = await self.storage.get_chunks([int(chunk_id) for chunk_id, _ in scores])
+            
+            passages = []
+            used = 0
+            for chunk_id, score in scores:
+                row = rows.get(int(chunk_id))
+                # A smaller passage further down may still fit
+                if row is None or used + row[3] > budget:
+                    continue
+                used += row[3]
+                passages.append(Passage(*row, score=score))
+            return passages
+        
+        except Exception as e:
+            logger.error(f"Error retrieving passages: {e}")
+            raise
+    
+    async def flush(self) -> None:
+        """Save the index cache and drop the changes it reflects."""
+        async with self._lock:
+            await self.vectors.flush()
+    
+    async def _run(self) -> None:
+        """Scheduler loop."""
+        while True:
+            try:
+                await self.ingest()
+            except Exception:
+                # Already logged, retried after the next interval
+                pass
+            await asyncio.sleep(self.interval * 3600)
+    
+    def start(self) -> None:
+        """Start rescanning the attached sources periodically."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info(f"Scheduled document ingestion every {self.interval}h")
+    
+    async def stop(self) -> None:
+        """Stop the scheduler and the readers, and save the index cache."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._pool is not None:
+            await asyncio.to_thread(self._pool.shutdown, True, cancel_futures=True)
+            self._pool = None
+        await self.flush()
@@ -0,0 +1,199 @@
+"""Document reading and chunking.
+
+Runs in the worker processes of document ingestion, so it imports
+nothing from the rest of the backend. Files are memory-mapped: hashing
+reads them straight from the page cache, and an unchanged file is never
+decoded. Text is cut along its structure, Markdown headings or the
+top-level definitions of Python code, then into paragraphs, which are
+packed into passages of a bounded size.
+"""
+import hashlib
+import mmap
+import re
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional, Tuple
+
+# (heading, text, estimated tokens) of a passage
+Chunk = Tuple[Optional[str], str, int]
+
+# Bytes searched for a NUL byte to tell binary files apart
+BINARY_PROBE = 8192
+
+# Rough characters per token of English text and code
+CHARS_PER_TOKEN = 4
+
+_MARKDOWN_HEADING = re.compile(r"(#{1,6})\s+(.+?)\s*#*\s*$")
+_PYTHON_DEFINITION = re.compile(r"(?:async\s+)?(def|class)\s+(\w+)")
+_FENCE = ("```", "~~~")
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the tokens of a text without a tokenizer."""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def _markdown_sections() -> Callable[[str], Optional[str]]:
+    """Section detector tracking the heading path of a Markdown file."""
+    path: List[str] = []
+    
+    def section(line: str) -> Optional[str]:
+        match = _MARKDOWN_HEADING.match(line)
+        if not match:
+            return None
+        level = len(match.group(1))
+        del path[level - 1:]
+        path.append(match.group(2))
+        return " > ".join(path)
+    
+    return section
+
+def _python_section(line: str) -> Optional[str]:
+    """Heading of a top-level Python definition."""
+    match = _PYTHON_DEFINITION.match(line)
+    return f"{match.group(1)} {match.group(2)}" if match else None
+
+def _blocks(
+    text: str,
+    section: Optional[Callable[[str], Optional[str]]]
+) -> Iterator[Tuple[Optional[str], str]]:
+    """Split text into paragraphs, each with the heading of its section.
+    
+    Blank lines end a paragraph except inside fenced code; a line
+    ``section`` returns a heading for starts a new section.
+    """
+    heading = None
+    lines: List[str] = []
+    fenced = False
+    for line in text.splitlines():
+        if line.lstrip().startswith(_FENCE):
+            fenced = not fenced
+        elif not fenced and section is not None:
+            started = section(line)
+            if started is not None:
+                if lines:
+                    yield heading, "\n".join(lines)
+                heading, lines = started, []
+        if not line.strip() and not fenced:
+            if lines:
+                yield heading, "\n".join(lines)
+            lines = []
+        else:
+            lines.append(line)
+    if lines:
+        yield heading, "\n".join(lines)
+
+def _split_long(block: str, max_tokens: int) -> Iterator[str]:
+    """Cut a paragraph longer than a passage at line ends, or mid-line if need be."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(block) <= max_chars:
+        yield block
+        return
+    piece = ""
+    for line in block.split("\n"):
+        while len(line) > max_chars:
+            if piece:
+                yield piece
+                piece = ""
+            yield line[:max_chars]
+            line = line[max_chars:]
+        if piece and len(piece) + 1 + len(line) > max_chars:
+            yield piece
+            piece = ""
+        piece = f"{piece}\n{line}" if piece else line
+    if piece:
+        yield piece
+
+def chunk_text(text: str, suffix: str, max_tokens: int) -> List[Chunk]:
+    """Cut a document into passages along its structure.
+    
+    Consecutive paragraphs of the same section are packed together up
+    to ``max_tokens``; a passage never spans two sections.
+    
+    Args:
+        text: Document text
+        suffix: Lowercase file suffix, selecting how sections are found
+        max_tokens: Estimated tokens per passage
+    
+    Returns:
+        Passages in document order
+    """
+    if suffix in (".md", ".markdown"):
+        section = _markdown_sections()
+    elif suffix == ".py":
+        section = _python_section
+    else:
+        section = None
+    
+    chunks: List[Chunk] = []
+    heading: Optional[str] = None
+    parts: List[str] = []
+    size = 0
+    for block_heading, block in _blocks(text, section):
+        for piece in _split_long(block, max_tokens):
+            tokens = estimate_tokens(piece)
+            if parts and (block_heading != heading or size + tokens > max_tokens):
+                content = "\n\n".join(parts)
+                chunks.append((heading, content, estimate_tokens(content)))
+                parts, size = [], 0
+            heading = block_heading
+            parts.append(piece)
+            size += tokens
+    if parts:
+        content = "\n\n".join(parts)
+        chunks.append((heading, content, estimate_tokens(content)))
+    return chunks
+
+def read_document(
+    path: str,
+    known_hash: Optional[str],
+    max_tokens: int
+) -> Tuple[str, Optional[List[Chunk]]]:
+    """Hash a file and chunk it unless its content is already known.
+    
+    Args:
+        path: File to read
+        known_hash: Hash of the stored version, None if there is none
+        max_tokens: Estimated tokens per passage
+    
+    Returns:
+        SHA-256 of the content and its passages; None instead of the
+        passages when the hash matches ``known_hash``, and no passages
+        for a binary file
+    """
+    with open(path, "rb") as file:
+        try:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            data = b""
+        try:
+            digest = hashlib.sha256(data).hexdigest()
+            if digest == known_hash:
+                return digest, None
+            if data.find(b"\0", 0, BINARY_PROBE) != -1:
+                return digest, []
+            text = str(data, "utf-8", errors="replace")
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+    return digest, chunk_text(text, Path(path).suffix.lower(), max_tokens)
+
+def read_documents(
+    files: List[Tuple[str, Optional[str]]],
+    max_tokens: int
+) -> List[Tuple[Optional[str], Optional[List[Chunk]], Optional[str]]]:
+    """Read several files in one call, saving a round trip to the worker per file.
+    
+    Args:
+        files: Path and known hash of each file, as for ``read_document``
+        max_tokens: Estimated tokens per passage
+    
+    Returns:
+        Hash, passages and error of each file; an unreadable file has
+        only an error
+    """
+    results = []
+    for path, known_hash in files:
+        try:
+            results.append((*read_document(path, known_hash, max_tokens), None))
+        except OSError as e:
+            results.append((None, None, str(e)))
+    return results
@@ -0,0 +1,300 @@
+"""Semantic search module."""
+import asyncio
+import logging
+from pathlib import Path
+from typing import Any, Awaitable, Callable, List, Optional
+
+from nexus_chat.backend.ollama_client import OllamaClient
+from nexus_chat.backend.storage_manager import StorageManager
+from nexus_chat.backend.vector_index import (
+    VectorIndex, decode_vectors, encode_vector, require_numpy
+)
+from nexus_chat.models.search import SearchHit
+from nexus_chat.utils.constants import DATABASE, MODEL_DEFAULTS
+
+logger = logging.getLogger(__name__)
+
+# Slots read per query when loading the index
+LOAD_BATCH_SIZE = 5000
+
+class StoredIndex:
+    """A ``VectorIndex`` kept in step with the embeddings stored in the database.
+    
+    The index reflects the change log of its embedding table up to
+    ``index.seq``: ``refresh`` replays newer changes and ``flush`` saves
+    the cache and prunes the log. Callers serialize access.
+    """
+    
+    def __init__(self, storage: StorageManager, kind: str, model: str, path: Path):
+        """Initialize stored index.
+        
+        Args:
+            storage: Storage manager holding the embeddings
+            kind: Embedding kind, see ``StorageManager.get_embedding_rows``
+            model: Embedding model
+            path: Vector index cache file
+        """
+        self.storage = storage
+        self.kind = kind
+        self.model = model
+        self.path = Path(path)
+        self.index: Optional[VectorIndex] = None
+    
+    async def open(self, dim: int) -> VectorIndex:
+        """Map the index cache and bring it up to date with the database."""
+        index = await asyncio.to_thread(
+            VectorIndex, self.path, self.model, dim, await self.storage.get_replica_id()
+        )
+        rows = await self.storage.get_embedding_rows(self.model, kind=self.kind)
+        await asyncio.to_thread(index.set_rows, rows)
+        if index.seq and index.seq + 1 >= await self.storage.get_embedding_log_start(self.kind):
+            self.index = index
+            await self._refresh()
+            return index
+        
+        # New cache file, or changes since it was written are no longer logged
+        if index.seq:
+            logger.warning(f"Vector index cache {self.path.name} is out of date, reloading it")
+        seq, _ = await self.storage.get_embedding_changes(0, self.kind)
+        slots = [row[0] for row in rows]
+        for start in range(0, len(slots), LOAD_BATCH_SIZE):
+            await self._load_slots(index, slots[start:start + LOAD_BATCH_SIZE])
+        await asyncio.to_thread(index.flush, seq)
+        await self.storage.prune_embedding_changes(seq, self.kind)
+        logger.info(f"Loaded {len(index)} embeddings into {self.path.name}")
+        self.index = index
+        return index
+    
+    async def _load_slots(self, index: VectorIndex, slots: List[int]) -> None:
+        """Reload slots from the database, dropping those no longer stored."""
+        rows = await self.storage.get_embedding_rows(
+            self.model, slots, vectors=True, kind=self.kind
+        )
+        if rows and len(rows[0][4]) != index.dim * 2:
+            raise ValueError(f"Embeddings of {self.model} do not have {index.dim} dimensions")
+        vectors = decode_vectors((row[4] for row in rows), index.dim)
+        await asyncio.to_thread(index.set_rows, [row[:4] for row in rows], vectors)
+        index.remove_slots(set(slots) - {row[0] for row in rows})
+    
+    async def _refresh(self) -> None:
+        """Apply embedding changes made since the index last saw them."""
+        seq, slots = await self.storage.get_embedding_changes(self.index.seq, self.kind)
+        for start in range(0, len(slots), LOAD_BATCH_SIZE):
+            await self._load_slots(self.index, slots[start:start + LOAD_BATCH_SIZE])
+        self.index.seq = seq
+    
+    async def refresh(self) -> None:
+        """Bring the index up to date, opening it once embeddings are stored."""
+        if self.index is None:
+            dim = await self.storage.get_embedding_dim(self.model, self.kind)
+            if dim is not None:
+                await self.open(dim)
+        else:
+            await self._refresh()
+    
+    async def add(
+        self,
+        save: Callable[[List[int]], Awaitable[Any]],
+        count: int,
+        dim: int
+    ) -> None:
+        """Store new embeddings in freshly allocated slots and index them.
+        
+        Args:
+            save: Coroutine function storing the embeddings with the given slots
+            count: Number of embeddings
+            dim: Their dimensions
+        """
+        if self.index is None:
+            await self.open(dim)
+        slots = self.index.allocate(count)
+        try:
+            await save(slots)
+            await self._refresh()
+        finally:
+            # Slots of rows deleted meanwhile, or never stored
+            self.index.release(slots)
+    
+    async def flush(self) -> None:
+        """Save the index cache and drop the changes it reflects."""
+        if self.index is None:
+            return
+        seq = self.index.seq
+        await asyncio.to_thread(self.index.flush, seq)
+        await self.storage.prune_embedding_changes(seq, self.kind)
+
+class EmbeddingManager:
+    """Embeds stored messages in the background and searches them by meaning.
+    
+    Indexing passes walk the messages in batches of ``batch_size``: each
+    batch is embedded with one Ollama request and stored in one
+    transaction, and the next pass resumes after the last message seen.
+    Messages deleted or archived meanwhile drop out of the index through
+    the ``embedding_changes`` log, which ``refresh`` replays before each
+    search.
+    """
+    
+    def __init__(
+        self,
+        storage: StorageManager,
+        client: OllamaClient,
+        model: str = MODEL_DEFAULTS["EMBEDDING_MODEL"],
+        index_path: Optional[str] = None,
+        batch_size: int = DATABASE["EMBEDDING_BATCH_SIZE"],
+        interval: float = DATABASE["EMBEDDING_INTERVAL"]
+    ):
+        """Initialize embedding manager.
+        
+        Args:
+            storage: Storage manager holding messages and embeddings
+            client: Ollama client computing embeddings
+            model: Embedding model
+            index_path: Vector index cache file, defaults to
+                ``<name>-vectors.npy`` next to the database
+            batch_size: Messages embedded per batch
+            interval: Hours between indexing passes
+        """
+        require_numpy()
+        self.storage = storage
+        self.client = client
+        self.model = model
+        if index_path is None:
+            db_path = Path(storage.db_path)
+            index_path = db_path.with_name(f"{db_path.stem}-vectors.npy")
+        self.index_path = Path(index_path)
+        self.batch_size = batch_size
+        self.interval = interval
+        
+        self.vectors = StoredIndex(storage, "messages", model, self.index_path)
+        # Rowid the running indexing pass continues after
+        self._after = 0
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+    
+    @property
+    def index(self) -> Optional[VectorIndex]:
+        """Vector index, None until embeddings are stored."""
+        return self.vectors.index
+    
+    async def refresh(self) -> None:
+        """Bring the index up to date with stored embeddings."""
+        async with self._lock:
+            await self.vectors.refresh()
+    
+    async def index_batch(self) -> int:
+        """Embed the next batch of messages lacking an embedding.
+        
+        Returns:
+            Number of messages embedded, 0 when the pass is complete
+        """
+        async with self._lock:
+            messages, self._after = await self.storage.get_messages_to_embed(
+                self.model, self._after, self.batch_size
+            )
+            if not messages:
+                return 0
+            
+            embeddings = await self.client.embed(
+                self.model, [message.content for message in messages]
+            )
+            await self.vectors.add(
+                lambda slots: self.storage.save_embeddings([
+                    (message.id, self.model, slot, encode_vector(embedding))
+                    for message, slot, embedding in zip(messages, slots, embeddings)
+                ]),
+                len(messages),
+                len(embeddings[0])
+            )
+            return len(messages)
+    
+    async def run(self) -> int:
+        """Embed every message lacking an embedding, batch by batch.
+        
+        Returns:
+            Number of messages embedded
+        """
+        try:
+            self._after = 0
+            await self.refresh()
+            embedded = 0
+            while True:
+                count = await self.index_batch()
+                if not count:
+                    break
+                embedded += count
+                await asyncio.sleep(0)
+            await self.flush()
+            
+            if embedded:
+                logger.info(f"Embedded {embedded} messages with {self.model}")
+            return embedded
+        
+        except Exception as e:
+            logger.error(f"Error indexing embeddings: {str(e)}")
+            raise
+    
+    async def flush(self) -> None:
+        """Save the index cache and drop the changes it reflects."""
+        async with self._lock:
+            await self.vectors.flush()
+    
+    async def search(
+        self,
+        query: str,
+        limit: int = 20,
+        session_id: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> List[SearchHit]:
+        """Find the messages closest in meaning to a query.
+        
+        Only messages embedded so far are found.
+        
+        Args:
+            query: Search text
+            limit: Maximum number of hits
+            session_id: Optional session to search in
+            model: Optional chat model whose messages to search
+        
+        Returns:
+            Hits ordered by cosine similarity, best first
+        """
+        try:
+            await self.refresh()
+            if self.index is None:
+                return []
+            embedding, = await self.client.embed(self.model, [query])
+            scores = await asyncio.to_thread(
+                self.index.search, embedding, limit, session_id, model
+            )
+            return await self.storage.get_search_hits(scores)
+        
+        except Exception as e:
+            logger.error(f"Error searching embeddings: {str(e)}")
+            raise
+    
+    async def _run(self) -> None:
+        """Scheduler loop."""
+        while True:
+            try:
+                await self.run()
+            except Exception:
+                # Already logged, retried after the next interval
+                pass
+            await asyncio.sleep(self.interval * 3600)
+    
+    def start(self) -> None:
+        """Start indexing new messages periodically."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info(f"Scheduled embedding with {self.model} every {self.interval}h")
+    
+    async def stop(self) -> None:
+        """Stop the scheduler and save the index cache."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
@@ -0,0 +1,130 @@
+"""Model fan-out module."""
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+from nexus_chat.models.message import Message
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ModelRun:
+    """One model's answer in a fan-out."""
+    model: str
+    message: Optional[Message] = None
+    error: Optional[str] = None
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+    
+    @property
+    def done(self) -> bool:
+        """Whether the answer is complete, failed or cancelled."""
+        return self.task is not None and self.task.done()
+    
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        """Seconds from sending the request to the first token."""
+        if self.message is None or "first_token_duration" not in self.message.metadata:
+            return None
+        return self.message.metadata["first_token_duration"] / 1e9
+    
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """Generation speed Ollama reported for the answer."""
+        if self.message is None:
+            return None
+        stats = self.message.metadata
+        if not stats.get("eval_count") or not stats.get("eval_duration"):
+            return None
+        return stats["eval_count"] / stats["eval_duration"] * 1e9
+
+class FanOut:
+    """Answers of several models to one prompt, streamed concurrently.
+    
+    Each answer becomes a sibling branch below the prompt. The first one
+    to complete is selected until ``pick`` chooses a winner, which also
+    cancels the answers still streaming; cancelled answers are kept as
+    failed messages like any interrupted answer.
+    """
+    
+    def __init__(
+        self,
+        prompt: Message,
+        models: Sequence[str],
+        reply: Callable[[str], Awaitable[Message]],
+        select: Callable[[str], object]
+    ):
+        """Start streaming the answers.
+        
+        Args:
+            prompt: User message the models answer, already recorded
+            models: Models to ask
+            reply: Coroutine function streaming the answer of a model
+            select: Function selecting the branch of an answer by message id
+        """
+        self.prompt = prompt
+        self.runs: Dict[str, ModelRun] = {model: ModelRun(model) for model in models}
+        self.winner: Optional[str] = None
+        self._select = select
+        self._selected: Optional[str] = None
+        
+        loop = asyncio.get_running_loop()
+        for run in self.runs.values():
+            run.task = loop.create_task(self._run(run, reply))
+    
+    async def _run(self, run: ModelRun, reply: Callable[[str], Awaitable[Message]]) -> None:
+        """Stream one answer and select it if it is the one to show."""
+        try:
+            run.message = await reply(run.model)
+        except asyncio.CancelledError:
+            run.error = "Cancelled"
+            raise
+        except Exception as e:
+            # Already logged; the other models keep going
+            run.error = str(e)
+            return
+        
+        logger.info(
+            f"Fan-out answer of {run.model}: first token after "
+            f"{run.time_to_first_token or 0:.2f}s, {run.tokens_per_second or 0:.1f} tokens/s"
+        )
+        if run.model == self.winner or (self.winner is None and self._selected is None):
+            self._selected = run.model
+            self._select(run.message.id)
+    
+    @property
+    def selected(self) -> Optional[ModelRun]:
+        """Run whose answer is on the selected branch, None before any completes."""
+        return self.runs[self._selected] if self._selected else None
+    
+    def pick(self, model: str) -> None:
+        """Choose the answer to continue with and cancel the others.
+        
+        Args:
+            model: Model whose answer wins
+        """
+        if model not in self.runs:
+            raise ValueError(f"{model} is not part of this fan-out")
+        self.winner = model
+        for run in self.runs.values():
+            if run.model != model and not run.done:
+                run.task.cancel()
+        run = self.runs[model]
+        if run.message is not None:
+            self._selected = model
+            self._select(run.message.id)
+    
+    def cancel(self) -> None:
+        """Cancel every answer still streaming."""
+        for run in self.runs.values():
+            if not run.done:
+                run.task.cancel()
+    
+    async def wait(self) -> List[ModelRun]:
+        """Wait until every answer is complete, failed or cancelled.
+        
+        Returns:
+            Runs in the order the models were given
+        """
+        await asyncio.gather(*(run.task for run in self.runs.values()), return_exceptions=True)
+        return list(self.runs.values())
@@ -1,71 +1,272 @@
 """Chat history manager."""
 import json
 import logging
+from collections import OrderedDict
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import Dict, List, Optional, TYPE_CHECKING
+
+from nexus_chat.models.message import Message
+from nexus_chat.utils.constants import DATABASE
+from nexus_chat.utils.message_ring import MessageRing
+
+if TYPE_CHECKING:
+    from nexus_chat.backend.storage_manager import StorageManager
+    from nexus_chat.models.chat_session import ChatSession
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_SESSION = "default"
+
 class HistoryManager:
-    """Manages chat history."""
+    """Manages chat history.
     
-    def __init__(self, history_file: Optional[str] = None):
+    Each session keeps its newest messages in a bounded ``MessageRing``;
+    an opened ``ChatSession`` shares its own ring, so its messages are
+    held once. Messages evicted by the per-session cap (``max_history``)
+    or by the global memory cap (``max_memory``) leave the session's
+    tree, and are queued and spilled to the storage manager, from where
+    a ``SessionHandle`` pages them back in. Rings of other sessions that
+    the memory cap empties, and rings of closed sessions, are dropped.
+    """
+    
+    def __init__(
+        self,
+        history_file: Optional[str] = None,
+        storage_manager: Optional["StorageManager"] = None,
+        max_history: int = DATABASE["MAX_HISTORY"],
+        max_memory: int = DATABASE["MAX_HISTORY_MEMORY"]
+    ):
         """Initialize history manager.
         
         Args:
             history_file: Optional path to history file
+            storage_manager: Optional storage manager receiving spilled messages
+            max_history: Maximum messages kept in memory per session
+            max_memory: Maximum message content kept in memory overall, in MB
         """
-        self.history: List[Dict[str, Any]] = []
         self.history_file = history_file
+        self.storage_manager = storage_manager
+        self.max_history = max_history
+        self.max_memory_bytes = max_memory * 1024 * 1024
+        self.current_session_id = DEFAULT_SESSION
+        
+        # Rings ordered from least to most recently used
+        self.rings: "OrderedDict[str, MessageRing]" = OrderedDict()
+        self.sessions: Dict[str, "ChatSession"] = {}
+        self.memory_bytes = 0
+        self._pending_spill: List[Message] = []
+        
         logger.info("History manager initialized")
+    
+    @property
+    def history(self) -> MessageRing:
+        """In-memory history of the current session."""
+        return self._get_ring(self.current_session_id)
+    
+    def _get_ring(self, session_id: str) -> MessageRing:
+        """Get or create the ring of a session and mark it recently used."""
+        ring = self.rings.get(session_id)
+        if ring is None:
+            ring = MessageRing(
+                capacity=self.max_history,
+                on_evict=self._on_evict
+            )
+            self.rings[session_id] = ring
+        else:
+            self.rings.move_to_end(session_id)
+        return ring
+    
+    def _adopt(self, session: "ChatSession") -> None:
+        """Use a session's ring as its history, capped and spilled like the others."""
+        ring = session.messages
+        discard = session.tree.discard
         
-    def add_message(self, message: Dict[str, Any]) -> None:
+        def on_evict(messages: List[Message]) -> None:
+            discard(messages)
+            self._on_evict(messages)
+        
+        self._drop(session.id)
+        ring.capacity = self.max_history
+        ring.on_evict = on_evict
+        self.rings[session.id] = ring
+        self.sessions[session.id] = session
+        if len(ring) > self.max_history:
+            ring.evict(len(ring) - self.max_history)
+        self.memory_bytes += ring.nbytes
+        self._enforce_memory_limit()
+    
+    def _drop(self, session_id: str) -> None:
+        """Forget a session's ring, releasing its messages from the total."""
+        ring = self.rings.pop(session_id, None)
+        if ring is not None:
+            self.memory_bytes -= ring.nbytes
+        self.sessions.pop(session_id, None)
+    
+    def _on_evict(self, messages: List[Message]) -> None:
+        """Queue evicted messages for spilling to storage."""
+        if self.storage_manager:
+            self._pending_spill.extend(messages)
+        else:
+            logger.debug(f"Dropped {len(messages)} messages beyond history limit")
+    
+    def _enforce_memory_limit(self) -> None:
+        """Evict from least recently used sessions until under the global cap."""
+        for session_id in list(self.rings):
+            if self.memory_bytes <= self.max_memory_bytes:
+                break
+            ring = self.rings[session_id]
+            # Keep the newest message of the active session in memory
+            keep = 1 if session_id == self.current_session_id else 0
+            while len(ring) > keep and self.memory_bytes > self.max_memory_bytes:
+                before = ring.nbytes
+                ring.evict(1)
+                self.memory_bytes -= before - ring.nbytes
+            if not ring and session_id != self.current_session_id:
+                # Reopening the session adopts its ring again
+                self._drop(session_id)
+    
+    async def open_session(self, session: "ChatSession") -> None:
+        """Make a session current, registering it with storage.
+        
+        The session's ring becomes its history: it is resized to
+        ``max_history`` and its messages count towards ``max_memory``.
+        
+        Args:
+            session: Session to open
+        """
+        try:
+            self.current_session_id = session.id
+            self._adopt(session)
+            if self.storage_manager:
+                await self.storage_manager.save_session(session)
+            logger.info(f"Opened session {session.id}")
+        
+        except Exception as e:
+            logger.error(f"Error opening session: {str(e)}")
+            raise
+    
+    def add_message(
+        self,
+        message: Message,
+        session_id: Optional[str] = None,
+        select: bool = True
+    ) -> None:
         """Add message to history.
         
         Args:
             message: Message to add
+            session_id: Optional session id, defaults to the current session
+            select: Whether the message becomes the tip of the selected
+                branch of an opened session
         """
         try:
-            self.history.append(message)
+            session_id = session_id or self.current_session_id
+            if message.session_id is None:
+                message.session_id = session_id
+            
+            ring = self._get_ring(session_id)
+            before = ring.nbytes
+            session = self.sessions.get(session_id)
+            if session is not None:
+                # Indexes the message in the session's tree and appends it to the ring
+                session.add(message, select)
+            else:
+                ring.append(message)
+            self.memory_bytes += ring.nbytes - before
+            self._enforce_memory_limit()
             logger.info("Message added to history")
             
             if self.history_file:
                 self._save_history()
-                
+        
         except Exception as e:
             logger.error(f"Error adding message to history: {str(e)}")
             raise
-            
-    def get_chat_history(self) -> List[Dict[str, Any]]:
+    
+    async def spill(self) -> int:
+        """Write evicted messages to storage.
+        
+        Returns:
+            Number of messages spilled
+        """
+        if not self._pending_spill or not self.storage_manager:
+            return 0
+        
+        pending, self._pending_spill = self._pending_spill, []
+        try:
+            await self.storage_manager.save_messages(pending)
+            logger.info(f"Spilled {len(pending)} messages to storage")
+            return len(pending)
+        
+        except Exception as e:
+            # Keep unsaved messages queued for the next attempt
+            self._pending_spill = pending + self._pending_spill
+            logger.error(f"Error spilling messages: {str(e)}")
+            raise
+    
+    def get_chat_history(self, session_id: Optional[str] = None) -> List[Message]:
         """Get chat history.
         
+        Args:
+            session_id: Optional session id, defaults to the current session
+        
         Returns:
-            List of messages
+            List of in-memory messages
         """
         try:
             if self.history_file:
                 self._load_history()
-                
-            logger.info(f"Found {len(self.history)} messages")
-            return self.history
             
+            history = list(self._get_ring(session_id or self.current_session_id))
+            logger.info(f"Found {len(history)} messages")
+            return history
+        
         except Exception as e:
             logger.error(f"Error getting chat history: {str(e)}")
             raise
-            
-    def clear_history(self) -> None:
-        """Clear chat history."""
+    
+    def close_session(self, session_id: str) -> None:
+        """Release a session's in-memory history.
+        
+        Its messages stay in storage; evicted ones not spilled yet are
+        still written by the next ``spill``.
+        
+        Args:
+            session_id: Session to close
+        """
+        self._drop(session_id)
+        if session_id == self.current_session_id:
+            self.current_session_id = DEFAULT_SESSION
+        logger.info(f"Closed session {session_id}")
+    
+    async def clear_history(self, session_id: Optional[str] = None) -> None:
+        """Clear chat history, in memory and in storage.
+        
+        Args:
+            session_id: Optional session id, defaults to the current session
+        """
         try:
-            self.history = []
+            session_id = session_id or self.current_session_id
+            ring = self._get_ring(session_id)
+            session = self.sessions.get(session_id)
+            if session is not None:
+                session.tree.discard(list(ring))
+            self.memory_bytes -= ring.nbytes
+            ring.clear()
+            self._pending_spill = [
+                m for m in self._pending_spill if m.session_id != session_id
+            ]
+            if self.storage_manager:
+                await self.storage_manager.delete_messages(session_id)
             logger.info("Chat history cleared")
             
             if self.history_file:
                 self._save_history()
-                
+        
         except Exception as e:
             logger.error(f"Error clearing chat history: {str(e)}")
             raise
-            
+    
     def _save_history(self) -> None:
         """Save chat history to file."""
         try:
@@ -73,28 +274,34 @@ class HistoryManager:
             history_path.parent.mkdir(parents=True, exist_ok=True)
             
             with open(history_path, "w") as f:
-                json.dump(self.history, f)
-                
-            logger.info(f"Chat history saved to {self.history_file}")
+                json.dump(
+                    [message.to_dict() for message in self.history],
+                    f
+                )
             
+            logger.info(f"Chat history saved to {self.history_file}")
+        
         except Exception as e:
             logger.error(f"Error saving chat history: {str(e)}")
             raise
-            
+    
     def _load_history(self) -> None:
         """Load chat history from file."""
         try:
             history_path = Path(self.history_file)
+            ring = self.history
+            self.memory_bytes -= ring.nbytes
+            ring.clear()
             
             if history_path.exists():
                 with open(history_path) as f:
-                    self.history = json.load(f)
-                    
+                    ring.extend(Message.from_dict(message) for message in json.load(f))
+                self.memory_bytes += ring.nbytes
+                
                 logger.info(f"Chat history loaded from {self.history_file}")
             else:
-                self.history = []
                 logger.info("No chat history file found")
-                
+        
         except Exception as e:
             logger.error(f"Error loading chat history: {str(e)}")
             raise
@@ -0,0 +1,73 @@
+"""Image encoding for vision models.
+
+Runs in the worker pool of ``ImageStore``, so it imports nothing from
+the rest of the backend. Images are scaled down so their longer side
+fits the input resolution of vision models, which resize larger images
+themselves, and re-encoded as JPEG. An upright RGB or grayscale JPEG
+that already fits is kept byte for byte.
+"""
+import io
+from typing import Tuple
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+# Encoded bytes, MIME type, width and height of an image
+EncodedImage = Tuple[bytes, str, int, int]
+
+# EXIF tag of the camera orientation
+ORIENTATION = 0x0112
+
+def require_pillow() -> None:
+    """Fail early when image attachments are used without Pillow."""
+    if Image is None:
+        raise ImportError("Image attachments require Pillow (pip install Pillow)")
+
+def _flatten(image: "Image.Image") -> "Image.Image":
+    """Convert to RGB, laying transparent images over white."""
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        image = image.convert("RGBA")
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel("A"))
+        return background
+    return image.convert("RGB") if image.mode != "RGB" else image
+
+def encode_image(data: bytes, max_side: int, quality: int) -> EncodedImage:
+    """Scale an image down to fit a square and encode it as JPEG.
+    
+    JPEGs are decoded at a reduced scale where that still covers
+    ``max_side``, which skips most of the decoding work for camera
+    photos. The first frame of an animation is used.
+    
+    Args:
+        data: Image file content in any format Pillow reads
+        max_side: Longest side in pixels
+        quality: JPEG quality, 1 to 95
+    
+    Returns:
+        Encoded image, its MIME type and size
+    
+    Raises:
+        ValueError: If the data is not an image Pillow can read
+    """
+    try:
+        image = Image.open(io.BytesIO(data))
+        upright = image.getexif().get(ORIENTATION, 1) == 1
+        if (
+            image.format == "JPEG" and image.mode in ("RGB", "L")
+            and upright and max(image.size) <= max_side
+        ):
+            return data, "image/jpeg", image.width, image.height
+        
+        image.draft("RGB", (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        image = _flatten(image)
+    except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise ValueError(f"Unreadable image: {e}") from e
+    
+    output = io.BytesIO()
+    image.save(output, "JPEG", quality=quality)
+    return output.getvalue(), "image/jpeg", image.width, image.height
@@ -0,0 +1,177 @@
+"""Image attachment module."""
+import asyncio
+import base64
+import hashlib
+import logging
+import os
+from collections import OrderedDict
+from concurrent.futures import Executor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from nexus_chat.backend.image_encoder import encode_image, require_pillow
+from nexus_chat.backend.storage_manager import StorageManager
+from nexus_chat.backend.worker_pool import create_pool
+from nexus_chat.utils.constants import IMAGES
+
+logger = logging.getLogger(__name__)
+
+# An image file, or the content of one
+ImageSource = Union[str, Path, bytes]
+
+class ImageStore:
+    """Encodes images attached to messages and hands them to the Ollama client.
+    
+    Attached images are scaled down and re-encoded in a worker pool, off
+    the event loop, then stored once in the ``images`` table by the hash
+    of the encoded bytes; messages only list those hashes in their
+    ``images`` metadata. The original image is keyed by its own hash and
+    the encoding settings, so attaching the same picture again skips the
+    encoding. Base64 payloads are kept in an LRU cache of at most
+    ``cache_size`` MB, so resending a conversation reads and encodes
+    nothing again.
+    """
+    
+    def __init__(
+        self,
+        storage: StorageManager,
+        max_side: int = IMAGES["MAX_SIDE"],
+        quality: int = IMAGES["QUALITY"],
+        workers: Optional[int] = None,
+        max_file_size: float = IMAGES["MAX_FILE_SIZE"],
+        cache_size: float = IMAGES["CACHE_SIZE"]
+    ):
+        """Initialize image store.
+        
+        Args:
+            storage: Storage manager holding the images
+            max_side: Longest side in pixels of encoded images
+            quality: JPEG quality of encoded images
+            workers: Encoding processes, defaults to the number of CPUs
+            max_file_size: Largest image file accepted, in MB
+            cache_size: Base64 images kept in memory, in MB
+        """
+        require_pillow()
+        self.storage = storage
+        self.max_side = max_side
+        self.quality = quality
+        self.workers = workers or os.cpu_count() or 1
+        self.max_file_bytes = int(max_file_size * 1024 * 1024)
+        self.cache_bytes = int(cache_size * 1024 * 1024)
+        
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._cached_bytes = 0
+        self._pool: Optional[Executor] = None
+    
+    def _executor(self) -> Executor:
+        """Pool encoding images, started on first use and kept until ``close``."""
+        if self._pool is None:
+            self._pool = create_pool(self.workers, "image-encoder")
+        return self._pool
+    
+    def _load(self, source: ImageSource) -> Tuple[bytes, str]:
+        """Read an image and key it by its content and the encoding settings."""
+        if isinstance(source, bytes):
+            data = source
+        else:
+            path = Path(source)
+            if path.stat().st_size > self.max_file_bytes:
+                raise ValueError(f"{path.name} is larger than {self.max_file_bytes >> 20} MB")
+            data = path.read_bytes()
+        if len(data) > self.max_file_bytes:
+            raise ValueError(f"Image is larger than {self.max_file_bytes >> 20} MB")
+        digest = hashlib.sha256(data).hexdigest()
+        return data, f"{digest}:{self.max_side}:{self.quality}"
+    
+    async def add(self, source: ImageSource) -> str:
+        """Encode and store an image unless an earlier encoding of it is stored.
+        
+        Args:
+            source: Image file or its content
+        
+        Returns:
+            Hash to list in the ``images`` metadata of a message
+        """
+        try:
+            data, source_key = await asyncio.to_thread(self._load, source)
+            image_hash = await self.storage.find_image(source_key)
+            if image_hash is not None:
+                return image_hash
+            
+            loop = asyncio.get_running_loop()
+            encoded, mime, width, height = await loop.run_in_executor(
+                self._executor(), encode_image, data, self.max_side, self.quality
+            )
+            image_hash = hashlib.sha256(encoded).hexdigest()
+            await self.storage.save_image(image_hash, source_key, mime, width, height, encoded)
+            # About to be sent with the message it is attached to
+            self._remember(image_hash, base64.b64encode(encoded).decode("ascii"))
+            logger.debug(f"Encoded image {image_hash[:12]} at {width}x{height}")
+            return image_hash
+        
+        except Exception as e:
+            logger.error(f"Error adding image: {e}")
+            if isinstance(e, BrokenProcessPool):
+                # A worker died; start a new pool next time
+                self._pool = None
+            raise
+    
+    async def add_many(self, sources: Iterable[ImageSource]) -> List[str]:
+        """Add several images, encoding them concurrently.
+        
+        Args:
+            sources: Image files or their content
+        
+        Returns:
+            Hashes of the images, in the same order
+        """
+        return list(await asyncio.gather(*(self.add(source) for source in sources)))
+    
+    async def payloads(self, hashes: Iterable[str]) -> Dict[str, str]:
+        """Base64 content of stored images, from the cache where possible.
+        
+        Images removed meanwhile, such as those of messages synced from
+        another database, are left out.
+        
+        Args:
+            hashes: Image hashes
+        
+        Returns:
+            Base64 image by hash
+        """
+        found: Dict[str, str] = {}
+        missing: List[str] = []
+        for image_hash in set(hashes):
+            payload = self._cache.get(image_hash)
+            if payload is None:
+                missing.append(image_hash)
+            else:
+                self._cache.move_to_end(image_hash)
+                found[image_hash] = payload
+        
+        if missing:
+            stored = await self.storage.get_images(missing)
+            for image_hash, data in stored.items():
+                payload = base64.b64encode(data).decode("ascii")
+                self._remember(image_hash, payload)
+                found[image_hash] = payload
+            if len(stored) < len(missing):
+                logger.warning(f"{len(missing) - len(stored)} attached images are no longer stored")
+        return found
+    
+    def _remember(self, image_hash: str, payload: str) -> None:
+        """Add a payload to the cache, evicting the least recently used."""
+        if image_hash in self._cache or len(payload) > self.cache_bytes:
+            return
+        self._cache[image_hash] = payload
+        self._cached_bytes += len(payload)
+        while self._cached_bytes > self.cache_bytes:
+            _, evicted = self._cache.popitem(last=False)
+            self._cached_bytes -= len(evicted)
+    
+    async def close(self) -> None:
+        """Stop the encoding workers."""
+        if self._pool is not None:
+            await asyncio.to_thread(self._pool.shutdown, True, cancel_futures=True)
+            self._pool = None
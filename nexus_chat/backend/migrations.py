@@ -0,0 +1,911 @@
+"""Database schema migrations.
+
+The schema version lives in ``PRAGMA user_version``. Each migration
+moves the schema from the previous version to its own, and runs in a
+single transaction together with the version bump, so a failed
+migration leaves the database at the last good version.
+"""
+import logging
+from typing import List, NamedTuple, Optional
+
+import aiosqlite
+
+from nexus_chat.utils.constants import DATABASE
+
+logger = logging.getLogger(__name__)
+
+class Migration(NamedTuple):
+    """A schema migration."""
+    version: int
+    description: str
+    statements: List[str]
+
+# Keeps token totals and the last message current when a message changes
+STATS_UPDATE_TRIGGER = """
+    CREATE TRIGGER IF NOT EXISTS trg_messages_stats_update
+    AFTER UPDATE OF metadata, created_at ON messages
+    BEGIN
+        UPDATE session_stats SET
+            total_tokens = total_tokens
+                - COALESCE(json_extract(OLD.metadata, '$.eval_count'), 0)
+                + COALESCE(json_extract(NEW.metadata, '$.eval_count'), 0),
+            (last_message_at, last_message_id) = (
+                SELECT created_at, id FROM messages
+                WHERE session_id = NEW.session_id
+                ORDER BY created_at DESC, rowid DESC LIMIT 1
+            )
+        WHERE session_id = NEW.session_id;
+    END
+"""
+
+def iso_to_epoch_ms(column: str) -> str:
+    """SQL expression converting a naive local ISO timestamp to epoch milliseconds."""
+    return (
+        f"CAST(round((julianday({column}, 'utc') - 2440587.5) * 86400000) AS INTEGER)"
+    )
+
+# Current time in epoch milliseconds
+NOW_MS = "CAST(round((julianday('now') - 2440587.5) * 86400000) AS INTEGER)"
+
+def resolve_content(row: str) -> str:
+    """SQL expression for the text of a message row, read from its blob if it has one."""
+    return (
+        f"CASE WHEN {row}.blob_hash IS NULL THEN {row}.content ELSE ("
+        "SELECT CASE WHEN compressed THEN unzip_text(data) ELSE data END "
+        f"FROM blobs WHERE hash = {row}.blob_hash) END"
+    )
+
+def version_trigger(table: str, condition: Optional[str] = None) -> str:
+    """Trigger counting local updates of a row in its version.
+    
+    Sync writes ``changed_at`` itself when it applies a change; any
+    other update is a local change, which gets a new version unless
+    ``condition`` excludes it.
+    """
+    when = "NEW.changed_at = OLD.changed_at"
+    if condition:
+        when += f" AND {condition}"
+    return f"""
+        CREATE TRIGGER IF NOT EXISTS trg_{table}_version
+        AFTER UPDATE ON {table}
+        WHEN {when}
+        BEGIN
+            UPDATE {table} SET
+                version = OLD.version + 1,
+                changed_at = max({NOW_MS}, OLD.changed_at + 1),
+                origin = NULL
+            WHERE rowid = NEW.rowid;
+        END
+    """
+
+# Rebuilding the search index reads every row; drop streaming ones again
+UNINDEX_STREAMING = """
+    INSERT INTO messages_fts (messages_fts, rowid, content)
+    SELECT 'delete', rowid, content FROM messages WHERE status = 'streaming'
+"""
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Create sessions and messages tables", [
+        """
+        CREATE TABLE IF NOT EXISTS chat_sessions (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            model TEXT NOT NULL,
+            system_prompt TEXT,
+            active BOOLEAN NOT NULL DEFAULT 1,
+            created_at TIMESTAMP NOT NULL,
+            updated_at TIMESTAMP NOT NULL,
+            metadata TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS messages (
+            id TEXT PRIMARY KEY,
+            session_id TEXT NOT NULL,
+            content TEXT NOT NULL,
+            role TEXT NOT NULL,
+            model TEXT NOT NULL,
+            parent_id TEXT,
+            status TEXT NOT NULL DEFAULT 'complete',
+            error TEXT,
+            created_at TIMESTAMP NOT NULL,
+            metadata TEXT,
+            FOREIGN KEY (session_id) REFERENCES chat_sessions (id)
+                ON DELETE CASCADE
+        )
+        """,
+    ]),
+    Migration(2, "Index messages by session and sessions by activity", [
+        """
+        CREATE INDEX IF NOT EXISTS idx_messages_session_created
+            ON messages (session_id, created_at)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_sessions_active_updated
+            ON chat_sessions (active, updated_at)
+        """,
+        "ANALYZE",
+    ]),
+    Migration(3, "Extend message index with id for keyset pagination", [
+        """
+        CREATE INDEX IF NOT EXISTS idx_messages_session_created_id
+            ON messages (session_id, created_at, id)
+        """,
+        "DROP INDEX IF EXISTS idx_messages_session_created",
+        "ANALYZE",
+    ]),
+    Migration(4, "Keep per-session message counters current with triggers", [
+        """
+        CREATE TABLE IF NOT EXISTS session_stats (
+            session_id TEXT PRIMARY KEY
+                REFERENCES chat_sessions (id) ON DELETE CASCADE,
+            message_count INTEGER NOT NULL DEFAULT 0,
+            total_tokens INTEGER NOT NULL DEFAULT 0,
+            last_message_at TIMESTAMP,
+            last_message_id TEXT
+        )
+        """,
+        # Generated token counts are kept in metadata under Ollama's name
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_messages_stats_insert
+        AFTER INSERT ON messages
+        BEGIN
+            INSERT INTO session_stats (
+                session_id, message_count, total_tokens,
+                last_message_at, last_message_id
+            ) VALUES (
+                NEW.session_id, 1,
+                COALESCE(json_extract(NEW.metadata, '$.eval_count'), 0),
+                NEW.created_at, NEW.id
+            )
+            ON CONFLICT (session_id) DO UPDATE SET
+                message_count = message_count + 1,
+                total_tokens = total_tokens + excluded.total_tokens,
+                last_message_at = CASE
+                    WHEN last_message_id IS NULL
+                        OR (excluded.last_message_at, excluded.last_message_id)
+                            > (last_message_at, last_message_id)
+                    THEN excluded.last_message_at ELSE last_message_at END,
+                last_message_id = CASE
+                    WHEN last_message_id IS NULL
+                        OR (excluded.last_message_at, excluded.last_message_id)
+                            > (last_message_at, last_message_id)
+                    THEN excluded.last_message_id ELSE last_message_id END;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_messages_stats_delete
+        AFTER DELETE ON messages
+        BEGIN
+            UPDATE session_stats SET
+                message_count = message_count - 1,
+                total_tokens = total_tokens
+                    - COALESCE(json_extract(OLD.metadata, '$.eval_count'), 0)
+            WHERE session_id = OLD.session_id;
+            UPDATE session_stats SET
+                (last_message_at, last_message_id) = (
+                    SELECT created_at, id FROM messages
+                    WHERE session_id = OLD.session_id
+                    ORDER BY created_at DESC, id DESC LIMIT 1
+                )
+            WHERE session_id = OLD.session_id
+                AND last_message_id = OLD.id;
+        END
+        """,
+        STATS_UPDATE_TRIGGER,
+        # Backfill counters for messages written before this version
+        """
+        INSERT OR REPLACE INTO session_stats (
+            session_id, message_count, total_tokens,
+            last_message_at, last_message_id
+        )
+        SELECT
+            s.id,
+            (SELECT COUNT(*) FROM messages WHERE session_id = s.id),
+            (SELECT COALESCE(SUM(json_extract(metadata, '$.eval_count')), 0)
+                FROM messages WHERE session_id = s.id),
+            last.created_at,
+            last.id
+        FROM chat_sessions s
+        JOIN messages last ON last.id = (
+            SELECT id FROM messages WHERE session_id = s.id
+            ORDER BY created_at DESC, id DESC LIMIT 1
+        )
+        """,
+    ]),
+    Migration(5, "Add full-text search over message content", [
+        # External content table, rows are keyed by the messages rowid
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5 (
+            content,
+            content = 'messages',
+            content_rowid = 'rowid',
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_messages_fts_insert
+        AFTER INSERT ON messages
+        BEGIN
+            INSERT INTO messages_fts (rowid, content)
+            VALUES (NEW.rowid, NEW.content);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_messages_fts_delete
+        AFTER DELETE ON messages
+        BEGIN
+            INSERT INTO messages_fts (messages_fts, rowid, content)
+            VALUES ('delete', OLD.rowid, OLD.content);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_messages_fts_update
+        AFTER UPDATE OF content ON messages
+        BEGIN
+            INSERT INTO messages_fts (messages_fts, rowid, content)
+            VALUES ('delete', OLD.rowid, OLD.content);
+            INSERT INTO messages_fts (rowid, content)
+            VALUES (NEW.rowid, NEW.content);
+        END
+        """,
+        "INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')",
+    ]),
+    Migration(6, "Skip indexing streaming messages and track them for recovery", [
+        # Partial content of a streaming message is rewritten on every
+        # flush; only index it once the message leaves the streaming state
+        "DROP TRIGGER IF EXISTS trg_messages_fts_insert",
+        "DROP TRIGGER IF EXISTS trg_messages_fts_delete",
+        "DROP TRIGGER IF EXISTS trg_messages_fts_update",
+        """
+        CREATE TRIGGER trg_messages_fts_insert
+        AFTER INSERT ON messages
+        WHEN NEW.status != 'streaming'
+        BEGIN
+            INSERT INTO messages_fts (rowid, content)
+            VALUES (NEW.rowid, NEW.content);
+        END
+        """,
+        """
+        CREATE TRIGGER trg_messages_fts_delete
+        AFTER DELETE ON messages
+        WHEN OLD.status != 'streaming'
+        BEGIN
+            INSERT INTO messages_fts (messages_fts, rowid, content)
+            VALUES ('delete', OLD.rowid, OLD.content);
+        END
+        """,
+        """
+        CREATE TRIGGER trg_messages_fts_update_old
+        AFTER UPDATE OF content, status ON messages
+        WHEN OLD.status != 'streaming'
+            AND (OLD.content != NEW.content OR NEW.status = 'streaming')
+        BEGIN
+            INSERT INTO messages_fts (messages_fts, rowid, content)
+            VALUES ('delete', OLD.rowid, OLD.content);
+        END
+        """,
+        """
+        CREATE TRIGGER trg_messages_fts_update_new
+        AFTER UPDATE OF content, status ON messages
+        WHEN NEW.status != 'streaming'
+            AND (OLD.content != NEW.content OR OLD.status = 'streaming')
+        BEGIN
+            INSERT INTO messages_fts (rowid, content)
+            VALUES (NEW.rowid, NEW.content);
+        END
+        """,
+        "INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')",
+        UNINDEX_STREAMING,
+        """
+        CREATE INDEX IF NOT EXISTS idx_messages_streaming
+            ON messages (status) WHERE status = 'streaming'
+        """,
+    ]),
+    Migration(7, "Update the search index from a single trigger", [
+        # Triggers on the same event fire newest first, so the pair from
+        # version 6 inserted the new content before deleting the old one
+        "DROP TRIGGER IF EXISTS trg_messages_fts_update_old",
+        "DROP TRIGGER IF EXISTS trg_messages_fts_update_new",
+        """
+        CREATE TRIGGER trg_messages_fts_update
+        AFTER UPDATE OF content, status ON messages
+        WHEN OLD.content != NEW.content
+            OR (OLD.status = 'streaming') != (NEW.status = 'streaming')
+        BEGIN
+            INSERT INTO messages_fts (messages_fts, rowid, content)
+            SELECT 'delete', OLD.rowid, OLD.content
+            WHERE OLD.status != 'streaming';
+            INSERT INTO messages_fts (rowid, content)
+            SELECT NEW.rowid, NEW.content
+            WHERE NEW.status != 'streaming';
+        END
+        """,
+        "INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')",
+        UNINDEX_STREAMING,
+    ]),
+    Migration(8, "Store timestamps as integer epoch milliseconds", [
+        # Integers compare and decode faster than ISO strings and take
+        # less space in rows and indexes. The declared column types keep
+        # numeric affinity, so the values are converted in place; the
+        # stats trigger would recompute each session once per row
+        "DROP TRIGGER IF EXISTS trg_messages_stats_update",
+        f"""
+        UPDATE messages SET created_at = {iso_to_epoch_ms('created_at')}
+        WHERE typeof(created_at) = 'text'
+        """,
+        f"""
+        UPDATE chat_sessions SET
+            created_at = {iso_to_epoch_ms('created_at')},
+            updated_at = {iso_to_epoch_ms('updated_at')}
+        WHERE typeof(created_at) = 'text' OR typeof(updated_at) = 'text'
+        """,
+        f"""
+        UPDATE session_stats SET last_message_at = {iso_to_epoch_ms('last_message_at')}
+        WHERE typeof(last_message_at) = 'text'
+        """,
+        STATS_UPDATE_TRIGGER,
+        "ANALYZE",
+    ]),
+    Migration(9, "Link messages into a branch tree by parent_id", [
+        # Answers already point at their prompt; chain every other
+        # message to the one before it so existing sessions form a
+        # single branch
+        """
+        UPDATE messages SET parent_id = (
+            SELECT p.id FROM messages p
+            WHERE p.session_id = messages.session_id
+                AND (p.created_at, p.id) < (messages.created_at, messages.id)
+            ORDER BY p.created_at DESC, p.id DESC
+            LIMIT 1
+        )
+        WHERE parent_id IS NULL
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_messages_session_parent
+            ON messages (session_id, parent_id)
+        """,
+        "ANALYZE",
+    ]),
+    Migration(10, "Store large message bodies once in a content-addressed blob table", [
+        # Rows of unreferenced blobs stay until garbage collection, so
+        # triggers may still read the old content of a deleted message
+        """
+        CREATE TABLE IF NOT EXISTS blobs (
+            hash TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            compressed BOOLEAN NOT NULL,
+            data BLOB NOT NULL,
+            refcount INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+        "ALTER TABLE messages ADD COLUMN blob_hash TEXT",
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_messages_blob_insert
+        AFTER INSERT ON messages
+        WHEN NEW.blob_hash IS NOT NULL
+        BEGIN
+            UPDATE blobs SET refcount = refcount + 1 WHERE hash = NEW.blob_hash;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_messages_blob_delete
+        AFTER DELETE ON messages
+        WHEN OLD.blob_hash IS NOT NULL
+        BEGIN
+            UPDATE blobs SET refcount = refcount - 1 WHERE hash = OLD.blob_hash;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_messages_blob_update
+        AFTER UPDATE OF blob_hash ON messages
+        WHEN OLD.blob_hash IS NOT NEW.blob_hash
+        BEGIN
+            UPDATE blobs SET refcount = refcount - 1 WHERE hash = OLD.blob_hash;
+            UPDATE blobs SET refcount = refcount + 1 WHERE hash = NEW.blob_hash;
+        END
+        """,
+        # The search index is rebuilt below; move existing large bodies
+        # without updating it row by row
+        "DROP TRIGGER IF EXISTS trg_messages_fts_insert",
+        "DROP TRIGGER IF EXISTS trg_messages_fts_delete",
+        "DROP TRIGGER IF EXISTS trg_messages_fts_update",
+        f"""
+        INSERT INTO blobs (hash, size, compressed, data)
+        SELECT sha256(content), length(CAST(content AS BLOB)), 1, zip_text(content)
+        FROM messages
+        WHERE length(CAST(content AS BLOB)) >= {DATABASE["BLOB_THRESHOLD"]}
+            AND status != 'streaming'
+        ON CONFLICT (hash) DO NOTHING
+        """,
+        f"""
+        UPDATE messages SET blob_hash = sha256(content), content = ''
+        WHERE length(CAST(content AS BLOB)) >= {DATABASE["BLOB_THRESHOLD"]}
+            AND status != 'streaming'
+        """,
+        # Index the full text of every message through a view
+        "DROP TABLE IF EXISTS messages_fts",
+        f"""
+        CREATE VIEW IF NOT EXISTS message_text AS
+            SELECT m.rowid AS num, {resolve_content('m')} AS content FROM messages m
+        """,
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5 (
+            content,
+            content = 'message_text',
+            content_rowid = 'num',
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+        """,
+        f"""
+        CREATE TRIGGER trg_messages_fts_insert
+        AFTER INSERT ON messages
+        WHEN NEW.status != 'streaming'
+        BEGIN
+            INSERT INTO messages_fts (rowid, content)
+            VALUES (NEW.rowid, {resolve_content('NEW')});
+        END
+        """,
+        f"""
+        CREATE TRIGGER trg_messages_fts_delete
+        AFTER DELETE ON messages
+        WHEN OLD.status != 'streaming'
+        BEGIN
+            INSERT INTO messages_fts (messages_fts, rowid, content)
+            VALUES ('delete', OLD.rowid, {resolve_content('OLD')});
+        END
+        """,
+        f"""
+        CREATE TRIGGER trg_messages_fts_update
+        AFTER UPDATE OF content, status, blob_hash ON messages
+        WHEN OLD.content != NEW.content
+            OR OLD.blob_hash IS NOT NEW.blob_hash
+            OR (OLD.status = 'streaming') != (NEW.status = 'streaming')
+        BEGIN
+            INSERT INTO messages_fts (messages_fts, rowid, content)
+            SELECT 'delete', OLD.rowid, {resolve_content('OLD')}
+            WHERE OLD.status != 'streaming';
+            INSERT INTO messages_fts (rowid, content)
+            SELECT NEW.rowid, {resolve_content('NEW')}
+            WHERE NEW.status != 'streaming';
+        END
+        """,
+        "INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')",
+        UNINDEX_STREAMING,
+    ]),
+    Migration(11, "Track row versions and change times for delta sync", [
+        # ``version`` counts the changes of a row across databases,
+        # ``changed_at`` is when it last changed in this one and ``origin``
+        # the database a synced change came from, NULL for local changes
+        "ALTER TABLE chat_sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 1",
+        "ALTER TABLE chat_sessions ADD COLUMN changed_at INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE chat_sessions ADD COLUMN origin TEXT",
+        "UPDATE chat_sessions SET changed_at = updated_at",
+        "CREATE INDEX IF NOT EXISTS idx_sessions_changed ON chat_sessions (changed_at)",
+        version_trigger("chat_sessions"),
+        "ALTER TABLE messages ADD COLUMN version INTEGER NOT NULL DEFAULT 1",
+        "ALTER TABLE messages ADD COLUMN changed_at INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE messages ADD COLUMN origin TEXT",
+        "UPDATE messages SET changed_at = created_at",
+        "CREATE INDEX IF NOT EXISTS idx_messages_changed ON messages (changed_at)",
+        version_trigger("messages"),
+        """
+        CREATE TABLE IF NOT EXISTS sync_replica (
+            id TEXT NOT NULL
+        )
+        """,
+        "INSERT INTO sync_replica (id) SELECT lower(hex(randomblob(16)))",
+        # High-water marks of changed_at sent to and received from each peer
+        """
+        CREATE TABLE IF NOT EXISTS sync_peers (
+            peer TEXT PRIMARY KEY,
+            sent_at INTEGER NOT NULL DEFAULT 0,
+            received_at INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+    ]),
+    Migration(12, "Store message embeddings for semantic search", [
+        # ``slot`` is the row of the vector in the search matrix of
+        # ``VectorIndex``, one per embedding model; vectors are unit
+        # length float16
+        """
+        CREATE TABLE IF NOT EXISTS message_embeddings (
+            message_id TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            slot INTEGER NOT NULL,
+            vector BLOB NOT NULL,
+            UNIQUE (model, slot),
+            FOREIGN KEY (message_id) REFERENCES messages (id)
+                ON DELETE CASCADE
+        )
+        """,
+        # Slots changed since the matrix cache was written are reloaded
+        """
+        CREATE TABLE IF NOT EXISTS embedding_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            slot INTEGER NOT NULL
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_embeddings_insert
+        AFTER INSERT ON message_embeddings
+        BEGIN
+            INSERT INTO embedding_changes (slot) VALUES (NEW.slot);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_embeddings_delete
+        AFTER DELETE ON message_embeddings
+        BEGIN
+            INSERT INTO embedding_changes (slot) VALUES (OLD.slot);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_embeddings_update
+        AFTER UPDATE ON message_embeddings
+        BEGIN
+            INSERT INTO embedding_changes (slot) VALUES (OLD.slot);
+            INSERT INTO embedding_changes (slot)
+            SELECT NEW.slot WHERE NEW.slot != OLD.slot;
+        END
+        """,
+        # An embedding no longer matches edited content
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_messages_embedding_stale
+        AFTER UPDATE OF content, blob_hash ON messages
+        WHEN OLD.content != NEW.content OR OLD.blob_hash IS NOT NEW.blob_hash
+        BEGIN
+            DELETE FROM message_embeddings WHERE message_id = NEW.id;
+        END
+        """,
+    ]),
+    Migration(13, "Store local documents for retrieval", [
+        # Files and folders attached to sessions, by absolute path
+        """
+        CREATE TABLE IF NOT EXISTS document_sources (
+            id INTEGER PRIMARY KEY,
+            path TEXT NOT NULL UNIQUE,
+            added_at INTEGER NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS session_sources (
+            session_id TEXT NOT NULL,
+            source_id INTEGER NOT NULL,
+            PRIMARY KEY (session_id, source_id),
+            FOREIGN KEY (session_id) REFERENCES chat_sessions (id)
+                ON DELETE CASCADE,
+            FOREIGN KEY (source_id) REFERENCES document_sources (id)
+                ON DELETE CASCADE
+        ) WITHOUT ROWID
+        """,
+        # Size and mtime skip unchanged files without reading them, the
+        # hash skips re-embedding files touched but not changed
+        """
+        CREATE TABLE IF NOT EXISTS documents (
+            id INTEGER PRIMARY KEY,
+            source_id INTEGER NOT NULL,
+            path TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            hash TEXT NOT NULL,
+            model TEXT NOT NULL,
+            UNIQUE (source_id, path),
+            FOREIGN KEY (source_id) REFERENCES document_sources (id)
+                ON DELETE CASCADE
+        )
+        """,
+        # Passages with their embedding, ``slot`` as in ``message_embeddings``
+        """
+        CREATE TABLE IF NOT EXISTS document_chunks (
+            id INTEGER PRIMARY KEY,
+            document_id INTEGER NOT NULL,
+            ordinal INTEGER NOT NULL,
+            heading TEXT,
+            content TEXT NOT NULL,
+            tokens INTEGER NOT NULL,
+            model TEXT NOT NULL,
+            slot INTEGER NOT NULL,
+            vector BLOB NOT NULL,
+            UNIQUE (model, slot),
+            FOREIGN KEY (document_id) REFERENCES documents (id)
+                ON DELETE CASCADE
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_document_chunks_document
+            ON document_chunks (document_id)
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS chunk_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            slot INTEGER NOT NULL
+        )
+        """,
+        # Chunks are replaced, never updated
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_chunks_insert
+        AFTER INSERT ON document_chunks
+        BEGIN
+            INSERT INTO chunk_changes (slot) VALUES (NEW.slot);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_chunks_delete
+        AFTER DELETE ON document_chunks
+        BEGIN
+            INSERT INTO chunk_changes (slot) VALUES (OLD.slot);
+        END
+        """,
+    ]),
+    Migration(14, "Store images attached to messages", [
+        # Encoded images by the hash of their bytes; ``source_key`` finds
+        # the encoding of an original image, and unreferenced rows are
+        # kept for a grace period so an image encoded for a message not
+        # saved yet survives garbage collection
+        """
+        CREATE TABLE IF NOT EXISTS images (
+            hash TEXT PRIMARY KEY,
+            source_key TEXT NOT NULL,
+            mime TEXT NOT NULL,
+            width INTEGER NOT NULL,
+            height INTEGER NOT NULL,
+            data BLOB NOT NULL,
+            refcount INTEGER NOT NULL DEFAULT 0,
+            created_at INTEGER NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_images_source ON images (source_key)",
+        # Messages list the hashes of their images in ``metadata.images``;
+        # the LIKE test skips parsing the metadata of other messages
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_messages_images_insert
+        AFTER INSERT ON messages
+        WHEN NEW.metadata LIKE '%"images"%'
+        BEGIN
+            UPDATE images SET refcount = refcount + 1
+            WHERE hash IN (SELECT value FROM json_each(NEW.metadata, '$.images'));
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_messages_images_delete
+        AFTER DELETE ON messages
+        WHEN OLD.metadata LIKE '%"images"%'
+        BEGIN
+            UPDATE images SET refcount = refcount - 1
+            WHERE hash IN (SELECT value FROM json_each(OLD.metadata, '$.images'));
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_messages_images_update
+        AFTER UPDATE OF metadata ON messages
+        WHEN OLD.metadata IS NOT NEW.metadata
+            AND (OLD.metadata LIKE '%"images"%' OR NEW.metadata LIKE '%"images"%')
+        BEGIN
+            UPDATE images SET refcount = refcount - 1
+            WHERE hash IN (SELECT value FROM json_each(OLD.metadata, '$.images'));
+            UPDATE images SET refcount = refcount + 1
+            WHERE hash IN (SELECT value FROM json_each(NEW.metadata, '$.images'));
+        END
+        """,
+    ]),
+    Migration(15, "Order messages of the same millisecond by rowid", [
+        # Millisecond timestamps tie often; rowids grow in the order
+        # messages are written, where ids are random
+        "DROP TRIGGER IF EXISTS trg_messages_stats_insert",
+        "DROP TRIGGER IF EXISTS trg_messages_stats_update",
+        "DROP TRIGGER IF EXISTS trg_messages_stats_delete",
+        # A new row has the highest rowid, so it is the last message
+        # unless an older timestamp was written with it
+        """
+        CREATE TRIGGER trg_messages_stats_insert
+        AFTER INSERT ON messages
+        BEGIN
+            INSERT INTO session_stats (
+                session_id, message_count, total_tokens,
+                last_message_at, last_message_id
+            ) VALUES (
+                NEW.session_id, 1,
+                COALESCE(json_extract(NEW.metadata, '$.eval_count'), 0),
+                NEW.created_at, NEW.id
+            )
+            ON CONFLICT (session_id) DO UPDATE SET
+                message_count = message_count + 1,
+                total_tokens = total_tokens + excluded.total_tokens,
+                last_message_at = CASE
+                    WHEN last_message_id IS NULL
+                        OR excluded.last_message_at >= last_message_at
+                    THEN excluded.last_message_at ELSE last_message_at END,
+                last_message_id = CASE
+                    WHEN last_message_id IS NULL
+                        OR excluded.last_message_at >= last_message_at
+                    THEN excluded.last_message_id ELSE last_message_id END;
+        END
+        """,
+        STATS_UPDATE_TRIGGER,
+        """
+        CREATE TRIGGER trg_messages_stats_delete
+        AFTER DELETE ON messages
+        BEGIN
+            UPDATE session_stats SET
+                message_count = message_count - 1,
+                total_tokens = total_tokens
+                    - COALESCE(json_extract(OLD.metadata, '$.eval_count'), 0)
+            WHERE session_id = OLD.session_id;
+            UPDATE session_stats SET
+                (last_message_at, last_message_id) = (
+                    SELECT created_at, id FROM messages
+                    WHERE session_id = OLD.session_id
+                    ORDER BY created_at DESC, rowid DESC LIMIT 1
+                )
+            WHERE session_id = OLD.session_id
+                AND last_message_id = OLD.id;
+        END
+        """,
+        """
+        UPDATE session_stats SET
+            (last_message_at, last_message_id) = (
+                SELECT created_at, id FROM messages
+                WHERE session_id = session_stats.session_id
+                ORDER BY created_at DESC, rowid DESC LIMIT 1
+            )
+        """,
+    ]),
+    Migration(16, "Index messages by session and time, ordered by rowid", [
+        # Keyset pages break timestamp ties by rowid, which every index
+        # ends with; with id in the key each page was sorted again
+        """
+        CREATE INDEX IF NOT EXISTS idx_messages_session_created
+            ON messages (session_id, created_at)
+        """,
+        "DROP INDEX IF EXISTS idx_messages_session_created_id",
+        "ANALYZE",
+    ]),
+    Migration(17, "Append streamed text in chunks and version finished messages only", [
+        # Text streamed after the first write; it is folded into the
+        # message by the final write, so each flush inserts only new text
+        """
+        CREATE TABLE IF NOT EXISTS message_chunks (
+            message_id TEXT NOT NULL
+                REFERENCES messages (id) ON DELETE CASCADE,
+            seq INTEGER NOT NULL,
+            content TEXT NOT NULL,
+            PRIMARY KEY (message_id, seq)
+        ) WITHOUT ROWID
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS trg_messages_chunks_fold
+        AFTER UPDATE OF status ON messages
+        WHEN OLD.status = 'streaming' AND NEW.status != 'streaming'
+        BEGIN
+            DELETE FROM message_chunks WHERE message_id = NEW.id;
+        END
+        """,
+        # Partial writes are not changes to sync; the final one counts once
+        "DROP TRIGGER IF EXISTS trg_messages_version",
+        version_trigger("messages", "NEW.status != 'streaming'"),
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+# Archive database, attached as ``archive``. Message content is stored
+# zlib compressed; the search index reads it back through a view that
+# decompresses it with the ``unzip_text`` SQL function
+ARCHIVE_MIGRATIONS: List[Migration] = [
+    Migration(1, "Create archive tables", [
+        """
+        CREATE TABLE IF NOT EXISTS archive.archived_sessions (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            model TEXT NOT NULL,
+            system_prompt TEXT,
+            active BOOLEAN NOT NULL,
+            created_at TIMESTAMP NOT NULL,
+            updated_at TIMESTAMP NOT NULL,
+            metadata TEXT,
+            archived_at TIMESTAMP NOT NULL
+        )
+        """,
+        # Explicit integer key, so VACUUM keeps the search index rowids valid
+        """
+        CREATE TABLE IF NOT EXISTS archive.archived_messages (
+            num INTEGER PRIMARY KEY,
+            id TEXT NOT NULL UNIQUE,
+            session_id TEXT NOT NULL,
+            content BLOB NOT NULL,
+            role TEXT NOT NULL,
+            model TEXT NOT NULL,
+            parent_id TEXT,
+            status TEXT NOT NULL,
+            error TEXT,
+            created_at TIMESTAMP NOT NULL,
+            metadata TEXT
+        )
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS archive.idx_archived_messages_session_created_id
+            ON archived_messages (session_id, created_at, id)
+        """,
+        """
+        CREATE VIEW IF NOT EXISTS archive.archived_content AS
+            SELECT num, unzip_text(content) AS content FROM archived_messages
+        """,
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS archive.archived_fts USING fts5 (
+            content,
+            content = 'archived_content',
+            content_rowid = 'num',
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3'
+        )
+        """,
+    ]),
+    Migration(2, "Store archive timestamps as integer epoch milliseconds", [
+        f"""
+        UPDATE archive.archived_messages SET created_at = {iso_to_epoch_ms('created_at')}
+        WHERE typeof(created_at) = 'text'
+        """,
+        f"""
+        UPDATE archive.archived_sessions SET
+            created_at = {iso_to_epoch_ms('created_at')},
+            updated_at = {iso_to_epoch_ms('updated_at')},
+            archived_at = {iso_to_epoch_ms('archived_at')}
+        WHERE typeof(created_at) = 'text'
+        """,
+    ]),
+]
+
+async def get_schema_version(db: aiosqlite.Connection, schema: str = "main") -> int:
+    """Read the schema version of a database."""
+    async with db.execute(f"PRAGMA {schema}.user_version") as cursor:
+        return (await cursor.fetchone())[0]
+
+async def migrate(
+    db: aiosqlite.Connection,
+    migrations: List[Migration] = MIGRATIONS,
+    schema: str = "main"
+) -> int:
+    """Apply pending migrations.
+    
+    Args:
+        db: Writer connection outside any transaction
+        migrations: Migrations to apply, in version order
+        schema: Name of the attached database to migrate
+    
+    Returns:
+        Schema version after migrating
+    
+    Raises:
+        RuntimeError: If the database was written by a newer schema
+    """
+    version = await get_schema_version(db, schema)
+    latest = migrations[-1].version
+    if version > latest:
+        raise RuntimeError(
+            f"Database schema version {version} is newer than "
+            f"supported version {latest}"
+        )
+    
+    for migration in migrations:
+        if migration.version <= version:
+            continue
+        
+        logger.info(
+            f"Migrating {schema} database to version {migration.version}: "
+            f"{migration.description}"
+        )
+        await db.execute("BEGIN IMMEDIATE")
+        try:
+            for statement in migration.statements:
+                await db.execute(statement)
+            await db.execute(f"PRAGMA {schema}.user_version = {migration.version}")
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        version = migration.version
+    
+    return version
@@ -0,0 +1,200 @@
+"""Model metadata module."""
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional
+
+from nexus_chat.backend.ollama_client import OllamaClient
+from nexus_chat.utils.constants import API_CONSTANTS, MODEL_METADATA
+
+logger = logging.getLogger(__name__)
+
+_PARAMETER_SIZE = re.compile(r"([\d.]+)\s*([KMBT])", re.IGNORECASE)
+_SCALES = {"K": 1e3, "M": 1e6, "B": 1e9, "T": 1e12}
+
+@dataclass
+class ModelMetadata:
+    """What an installed model is, as Ollama describes it."""
+    digest: str
+    size_bytes: int = 0
+    family: Optional[str] = None
+    context_length: Optional[int] = None
+    parameter_count: Optional[int] = None
+    quantization: Optional[str] = None
+    
+    @property
+    def billions(self) -> Optional[float]:
+        """Parameters in billions."""
+        return self.parameter_count / 1e9 if self.parameter_count else None
+
+def parse_show(digest: str, size_bytes: int, show: Mapping[str, Any]) -> ModelMetadata:
+    """Derive the metadata of a model from its /api/show response.
+    
+    Args:
+        digest: Digest of the model in /api/tags
+        size_bytes: Size of the model in /api/tags
+        show: Response of /api/show
+    
+    Returns:
+        Metadata of the model, with what the response lacks left unset
+    """
+    info = show.get("model_info") or {}
+    details = show.get("details") or {}
+    family = info.get("general.architecture") or details.get("family")
+    parameter_count = info.get("general.parameter_count")
+    if not parameter_count:
+        # Older servers only report a rounded size such as "3.2B"
+        match = _PARAMETER_SIZE.match(details.get("parameter_size", ""))
+        if match:
+            parameter_count = int(float(match.group(1)) * _SCALES[match.group(2).upper()])
+    return ModelMetadata(
+        digest=digest,
+        size_bytes=size_bytes,
+        family=family,
+        context_length=info.get(f"{family}.context_length"),
+        parameter_count=parameter_count,
+        quantization=details.get("quantization_level")
+    )
+
+class ModelMetadataCache:
+    """Context length, size and quantization of installed models.
+    
+    The hardcoded values in ``AppSettings.model_configs`` describe one
+    build of a few models; this asks Ollama instead. ``/api/show`` is
+    queried once per model digest and its metadata kept in a JSON file,
+    so it is only fetched again when ``/api/tags`` lists a new digest,
+    such as after a pull. ``/api/tags`` itself is checked at most once
+    every ``refresh`` seconds. ``generation`` increases whenever the
+    metadata changes, for caches derived from it.
+    """
+    
+    def __init__(
+        self,
+        client: OllamaClient,
+        path: Path,
+        refresh: float = MODEL_METADATA["REFRESH"]
+    ):
+        """Initialize model metadata cache.
+        
+        Args:
+            client: Ollama client
+            path: JSON file keeping metadata by digest
+            refresh: Seconds before /api/tags is checked again
+        """
+        self.client = client
+        self.path = Path(path)
+        self.refresh_interval = refresh
+        self.generation = 0
+        
+        self.models: Dict[str, ModelMetadata] = {}
+        self._digests: Dict[str, ModelMetadata] = self._load()
+        self._checked_at: Optional[float] = None
+        self._lock = asyncio.Lock()
+    
+    def _load(self) -> Dict[str, ModelMetadata]:
+        """Metadata by digest saved by an earlier run."""
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+            return {digest: ModelMetadata(**fields) for digest, fields in data.items()}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            # Rebuilt from Ollama on the next refresh
+            logger.warning(f"Ignoring unreadable model metadata {self.path}: {e}")
+            return {}
+    
+    def _save(self) -> None:
+        """Write metadata by digest, replacing the file at once."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix(".tmp")
+        with open(temp_path, "w") as f:
+            json.dump({digest: asdict(meta) for digest, meta in self._digests.items()}, f, indent=2)
+        os.replace(temp_path, self.path)
+    
+    async def refresh(self, force: bool = False) -> Dict[str, ModelMetadata]:
+        """Fetch the metadata of models installed since the last check.
+        
+        Args:
+            force: Check /api/tags even if checked recently
+        
+        Returns:
+            Metadata of the installed models by name
+        """
+        async with self._lock:
+            now = time.monotonic()
+            fresh = (
+                self._checked_at is not None
+                and now - self._checked_at < self.refresh_interval
+            )
+            if fresh and not force:
+                return self.models
+            try:
+                tags = await self.client.list_model_details()
+                models: Dict[str, ModelMetadata] = {}
+                fetched = 0
+                for tag in tags:
+                    digest = tag.get("digest", "")
+                    meta = self._digests.get(digest)
+                    if meta is None:
+                        show = await self.client.show_model(tag["name"])
+                        meta = parse_show(digest, tag.get("size", 0), show)
+                        self._digests[digest] = meta
+                        fetched += 1
+                    models[tag["name"]] = meta
+                
+                # Drop digests of removed or updated models
+                installed = {meta.digest for meta in models.values()}
+                removed = [digest for digest in self._digests if digest not in installed]
+                for digest in removed:
+                    del self._digests[digest]
+                if fetched or removed:
+                    await asyncio.to_thread(self._save)
+                if fetched or removed or models.keys() != self.models.keys():
+                    self.generation += 1
+                    logger.info(f"Model metadata of {len(models)} models, {fetched} fetched")
+                self.models = models
+                self._checked_at = now
+                return models
+            
+            except Exception as e:
+                logger.error(f"Error refreshing model metadata: {e}")
+                raise
+    
+    def get(self, model: str) -> Optional[ModelMetadata]:
+        """Metadata of a model, named with or without its tag.
+        
+        Args:
+            model: Model name
+        
+        Returns:
+            Metadata, or None if the model was not installed at the last refresh
+        """
+        meta = self.models.get(model) or self.models.get(f"{model}:latest")
+        if meta is None and ":" not in model:
+            # Untagged profiles and configs name any tag of the model
+            meta = next(
+                (meta for name, meta in self.models.items() if name.split(":")[0] == model),
+                None
+            )
+        return meta
+    
+    def timeout(self, model: str) -> Optional[float]:
+        """Seconds to wait for each chunk of an answer, leaving time to load the model.
+        
+        Args:
+            model: Model name
+        
+        Returns:
+            Timeout grown with the model's size, or None if it is unknown
+        """
+        meta = self.get(model)
+        if meta is None or not meta.size_bytes:
+            return None
+        load_seconds = meta.size_bytes / (MODEL_METADATA["LOAD_RATE"] * 1024 * 1024)
+        return API_CONSTANTS["REQUEST_TIMEOUT"] + load_seconds
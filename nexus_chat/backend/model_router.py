@@ -0,0 +1,303 @@
+"""Model routing module."""
+import logging
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional, Set, Tuple
+
+from nexus_chat.backend.model_metadata import ModelMetadataCache
+from nexus_chat.backend.ollama_client import OllamaClient
+from nexus_chat.models.settings import ModelConfig, default_model_configs
+from nexus_chat.utils.constants import ROUTER
+
+logger = logging.getLogger(__name__)
+
+# Kinds of prompts, and the model category answering them best
+KINDS = ("simple", "code", "math", "complex")
+CATEGORIES = {"code": "Programming", "math": "Mathematics"}
+
+CODE_PATTERN = re.compile(
+    r"```|^\s*(?:def|class|import|from|function|const|let|var|#include)\b"
+    r"|\b(?:code|function|bug|traceback|stack trace|compile|regex|python|javascript|sql)\b",
+    re.IGNORECASE | re.MULTILINE
+)
+MATH_PATTERN = re.compile(
+    r"[∫∑√π∞≤≥≠±]|\d\s*[-+*/^=]\s*\d"
+    r"|\b(?:solve|equation|integral|derivative|calculate|matrix|probability)\b",
+    re.IGNORECASE
+)
+COMPLEX_PATTERN = re.compile(
+    r"\b(?:explain why|analy[sz]e|compare|step by step|prove|in detail|pros and cons|design)\b",
+    re.IGNORECASE
+)
+
+@dataclass
+class PromptTraits:
+    """What a prompt needs from the model answering it."""
+    kind: str
+    chars: int
+    english: bool
+    source: str = "heuristic"
+
+@dataclass
+class RouteDecision:
+    """Model chosen for a prompt, and why."""
+    model: str
+    traits: PromptTraits
+    reason: str
+    baseline: str
+    saving: Optional[float] = None
+    
+    def to_metadata(self) -> Dict[str, Any]:
+        """Summary stored in the metadata of the answer."""
+        return {
+            "kind": self.traits.kind,
+            "source": self.traits.source,
+            "reason": self.reason,
+            "baseline": self.baseline,
+            "saving": self.saving
+        }
+
+class ModelRouter:
+    """Sends each prompt to the smallest installed model able to answer it.
+    
+    Prompts are classified by cheap local heuristics: code fences and
+    keywords, math symbols, length, wording asking for analysis, and
+    whether the text is English. Prompts the heuristics find nothing
+    special in may be classified by a tiny ``classifier_model`` instead.
+    Code and math go to models of the matching category in
+    ``model_configs``, long, analytical or non-English prompts to models
+    of at least ``large_size`` billion parameters, and the rest to any
+    model. Sizes are the parameter counts Ollama reports if ``metadata``
+    is given, so installed models without a configuration are routed
+    too, as general ones. Among capable models, those already loaded by
+    Ollama come first, smaller ones next.
+    
+    Answer latencies are averaged per model, so each decision logs the
+    time it is expected to save over the model that would have answered.
+    """
+    
+    CLASSIFIER_PROMPT = (
+        "Classify the request below as one word: simple (a short factual or "
+        "conversational answer), code, math or complex (needs reasoning or a "
+        "long answer). Reply with the word only.\n\nRequest:\n{prompt}"
+    )
+    
+    def __init__(
+        self,
+        client: OllamaClient,
+        model_configs: Optional[Mapping[str, ModelConfig]] = None,
+        classifier_model: Optional[str] = None,
+        metadata: Optional[ModelMetadataCache] = None,
+        long_prompt: int = ROUTER["LONG_PROMPT"],
+        large_size: float = ROUTER["LARGE_SIZE"],
+        refresh: float = ROUTER["REFRESH"]
+    ):
+        """Initialize model router.
+        
+        Args:
+            client: Ollama client
+            model_configs: Configurations of known models by name,
+                defaults to the built-in ones
+            classifier_model: Optional tiny model classifying prompts
+                the heuristics find nothing special in
+            metadata: Optional metadata of the installed models
+            long_prompt: Characters past which a prompt needs a large model
+            large_size: Billions of parameters of a large model
+            refresh: Seconds the lists of installed and loaded models are reused
+        """
+        self.client = client
+        self.model_configs = default_model_configs() if model_configs is None else model_configs
+        self.classifier_model = classifier_model
+        self.metadata = metadata
+        self.long_prompt = long_prompt
+        self.large_size = large_size
+        self.refresh = refresh
+        
+        self.latency: Dict[str, float] = {}
+        self.decisions = 0
+        self.saved = 0.0
+        self._installed: List[str] = []
+        self._resident: Set[str] = set()
+        self._listed_at: Optional[float] = None
+    
+    def config(self, model: str) -> Optional[ModelConfig]:
+        """Configuration of a model, matched with or without its tag."""
+        return self.model_configs.get(model) or self.model_configs.get(model.split(":")[0])
+    
+    def _size(self, model: str) -> Optional[float]:
+        """Billions of parameters of a model, None if unknown."""
+        meta = self.metadata.get(model) if self.metadata else None
+        if meta and meta.billions:
+            return meta.billions
+        config = self.config(model)
+        return config.size if config else None
+    
+    def _category(self, model: str) -> Optional[str]:
+        """Category of a model, None for models without a configuration."""
+        config = self.config(model)
+        return config.category if config else None
+    
+    async def _models(self) -> Tuple[List[str], Set[str]]:
+        """Installed models and those loaded in memory, listed again once stale."""
+        now = time.monotonic()
+        if self._listed_at is None or now - self._listed_at >= self.refresh:
+            if self.metadata:
+                self._installed = list(await self.metadata.refresh())
+            else:
+                self._installed = await self.client.list_models()
+            try:
+                self._resident = set(await self.client.running_models())
+            except Exception as e:
+                # Older servers lack /api/ps; route by size alone
+                logger.warning(f"Routing without loaded models: {e}")
+                self._resident = set()
+            self._listed_at = now
+        return self._installed, self._resident
+    
+    async def classify(self, prompt: str) -> PromptTraits:
+        """Classify what a prompt needs.
+        
+        Args:
+            prompt: Prompt text
+        
+        Returns:
+            Traits of the prompt
+        """
+        letters = [char for char in prompt if char.isalpha()]
+        english = not letters or sum(not char.isascii() for char in letters) / len(letters) < 0.05
+        if CODE_PATTERN.search(prompt):
+            kind = "code"
+        elif MATH_PATTERN.search(prompt):
+            kind = "math"
+        elif len(prompt) > self.long_prompt or COMPLEX_PATTERN.search(prompt):
+            kind = "complex"
+        else:
+            kind = "simple"
+        traits = PromptTraits(kind, len(prompt), english)
+        
+        if kind == "simple" and self.classifier_model:
+            try:
+                reply = ""
+                async for chunk in self.client.chat_stream(
+                    self.classifier_model,
+                    self.CLASSIFIER_PROMPT.format(prompt=prompt),
+                    options={"temperature": 0, "num_predict": 3}
+                ):
+                    reply += chunk
+                words = reply.strip().lower().split()
+                if words and words[0].strip(".") in KINDS:
+                    traits.kind = words[0].strip(".")
+                    traits.source = self.classifier_model
+            except Exception as e:
+                # The heuristic answer stands
+                logger.warning(f"Error classifying prompt with {self.classifier_model}: {e}")
+        return traits
+    
+    def _capable(self, traits: PromptTraits, models: List[str]) -> List[str]:
+        """Models of known size able to answer a prompt."""
+        known = [model for model in models if self._size(model) is not None]
+        category = CATEGORIES.get(traits.kind)
+        if category:
+            specialists = [model for model in known if self._category(model) == category]
+            if specialists:
+                return specialists
+        # Models specialized in something else answer only when no other can
+        generalists = [
+            model for model in known if self._category(model) not in CATEGORIES.values()
+        ]
+        known = generalists or known
+        if traits.kind != "simple" or not traits.english:
+            return [model for model in known if self._size(model) >= self.large_size]
+        return known
+    
+    def _estimate(self, model: str) -> Optional[float]:
+        """Expected seconds per answer of a model.
+        
+        Models without an answer yet are estimated from the others by size.
+        """
+        if model in self.latency:
+            return self.latency[model]
+        size = self._size(model)
+        known = [
+            (seconds, self._size(name))
+            for name, seconds in self.latency.items()
+            if self._size(name)
+        ]
+        if size is None or not known:
+            return None
+        return sum(seconds for seconds, _ in known) / sum(billions for _, billions in known) * size
+    
+    async def route(self, prompt: str, default: str) -> RouteDecision:
+        """Choose the model answering a prompt.
+        
+        Args:
+            prompt: Prompt text
+            default: Model answering when no configured model is capable
+        
+        Returns:
+            Routing decision
+        """
+        traits = await self.classify(prompt)
+        installed, resident = await self._models()
+        capable = self._capable(traits, installed)
+        if not capable:
+            decision = RouteDecision(default, traits, "no capable model installed", default)
+        else:
+            model = min(capable, key=lambda name: (name not in resident, self._size(name)))
+            reason = f"{traits.kind} prompt, {self._size(model):.3g}B"
+            if model in resident:
+                reason += " loaded"
+            decision = RouteDecision(model, traits, reason, default)
+        
+        expected, baseline = self._estimate(decision.model), self._estimate(default)
+        if decision.model != default and expected is not None and baseline is not None:
+            decision.saving = baseline - expected
+            self.saved += decision.saving
+        self.decisions += 1
+        saving = f", ~{decision.saving:.1f}s faster than {default}" if decision.saving else ""
+        logger.info(f"Routed {traits.kind} prompt to {decision.model} ({decision.reason}{saving})")
+        return decision
+    
+    async def escalate(self, prompt: str, model: str) -> Optional[str]:
+        """Choose a larger model to answer a prompt again.
+        
+        Args:
+            prompt: Prompt text
+            model: Model whose answer was not good enough
+        
+        Returns:
+            Smallest larger model, of the prompt's category if one is
+            installed and otherwise not specialized in another, or None
+            if there is no larger model
+        """
+        installed, _ = await self._models()
+        size = self._size(model) or 0.0
+        larger = [name for name in installed if (self._size(name) or 0.0) > size]
+        if not larger:
+            return None
+        category = CATEGORIES.get((await self.classify(prompt)).kind)
+        chosen = min(
+            larger,
+            key=lambda name: (
+                category is not None and self._category(name) != category,
+                self._category(name) in CATEGORIES.values(),
+                self._size(name)
+            )
+        )
+        logger.info(f"Escalating from {model} to {chosen}")
+        return chosen
+    
+    def observe(self, model: str, stats: Mapping[str, Any]) -> None:
+        """Update a model's average latency with the stats of an answer.
+        
+        Args:
+            model: Model that answered
+            stats: Stats Ollama reported, with ``total_duration`` in nanoseconds
+        """
+        if not stats.get("total_duration"):
+            return
+        seconds = stats["total_duration"] / 1e9
+        weight = ROUTER["LATENCY_WEIGHT"]
+        previous = self.latency.get(model)
+        self.latency[model] = seconds if previous is None else previous + weight * (seconds - previous)
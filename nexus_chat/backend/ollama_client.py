@@ -3,10 +3,23 @@ import aiohttp
 import json
 import logging
 import requests
-from typing import AsyncGenerator, Dict, List, Optional, Generator
+import time
+from typing import Any, AsyncGenerator, Dict, List, Mapping, Optional, Generator, Union
+
+from nexus_chat.models.message import Message
 
 logger = logging.getLogger(__name__)
 
+# Timing and token fields of the final chunk of a generation
+STATS_FIELDS = (
+    "total_duration",
+    "load_duration",
+    "prompt_eval_count",
+    "prompt_eval_duration",
+    "eval_count",
+    "eval_duration",
+)
+
 class OllamaClient:
     """Ollama API client."""
     
@@ -123,16 +136,83 @@ class OllamaClient:
             logger.error(f"Error listing models: {e}")
             raise
             
+    async def list_model_details(self) -> List[Dict[str, Any]]:
+        """Get installed models with their digest, size and details, as /api/tags lists them."""
+        await self._ensure_session()
+        
+        try:
+            async with self.session.get(f"{self.base_url}/api/tags") as response:
+                response.raise_for_status()
+                data = await response.json()
+                return data.get("models", [])
+                
+        except Exception as e:
+            logger.error(f"Error listing model details: {e}")
+            raise
+            
+    async def show_model(self, model: str) -> Dict[str, Any]:
+        """Get a model's details, parameters and architecture metadata from /api/show."""
+        await self._ensure_session()
+        
+        try:
+            async with self.session.post(
+                f"{self.base_url}/api/show",
+                json={"model": model}
+            ) as response:
+                response.raise_for_status()
+                data = await response.json()
+                if "error" in data:
+                    raise RuntimeError(data["error"])
+                return data
+                
+        except Exception as e:
+            logger.error(f"Error showing model {model}: {e}")
+            raise
+            
+    async def running_models(self) -> List[str]:
+        """Get list of models loaded in memory, ready to answer without loading."""
+        await self._ensure_session()
+        
+        try:
+            async with self.session.get(f"{self.base_url}/api/ps") as response:
+                response.raise_for_status()
+                data = await response.json()
+                return [model["name"] for model in data.get("models", [])]
+                
+        except Exception as e:
+            logger.error(f"Error listing running models: {e}")
+            raise
+            
     async def chat(
         self,
         model: str,
         message: str,
+        stats: Optional[Dict] = None,
+        context: Optional[List[Message]] = None,
+        images: Optional[List[str]] = None,
+        context_images: Optional[Mapping[str, str]] = None,
+        options: Optional[Mapping[str, Any]] = None,
+        keep_alive: Optional[Union[str, float]] = None,
+        timeout: Optional[float] = None,
     ) -> AsyncGenerator[str, None]:
         """Send chat message to model with streaming response.
         
         Args:
             model: Name of model to use
             message: Message to send
+            stats: Optional dict filled with the timing and token counts
+                Ollama reports in its final chunk, and the nanoseconds
+                until the first token arrived as ``first_token_duration``
+            context: Optional earlier messages of the conversation, oldest first
+            images: Optional base64 images sent with the message, for
+                vision models
+            context_images: Optional base64 images of the context
+                messages, by hash
+            options: Optional generation options, the model's own if omitted
+            keep_alive: Optional time the model stays loaded after the request
+            timeout: Optional seconds to wait for each chunk, including
+                the first while the model loads, instead of bounding the
+                whole request
             
         Yields:
             Response chunks from the model
@@ -144,21 +224,24 @@ class OllamaClient:
             logger.info(f"Sending message to {model}")
             
             # Format message
-            messages = [{"role": "user", "content": message}]
+            messages = [m.to_api(context_images) for m in context or ()]
+            messages.append({"role": "user", "content": message})
+            if images:
+                messages[-1]["images"] = images
+            
+            data = {"model": model, "messages": messages, "stream": True}
+            if options:
+                data["options"] = options
+            if keep_alive is not None:
+                data["keep_alive"] = keep_alive
+            
+            request = {"json": data}
+            if timeout:
+                request["timeout"] = aiohttp.ClientTimeout(total=None, sock_read=timeout)
             
             # Send request
-            async with self.session.post(
-                f"{self.base_url}/api/chat",
-                json={
-                    "model": model,
-                    "messages": messages,
-                    "stream": True,
-                    "options": {
-                        "temperature": 0.7,
-                        "top_p": 0.9,
-                    }
-                }
-            ) as response:
+            start = time.perf_counter_ns()
+            async with self.session.post(f"{self.base_url}/api/chat", **request) as response:
                 # Check response
                 response.raise_for_status()
                 
@@ -183,9 +266,17 @@ class OllamaClient:
                     if "error" in data:
                         raise Exception(data["error"])
                         
+                    # Collect stats from final chunk
+                    if data.get("done") and stats is not None:
+                        stats.update({
+                            key: data[key] for key in STATS_FIELDS if key in data
+                        })
+                        
                     # Extract and format response chunk
                     if "message" in data and "content" in data["message"]:
                         chunk = data["message"]["content"]
+                        if stats is not None and chunk and "first_token_duration" not in stats:
+                            stats["first_token_duration"] = time.perf_counter_ns() - start
                         
                         # Handle code block formatting
                         if "```" in chunk:
@@ -227,7 +318,7 @@ class OllamaClient:
         self,
         model: str,
         message: str,
-        context: Optional[List[Dict[str, str]]] = None,
+        context: Optional[List[Message]] = None,
         **kwargs
     ) -> AsyncGenerator[str, None]:
         """Stream chat responses from model.
@@ -253,7 +344,7 @@ class OllamaClient:
             }
             
             if context:
-                data["messages"] = context + data["messages"]
+                data["messages"] = [m.to_api() for m in context] + data["messages"]
                 
             # Send request
             async with self.session.post(
@@ -268,6 +359,8 @@ class OllamaClient:
                     if line:
                         try:
                             chunk = json.loads(line)
+                            if "error" in chunk:
+                                raise RuntimeError(chunk["error"])
                             if "message" in chunk:
                                 yield chunk["message"]["content"]
                         except json.JSONDecodeError as e:
@@ -278,6 +371,33 @@ class OllamaClient:
             logger.error(f"Error streaming chat: {str(e)}")
             raise
             
+    async def embed(self, model: str, texts: List[str]) -> List[List[float]]:
+        """Compute embeddings of texts.
+        
+        Args:
+            model: Name of the embedding model
+            texts: Texts to embed in one request
+            
+        Returns:
+            One embedding per text
+        """
+        await self._ensure_session()
+        
+        try:
+            async with self.session.post(
+                f"{self.base_url}/api/embed",
+                json={"model": model, "input": texts}
+            ) as response:
+                response.raise_for_status()
+                data = await response.json()
+                if "error" in data:
+                    raise RuntimeError(data["error"])
+                return data["embeddings"]
+                
+        except Exception as e:
+            logger.error(f"Error computing embeddings: {str(e)}")
+            raise
+            
     async def pull_model(self, model: str):
         """Pull model."""
         await self._ensure_session()
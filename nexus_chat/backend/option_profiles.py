@@ -0,0 +1,226 @@
+"""Generation option profiles module."""
+import logging
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from nexus_chat.backend.model_metadata import ModelMetadataCache
+from nexus_chat.models.settings import ModelConfig, default_model_configs
+from nexus_chat.utils.constants import MODEL_DEFAULTS
+
+logger = logging.getLogger(__name__)
+
+# Ollama options: type, lowest and highest accepted value
+OPTION_SPECS: Dict[str, Tuple[type, Optional[float], Optional[float]]] = {
+    "num_ctx": (int, 1, None),
+    "num_batch": (int, 1, None),
+    "num_thread": (int, 1, None),
+    "num_gpu": (int, -1, None),
+    "num_keep": (int, -1, None),
+    "num_predict": (int, -2, None),
+    "seed": (int, None, None),
+    "top_k": (int, 0, None),
+    "repeat_last_n": (int, -1, None),
+    "mirostat": (int, 0, 2),
+    "temperature": (float, 0, None),
+    "top_p": (float, 0, 1),
+    "min_p": (float, 0, 1),
+    "typical_p": (float, 0, 1),
+    "repeat_penalty": (float, 0, None),
+    "presence_penalty": (float, None, None),
+    "frequency_penalty": (float, None, None),
+    "mirostat_tau": (float, 0, None),
+    "mirostat_eta": (float, 0, None),
+    "numa": (bool, None, None),
+    "use_mmap": (bool, None, None),
+    "use_mlock": (bool, None, None),
+    "penalize_newline": (bool, None, None),
+    "stop": (list, None, None),
+}
+
+# Names used in ModelConfig.parameters for Ollama options
+PARAMETER_ALIASES = {"max_tokens": "num_predict", "repetition_penalty": "repeat_penalty"}
+
+def validate_options(options: Mapping[str, Any]) -> Dict[str, Any]:
+    """Check generation options against what Ollama accepts.
+    
+    Besides Ollama's ``options``, a profile may set ``keep_alive``, how
+    long the model stays loaded after a request: a duration such as
+    ``"10m"``, or seconds, negative to keep it loaded.
+    
+    Args:
+        options: Options by name
+    
+    Returns:
+        Validated options, integers given for float options converted
+    
+    Raises:
+        ValueError: If an option is unknown or its value is invalid
+    """
+    validated: Dict[str, Any] = {}
+    for name, value in options.items():
+        if name == "keep_alive":
+            if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+                raise ValueError(f"keep_alive must be a duration or seconds, not {value!r}")
+            validated[name] = value
+            continue
+        if name not in OPTION_SPECS:
+            raise ValueError(f"Unknown generation option {name}")
+        kind, low, high = OPTION_SPECS[name]
+        if kind is list:
+            if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+                raise ValueError(f"{name} must be a list of strings")
+        elif kind is bool:
+            if not isinstance(value, bool):
+                raise ValueError(f"{name} must be true or false")
+        else:
+            numeric = (int,) if kind is int else (int, float)
+            if isinstance(value, bool) or not isinstance(value, numeric):
+                raise ValueError(f"{name} must be {'an integer' if kind is int else 'a number'}")
+            value = kind(value)
+            if low is not None and value < low:
+                raise ValueError(f"{name} must be at least {low}, not {value}")
+            if high is not None and value > high:
+                raise ValueError(f"{name} must be at most {high}, not {value}")
+        validated[name] = value
+    return validated
+
+class OptionProfiles:
+    """Generation options sent with each request, by model and session.
+    
+    Options are merged from the global defaults, ``MODEL_DEFAULTS``
+    overridden by ``defaults``, then the model's ``ModelConfig.parameters``
+    and its profile in ``models``, then the session's overrides. A
+    model's context length, as Ollama reports it if ``metadata`` is
+    given and otherwise its ``context_length`` parameter, caps
+    ``num_ctx`` rather than setting it, so a large context window is
+    only allocated when asked for. Merged options are cached per model
+    and session until a profile or the metadata changes.
+    """
+    
+    def __init__(
+        self,
+        defaults: Optional[Mapping[str, Any]] = None,
+        models: Optional[Mapping[str, Mapping[str, Any]]] = None,
+        model_configs: Optional[Mapping[str, ModelConfig]] = None,
+        metadata: Optional[ModelMetadataCache] = None
+    ):
+        """Initialize option profiles.
+        
+        Args:
+            defaults: Optional options overriding the global defaults
+            models: Optional profiles by model name, with or without its tag
+            model_configs: Configurations of known models by name,
+                defaults to the built-in ones
+            metadata: Optional metadata of the installed models
+        
+        Raises:
+            ValueError: If a profile is invalid
+        """
+        self.model_configs = default_model_configs() if model_configs is None else model_configs
+        self.metadata = metadata
+        self._defaults = {
+            "temperature": MODEL_DEFAULTS["TEMPERATURE"],
+            "top_p": MODEL_DEFAULTS["TOP_P"],
+            "top_k": MODEL_DEFAULTS["TOP_K"],
+            "repeat_penalty": MODEL_DEFAULTS["REPETITION_PENALTY"],
+            "num_ctx": MODEL_DEFAULTS["CONTEXT_LENGTH"],
+            "num_predict": MODEL_DEFAULTS["MAX_TOKENS"],
+            **validate_options(defaults or {})
+        }
+        self._models = {
+            model: validate_options(options) for model, options in (models or {}).items()
+        }
+        self._sessions: Dict[str, Dict[str, Any]] = {}
+        self._cache: Dict[Tuple[str, Optional[str]], Dict[str, Any]] = {}
+        self._generation = metadata.generation if metadata else 0
+    
+    def _config(self, model: str) -> Tuple[Dict[str, Any], Optional[int]]:
+        """Options set by a model's configuration, and its context length."""
+        meta = self.metadata.get(model) if self.metadata else None
+        context_length = meta.context_length if meta else None
+        config = self.model_configs.get(model) or self.model_configs.get(model.split(":")[0])
+        if config is None:
+            return {}, context_length
+        options = {}
+        for name, value in config.parameters.items():
+            name = PARAMETER_ALIASES.get(name, name)
+            # Other parameters describe the model rather than configure it
+            if name in OPTION_SPECS:
+                options[name] = value
+        return validate_options(options), context_length or config.parameters.get("context_length")
+    
+    def resolve(self, model: str, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """Request fields carrying the options of a model in a session.
+        
+        Args:
+            model: Model answering
+            session_id: Optional session whose overrides apply
+        
+        Returns:
+            ``options`` and, if set, ``keep_alive`` fields of an Ollama
+            request; shared, so not to be modified
+        """
+        if self.metadata and self.metadata.generation != self._generation:
+            self._generation = self.metadata.generation
+            self._cache.clear()
+        key = (model, session_id)
+        fields = self._cache.get(key)
+        if fields is not None:
+            return fields
+        
+        configured, context_length = self._config(model)
+        options = {
+            **self._defaults,
+            **configured,
+            **self._models.get(model.split(":")[0], {}),
+            **self._models.get(model, {}),
+            **self._sessions.get(session_id, {})
+        }
+        if context_length and options.get("num_ctx", 0) > context_length:
+            logger.warning(
+                f"num_ctx {options['num_ctx']} exceeds the {context_length} tokens "
+                f"{model} supports, using {context_length}"
+            )
+            options["num_ctx"] = context_length
+        fields = {"options": options}
+        keep_alive = options.pop("keep_alive", None)
+        if keep_alive is not None:
+            fields["keep_alive"] = keep_alive
+        self._cache[key] = fields
+        return fields
+    
+    def set_defaults(self, options: Mapping[str, Any]) -> None:
+        """Override global defaults.
+        
+        Args:
+            options: Options overriding the built-in defaults
+        """
+        self._defaults.update(validate_options(options))
+        self._cache.clear()
+    
+    def set_model(self, model: str, options: Optional[Mapping[str, Any]]) -> None:
+        """Replace the profile of a model.
+        
+        Args:
+            model: Model name, with or without its tag
+            options: Options of the model, None to remove its profile
+        """
+        if options:
+            self._models[model] = validate_options(options)
+        else:
+            self._models.pop(model, None)
+        # A profile without a tag applies to every tag
+        self._cache.clear()
+    
+    def set_session(self, session_id: str, options: Optional[Mapping[str, Any]]) -> None:
+        """Replace the overrides of a session.
+        
+        Args:
+            session_id: Session id
+            options: Options overriding the model's, None to remove them
+        """
+        if options:
+            self._sessions[session_id] = validate_options(options)
+        else:
+            self._sessions.pop(session_id, None)
+        for key in [key for key in self._cache if key[1] == session_id]:
+            del self._cache[key]
@@ -0,0 +1,241 @@
+"""Generation option tuning module."""
+import logging
+import statistics
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from nexus_chat.backend.ollama_client import OllamaClient
+from nexus_chat.utils.constants import TUNER
+
+logger = logging.getLogger(__name__)
+
+# Options swept, in order; each is fixed at its best before the next
+TUNED_OPTIONS = ("num_thread", "num_batch", "num_ctx")
+
+def reject_outliers(
+    values: Sequence[float],
+    limit: float = TUNER["OUTLIER_LIMIT"]
+) -> Tuple[List[float], int]:
+    """Drop values far from the median.
+    
+    Values more than ``limit`` scaled median absolute deviations from the
+    median are dropped, or mean absolute deviations when most values are
+    equal; with fewer than three values, or no deviation, all are kept.
+    
+    Args:
+        values: Measured values
+        limit: Deviations from the median past which a value is an outlier
+    
+    Returns:
+        Kept values and the number dropped
+    """
+    if len(values) < 3:
+        return list(values), 0
+    median = statistics.median(values)
+    # Scaled to estimate the standard deviation of normal values
+    deviations = [abs(value - median) for value in values]
+    deviation = 1.4826 * statistics.median(deviations) or 1.2533 * statistics.fmean(deviations)
+    if deviation == 0:
+        return list(values), 0
+    kept = [value for value in values if abs(value - median) <= limit * deviation]
+    return kept, len(values) - len(kept)
+
+@dataclass
+class Measurement:
+    """Throughput of a model with one set of options."""
+    options: Dict[str, Any]
+    prompt_rate: float  # prompt tokens evaluated per second
+    eval_rate: float  # tokens generated per second
+    trials: int
+    rejected: int
+    
+    @property
+    def seconds(self) -> float:
+        """Expected duration of a reference request, prompt and answer."""
+        return (
+            TUNER["REFERENCE_PROMPT_TOKENS"] / self.prompt_rate
+            + TUNER["REFERENCE_EVAL_TOKENS"] / self.eval_rate
+        )
+
+@dataclass
+class TuneReport:
+    """Outcome of tuning a model."""
+    model: str
+    best: Dict[str, Any]
+    measurements: List[Measurement] = field(default_factory=list)
+    duration: float = 0.0
+    
+    def format(self) -> str:
+        """Table of the measurements, best first."""
+        lines = [
+            f"{self.model}: best {', '.join(f'{k}={v}' for k, v in self.best.items())}",
+            f"{'num_thread':>10} {'num_batch':>9} {'num_ctx':>7} "
+            f"{'prompt t/s':>10} {'eval t/s':>8} {'seconds':>7} {'trials':>6}"
+        ]
+        for measurement in sorted(self.measurements, key=lambda m: m.seconds):
+            options = measurement.options
+            lines.append(
+                f"{options.get('num_thread', '-'):>10} {options.get('num_batch', '-'):>9} "
+                f"{options.get('num_ctx', '-'):>7} {measurement.prompt_rate:>10.1f} "
+                f"{measurement.eval_rate:>8.1f} {measurement.seconds:>7.2f} "
+                f"{measurement.trials - measurement.rejected:>3}/{measurement.trials}"
+            )
+        lines.append(f"Tuned in {self.duration:.0f}s")
+        return "\n".join(lines)
+
+class OptionTuner:
+    """Finds the fastest ``num_thread``, ``num_batch`` and ``num_ctx`` of a model.
+    
+    Each option is swept in turn over its candidate values, the others
+    fixed at their best so far, rather than trying every combination.
+    Every set of options is first warmed up with one untimed request,
+    which loads the model with those options, then timed over
+    ``trials`` rounds of the prompt set from the durations Ollama
+    reports. Each prompt is prefixed with the trial number so Ollama's
+    prompt cache does not skip its evaluation. Rates with outliers
+    rejected are averaged and ranked by the expected duration of a
+    reference request; within ``tolerance`` of the fastest, the largest
+    context and then the fewest threads win.
+    """
+    
+    def __init__(
+        self,
+        client: OllamaClient,
+        model: str,
+        base_options: Optional[Mapping[str, Any]] = None,
+        prompts: Sequence[str] = TUNER["PROMPTS"],
+        trials: int = TUNER["TRIALS"],
+        num_predict: int = TUNER["NUM_PREDICT"],
+        tolerance: float = TUNER["TOLERANCE"]
+    ):
+        """Initialize option tuner.
+        
+        Args:
+            client: Ollama client of the host to tune for
+            model: Model to tune
+            base_options: Optional options kept while tuning, such as the
+                model's current profile
+            prompts: Prompts timed in each trial
+            trials: Timed rounds of the prompts per set of options
+            num_predict: Tokens generated per prompt
+            tolerance: Relative slowdown within which options count as fastest
+        """
+        self.client = client
+        self.model = model
+        self.prompts = prompts
+        self.trials = trials
+        self.tolerance = tolerance
+        # Greedy decoding keeps answer lengths alike across options
+        self.base_options = {
+            **(base_options or {}),
+            "num_predict": num_predict,
+            "temperature": 0,
+            "seed": 0
+        }
+    
+    async def _request(self, prompt: str, options: Dict[str, Any]) -> Dict[str, Any]:
+        """Send one prompt and return the stats Ollama reported."""
+        stats: Dict[str, Any] = {}
+        async for _ in self.client.chat(self.model, prompt, stats=stats, options=options):
+            pass
+        return stats
+    
+    async def measure(self, options: Mapping[str, Any]) -> Measurement:
+        """Time the prompt set with a set of options.
+        
+        Args:
+            options: Options overriding the base options
+        
+        Returns:
+            Measured throughput
+        """
+        merged = {**self.base_options, **options}
+        await self._request(self.prompts[0], merged)
+        
+        prompt_rates, eval_rates = [], []
+        for trial in range(self.trials):
+            for prompt in self.prompts:
+                stats = await self._request(f"[{trial}] {prompt}", merged)
+                if stats.get("prompt_eval_duration") and stats.get("prompt_eval_count"):
+                    prompt_rates.append(
+                        stats["prompt_eval_count"] / stats["prompt_eval_duration"] * 1e9
+                    )
+                if stats.get("eval_duration") and stats.get("eval_count"):
+                    eval_rates.append(stats["eval_count"] / stats["eval_duration"] * 1e9)
+        if not eval_rates or not prompt_rates:
+            raise RuntimeError(f"{self.model} reported no timings")
+        
+        prompt_kept, prompt_rejected = reject_outliers(prompt_rates)
+        eval_kept, eval_rejected = reject_outliers(eval_rates)
+        measurement = Measurement(
+            dict(options),
+            statistics.fmean(prompt_kept),
+            statistics.fmean(eval_kept),
+            trials=len(eval_rates),
+            rejected=max(prompt_rejected, eval_rejected)
+        )
+        logger.info(
+            f"{self.model} with {options}: {measurement.prompt_rate:.1f} prompt tokens/s, "
+            f"{measurement.eval_rate:.1f} tokens/s, {measurement.rejected} outliers"
+        )
+        return measurement
+    
+    def _best(self, measurements: List[Measurement]) -> Measurement:
+        """Fastest measurement, preferring larger contexts and fewer threads among near ties."""
+        fastest = min(measurement.seconds for measurement in measurements)
+        close = [
+            measurement for measurement in measurements
+            if measurement.seconds <= fastest * (1 + self.tolerance)
+        ]
+        return min(
+            close,
+            key=lambda m: (-m.options.get("num_ctx", 0), m.options.get("num_thread", 0), m.seconds)
+        )
+    
+    async def tune(
+        self,
+        candidates: Mapping[str, Sequence[int]],
+        progress: Optional[Callable[[int, int], None]] = None
+    ) -> TuneReport:
+        """Sweep the options and find the fastest values.
+        
+        Args:
+            candidates: Values to try by option, among ``num_thread``,
+                ``num_batch`` and ``num_ctx``; options left out keep
+                their base value
+            progress: Optional callback receiving sets of options
+                measured and the total
+        
+        Returns:
+            Report with the best values and every measurement
+        """
+        try:
+            start = time.perf_counter()
+            swept = [name for name in TUNED_OPTIONS if candidates.get(name)]
+            # Each sweep after the first starts with the options already measured
+            total = sum(len(candidates[name]) for name in swept) - max(len(swept) - 1, 0)
+            best: Dict[str, Any] = {name: candidates[name][0] for name in swept}
+            measured: Dict[Tuple, Measurement] = {}
+            report = TuneReport(self.model, best)
+            
+            for name in swept:
+                round_measurements = []
+                for value in candidates[name]:
+                    options = {**best, name: value}
+                    key = tuple(sorted(options.items()))
+                    if key not in measured:
+                        measured[key] = await self.measure(options)
+                        report.measurements.append(measured[key])
+                    round_measurements.append(measured[key])
+                    if progress:
+                        progress(len(report.measurements), total)
+                best[name] = self._best(round_measurements).options[name]
+            
+            report.duration = time.perf_counter() - start
+            logger.info(f"Tuned {self.model} in {report.duration:.0f}s: {best}")
+            return report
+        
+        except Exception as e:
+            logger.error(f"Error tuning {self.model}: {e}")
+            raise
@@ -0,0 +1,198 @@
+"""Request scheduler module."""
+import asyncio
+import itertools
+import logging
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+from nexus_chat.utils.constants import SCHEDULER
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class _Waiter:
+    """A generation request waiting for a slot."""
+    seq: int
+    session_id: str
+    model: str
+    future: asyncio.Future = field(repr=False)
+    count: int = 1
+    since: float = field(default_factory=time.monotonic)
+
+class RequestScheduler:
+    """Shares the generation slots of the Ollama host between sessions.
+    
+    Ollama answers a bounded number of requests at once and keeps a
+    bounded number of models loaded; past that, requests queue inside
+    the server in arrival order, and a request for another model evicts
+    one still in use. Requests queue here instead: at most
+    ``max_parallel`` generations run at once, over at most
+    ``max_models`` models, and a freed slot goes to the waiting request
+    whose session has the fewest running, oldest first. A fan-out to
+    several models thus takes the free slots without starving a session
+    sending a single message. A request waiting longer than
+    ``max_wait`` seconds is served next in arrival order, and if its
+    model cannot be loaded yet, later requests wait until it can, so
+    busy sessions and loaded models cannot starve it. Several slots can
+    be requested together, for candidates of one answer that must run
+    side by side; they are granted at once and handed back one by one.
+    """
+    
+    def __init__(
+        self,
+        max_parallel: int = SCHEDULER["MAX_PARALLEL"],
+        max_models: int = SCHEDULER["MAX_MODELS"],
+        max_wait: float = SCHEDULER["MAX_WAIT"]
+    ):
+        """Initialize request scheduler.
+        
+        Args:
+            max_parallel: Generations running at once, such as Ollama's
+                ``OLLAMA_NUM_PARALLEL``
+            max_models: Models generating at once, such as Ollama's
+                ``OLLAMA_MAX_LOADED_MODELS``
+            max_wait: Seconds after which a waiting request goes first;
+                0 serves requests strictly in arrival order
+        """
+        self.max_parallel = max_parallel
+        self.max_models = max_models
+        self.max_wait = max_wait
+        
+        self._sessions: Counter = Counter()
+        self._models: Counter = Counter()
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+    
+    @property
+    def running(self) -> int:
+        """Number of generations running."""
+        return sum(self._sessions.values())
+    
+    @property
+    def waiting(self) -> int:
+        """Number of generations waiting for a slot."""
+        return len(self._waiters)
+    
+    def _fits(self, model: str, count: int = 1) -> bool:
+        """Whether ``count`` generations with a model can start now."""
+        return self.running + count <= self.max_parallel and (
+            model in self._models or len(self._models) < self.max_models
+        )
+    
+    def _overdue(self) -> Optional[_Waiter]:
+        """The oldest waiter if it has waited longer than ``max_wait``."""
+        # Waiters are appended in arrival order
+        for waiter in self._waiters:
+            if not waiter.future.done():
+                if time.monotonic() - waiter.since >= self.max_wait:
+                    return waiter
+                return None
+        return None
+    
+    def _take(self, session_id: str, model: str, count: int = 1) -> None:
+        self._sessions[session_id] += count
+        self._models[model] += count
+    
+    def _release(self, session_id: str, model: str) -> None:
+        """Free a slot and hand it, and any others now usable, to waiters."""
+        for counter, key in ((self._sessions, session_id), (self._models, model)):
+            counter[key] -= 1
+            if counter[key] <= 0:
+                del counter[key]
+        while self._waiters:
+            waiter = self._overdue()
+            if waiter is not None:
+                # Hold slots back until the overdue request fits
+                if not self._fits(waiter.model, waiter.count):
+                    break
+            else:
+                # Cancelled waiters remove themselves once they resume
+                eligible = [
+                    waiter for waiter in self._waiters
+                    if not waiter.future.done() and self._fits(waiter.model, waiter.count)
+                ]
+                if not eligible:
+                    break
+                waiter = min(eligible, key=lambda w: (self._sessions[w.session_id], w.seq))
+            self._waiters.remove(waiter)
+            self._take(waiter.session_id, waiter.model, waiter.count)
+            waiter.future.set_result(None)
+    
+    async def _acquire(self, session_id: str, model: str, count: int = 1) -> None:
+        """Wait for ``count`` slots."""
+        # Waiters that fit were granted on release, so those left cannot
+        # use the slot, unless one is overdue and the slot is held for it
+        if self._fits(model, count) and self._overdue() is None:
+            self._take(session_id, model, count)
+            return
+        
+        future = asyncio.get_running_loop().create_future()
+        waiter = _Waiter(next(self._seq), session_id, model, future, count)
+        self._waiters.append(waiter)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.cancelled():
+                self._waiters.remove(waiter)
+            else:
+                # Granted as the request was cancelled
+                for _ in range(count):
+                    self._release(session_id, model)
+            raise
+    
+    @asynccontextmanager
+    async def slot(self, session_id: str, model: str) -> AsyncIterator[float]:
+        """Hold a generation slot for the duration of a request.
+        
+        Args:
+            session_id: Session the request belongs to
+            model: Model generating the answer
+        
+        Yields:
+            Seconds spent waiting for the slot
+        """
+        start = time.perf_counter()
+        await self._acquire(session_id, model)
+        waited = time.perf_counter() - start
+        if waited > 0.1:
+            logger.debug(f"Request for {model} waited {waited:.2f}s for a slot")
+        try:
+            yield waited
+        finally:
+            self._release(session_id, model)
+    
+    @asynccontextmanager
+    async def slots(
+        self,
+        session_id: str,
+        model: str,
+        count: int
+    ) -> AsyncIterator[Tuple[int, Callable[[], None]]]:
+        """Hold several generation slots, granted together.
+        
+        Args:
+            session_id: Session the requests belong to
+            model: Model generating the answers
+            count: Slots wanted, capped at ``max_parallel``
+        
+        Yields:
+            Number of slots held, and a function handing one back early
+        """
+        count = max(1, min(count, self.max_parallel))
+        await self._acquire(session_id, model, count)
+        held = count
+        
+        def release() -> None:
+            nonlocal held
+            if held:
+                held -= 1
+                self._release(session_id, model)
+        
+        try:
+            yield count, release
+        finally:
+            while held:
+                release()
@@ -0,0 +1,335 @@
+"""Retention policy module."""
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from nexus_chat.backend.migrations import resolve_content
+from nexus_chat.backend.storage_manager import StorageManager
+from nexus_chat.models.message import Message
+from nexus_chat.utils.constants import DATABASE
+from nexus_chat.utils.timestamps import now_ms
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class RetentionPolicy:
+    """Limits on what stays in the live database.
+    
+    A session expires when its last activity is older than ``max_age``
+    days, when it falls outside the ``max_sessions`` most recently used,
+    or, oldest first, while the database is above ``max_size`` MB.
+    ``None`` disables a limit. With ``inactive_only``, only inactive
+    sessions expire: closed ones, and open ones without activity for
+    ``inactive_after`` days.
+    """
+    max_age: Optional[float] = DATABASE["RETENTION_MAX_AGE"]  # days
+    max_sessions: Optional[int] = None
+    max_size: Optional[float] = None  # MB
+    inactive_only: bool = True
+    inactive_after: Optional[float] = DATABASE["RETENTION_INACTIVE_AFTER"]  # days
+
+@dataclass
+class RetentionReport:
+    """Outcome of a retention run."""
+    archived_sessions: int = 0
+    archived_messages: int = 0
+    collected_blobs: int = 0
+    freed_pages: int = 0
+
+class RetentionManager:
+    """Applies a retention policy to the live database in the background.
+    
+    Expired sessions are moved to the compressed archive database and
+    blobs they alone referred to are deleted. If the database uses
+    incremental auto-vacuum, the freed pages are then returned to the
+    file system in steps of ``vacuum_pages`` pages, each its own short
+    write transaction, so streaming writes interleave with the cleanup;
+    older databases are converted on demand with ``manage.py vacuum``.
+    Every run ends with ``PRAGMA optimize``.
+    """
+    
+    def __init__(
+        self,
+        storage: StorageManager,
+        policy: Optional[RetentionPolicy] = None,
+        interval: float = DATABASE["RETENTION_INTERVAL"],
+        vacuum_pages: int = DATABASE["VACUUM_STEP_PAGES"],
+        vacuum_sleep: float = DATABASE["VACUUM_STEP_SLEEP"]
+    ):
+        """Initialize retention manager.
+        
+        Args:
+            storage: Storage manager to clean up
+            policy: Retention policy, defaults to archiving by age only
+            interval: Hours between scheduled runs
+            vacuum_pages: Pages released per vacuum step
+            vacuum_sleep: Seconds to sleep between vacuum steps
+        """
+        self.storage = storage
+        self.policy = policy or RetentionPolicy()
+        self.interval = interval
+        self.vacuum_pages = vacuum_pages
+        self.vacuum_sleep = vacuum_sleep
+        
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+    
+    async def expired_sessions(self) -> List[str]:
+        """Find the sessions the policy moves to the archive.
+        
+        Returns:
+            Ids of expired sessions
+        """
+        policy = self.policy
+        activity = await self.storage.get_session_activity()
+        now = datetime.now()
+        cutoff = now - timedelta(days=policy.max_age) if policy.max_age is not None else None
+        idle_cutoff = (
+            now - timedelta(days=policy.inactive_after)
+            if policy.inactive_after is not None
+            else None
+        )
+        
+        expired = []
+        kept = []
+        for rank, (session_id, active, last_active) in enumerate(activity):
+            if policy.inactive_only and active and (
+                idle_cutoff is None or last_active >= idle_cutoff
+            ):
+                continue
+            if (
+                (cutoff is not None and last_active < cutoff)
+                or (policy.max_sessions is not None and rank >= policy.max_sessions)
+            ):
+                expired.append(session_id)
+            else:
+                kept.append(session_id)
+        
+        if policy.max_size is None:
+            return expired
+        
+        # Archive the least recently used remaining sessions until the
+        # estimated size fits
+        excess = await self.storage.get_database_size() - policy.max_size * 1024 * 1024
+        for session_id in expired:
+            excess -= await self.storage.get_session_size(session_id)
+        for session_id in reversed(kept):
+            if excess <= 0:
+                break
+            excess -= await self.storage.get_session_size(session_id)
+            expired.append(session_id)
+        
+        return expired
+    
+    async def archive_sessions(self, session_ids: List[str]) -> int:
+        """Move sessions and their messages to the archive database.
+        
+        The copy and the delete run in one transaction, but a commit
+        spanning two WAL databases is only atomic per file; after a crash
+        in between, archiving the same sessions again skips what was
+        already copied.
+        
+        Args:
+            session_ids: Sessions to archive
+        
+        Returns:
+            Number of archived messages
+        """
+        if not session_ids:
+            return 0
+        pool = await self.storage.connect()
+        
+        placeholders = ", ".join("?" * len(session_ids))
+        try:
+            async with pool.writer() as db:
+                async with db.execute(
+                    "SELECT COALESCE(MAX(num), 0) FROM archive.archived_messages"
+                ) as cursor:
+                    last_num = (await cursor.fetchone())[0]
+                
+                await db.execute(f"""
+                    INSERT INTO archive.archived_sessions
+                    SELECT
+                        id, name, model, system_prompt, active,
+                        created_at, updated_at, metadata, ?
+                    FROM chat_sessions WHERE id IN ({placeholders})
+                    ON CONFLICT (id) DO NOTHING
+                """, (now_ms(), *session_ids))
+                await db.execute(f"""
+                    INSERT INTO archive.archived_messages (
+                        id, session_id, content, role, model,
+                        parent_id, status, error, created_at, metadata
+                    )
+                    SELECT
+                        id, session_id, zip_text({resolve_content('m')}), role, model,
+                        parent_id, status, error, created_at, metadata
+                    FROM messages m WHERE session_id IN ({placeholders})
+                    ORDER BY session_id, created_at, rowid
+                    ON CONFLICT (id) DO NOTHING
+                """, session_ids)
+                # Index only rows copied just now, from the uncompressed source
+                await db.execute(f"""
+                    INSERT INTO archive.archived_fts (rowid, content)
+                    SELECT a.num, {resolve_content('m')}
+                    FROM archive.archived_messages a
+                    JOIN messages m ON m.id = a.id
+                    WHERE a.num > ?
+                """, (last_num,))
+                
+                cursor = await db.execute(
+                    f"DELETE FROM messages WHERE session_id IN ({placeholders})",
+                    session_ids
+                )
+                archived = cursor.rowcount
+                await db.execute(
+                    f"DELETE FROM chat_sessions WHERE id IN ({placeholders})",
+                    session_ids
+                )
+            logger.info(f"Archived {len(session_ids)} sessions with {archived} messages")
+            return archived
+        except Exception as e:
+            logger.error(f"Error archiving sessions: {e}")
+            raise
+    
+    async def restore_sessions(self, session_ids: List[str]) -> int:
+        """Move archived sessions and their messages back to the live database.
+        
+        Restored sessions count as used now, so retention does not
+        archive them again straight away.
+        
+        Args:
+            session_ids: Archived sessions to restore
+        
+        Returns:
+            Number of restored messages
+        """
+        if not session_ids:
+            return 0
+        pool = await self.storage.connect()
+        
+        placeholders = ", ".join("?" * len(session_ids))
+        try:
+            async with pool.writer() as db:
+                restored_at = now_ms()
+                await db.execute(f"""
+                    INSERT INTO chat_sessions (
+                        id, name, model, system_prompt, active,
+                        created_at, updated_at, metadata, changed_at
+                    )
+                    SELECT
+                        id, name, model, system_prompt, active,
+                        created_at, ?, metadata, ?
+                    FROM archive.archived_sessions WHERE id IN ({placeholders})
+                    ON CONFLICT (id) DO NOTHING
+                """, (restored_at, restored_at, *session_ids))
+                async with db.execute(f"""
+                    SELECT
+                        id, session_id, unzip_text(content), role, model,
+                        parent_id, status, error, created_at, metadata
+                    FROM archive.archived_messages WHERE session_id IN ({placeholders})
+                    ORDER BY num
+                """, session_ids) as cursor:
+                    messages = [Message.from_row(tuple(row)) async for row in cursor]
+                # Large bodies go back to the blob table
+                restored = await self.storage.insert_messages(db, messages, replace=False)
+                
+                await db.execute(f"""
+                    INSERT INTO archive.archived_fts (archived_fts, rowid, content)
+                    SELECT 'delete', num, unzip_text(content)
+                    FROM archive.archived_messages WHERE session_id IN ({placeholders})
+                """, session_ids)
+                await db.execute(
+                    f"DELETE FROM archive.archived_messages WHERE session_id IN ({placeholders})",
+                    session_ids
+                )
+                await db.execute(
+                    f"DELETE FROM archive.archived_sessions WHERE id IN ({placeholders})",
+                    session_ids
+                )
+            logger.info(f"Restored {len(session_ids)} sessions with {restored} messages")
+            return restored
+        except Exception as e:
+            logger.error(f"Error restoring sessions: {e}")
+            raise
+    
+    async def vacuum(self) -> int:
+        """Release free pages in small steps.
+        
+        Returns:
+            Number of released pages
+        """
+        freed = 0
+        while True:
+            released = await self.storage.incremental_vacuum(self.vacuum_pages)
+            freed += released
+            if released < self.vacuum_pages:
+                return freed
+            await asyncio.sleep(self.vacuum_sleep)
+    
+    async def run(self) -> RetentionReport:
+        """Apply the policy once.
+        
+        Returns:
+            What was archived and reclaimed
+        """
+        async with self._lock:
+            try:
+                report = RetentionReport()
+                
+                expired = await self.expired_sessions()
+                # Archive in chunks to keep each write transaction short
+                for start in range(0, len(expired), DATABASE["ARCHIVE_BATCH_SIZE"]):
+                    batch = expired[start:start + DATABASE["ARCHIVE_BATCH_SIZE"]]
+                    report.archived_messages += await self.archive_sessions(batch)
+                    report.archived_sessions += len(batch)
+                    await asyncio.sleep(0)
+                
+                report.collected_blobs = await self.storage.collect_garbage()
+                # Without incremental auto-vacuum only a full VACUUM releases
+                # pages; freed ones are reused by later writes meanwhile
+                if await self.storage.incremental_vacuum_enabled():
+                    report.freed_pages = await self.vacuum()
+                await self.storage.optimize()
+                
+                logger.info(
+                    f"Retention archived {report.archived_sessions} sessions "
+                    f"({report.archived_messages} messages), "
+                    f"collected {report.collected_blobs} blobs, "
+                    f"released {report.freed_pages} pages"
+                )
+                return report
+            
+            except Exception as e:
+                logger.error(f"Error applying retention policy: {str(e)}")
+                raise
+    
+    async def _run(self) -> None:
+        """Scheduler loop."""
+        while True:
+            try:
+                await self.run()
+            except Exception:
+                # Already logged, retried after the next interval
+                pass
+            await asyncio.sleep(self.interval * 3600)
+    
+    def start(self) -> None:
+        """Start applying the policy periodically."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info(f"Scheduled retention every {self.interval}h")
+    
+    async def stop(self) -> None:
+        """Stop the scheduler, waiting for a running pass to finish."""
+        if self._task is None:
+            return
+        
+        async with self._lock:
+            self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
@@ -1,12 +1,32 @@
 """Backend service module."""
 import asyncio
 import logging
-from typing import Callable, List, Optional
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
 
+from nexus_chat.backend.backup_manager import BackupManager
+from nexus_chat.backend.best_of import JudgeScorer
 from nexus_chat.backend.chat_manager import ChatManager
+from nexus_chat.backend.document_manager import DocumentManager, IngestReport
+from nexus_chat.backend.embedding_manager import EmbeddingManager
+from nexus_chat.backend.fan_out import FanOut
 from nexus_chat.backend.history_manager import HistoryManager
+from nexus_chat.backend.image_store import ImageSource, ImageStore
+from nexus_chat.backend.model_metadata import ModelMetadataCache
+from nexus_chat.backend.model_router import ModelRouter
 from nexus_chat.backend.ollama_client import OllamaClient
+from nexus_chat.backend.option_profiles import OptionProfiles
+from nexus_chat.backend.request_scheduler import RequestScheduler
+from nexus_chat.backend.retention_manager import RetentionManager, RetentionPolicy
+from nexus_chat.backend.storage_manager import StorageManager
+from nexus_chat.backend.sync_manager import SyncManager
+from nexus_chat.models.message import Message
+from nexus_chat.models.search import SearchHit
 from nexus_chat.utils.config import load_config, save_config
+from nexus_chat.utils.constants import (
+    BEST_OF, DATABASE, DOCUMENTS, IMAGES, MODEL_DEFAULTS, SCHEDULER
+)
+from nexus_chat.utils.progress import ProgressCallback
 
 logger = logging.getLogger(__name__)
 
@@ -23,13 +43,103 @@ class BackendService:
             
             # Create clients
             self.ollama_client = OllamaClient()
+            self.scheduler = RequestScheduler(
+                max_parallel=self.config.get("max_parallel_requests", SCHEDULER["MAX_PARALLEL"]),
+                max_models=self.config.get("max_loaded_models", SCHEDULER["MAX_MODELS"]),
+                max_wait=self.config.get("max_request_wait", SCHEDULER["MAX_WAIT"])
+            )
             
             # Create managers
-            self.history_manager = HistoryManager()
+            self.storage_manager = StorageManager(self.config.get("db_path"))
+            self.history_manager = HistoryManager(
+                storage_manager=self.storage_manager,
+                max_history=self.config.get("max_history", DATABASE["MAX_HISTORY"]),
+                max_memory=self.config.get(
+                    "max_history_memory", DATABASE["MAX_HISTORY_MEMORY"]
+                )
+            )
+            self.document_manager: Optional[DocumentManager] = None
+            if self.config.get("document_retrieval", False):
+                try:
+                    self.document_manager = DocumentManager(
+                        self.storage_manager,
+                        self.ollama_client,
+                        model=self.config.get("embedding_model", MODEL_DEFAULTS["EMBEDDING_MODEL"]),
+                        workers=self.config.get("ingest_workers"),
+                        interval=self.config.get(
+                            "ingest_interval", DOCUMENTS["INGEST_INTERVAL"]
+                        )
+                    )
+                except ImportError as e:
+                    logger.warning(f"Document retrieval disabled: {e}")
+            self.metadata = ModelMetadataCache(
+                self.ollama_client,
+                Path(self.storage_manager.db_path).parent / "model_metadata.json"
+            )
+            self.profiles = OptionProfiles(
+                defaults=self.config.get("options"),
+                models=self.config.get("model_options"),
+                metadata=self.metadata
+            )
+            self.router: Optional[ModelRouter] = None
+            if self.config.get("auto_route", False):
+                self.router = ModelRouter(
+                    self.ollama_client,
+                    classifier_model=self.config.get("router_model"),
+                    metadata=self.metadata
+                )
+            self.image_store: Optional[ImageStore] = None
+            try:
+                self.image_store = ImageStore(
+                    self.storage_manager,
+                    max_side=self.config.get("image_max_side", IMAGES["MAX_SIDE"]),
+                    quality=self.config.get("image_quality", IMAGES["QUALITY"]),
+                    workers=self.config.get("image_workers")
+                )
+            except ImportError as e:
+                logger.warning(f"Image attachments disabled: {e}")
             self.chat_manager = ChatManager(
                 ollama_client=self.ollama_client,
-                history_manager=self.history_manager
+                history_manager=self.history_manager,
+                storage_manager=self.storage_manager,
+                document_manager=self.document_manager,
+                image_store=self.image_store,
+                scheduler=self.scheduler,
+                router=self.router,
+                profiles=self.profiles,
+                metadata=self.metadata
+            )
+            self.backup_manager = BackupManager(
+                self.storage_manager.db_path,
+                self.storage_manager.archive_path,
+                interval=self.config.get("backup_interval", DATABASE["BACKUP_INTERVAL"])
             )
+            self.retention_manager = RetentionManager(
+                self.storage_manager,
+                RetentionPolicy(
+                    max_age=self.config.get("retention_max_age", DATABASE["RETENTION_MAX_AGE"]),
+                    max_sessions=self.config.get("retention_max_sessions"),
+                    max_size=self.config.get("retention_max_size")
+                )
+            )
+            self.sync_manager = SyncManager(
+                self.storage_manager,
+                sync_dir=self.config.get("sync_dir"),
+                interval=self.config.get("sync_interval", DATABASE["SYNC_INTERVAL"])
+            )
+            self.embedding_manager: Optional[EmbeddingManager] = None
+            if self.config.get("semantic_search", False):
+                try:
+                    self.embedding_manager = EmbeddingManager(
+                        self.storage_manager,
+                        self.ollama_client,
+                        model=self.config.get("embedding_model", MODEL_DEFAULTS["EMBEDDING_MODEL"]),
+                        interval=self.config.get(
+                            "embedding_interval", DATABASE["EMBEDDING_INTERVAL"]
+                        )
+                    )
+                except ImportError as e:
+                    logger.warning(f"Semantic search disabled: {e}")
             
             logger.info("Backend service initialized")
             
@@ -42,7 +152,25 @@ class BackendService:
         try:
             logger.info("Starting backend service")
             
-            # Nothing to start yet
+            # Close out answers interrupted by a previous crash
+            await self.storage_manager.recover_streaming()
+            
+            try:
+                await self.metadata.refresh()
+            except Exception as e:
+                # Fetched again before the first answer
+                logger.warning(f"Model metadata unavailable: {e}")
+            
+            if self.config.get("backup_enabled", True):
+                self.backup_manager.start()
+            if self.config.get("retention_enabled", True):
+                self.retention_manager.start()
+            if self.sync_manager.sync_dir:
+                self.sync_manager.start()
+            if self.embedding_manager:
+                self.embedding_manager.start()
+            if self.document_manager:
+                self.document_manager.start()
             
             logger.info("Backend service started")
             
@@ -55,8 +183,20 @@ class BackendService:
         try:
             logger.info("Stopping backend service")
             
+            await self.chat_manager.close_session()
+            
             # Close clients
+            await self.backup_manager.stop()
+            await self.retention_manager.stop()
+            await self.sync_manager.stop()
+            if self.embedding_manager:
+                await self.embedding_manager.stop()
+            if self.document_manager:
+                await self.document_manager.stop()
+            if self.image_store:
+                await self.image_store.close()
             await self.ollama_client.close()
+            await self.storage_manager.close()
             
             logger.info("Backend service stopped")
             
@@ -82,6 +222,45 @@ class BackendService:
             logger.error(f"Error setting model: {str(e)}")
             raise
             
+    def set_model_options(self, model: str, options: Optional[Dict[str, Any]]) -> None:
+        """Set the generation options profile of a model.
+        
+        Args:
+            model: Model name, with or without its tag
+            options: Options of the model, None to remove its profile
+            
+        Raises:
+            ValueError: If an option is invalid
+        """
+        try:
+            logger.info(f"Setting generation options of {model}")
+            self.profiles.set_model(model, options)
+            
+            # Save to config
+            model_options = self.config.setdefault("model_options", {})
+            if options:
+                model_options[model] = options
+            else:
+                model_options.pop(model, None)
+            save_config(self.config)
+            
+        except Exception as e:
+            logger.error(f"Error setting model options: {str(e)}")
+            raise
+            
+    async def set_session_options(self, options: Optional[Dict[str, Any]]) -> None:
+        """Override generation options in the current session.
+        
+        Args:
+            options: Options overriding the model's, None to remove them
+        """
+        try:
+            await self.chat_manager.set_session_options(options)
+            
+        except Exception as e:
+            logger.error(f"Error setting session options: {str(e)}")
+            raise
+            
     def get_model(self) -> Optional[str]:
         """Get current model.
         
@@ -110,20 +289,267 @@ class BackendService:
             logger.error(f"Error listing models: {str(e)}")
             raise
             
-    async def send_message(self, message: str, callback: Optional[Callable[[str], None]] = None) -> str:
+    async def send_message(
+        self,
+        message: str,
+        callback: Optional[Callable[[str], None]] = None,
+        images: Optional[Sequence[ImageSource]] = None
+    ) -> str:
         """Send message to model.
         
         Args:
             message: Message text
             callback: Optional callback for streaming responses
+            images: Optional image files, or their content, for vision models
             
         Returns:
             Model response
         """
         try:
             logger.info("Sending message")
-            return await self.chat_manager.send_message(message, callback)
+            return await self.chat_manager.send_message(message, callback, images)
             
         except Exception as e:
             logger.error(f"Error sending message: {str(e)}")
             raise
+            
+    async def edit_message(
+        self,
+        message_id: str,
+        content: str,
+        callback: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """Send an edited message as a new branch.
+        
+        Args:
+            message_id: Id of the user message to edit
+            content: New message text
+            callback: Optional callback for streaming responses
+            
+        Returns:
+            Model response
+        """
+        try:
+            logger.info("Editing message")
+            return await self.chat_manager.edit_message(message_id, content, callback)
+            
+        except Exception as e:
+            logger.error(f"Error editing message: {str(e)}")
+            raise
+            
+    async def regenerate(
+        self,
+        message_id: str,
+        callback: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """Generate an alternative answer as a new branch.
+        
+        Args:
+            message_id: Id of the answer to regenerate
+            callback: Optional callback for streaming responses
+            
+        Returns:
+            Model response
+        """
+        try:
+            logger.info("Regenerating answer")
+            return await self.chat_manager.regenerate(message_id, callback)
+            
+        except Exception as e:
+            logger.error(f"Error regenerating answer: {str(e)}")
+            raise
+            
+    async def escalate(
+        self,
+        message_id: str,
+        callback: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """Answer again with a larger model than a routed answer's, as a new branch.
+        
+        Args:
+            message_id: Id of the answer to escalate
+            callback: Optional callback for streaming responses
+            
+        Returns:
+            Model response
+        """
+        try:
+            logger.info("Escalating answer")
+            return await self.chat_manager.escalate(message_id, callback)
+            
+        except Exception as e:
+            logger.error(f"Error escalating answer: {str(e)}")
+            raise
+            
+    async def fan_out(
+        self,
+        message: str,
+        models: Sequence[str],
+        callback: Optional[Callable[[str, str], None]] = None,
+        images: Optional[Sequence[ImageSource]] = None
+    ) -> FanOut:
+        """Send one message to several models at once to compare their answers.
+        
+        Args:
+            message: Message text
+            models: Models to ask
+            callback: Optional callback receiving the model and each chunk
+                of its answer
+            images: Optional image files, or their content, for vision models
+            
+        Returns:
+            Fan-out to wait on and pick the winning answer from
+        """
+        try:
+            logger.info("Fanning out message")
+            return await self.chat_manager.fan_out(message, models, callback, images)
+            
+        except Exception as e:
+            logger.error(f"Error fanning out message: {str(e)}")
+            raise
+            
+    async def best_of(
+        self,
+        message: str,
+        n: Optional[int] = None,
+        callback: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """Send message, keeping the best of several sampled answers.
+        
+        Answers are scored by the configured ``judge_model`` if any,
+        otherwise by a heuristic.
+        
+        Args:
+            message: Message text
+            n: Number of candidates, defaults to the configured ``best_of``
+            callback: Optional callback to receive the winner's chunks
+            
+        Returns:
+            Winning model response
+        """
+        try:
+            logger.info("Sampling best answer")
+            judge = self.config.get("judge_model")
+            return await self.chat_manager.best_of(
+                message,
+                n or self.config.get("best_of", BEST_OF["N"]),
+                callback,
+                scorer=JudgeScorer(self.ollama_client, judge) if judge else None,
+                temperatures=self.config.get("best_of_temperatures")
+            )
+            
+        except Exception as e:
+            logger.error(f"Error sampling best answer: {str(e)}")
+            raise
+            
+    def switch_branch(self, message_id: str) -> List[Message]:
+        """Select the branch through a message.
+        
+        Args:
+            message_id: Message on the branch
+            
+        Returns:
+            Messages of the branch, oldest first
+        """
+        try:
+            logger.info("Switching branch")
+            return self.chat_manager.switch_branch(message_id)
+            
+        except Exception as e:
+            logger.error(f"Error switching branch: {str(e)}")
+            raise
+            
+    async def backup(self, progress: Optional[ProgressCallback] = None) -> Path:
+        """Back up the database now.
+        
+        Args:
+            progress: Optional callback receiving copied and total pages
+            
+        Returns:
+            Path of the compressed backup
+        """
+        try:
+            logger.info("Backing up database")
+            return await self.backup_manager.backup(progress)
+            
+        except Exception as e:
+            logger.error(f"Error backing up database: {str(e)}")
+            raise
+            
+    async def semantic_search(
+        self,
+        query: str,
+        limit: int = 20,
+        session_id: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> List[SearchHit]:
+        """Search messages by meaning.
+        
+        Args:
+            query: Search text
+            limit: Maximum number of hits
+            session_id: Optional session to search in
+            model: Optional model whose messages to search
+            
+        Returns:
+            Hits ordered by similarity, best first
+        """
+        try:
+            logger.info("Searching messages by meaning")
+            if self.embedding_manager is None:
+                raise RuntimeError("Semantic search is not enabled")
+            return await self.embedding_manager.search(query, limit, session_id, model)
+            
+        except Exception as e:
+            logger.error(f"Error searching messages: {str(e)}")
+            raise
+            
+    def _require_documents(self) -> DocumentManager:
+        """Document manager, failing when retrieval is off or no session is open."""
+        if self.document_manager is None:
+            raise RuntimeError("Document retrieval is not enabled")
+        if self.chat_manager.current_session is None:
+            raise ValueError("No session to attach documents to")
+        return self.document_manager
+            
+    async def attach_documents(
+        self,
+        path: str,
+        progress: Optional[ProgressCallback] = None
+    ) -> IngestReport:
+        """Attach a file or folder to the current session and ingest it.
+        
+        Args:
+            path: File or folder
+            progress: Optional callback receiving files read and to read
+            
+        Returns:
+            Outcome of the ingestion
+        """
+        try:
+            logger.info(f"Attaching {path}")
+            manager = self._require_documents()
+            path = await manager.attach(self.chat_manager.current_session.id, path)
+            return await manager.ingest([path], progress)
+            
+        except Exception as e:
+            logger.error(f"Error attaching documents: {str(e)}")
+            raise
+            
+    async def detach_documents(self, path: str) -> bool:
+        """Detach a file or folder from the current session.
+        
+        Args:
+            path: File or folder
+            
+        Returns:
+            Whether it was attached
+        """
+        try:
+            logger.info(f"Detaching {path}")
+            manager = self._require_documents()
+            return await manager.detach(self.chat_manager.current_session.id, path)
+            
+        except Exception as e:
+            logger.error(f"Error detaching documents: {str(e)}")
+            raise
@@ -0,0 +1,129 @@
+"""Lazily hydrated session module."""
+import logging
+from collections import deque
+from typing import Deque, List, NamedTuple, TYPE_CHECKING
+
+from nexus_chat.models.chat_session import ChatSession
+from nexus_chat.models.message import Message
+
+if TYPE_CHECKING:
+    from nexus_chat.backend.storage_manager import StorageManager
+
+logger = logging.getLogger(__name__)
+
+class MessageCursor(NamedTuple):
+    """Keyset position of a message in its session.
+    
+    Messages created in the same millisecond are ordered by the rowid
+    storage looks up from ``id``.
+    """
+    created_ms: int
+    id: str
+    
+    @classmethod
+    def of(cls, message: Message) -> "MessageCursor":
+        """Cursor pointing at a message."""
+        return cls(message.created_ms, message.id)
+
+class SessionHandle:
+    """Stored session whose messages are loaded page by page.
+    
+    The handle keeps a sliding window of at most ``max_pages`` pages.
+    Scrolling up with ``load_older`` drops the newest page once the
+    window is full, scrolling down with ``load_newer`` drops the oldest,
+    so memory stays proportional to what the view shows.
+    """
+    
+    def __init__(
+        self,
+        storage: "StorageManager",
+        session: ChatSession,
+        page_size: int,
+        max_pages: int
+    ):
+        """Initialize session handle.
+        
+        Args:
+            storage: Storage manager the session lives in
+            session: Session without messages
+            page_size: Messages per page
+            max_pages: Pages kept loaded
+        """
+        self.storage = storage
+        self.session = session
+        self.page_size = page_size
+        self.max_pages = max_pages
+        
+        self.pages: Deque[List[Message]] = deque()
+        self.has_older = True
+        self.has_newer = False
+    
+    @property
+    def id(self) -> str:
+        """Session id."""
+        return self.session.id
+    
+    @property
+    def messages(self) -> List[Message]:
+        """Loaded messages in chronological order."""
+        return [message for page in self.pages for message in page]
+    
+    async def load_latest(self) -> List[Message]:
+        """Reset the window to the newest page.
+        
+        Returns:
+            Newest messages, oldest first
+        """
+        page = await self.storage.get_messages(self.id, limit=self.page_size)
+        self.pages.clear()
+        if page:
+            self.pages.append(page)
+        self.has_older = len(page) == self.page_size
+        self.has_newer = False
+        return page
+    
+    async def load_older(self) -> List[Message]:
+        """Load the page preceding the window.
+        
+        Returns:
+            Loaded messages, oldest first, empty at the start of the session
+        """
+        if not self.pages:
+            return await self.load_latest()
+        if not self.has_older:
+            return []
+        
+        page = await self.storage.get_messages(
+            self.id,
+            before=MessageCursor.of(self.pages[0][0]),
+            limit=self.page_size
+        )
+        self.has_older = len(page) == self.page_size
+        if page:
+            self.pages.appendleft(page)
+            if len(self.pages) > self.max_pages:
+                self.pages.pop()
+                self.has_newer = True
+        return page
+    
+    async def load_newer(self) -> List[Message]:
+        """Load the page following the window.
+        
+        Returns:
+            Loaded messages, oldest first, empty at the end of the session
+        """
+        if not self.pages or not self.has_newer:
+            return []
+        
+        page = await self.storage.get_messages(
+            self.id,
+            after=MessageCursor.of(self.pages[-1][-1]),
+            limit=self.page_size
+        )
+        self.has_newer = len(page) == self.page_size
+        if page:
+            self.pages.append(page)
+            if len(self.pages) > self.max_pages:
+                self.pages.popleft()
+                self.has_older = True
+        return page
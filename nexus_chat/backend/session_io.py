@@ -0,0 +1,260 @@
+"""Session export and import file formats.
+
+Exports are a stream of records: a header, then each session followed
+by its messages. ``jsonl`` writes one JSON object per line, ``jsonl.gz``
+the same gzip compressed, and ``parquet`` one row per record with the
+session and message fields as columns (requires ``pyarrow``). Writers
+take and readers yield records in batches, so files of any size pass
+through bounded memory.
+"""
+import gzip
+import io
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from nexus_chat.utils.timestamps import now_ms, parse_epoch_ms
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+EXPORT_FORMAT = "nexus-chat-export"
+# Version 2 stores times as epoch milliseconds instead of local ISO strings
+EXPORT_VERSION = 2
+
+FORMATS = ("jsonl", "jsonl.gz", "parquet")
+
+# What import does with a session whose id already exists
+CONFLICT_POLICIES = ("skip", "replace", "rename")
+
+Record = Dict[str, Any]
+
+@dataclass
+class SessionFilter:
+    """Selects the sessions to export. ``None`` does not filter."""
+    session_ids: Optional[List[str]] = None
+    model: Optional[str] = None
+    since: Optional[datetime] = None  # last update at or after
+    until: Optional[datetime] = None  # last update before
+    active_only: bool = False
+
+@dataclass
+class TransferReport:
+    """Outcome of an export or import."""
+    sessions: int = 0
+    messages: int = 0
+    skipped_sessions: int = 0
+    skipped_messages: int = 0
+    renamed_sessions: List[Tuple[str, str]] = field(default_factory=list)
+
+def detect_format(path: Path) -> str:
+    """Guess the format of a file from its name.
+    
+    Args:
+        path: Export file path
+    
+    Returns:
+        One of ``FORMATS``
+    """
+    name = path.name.lower()
+    for fmt in sorted(FORMATS, key=len, reverse=True):
+        if name.endswith("." + fmt):
+            return fmt
+    raise ValueError(f"Unknown export format of {path}, expected one of {', '.join(FORMATS)}")
+
+def header_record(schema_version: int) -> Record:
+    """First record of every export."""
+    return {
+        "type": "header",
+        "format": EXPORT_FORMAT,
+        "version": EXPORT_VERSION,
+        "schema_version": schema_version,
+        "exported_at": now_ms()
+    }
+
+def session_record(row: Mapping[str, Any]) -> Record:
+    """Export record of a chat_sessions row, with times in epoch milliseconds."""
+    return {
+        "type": "session",
+        "id": row["id"],
+        "name": row["name"],
+        "model": row["model"],
+        "system_prompt": row["system_prompt"],
+        "active": bool(row["active"]),
+        "created_at": row["created_at"],
+        "updated_at": row["updated_at"],
+        "metadata": json.loads(row["metadata"]) if row["metadata"] else {}
+    }
+
+def session_values(record: Record, session_id: str) -> Tuple:
+    """chat_sessions values of a session record, up to ``metadata``."""
+    metadata = record.get("metadata")
+    return (
+        session_id,
+        record["name"],
+        record["model"],
+        record.get("system_prompt"),
+        record.get("active", True),
+        parse_epoch_ms(record["created_at"]),
+        parse_epoch_ms(record["updated_at"]),
+        json.dumps(metadata) if metadata else None
+    )
+
+def _require_pyarrow() -> None:
+    """Fail early when the parquet format is used without pyarrow."""
+    if pq is None:
+        raise ImportError("The parquet format requires pyarrow (pip install pyarrow)")
+
+class JsonlWriter:
+    """Writes records as JSON lines, optionally gzip compressed."""
+    
+    def __init__(self, path: Path, compress: bool):
+        """Create the file, truncating an existing one."""
+        self.file = gzip.open(path, "wt", encoding="utf-8") if compress else open(
+            path, "w", encoding="utf-8"
+        )
+    
+    def write(self, records: List[Record]) -> None:
+        """Append a batch of records."""
+        self.file.writelines(
+            json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+            for record in records
+        )
+    
+    def close(self) -> None:
+        """Flush and close the file."""
+        self.file.close()
+
+class ParquetWriter:
+    """Writes records as parquet rows, one row group per batch."""
+    
+    # Union of header, session and message fields; metadata as JSON text
+    COLUMNS = (
+        ("type", "string"), ("id", "string"), ("session_id", "string"),
+        ("name", "string"), ("model", "string"), ("system_prompt", "string"),
+        ("active", "bool_"), ("role", "string"), ("content", "string"),
+        ("parent_id", "string"), ("status", "string"), ("error", "string"),
+        ("created_at", "int64"), ("updated_at", "int64"), ("metadata", "string"),
+        ("format", "string"), ("version", "int64"), ("schema_version", "int64"),
+        ("exported_at", "int64"),
+    )
+    
+    def __init__(self, path: Path):
+        """Create the file, truncating an existing one."""
+        _require_pyarrow()
+        self.schema = pa.schema([(name, getattr(pa, kind)()) for name, kind in self.COLUMNS])
+        self.writer = pq.ParquetWriter(str(path), self.schema, compression="zstd")
+    
+    def write(self, records: List[Record]) -> None:
+        """Append a batch of records as a row group."""
+        rows = [
+            {**record, "metadata": json.dumps(record["metadata"])}
+            if record.get("metadata") is not None
+            else record
+            for record in records
+        ]
+        self.writer.write_table(pa.Table.from_pylist(rows, schema=self.schema))
+    
+    def close(self) -> None:
+        """Write the footer and close the file."""
+        self.writer.close()
+
+def open_writer(path: Path, fmt: str):
+    """Open a record writer.
+    
+    Args:
+        path: File to create
+        fmt: One of ``FORMATS``
+    
+    Returns:
+        Writer with ``write(records)`` and ``close()``
+    """
+    if fmt == "parquet":
+        return ParquetWriter(path)
+    if fmt in ("jsonl", "jsonl.gz"):
+        return JsonlWriter(path, compress=fmt == "jsonl.gz")
+    raise ValueError(f"Unknown export format {fmt}, expected one of {', '.join(FORMATS)}")
+
+class JsonlReader:
+    """Reads JSON line records in batches, reporting bytes read from disk."""
+    
+    def __init__(self, path: Path, compress: bool, batch_size: int):
+        """Open the file for reading."""
+        self.raw = open(path, "rb")
+        # Both read through ``raw``, whose position tracks progress
+        self.file = gzip.open(self.raw, "rt", encoding="utf-8") if compress else io.TextIOWrapper(
+            self.raw, encoding="utf-8"
+        )
+        self.batch_size = batch_size
+        self.total = path.stat().st_size
+    
+    @property
+    def done(self) -> int:
+        """Bytes of the file read so far."""
+        return self.raw.tell()
+    
+    def batches(self) -> Iterator[List[Record]]:
+        """Yield records in lists of at most ``batch_size``."""
+        batch = []
+        for line in self.file:
+            if line.strip():
+                batch.append(json.loads(line))
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = []
+        if batch:
+            yield batch
+    
+    def close(self) -> None:
+        """Close the file."""
+        self.file.close()
+        self.raw.close()
+
+class ParquetReader:
+    """Reads parquet records in batches, reporting rows read."""
+    
+    def __init__(self, path: Path, batch_size: int):
+        """Open the file and read its footer."""
+        _require_pyarrow()
+        self.file = pq.ParquetFile(str(path))
+        self.batch_size = batch_size
+        self.total = self.file.metadata.num_rows
+        self.done = 0
+    
+    def batches(self) -> Iterator[List[Record]]:
+        """Yield records in lists of at most ``batch_size``."""
+        for batch in self.file.iter_batches(batch_size=self.batch_size):
+            records = []
+            for row in batch.to_pylist():
+                record = {key: value for key, value in row.items() if value is not None}
+                if "metadata" in record:
+                    record["metadata"] = json.loads(record["metadata"])
+                records.append(record)
+            self.done += len(records)
+            yield records
+    
+    def close(self) -> None:
+        """Close the file."""
+        self.file.close()
+
+def open_reader(path: Path, fmt: str, batch_size: int):
+    """Open a record reader.
+    
+    Args:
+        path: File to read
+        fmt: One of ``FORMATS``
+        batch_size: Records per batch
+    
+    Returns:
+        Reader with ``batches()``, ``done``, ``total`` and ``close()``
+    """
+    if fmt == "parquet":
+        return ParquetReader(path, batch_size)
+    if fmt in ("jsonl", "jsonl.gz"):
+        return JsonlReader(path, fmt == "jsonl.gz", batch_size)
+    raise ValueError(f"Unknown export format {fmt}, expected one of {', '.join(FORMATS)}")
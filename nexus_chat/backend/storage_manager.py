@@ -1,197 +1,1465 @@
 """Storage management for chat sessions and messages."""
 import aiosqlite
+import asyncio
 import json
 import logging
-from typing import List, Optional, Dict, Any
+import re
+from typing import Iterable, List, Optional, Dict, Any, Tuple
 from datetime import datetime
 from pathlib import Path
 
-from nexus_chat.models.message import Message, MessageRole, MessageStatus
-from nexus_chat.models.chat_session import ChatSession
+from nexus_chat.backend.blob_store import BlobStore, compress_text, content_hash, decompress_text
+from nexus_chat.backend.connection_pool import ConnectionPool
+from nexus_chat.backend.migrations import (
+    ARCHIVE_MIGRATIONS, UNINDEX_STREAMING, migrate, resolve_content
+)
+from nexus_chat.backend.session_handle import MessageCursor, SessionHandle
+from nexus_chat.backend.write_batcher import WriteBatcher
+from nexus_chat.models.message import ROLES_BY_VALUE, Message, MessageRole, MessageStatus
+from nexus_chat.models.search import SearchHit
+from nexus_chat.models.chat_session import ChatSession, SessionSummary
+from nexus_chat.utils.constants import DATABASE, IMAGES
+from nexus_chat.utils.timestamps import from_epoch_ms, now_ms, to_epoch_ms
 
 logger = logging.getLogger(__name__)
 
+# Columns read by ``Message.from_row`` and written by ``Message.to_row``,
+# followed by the blob holding the content of large messages
+MESSAGE_COLUMNS = ", ".join(Message.ROW_COLUMNS) + ", blob_hash"
+
+# Keyset position of a ``MessageCursor`` as (created_at, rowid): messages
+# of the same millisecond keep the order they were written in, by rowid,
+# looked up from the cursor's message id
+CURSOR_KEY = "(?, (SELECT rowid FROM messages WHERE id = ?))"
+
+# Characters of a message shown as the snippet of a semantic search hit
+_SNIPPET_LENGTH = 200
+
+# Stored embeddings by kind: table, join adding the row's group and
+# label, change log, and the (slot, key, group, label) columns a
+# ``VectorIndex`` row is built from
+_EMBEDDING_KINDS = {
+    "messages": (
+        "message_embeddings",
+        "JOIN messages m ON m.id = e.message_id",
+        "embedding_changes",
+        "e.slot, e.message_id, m.session_id, m.model",
+    ),
+    "chunks": (
+        "document_chunks",
+        "JOIN documents d ON d.id = e.document_id",
+        "chunk_changes",
+        "e.slot, CAST(e.id AS TEXT), CAST(d.source_id AS TEXT), d.path",
+    ),
+}
+
+# Words of a free-text query, with an optional trailing * for prefix search
+_QUERY_TERM = re.compile(r"(\w+)(\*?)")
+
+def build_fts_query(text: str) -> str:
+    """Turn free text into a safe FTS5 query.
+    
+    Every word is quoted so FTS5 operators and punctuation in user input
+    cannot cause syntax errors; a trailing ``*`` keeps prefix matching,
+    e.g. ``"pyth*  async"`` becomes ``"pyth"* "async"``.
+    
+    Args:
+        text: User search text
+    
+    Returns:
+        FTS5 MATCH expression matching all words
+    """
+    return " ".join(
+        f'"{word}"{star}' for word, star in _QUERY_TERM.findall(text)
+    )
+
 class StorageManager:
-    """Manages persistent storage of chat data using SQLite."""
+    """Manages persistent storage of chat data using SQLite.
+    
+    Sessions moved out by ``RetentionManager`` live in a separate archive
+    database attached to every connection as ``archive``, with message
+    content compressed and still covered by ``search(archived=True)``.
+    Large message bodies are stored once in the ``blobs`` table, see
+    ``BlobStore``. Rows carry a version and the time of their last
+    change, read and merged by ``SyncManager``; ``TransferManager``
+    exports and imports them. These managers share the connection pool
+    returned by ``connect``.
+    """
     
-    def __init__(self, db_path: Optional[str] = None):
-        """Initialize storage manager with optional custom db path."""
+    def __init__(self, db_path: Optional[str] = None, archive_path: Optional[str] = None):
+        """Initialize storage manager.
+        
+        Args:
+            db_path: Optional database path
+            archive_path: Optional archive database path, defaults to
+                ``<name>-archive.db`` next to the database
+        """
         if db_path is None:
             db_path = Path.home() / ".config" / "ollama-chat" / "chat.db"
+        db_path = Path(db_path)
         db_path.parent.mkdir(parents=True, exist_ok=True)
+        if archive_path is None:
+            archive_path = db_path.with_name(f"{db_path.stem}-archive{db_path.suffix}")
         self.db_path = str(db_path)
+        self.archive_path = str(archive_path)
+        self.pool = ConnectionPool(
+            self.db_path,
+            attached={"archive": self.archive_path},
+            functions={
+                "zip_text": (1, compress_text),
+                "unzip_text": (1, decompress_text),
+                "sha256": (1, content_hash)
+            }
+        )
+        self.blobs = BlobStore(self.pool)
+        self.message_batcher = WriteBatcher(self._write_messages)
         self.initialized = False
-
+        self._init_lock = asyncio.Lock()
+    
     async def _initialize_db(self):
-        """Initialize database schema if not already done."""
+        """Bring the database schema up to date if not already done."""
         if self.initialized:
             return
-
-        async with aiosqlite.connect(self.db_path) as db:
-            # Create sessions table
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS chat_sessions (
-                    id TEXT PRIMARY KEY,
-                    name TEXT NOT NULL,
-                    model TEXT NOT NULL,
-                    system_prompt TEXT,
-                    active BOOLEAN NOT NULL DEFAULT 1,
-                    created_at TIMESTAMP NOT NULL,
-                    updated_at TIMESTAMP NOT NULL,
-                    metadata TEXT
-                )
-            """)
-
-            # Create messages table with foreign key
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS messages (
-                    id TEXT PRIMARY KEY,
-                    session_id TEXT NOT NULL,
-                    content TEXT NOT NULL,
-                    role TEXT NOT NULL,
-                    model TEXT NOT NULL,
-                    parent_id TEXT,
-                    status TEXT NOT NULL DEFAULT 'complete',
-                    error TEXT,
-                    created_at TIMESTAMP NOT NULL,
-                    metadata TEXT,
-                    FOREIGN KEY (session_id) REFERENCES chat_sessions (id)
-                        ON DELETE CASCADE
-                )
-            """)
-
-            await db.commit()
-        self.initialized = True
-
+        
+        async with self._init_lock:
+            if self.initialized:
+                return
+            
+            async with self.pool.writer() as db:
+                version = await migrate(db)
+                await migrate(db, ARCHIVE_MIGRATIONS, "archive")
+            logger.info(f"Database schema at version {version}")
+            self.initialized = True
+    
+    async def connect(self) -> ConnectionPool:
+        """Connection pool of the database, with its schema up to date."""
+        await self._initialize_db()
+        return self.pool
+    
+    async def close(self) -> None:
+        """Commit pending writes and close database connections."""
+        await self.message_batcher.close()
+        await self.pool.close()
+        self.initialized = False
+    
     async def save_session(self, session: ChatSession) -> None:
-        """Save or update a chat session."""
+        """Save or update a chat session.
+        
+        Saving a session unchanged leaves its row, with its update time
+        and version, as it is.
+        """
         await self._initialize_db()
         try:
-            async with aiosqlite.connect(self.db_path) as db:
+            # Upsert rather than REPLACE, which would cascade-delete messages
+            async with self.pool.writer() as db:
                 await db.execute("""
-                    INSERT OR REPLACE INTO chat_sessions (
+                    INSERT INTO chat_sessions (
                         id, name, model, system_prompt, active,
-                        created_at, updated_at, metadata
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        created_at, updated_at, metadata, changed_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (id) DO UPDATE SET
+                        name = excluded.name,
+                        model = excluded.model,
+                        system_prompt = excluded.system_prompt,
+                        active = excluded.active,
+                        updated_at = excluded.updated_at,
+                        metadata = excluded.metadata
+                    WHERE (
+                        excluded.name, excluded.model, excluded.system_prompt,
+                        excluded.active, excluded.metadata
+                    ) IS NOT (
+                        chat_sessions.name, chat_sessions.model, chat_sessions.system_prompt,
+                        chat_sessions.active, chat_sessions.metadata
+                    )
                 """, (
                     session.id,
                     session.name,
                     session.model,
                     session.system_prompt,
                     session.active,
-                    session.created_at.isoformat(),
-                    datetime.now().isoformat(),
-                    json.dumps(session.metadata) if session.metadata else None
+                    to_epoch_ms(session.created_at),
+                    now_ms(),
+                    json.dumps(session.metadata) if session.metadata else None,
+                    now_ms()
                 ))
-                await db.commit()
         except Exception as e:
             logger.error(f"Error saving session: {e}")
             raise
-
+    
+    async def _write_messages(self, messages: Iterable[Message]) -> int:
+        """Write messages in a single transaction."""
+        async with self.pool.writer() as db:
+            return await self.insert_messages(db, messages)
+    
+    async def insert_messages(
+        self,
+        db: aiosqlite.Connection,
+        messages: Iterable[Message],
+        replace: bool = True
+    ) -> int:
+        """Insert messages and their blobs in the caller's write transaction.
+        
+        Args:
+            db: Writer connection
+            messages: Messages to write
+            replace: Update messages whose id exists instead of skipping them
+        
+        Returns:
+            Number of rows written
+        """
+        changed_at = now_ms()
+        rows = [
+            row + (changed_at,)
+            for row in await self.message_rows(db, messages)
+        ]
+        # Upsert so counter triggers see updates rather than delete + insert;
+        # rewriting an unchanged row, such as a spilled message, is skipped so
+        # the version trigger does not record it as a change
+        on_conflict = """
+            DO UPDATE SET
+                session_id = excluded.session_id,
+                content = excluded.content,
+                role = excluded.role,
+                model = excluded.model,
+                parent_id = excluded.parent_id,
+                status = excluded.status,
+                error = excluded.error,
+                created_at = excluded.created_at,
+                metadata = excluded.metadata,
+                blob_hash = excluded.blob_hash
+            WHERE (
+                excluded.session_id, excluded.content, excluded.role, excluded.model,
+                excluded.parent_id, excluded.status, excluded.error,
+                excluded.created_at, excluded.metadata, excluded.blob_hash
+            ) IS NOT (
+                messages.session_id, messages.content, messages.role, messages.model,
+                messages.parent_id, messages.status, messages.error,
+                messages.created_at, messages.metadata, messages.blob_hash
+            )
+        """ if replace else "DO NOTHING"
+        cursor = await db.executemany(f"""
+            INSERT INTO messages (
+                id, session_id, content, role, model,
+                parent_id, status, error,
+                created_at, metadata, blob_hash, changed_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (id) {on_conflict}
+        """, rows)
+        return cursor.rowcount
+    
+    async def message_rows(
+        self,
+        db: aiosqlite.Connection,
+        messages: Iterable[Message]
+    ) -> List[Tuple]:
+        """Message rows followed by their blob hash, storing the blobs.
+        
+        Args:
+            db: Writer connection in a transaction
+            messages: Messages to write
+        
+        Returns:
+            ``Message.to_row`` values and ``blob_hash`` of each message
+        """
+        rows = []
+        blobs = {}
+        for message in messages:
+            row = message.to_row()
+            blob = self.blobs.prepare(row[2], row[6])
+            if blob is None:
+                rows.append(row + (None,))
+            else:
+                # Content lives in the blob, stored before the row refers to it
+                blobs[blob[0]] = blob
+                rows.append(row[:2] + ("",) + row[3:] + (blob[0],))
+        
+        if blobs:
+            await self.blobs.put(db, blobs.values())
+        return rows
+    
     async def save_message(self, message: Message) -> None:
-        """Save or update a message."""
+        """Save or update a message.
+        
+        Concurrent calls are grouped by the message batcher and
+        committed together in one transaction.
+        """
         await self._initialize_db()
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                await db.execute("""
-                    INSERT OR REPLACE INTO messages (
-                        id, session_id, content, role, model,
-                        parent_id, status, error,
-                        created_at, metadata
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    message.message_id,
-                    message.session_id,
-                    message.content,
-                    message.role.value,
-                    message.model,
-                    message.parent_id,
-                    message.status.value,
-                    message.error,
-                    message.timestamp.isoformat(),
-                    json.dumps(message.metadata) if message.metadata else None
-                ))
-                await db.commit()
+            await self.message_batcher.submit(message)
         except Exception as e:
             logger.error(f"Error saving message: {e}")
             raise
-
+    
+    async def save_messages(self, messages: Iterable[Message]) -> int:
+        """Save or update many messages in one transaction.
+        
+        Args:
+            messages: Messages to save
+        
+        Returns:
+            Number of rows written
+        """
+        await self._initialize_db()
+        try:
+            return await self._write_messages(messages)
+        except Exception as e:
+            logger.error(f"Error saving messages: {e}")
+            raise
+    
+    async def append_message_chunk(self, message_id: str, seq: int, content: str) -> None:
+        """Store text streamed into a message since its last write.
+        
+        The message must have been saved with status ``streaming``;
+        reads append its chunks to the stored content until the final
+        save folds them in.
+        
+        Args:
+            message_id: Streaming message
+            seq: Position of the chunk, increasing per message
+            content: New text
+        """
+        await self._initialize_db()
+        try:
+            async with self.pool.writer() as db:
+                await db.execute(
+                    "INSERT INTO message_chunks (message_id, seq, content) VALUES (?, ?, ?)",
+                    (message_id, seq, content)
+                )
+        except Exception as e:
+            logger.error(f"Error appending message chunk: {e}")
+            raise
+    
+    async def _streamed_text(self, message_ids: List[str]) -> Dict[str, str]:
+        """Text appended to streaming messages since their last full write."""
+        async with self.pool.reader() as db:
+            async with db.execute(f"""
+                SELECT message_id, content FROM message_chunks
+                WHERE message_id IN ({', '.join('?' * len(message_ids))})
+                ORDER BY message_id, seq
+            """, message_ids) as cursor:
+                chunks: Dict[str, List[str]] = {}
+                async for message_id, content in cursor:
+                    chunks.setdefault(message_id, []).append(content)
+        return {message_id: "".join(parts) for message_id, parts in chunks.items()}
+    
+    async def delete_messages(self, session_id: str) -> int:
+        """Delete all messages of a session, keeping the session.
+        
+        Args:
+            session_id: Session to empty
+        
+        Returns:
+            Number of deleted messages
+        """
+        await self._initialize_db()
+        try:
+            async with self.pool.writer() as db:
+                cursor = await db.execute(
+                    "DELETE FROM messages WHERE session_id = ?", (session_id,)
+                )
+                return cursor.rowcount
+        except Exception as e:
+            logger.error(f"Error deleting messages: {e}")
+            raise
+    
+    async def recover_streaming(self, error: str = "Interrupted") -> int:
+        """Close out messages left streaming by a crash or shutdown.
+        
+        Their partial content is kept and marked as failed.
+        
+        Args:
+            error: Error recorded on recovered messages
+        
+        Returns:
+            Number of recovered messages
+        """
+        await self._initialize_db()
+        try:
+            async with self.pool.reader() as db:
+                async with db.execute(
+                    f"SELECT {MESSAGE_COLUMNS} FROM messages WHERE status = ?",
+                    (MessageStatus.STREAMING.value,)
+                ) as cursor:
+                    cursor.row_factory = None
+                    rows = await cursor.fetchall()
+            messages = await self.rows_to_messages(rows)
+            for message in messages:
+                message.status = MessageStatus.ERROR
+                message.error = error
+            # Rewritten whole, folding in the streamed chunks
+            await self._write_messages(messages)
+            recovered = len(messages)
+            if recovered:
+                logger.warning(f"Recovered {recovered} interrupted streaming messages")
+            return recovered
+        except Exception as e:
+            logger.error(f"Error recovering streaming messages: {e}")
+            raise
+    
+    def _row_to_session(self, row: aiosqlite.Row) -> ChatSession:
+        """Build a session without messages from a chat_sessions row."""
+        return ChatSession(
+            id=row["id"],
+            name=row["name"],
+            model=row["model"],
+            system_prompt=row["system_prompt"],
+            active=bool(row["active"]),
+            created_at=from_epoch_ms(row["created_at"]),
+            metadata=json.loads(row["metadata"]) if row["metadata"] else {}
+        )
+    
+    async def _get_session_row(
+        self,
+        db: aiosqlite.Connection,
+        session_id: str
+    ) -> Optional[ChatSession]:
+        """Read a session without its messages."""
+        async with db.execute(
+            "SELECT * FROM chat_sessions WHERE id = ?",
+            (session_id,)
+        ) as cursor:
+            row = await cursor.fetchone()
+        return self._row_to_session(row) if row else None
+    
+    async def get_messages(
+        self,
+        session_id: str,
+        before: Optional[MessageCursor] = None,
+        after: Optional[MessageCursor] = None,
+        limit: Optional[int] = None
+    ) -> List[Message]:
+        """Get a page of a session's messages using keyset pagination.
+        
+        Without ``after`` the page holds the newest messages preceding
+        ``before`` (or the newest of the session); with ``after`` it holds
+        the oldest messages following it. Either way the index range scan
+        starts at the cursor, so the cost does not grow with the page's
+        distance from the end of the session.
+        
+        Args:
+            session_id: Session id
+            before: Optional cursor, only return messages older than it
+            after: Optional cursor, only return messages newer than it
+            limit: Optional maximum number of messages
+        
+        Returns:
+            Messages in chronological order
+        """
+        rows = await self._fetch_message_rows(
+            MESSAGE_COLUMNS, session_id, before, after, limit
+        )
+        return await self.rows_to_messages(rows)
+    
+    async def rows_to_messages(self, rows: List[Tuple]) -> List[Message]:
+        """Build messages from rows of ``MESSAGE_COLUMNS``, filling in blob and streamed content."""
+        messages = [Message.from_row(row[:-1]) for row in rows]
+        hashes = [row[-1] for row in rows if row[-1] is not None]
+        if hashes:
+            contents = await self.blobs.get_many(hashes)
+            for message, row in zip(messages, rows):
+                if row[-1] is not None:
+                    message.content = contents[row[-1]]
+        streaming = [m.id for m in messages if m.status == MessageStatus.STREAMING]
+        if streaming:
+            streamed = await self._streamed_text(streaming)
+            for message in messages:
+                if message.id in streamed:
+                    message.content += streamed[message.id]
+        return messages
+    
+    async def get_branch(self, leaf_id: str, limit: Optional[int] = None) -> List[Message]:
+        """Get the messages leading to a message by following ``parent_id``.
+        
+        Branches share their common prefix, so a branch is read by
+        walking from its last message up to the root, one primary key
+        lookup per message.
+        
+        Args:
+            leaf_id: Last message of the branch
+            limit: Optional maximum number of messages, the newest of the branch
+        
+        Returns:
+            Messages of the branch in chronological order
+        """
+        await self._initialize_db()
+        try:
+            async with self.pool.reader() as db:
+                async with db.execute(f"""
+                    WITH RECURSIVE branch (id, depth) AS (
+                        SELECT ?, 0
+                        UNION ALL
+                        SELECT m.parent_id, b.depth + 1
+                        FROM messages m JOIN branch b ON m.id = b.id
+                        WHERE m.parent_id IS NOT NULL
+                        LIMIT ?
+                    )
+                    SELECT {MESSAGE_COLUMNS} FROM branch JOIN messages USING (id)
+                    ORDER BY branch.depth DESC
+                """, (leaf_id, -1 if limit is None else limit)) as cursor:
+                    cursor.row_factory = None
+                    rows = await cursor.fetchall()
+            return await self.rows_to_messages(rows)
+        except Exception as e:
+            logger.error(f"Error getting branch: {e}")
+            raise
+    
+    async def get_children(self, session_id: str, parent_id: Optional[str]) -> List[Message]:
+        """Get the messages following a message, i.e. its alternative continuations.
+        
+        Args:
+            session_id: Session id
+            parent_id: Parent message id, None for the first messages of the session
+        
+        Returns:
+            Child messages in chronological order
+        """
+        await self._initialize_db()
+        try:
+            async with self.pool.reader() as db:
+                async with db.execute(f"""
+                    SELECT {MESSAGE_COLUMNS} FROM messages
+                    WHERE session_id = ? AND parent_id IS ?
+                    ORDER BY created_at, rowid
+                """, (session_id, parent_id)) as cursor:
+                    cursor.row_factory = None
+                    rows = await cursor.fetchall()
+            return await self.rows_to_messages(rows)
+        except Exception as e:
+            logger.error(f"Error getting child messages: {e}")
+            raise
+    
+    async def get_message_contents(
+        self,
+        session_id: str,
+        before: Optional[MessageCursor] = None,
+        limit: Optional[int] = None
+    ) -> List[Tuple[MessageRole, str]]:
+        """Get the role and text of a session's newest messages.
+        
+        Cheaper than ``get_messages`` when only the conversation text is
+        needed, e.g. to build a prompt: no message objects are created.
+        
+        Args:
+            session_id: Session id
+            before: Optional cursor, only return messages older than it
+            limit: Optional maximum number of messages
+        
+        Returns:
+            (role, content) tuples in chronological order
+        """
+        rows = await self._fetch_message_rows(
+            "role, content, blob_hash", session_id, before, None, limit
+        )
+        hashes = [blob_hash for _, _, blob_hash in rows if blob_hash is not None]
+        contents = await self.blobs.get_many(hashes) if hashes else {}
+        return [
+            (ROLES_BY_VALUE[role], contents[blob_hash] if blob_hash else content)
+            for role, content, blob_hash in rows
+        ]
+    
+    async def _fetch_message_rows(
+        self,
+        columns: str,
+        session_id: str,
+        before: Optional[MessageCursor],
+        after: Optional[MessageCursor],
+        limit: Optional[int]
+    ) -> List[Tuple]:
+        """Read a keyset page of message columns as plain tuples, oldest first."""
+        await self._initialize_db()
+        query = f"SELECT {columns} FROM messages WHERE session_id = ?"
+        params: List[Any] = [session_id]
+        if before is not None:
+            query += f" AND (created_at, rowid) < {CURSOR_KEY}"
+            params += [before.created_ms, before.id]
+        if after is not None:
+            query += f" AND (created_at, rowid) > {CURSOR_KEY}"
+            params += [after.created_ms, after.id]
+        order = "ASC" if after is not None else "DESC"
+        query += f" ORDER BY created_at {order}, rowid {order} LIMIT ?"
+        params.append(-1 if limit is None else limit)
+        
+        try:
+            async with self.pool.reader() as db:
+                async with db.execute(query, params) as cursor:
+                    # Tuples instead of the pool's Row objects
+                    cursor.row_factory = None
+                    rows = await cursor.fetchall()
+            if order == "DESC":
+                rows.reverse()
+            return rows
+        except Exception as e:
+            logger.error(f"Error getting messages: {e}")
+            raise
+    
     async def get_session(self, session_id: str) -> Optional[ChatSession]:
-        """Get a specific chat session with its messages."""
+        """Get a specific chat session with its newest messages.
+        
+        Only the tail that fits the session's message ring is loaded;
+        ``session.messages.evicted`` counts the older stored messages,
+        which can be read with ``get_messages``.
+        """
         await self._initialize_db()
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                db.row_factory = aiosqlite.Row
+            async with self.pool.reader() as db:
+                session = await self._get_session_row(db, session_id)
+                if session is None:
+                    return None
                 
-                # Get session
+                # Count messages that stay in storage
                 async with db.execute(
-                    "SELECT * FROM chat_sessions WHERE id = ?",
+                    "SELECT message_count FROM session_stats WHERE session_id = ?",
                     (session_id,)
-                ) as cursor:
-                    row = await cursor.fetchone()
-                    if not row:
-                        return None
-                    
-                    session = ChatSession(
-                        id=row["id"],
-                        name=row["name"],
-                        model=row["model"],
-                        system_prompt=row["system_prompt"],
-                        active=bool(row["active"]),
-                        created_at=datetime.fromisoformat(row["created_at"]),
-                        metadata=json.loads(row["metadata"]) if row["metadata"] else {}
-                    )
-                    
-                    # Get messages
-                    async with db.execute(
-                        "SELECT * FROM messages WHERE session_id = ? ORDER BY created_at",
-                        (session_id,)
-                    ) as msg_cursor:
-                        async for msg_row in msg_cursor:
-                            message = Message(
-                                message_id=msg_row["id"],
-                                session_id=msg_row["session_id"],
-                                content=msg_row["content"],
-                                role=MessageRole(msg_row["role"]),
-                                model=msg_row["model"],
-                                parent_id=msg_row["parent_id"],
-                                status=MessageStatus(msg_row["status"]),
-                                error=msg_row["error"],
-                                timestamp=datetime.fromisoformat(msg_row["created_at"]),
-                                metadata=json.loads(msg_row["metadata"]) if msg_row["metadata"] else {}
-                            )
-                            session.messages.append(message)
-                    
-                    return session
+                ) as count_cursor:
+                    row = await count_cursor.fetchone()
+                total = row[0] if row else 0
+            
+            messages = await self.get_messages(
+                session_id,
+                limit=session.messages.capacity
+            )
+            session.messages.evicted = total - len(messages)
+            session.extend(messages)
+            return session
         except Exception as e:
             logger.error(f"Error getting session: {e}")
             raise
-
+    
+    async def get_session_handle(
+        self,
+        session_id: str,
+        page_size: int = DATABASE["PAGE_SIZE"],
+        max_pages: int = DATABASE["MAX_LOADED_PAGES"]
+    ) -> Optional[SessionHandle]:
+        """Get a lazily hydrated session.
+        
+        Only the session row is read; messages are loaded page by page
+        through the returned handle.
+        
+        Args:
+            session_id: Session id
+            page_size: Messages per page
+            max_pages: Pages kept loaded before the far end is dropped
+        """
+        await self._initialize_db()
+        try:
+            async with self.pool.reader() as db:
+                session = await self._get_session_row(db, session_id)
+            if session is None:
+                return None
+            return SessionHandle(self, session, page_size, max_pages)
+        except Exception as e:
+            logger.error(f"Error getting session handle: {e}")
+            raise
+    
     async def list_sessions(self, active_only: bool = True) -> List[ChatSession]:
         """List all chat sessions."""
         await self._initialize_db()
-        sessions = []
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                db.row_factory = aiosqlite.Row
+            async with self.pool.reader() as db:
                 query = "SELECT * FROM chat_sessions"
                 if active_only:
                     query += " WHERE active = 1"
                 query += " ORDER BY updated_at DESC"
                 
                 async with db.execute(query) as cursor:
-                    async for row in cursor:
-                        session = ChatSession(
+                    return [self._row_to_session(row) async for row in cursor]
+        except Exception as e:
+            logger.error(f"Error listing sessions: {e}")
+            raise
+    
+    async def list_session_summaries(
+        self,
+        active_only: bool = True,
+        preview_length: int = DATABASE["PREVIEW_LENGTH"]
+    ) -> List[SessionSummary]:
+        """List sessions with message statistics in a single query.
+        
+        Counts, token totals and the last message come from the
+        trigger-maintained ``session_stats`` table, so no session's
+        messages are loaded or scanned.
+        
+        Args:
+            active_only: Only list active sessions
+            preview_length: Characters of the last message to include
+        """
+        await self._initialize_db()
+        query = f"""
+            SELECT
+                s.id, s.name, s.model, s.active, s.created_at, s.updated_at,
+                COALESCE(st.message_count, 0) AS message_count,
+                COALESCE(st.total_tokens, 0) AS total_tokens,
+                st.last_message_at,
+                substr({resolve_content('last')}, 1, ?) AS last_message_preview
+            FROM chat_sessions s
+            LEFT JOIN session_stats st ON st.session_id = s.id
+            LEFT JOIN messages last ON last.id = st.last_message_id
+        """
+        if active_only:
+            query += " WHERE s.active = 1"
+        query += " ORDER BY s.updated_at DESC"
+        
+        try:
+            async with self.pool.reader() as db:
+                async with db.execute(query, (preview_length,)) as cursor:
+                    return [
+                        SessionSummary(
                             id=row["id"],
                             name=row["name"],
                             model=row["model"],
-                            system_prompt=row["system_prompt"],
                             active=bool(row["active"]),
-                            created_at=datetime.fromisoformat(row["created_at"]),
-                            metadata=json.loads(row["metadata"]) if row["metadata"] else {}
+                            created_at=from_epoch_ms(row["created_at"]),
+                            updated_at=from_epoch_ms(row["updated_at"]),
+                            message_count=row["message_count"],
+                            total_tokens=row["total_tokens"],
+                            last_message_at=from_epoch_ms(row["last_message_at"])
+                            if row["last_message_at"]
+                            else None,
+                            last_message_preview=row["last_message_preview"]
                         )
-                        sessions.append(session)
-            return sessions
+                        async for row in cursor
+                    ]
         except Exception as e:
-            logger.error(f"Error listing sessions: {e}")
+            logger.error(f"Error listing session summaries: {e}")
+            raise
+    
+    async def search(
+        self,
+        query: str,
+        session_id: Optional[str] = None,
+        model: Optional[str] = None,
+        limit: int = 20,
+        offset: int = 0,
+        raw: bool = False,
+        archived: bool = False
+    ) -> List[SearchHit]:
+        """Full-text search over all stored messages.
+        
+        Args:
+            query: Search text; words ending in ``*`` match as prefixes
+            session_id: Optional session to search in
+            model: Optional model whose messages to search
+            limit: Maximum number of hits
+            offset: Number of best hits to skip
+            raw: Pass ``query`` to FTS5 unchanged instead of quoting words
+            archived: Search archived sessions instead of the live ones
+        
+        Returns:
+            Hits ordered by relevance, best first
+        """
+        await self._initialize_db()
+        match = query if raw else build_fts_query(query)
+        if not match:
+            return []
+        
+        if archived:
+            fts, messages, sessions, key = (
+                "archived_fts", "archive.archived_messages",
+                "archive.archived_sessions", "num"
+            )
+        else:
+            fts, messages, sessions, key = (
+                "messages_fts", "messages", "chat_sessions", "rowid"
+            )
+        sql = f"""
+            SELECT
+                m.id, m.session_id, s.name AS session_name, m.role, m.model,
+                m.created_at,
+                snippet({fts}, 0, '[', ']', '...', 12) AS snippet,
+                bm25({fts}) AS score
+            FROM {fts}
+            JOIN {messages} m ON m.{key} = {fts}.rowid
+            JOIN {sessions} s ON s.id = m.session_id
+            WHERE {fts} MATCH ?
+        """
+        params: List[Any] = [match]
+        if session_id is not None:
+            sql += " AND m.session_id = ?"
+            params.append(session_id)
+        if model is not None:
+            sql += " AND m.model = ?"
+            params.append(model)
+        sql += " ORDER BY score LIMIT ? OFFSET ?"
+        params += [limit, offset]
+        
+        try:
+            async with self.pool.reader() as db:
+                async with db.execute(sql, params) as cursor:
+                    return [
+                        SearchHit(
+                            message_id=row["id"],
+                            session_id=row["session_id"],
+                            session_name=row["session_name"],
+                            role=MessageRole(row["role"]),
+                            model=row["model"],
+                            created_at=from_epoch_ms(row["created_at"]),
+                            snippet=row["snippet"],
+                            score=-row["score"],
+                            archived=archived
+                        )
+                        async for row in cursor
+                    ]
+        except Exception as e:
+            logger.error(f"Error searching messages: {e}")
+            raise
+    
+    async def rebuild_search_index(self) -> None:
+        """Rebuild the full-text index from the messages table."""
+        await self._initialize_db()
+        try:
+            async with self.pool.writer() as db:
+                await db.execute(
+                    "INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')"
+                )
+                await db.execute(UNINDEX_STREAMING)
+                await db.execute(
+                    "INSERT INTO messages_fts (messages_fts) VALUES ('optimize')"
+                )
+            logger.info("Search index rebuilt")
+        except Exception as e:
+            logger.error(f"Error rebuilding search index: {e}")
+            raise
+    
+    async def get_session_activity(self) -> List[Tuple[str, bool, datetime]]:
+        """List sessions with their last activity, most recent first.
+        
+        Returns:
+            (session id, active, time of last message or update) tuples
+        """
+        await self._initialize_db()
+        try:
+            async with self.pool.reader() as db:
+                async with db.execute("""
+                    SELECT
+                        s.id, s.active,
+                        MAX(s.updated_at, COALESCE(st.last_message_at, 0)) AS last_active
+                    FROM chat_sessions s
+                    LEFT JOIN session_stats st ON st.session_id = s.id
+                    ORDER BY last_active DESC
+                """) as cursor:
+                    return [
+                        (row["id"], bool(row["active"]), from_epoch_ms(row["last_active"]))
+                        async for row in cursor
+                    ]
+        except Exception as e:
+            logger.error(f"Error getting session activity: {e}")
             raise
+    
+    async def get_session_size(self, session_id: str) -> int:
+        """Estimate the bytes a session's messages take in the database."""
+        await self._initialize_db()
+        try:
+            async with self.pool.reader() as db:
+                async with db.execute("""
+                    SELECT COALESCE(SUM(
+                        length(CAST(m.content AS BLOB)) + COALESCE(length(m.metadata), 0) + 100
+                        + COALESCE(b.size, 0)
+                    ), 0)
+                    FROM messages m
+                    -- Count blobs only this message refers to
+                    LEFT JOIN blobs b ON b.hash = m.blob_hash AND b.refcount = 1
+                    WHERE m.session_id = ?
+                """, (session_id,)) as cursor:
+                    return (await cursor.fetchone())[0]
+        except Exception as e:
+            logger.error(f"Error getting session size: {e}")
+            raise
+    
+    async def get_database_size(self) -> int:
+        """Bytes used by the database, not counting free pages."""
+        await self._initialize_db()
+        try:
+            async with self.pool.reader() as db:
+                values = []
+                for pragma in ("page_count", "freelist_count", "page_size"):
+                    async with db.execute(f"PRAGMA {pragma}") as cursor:
+                        values.append((await cursor.fetchone())[0])
+            page_count, freelist_count, page_size = values
+            return (page_count - freelist_count) * page_size
+        except Exception as e:
+            logger.error(f"Error getting database size: {e}")
+            raise
+    
+    async def incremental_vacuum_enabled(self) -> bool:
+        """Whether the database file uses incremental auto-vacuum."""
+        await self._initialize_db()
+        try:
+            # Ask the writer; other connections may report a stale mode
+            async with self.pool.writer() as db:
+                async with db.execute("PRAGMA auto_vacuum") as cursor:
+                    # 2 is INCREMENTAL
+                    return (await cursor.fetchone())[0] == 2
+        except Exception as e:
+            logger.error(f"Error reading auto-vacuum mode: {e}")
+            raise
+    
+    async def enable_incremental_vacuum(self) -> bool:
+        """Switch a database created without incremental auto-vacuum.
+        
+        Changing the mode of an existing file takes a full VACUUM, which
+        may renumber the implicit rowids the search index is keyed by,
+        so the index is rebuilt afterwards. Both block writers while they
+        run, so this is a maintenance command (``manage.py vacuum``)
+        rather than part of scheduled retention.
+        
+        Returns:
+            Whether the database had to be converted
+        """
+        if await self.incremental_vacuum_enabled():
+            return False
+        try:
+            async with self.pool.writer() as db:
+                logger.info("Converting database to incremental auto-vacuum")
+                await db.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                await db.execute("VACUUM")
+            await self.rebuild_search_index()
+            return True
+        except Exception as e:
+            logger.error(f"Error enabling incremental vacuum: {e}")
+            raise
+    
+    async def incremental_vacuum(self, pages: int) -> int:
+        """Return up to ``pages`` free pages to the file system.
+        
+        Args:
+            pages: Maximum number of pages to release
+        
+        Returns:
+            Number of released pages
+        """
+        await self._initialize_db()
+        try:
+            async with self.pool.writer() as db:
+                async with db.execute("PRAGMA freelist_count") as cursor:
+                    before = (await cursor.fetchone())[0]
+                # execute() steps the pragma once, releasing a single page;
+                # executescript() runs it to completion
+                await db.executescript(f"PRAGMA incremental_vacuum({int(pages)})")
+                async with db.execute("PRAGMA freelist_count") as cursor:
+                    return before - (await cursor.fetchone())[0]
+        except Exception as e:
+            logger.error(f"Error running incremental vacuum: {e}")
+            raise
+    
+    async def optimize(self) -> None:
+        """Let SQLite refresh query planner statistics where needed."""
+        await self._initialize_db()
+        try:
+            async with self.pool.writer() as db:
+                await db.execute("PRAGMA optimize")
+        except Exception as e:
+            logger.error(f"Error optimizing database: {e}")
+            raise
+    
+    async def collect_garbage(self, image_grace: float = IMAGES["GC_GRACE"]) -> int:
+        """Delete blobs and images no longer referenced by any message.
+        
+        Args:
+            image_grace: Hours an unreferenced image is kept, so one
+                encoded for a message not saved yet survives
+        
+        Returns:
+            Number of deleted blobs and images
+        """
+        await self._initialize_db()
+        try:
+            count, _ = await self.blobs.collect_garbage()
+            async with self.pool.writer() as db:
+                cursor = await db.execute(
+                    "DELETE FROM images WHERE refcount <= 0 AND created_at < ?",
+                    (now_ms() - int(image_grace * 3600 * 1000),)
+                )
+                images = cursor.rowcount
+            if images:
+                logger.info(f"Collected {images} unreferenced images")
+            return count + images
+        except Exception as e:
+            logger.error(f"Error collecting blobs: {e}")
+            raise
+    
+    async def get_replica_id(self) -> str:
+        """Random id telling this database apart from its sync peers."""
+        await self._initialize_db()
+        async with self.pool.reader() as db:
+            async with db.execute("SELECT id FROM sync_replica") as cursor:
+                return (await cursor.fetchone())[0]
+    
+    async def get_messages_to_embed(
+        self,
+        model: str,
+        after: int,
+        limit: int
+    ) -> Tuple[List[Message], int]:
+        """Read complete chat messages lacking an embedding of a model.
+        
+        Args:
+            model: Embedding model
+            after: Rowid to continue after, 0 to start from the oldest message
+            limit: Maximum number of messages
+        
+        Returns:
+            Messages in rowid order and the rowid to continue after
+        """
+        await self._initialize_db()
+        try:
+            async with self.pool.reader() as db:
+                async with db.execute(f"""
+                    SELECT {MESSAGE_COLUMNS}, rowid FROM messages m
+                    WHERE rowid > ? AND status = 'complete' AND role IN ('user', 'assistant')
+                        AND NOT EXISTS (
+                            SELECT 1 FROM message_embeddings e
+                            WHERE e.message_id = m.id AND e.model = ?
+                        )
+                    ORDER BY rowid LIMIT ?
+                """, (after, model, limit)) as cursor:
+                    cursor.row_factory = None
+                    rows = await cursor.fetchall()
+            messages = await self.rows_to_messages([row[:-1] for row in rows])
+            return messages, rows[-1][-1] if rows else after
+        except Exception as e:
+            logger.error(f"Error reading messages to embed: {e}")
+            raise
+    
+    async def save_embeddings(self, rows: List[Tuple[str, str, int, bytes]]) -> int:
+        """Store message embeddings, replacing earlier ones.
+        
+        Embeddings of messages deleted in the meantime are dropped.
+        
+        Args:
+            rows: Message id, embedding model, index slot and packed vector
+        
+        Returns:
+            Number of stored embeddings
+        """
+        await self._initialize_db()
+        try:
+            async with self.pool.writer() as db:
+                cursor = await db.executemany("""
+                    INSERT INTO message_embeddings (message_id, model, slot, vector)
+                    SELECT ?1, ?2, ?3, ?4 WHERE EXISTS (SELECT 1 FROM messages WHERE id = ?1)
+                    ON CONFLICT (message_id) DO UPDATE SET
+                        model = excluded.model,
+                        slot = excluded.slot,
+                        vector = excluded.vector
+                """, rows)
+                return cursor.rowcount
+        except Exception as e:
+            logger.error(f"Error saving embeddings: {e}")
+            raise
+    
+    async def get_embedding_dim(self, model: str, kind: str = "messages") -> Optional[int]:
+        """Dimensions of the stored embeddings of a model, None if there are none."""
+        await self._initialize_db()
+        table = _EMBEDDING_KINDS[kind][0]
+        async with self.pool.reader() as db:
+            async with db.execute(
+                f"SELECT length(vector) / 2 FROM {table} WHERE model = ? LIMIT 1",
+                (model,)
+            ) as cursor:
+                row = await cursor.fetchone()
+        return row[0] if row else None
+    
+    async def get_embedding_rows(
+        self,
+        model: str,
+        slots: Optional[List[int]] = None,
+        vectors: bool = False,
+        kind: str = "messages"
+    ) -> List[Tuple]:
+        """Read where the embeddings of a model sit in the vector index.
+        
+        Args:
+            model: Embedding model
+            slots: Slots to read, all if None
+            vectors: Also read the packed vectors
+            kind: ``messages``, or ``chunks`` of documents
+        
+        Returns:
+            Slot, key, group and label of each embedding, followed by
+            its vector if requested: the message id, session id and chat
+            model of messages, the chunk id, source id and path of chunks
+        """
+        await self._initialize_db()
+        table, join, _, columns = _EMBEDDING_KINDS[kind]
+        sql = f"""
+            SELECT {columns}{', e.vector' if vectors else ''}
+            FROM {table} e {join}
+            WHERE e.model = ?
+        """
+        params: List[Any] = [model]
+        if slots is not None:
+            sql += f" AND e.slot IN ({', '.join('?' * len(slots))})"
+            params += slots
+        try:
+            async with self.pool.reader() as db:
+                async with db.execute(sql, params) as cursor:
+                    cursor.row_factory = None
+                    return await cursor.fetchall()
+        except Exception as e:
+            logger.error(f"Error reading embeddings: {e}")
+            raise
+    
+    async def get_embedding_changes(
+        self,
+        since: int,
+        kind: str = "messages"
+    ) -> Tuple[int, List[int]]:
+        """Slots whose embedding was added, replaced or deleted.
+        
+        Args:
+            since: Last change already seen
+            kind: ``messages``, or ``chunks`` of documents
+        
+        Returns:
+            Last change and the slots changed after ``since``
+        """
+        await self._initialize_db()
+        log = _EMBEDDING_KINDS[kind][2]
+        async with self.pool.reader() as db:
+            async with db.execute(
+                f"SELECT slot, seq FROM {log} WHERE seq > ? ORDER BY seq", (since,)
+            ) as cursor:
+                rows = await cursor.fetchall()
+        if not rows:
+            return since, []
+        return rows[-1]["seq"], list(dict.fromkeys(row["slot"] for row in rows))
+    
+    async def get_embedding_log_start(self, kind: str = "messages") -> int:
+        """Oldest embedding change still logged, or the next one if none is."""
+        await self._initialize_db()
+        log = _EMBEDDING_KINDS[kind][2]
+        async with self.pool.reader() as db:
+            async with db.execute(f"""
+                SELECT COALESCE(
+                    (SELECT MIN(seq) FROM {log}),
+                    (SELECT seq + 1 FROM sqlite_sequence WHERE name = ?),
+                    1
+                )
+            """, (log,)) as cursor:
+                return (await cursor.fetchone())[0]
+    
+    async def prune_embedding_changes(self, seq: int, kind: str = "messages") -> None:
+        """Forget embedding changes up to one the vector index cache reflects."""
+        await self._initialize_db()
+        log = _EMBEDDING_KINDS[kind][2]
+        async with self.pool.writer() as db:
+            await db.execute(f"DELETE FROM {log} WHERE seq <= ?", (seq,))
+    
+    async def get_search_hits(self, scores: List[Tuple[str, float]]) -> List[SearchHit]:
+        """Build search hits for scored messages.
+        
+        Args:
+            scores: Message ids and scores, best first
+        
+        Returns:
+            Hits in the same order, with the start of each message as snippet
+        """
+        await self._initialize_db()
+        if not scores:
+            return []
+        try:
+            async with self.pool.reader() as db:
+                async with db.execute(f"""
+                    SELECT
+                        m.id, m.session_id, s.name AS session_name, m.role, m.model,
+                        m.created_at, substr({resolve_content('m')}, 1, ?) AS snippet
+                    FROM messages m JOIN chat_sessions s ON s.id = m.session_id
+                    WHERE m.id IN ({', '.join('?' * len(scores))})
+                """, (_SNIPPET_LENGTH, *(message_id for message_id, _ in scores))) as cursor:
+                    rows = {row["id"]: row async for row in cursor}
+            return [
+                SearchHit(
+                    message_id=message_id,
+                    session_id=rows[message_id]["session_id"],
+                    session_name=rows[message_id]["session_name"],
+                    role=MessageRole(rows[message_id]["role"]),
+                    model=rows[message_id]["model"],
+                    created_at=from_epoch_ms(rows[message_id]["created_at"]),
+                    snippet=rows[message_id]["snippet"],
+                    score=score
+                )
+                for message_id, score in scores
+                if message_id in rows
+            ]
+        except Exception as e:
+            logger.error(f"Error reading search hits: {e}")
+            raise
+    
+    async def attach_source(self, session_id: str, path: str) -> int:
+        """Attach a file or folder to a session for retrieval.
+        
+        Args:
+            session_id: Session id
+            path: Absolute path of the file or folder
+        
+        Returns:
+            Id of the document source
+        """
+        await self._initialize_db()
+        try:
+            async with self.pool.writer() as db:
+                await db.execute(
+                    "INSERT OR IGNORE INTO document_sources (path, added_at) VALUES (?, ?)",
+                    (path, now_ms())
+                )
+                async with db.execute(
+                    "SELECT id FROM document_sources WHERE path = ?", (path,)
+                ) as cursor:
+                    source_id = (await cursor.fetchone())[0]
+                await db.execute(
+                    "INSERT OR IGNORE INTO session_sources (session_id, source_id) VALUES (?, ?)",
+                    (session_id, source_id)
+                )
+            return source_id
+        except Exception as e:
+            logger.error(f"Error attaching {path}: {e}")
+            raise
+    
+    async def detach_source(self, session_id: str, path: str) -> bool:
+        """Detach a file or folder from a session.
+        
+        The documents of a source no session uses any more are deleted.
+        
+        Args:
+            session_id: Session id
+            path: Absolute path the source was attached with
+        
+        Returns:
+            Whether the source was attached to the session
+        """
+        await self._initialize_db()
+        try:
+            async with self.pool.writer() as db:
+                cursor = await db.execute("""
+                    DELETE FROM session_sources WHERE session_id = ?
+                        AND source_id = (SELECT id FROM document_sources WHERE path = ?)
+                """, (session_id, path))
+                detached = cursor.rowcount > 0
+                await db.execute("""
+                    DELETE FROM document_sources WHERE path = ? AND NOT EXISTS (
+                        SELECT 1 FROM session_sources WHERE source_id = document_sources.id
+                    )
+                """, (path,))
+            return detached
+        except Exception as e:
+            logger.error(f"Error detaching {path}: {e}")
+            raise
+    
+    async def get_sources(self, session_id: Optional[str] = None) -> List[Tuple[int, str]]:
+        """Read document sources.
+        
+        Args:
+            session_id: Session whose sources to read, all sources if None
+        
+        Returns:
+            Id and path of each source
+        """
+        await self._initialize_db()
+        if session_id is None:
+            sql, params = "SELECT id, path FROM document_sources ORDER BY id", ()
+        else:
+            sql = """
+                SELECT d.id, d.path FROM session_sources s
+                JOIN document_sources d ON d.id = s.source_id
+                WHERE s.session_id = ? ORDER BY d.id
+            """
+            params = (session_id,)
+        async with self.pool.reader() as db:
+            async with db.execute(sql, params) as cursor:
+                cursor.row_factory = None
+                return await cursor.fetchall()
+    
+    async def get_documents(self, source_id: int) -> Dict[str, Tuple[int, int, int, str, str]]:
+        """Read what is known about the files of a source.
+        
+        Args:
+            source_id: Document source id
+        
+        Returns:
+            Id, size, mtime in nanoseconds, content hash and embedding
+            model of each document, by path
+        """
+        await self._initialize_db()
+        async with self.pool.reader() as db:
+            async with db.execute(
+                "SELECT path, id, size, mtime_ns, hash, model FROM documents WHERE source_id = ?",
+                (source_id,)
+            ) as cursor:
+                cursor.row_factory = None
+                return {row[0]: row[1:] async for row in cursor}
+    
+    async def save_documents(
+        self,
+        source_id: int,
+        model: str,
+        documents: List[Tuple[str, int, int, str, Optional[List[Tuple]]]]
+    ) -> int:
+        """Store read documents and replace their chunks, in one transaction.
+        
+        Args:
+            source_id: Document source id
+            model: Embedding model of the chunks
+            documents: Path, size, mtime in nanoseconds, content hash and
+                chunks of each document, as heading, content, tokens,
+                index slot and packed vector; None keeps the stored
+                chunks of a document whose content did not change
+        
+        Returns:
+            Number of chunks stored
+        """
+        await self._initialize_db()
+        try:
+            async with self.pool.writer() as db:
+                await db.executemany("""
+                    INSERT INTO documents (source_id, path, size, mtime_ns, hash, model)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (source_id, path) DO UPDATE SET
+                        size = excluded.size,
+                        mtime_ns = excluded.mtime_ns,
+                        hash = excluded.hash,
+                        model = excluded.model
+                """, [
+                    (source_id, path, size, mtime_ns, digest, model)
+                    for path, size, mtime_ns, digest, _ in documents
+                ])
+                
+                changed = {path: chunks for path, *_, chunks in documents if chunks is not None}
+                if not changed:
+                    return 0
+                async with db.execute(f"""
+                    SELECT path, id FROM documents
+                    WHERE source_id = ? AND path IN ({', '.join('?' * len(changed))})
+                """, (source_id, *changed)) as cursor:
+                    ids = {row[0]: row[1] async for row in cursor}
+                await db.executemany(
+                    "DELETE FROM document_chunks WHERE document_id = ?",
+                    [(ids[path],) for path in changed]
+                )
+                rows = [
+                    (ids[path], ordinal, heading, content, tokens, model, slot, vector)
+                    for path, chunks in changed.items()
+                    for ordinal, (heading, content, tokens, slot, vector) in enumerate(chunks)
+                ]
+                await db.executemany("""
+                    INSERT INTO document_chunks (
+                        document_id, ordinal, heading, content, tokens, model, slot, vector
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, rows)
+                return len(rows)
+        except Exception as e:
+            logger.error(f"Error saving documents: {e}")
+            raise
+    
+    async def delete_documents(self, document_ids: List[int]) -> None:
+        """Delete documents and their chunks.
+        
+        Args:
+            document_ids: Ids of the documents
+        """
+        await self._initialize_db()
+        if not document_ids:
+            return
+        try:
+            async with self.pool.writer() as db:
+                await db.executemany(
+                    "DELETE FROM documents WHERE id = ?", [(doc_id,) for doc_id in document_ids]
+                )
+        except Exception as e:
+            logger.error(f"Error deleting documents: {e}")
+            raise
+    
+    async def get_chunks(
+        self,
+        chunk_ids: List[int]
+    ) -> Dict[int, Tuple[str, Optional[str], str, int]]:
+        """Read document chunks.
+        
+        Args:
+            chunk_ids: Ids of the chunks
+        
+        Returns:
+            Document path, heading, content and estimated tokens of each
+            chunk still stored, by id
+        """
+        await self._initialize_db()
+        if not chunk_ids:
+            return {}
+        async with self.pool.reader() as db:
+            async with db.execute(f"""
+                SELECT c.id, d.path, c.heading, c.content, c.tokens
+                FROM document_chunks c JOIN documents d ON d.id = c.document_id
+                WHERE c.id IN ({', '.join('?' * len(chunk_ids))})
+            """, chunk_ids) as cursor:
+                cursor.row_factory = None
+                return {row[0]: row[1:] async for row in cursor}
+    
+    async def find_image(self, source_key: str) -> Optional[str]:
+        """Look up the stored encoding of an original image.
+        
+        Args:
+            source_key: Key of the original image and encoding settings
+        
+        Returns:
+            Hash of the encoded image, None if it was never stored
+        """
+        await self._initialize_db()
+        async with self.pool.reader() as db:
+            async with db.execute(
+                "SELECT hash FROM images WHERE source_key = ? LIMIT 1", (source_key,)
+            ) as cursor:
+                row = await cursor.fetchone()
+        return row[0] if row else None
+    
+    async def save_image(
+        self,
+        image_hash: str,
+        source_key: str,
+        mime: str,
+        width: int,
+        height: int,
+        data: bytes
+    ) -> None:
+        """Store an encoded image unless it is stored already.
+        
+        Messages refer to it by hash in their ``images`` metadata.
+        
+        Args:
+            image_hash: SHA-256 of the encoded bytes
+            source_key: Key of the original image and encoding settings
+            mime: MIME type of the encoded bytes
+            width: Width in pixels
+            height: Height in pixels
+            data: Encoded bytes
+        """
+        await self._initialize_db()
+        try:
+            async with self.pool.writer() as db:
+                await db.execute("""
+                    INSERT INTO images (hash, source_key, mime, width, height, data, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (hash) DO NOTHING
+                """, (image_hash, source_key, mime, width, height, data, now_ms()))
+        except Exception as e:
+            logger.error(f"Error saving image: {e}")
+            raise
+    
+    async def get_images(self, hashes: Iterable[str]) -> Dict[str, bytes]:
+        """Read encoded images.
+        
+        Args:
+            hashes: Image hashes
+        
+        Returns:
+            Encoded bytes of each image still stored, by hash
+        """
+        await self._initialize_db()
+        hashes = list(set(hashes))
+        if not hashes:
+            return {}
+        async with self.pool.reader() as db:
+            async with db.execute(
+                f"SELECT hash, data FROM images WHERE hash IN ({', '.join('?' * len(hashes))})",
+                hashes
+            ) as cursor:
+                cursor.row_factory = None
+                return {row[0]: row[1] async for row in cursor}
@@ -0,0 +1,106 @@
+"""Incremental persistence of streaming messages."""
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from nexus_chat.backend.storage_manager import StorageManager
+from nexus_chat.models.message import Message, MessageStatus
+from nexus_chat.utils.constants import DATABASE
+
+logger = logging.getLogger(__name__)
+
+class StreamPersister:
+    """Writes a streaming message to storage while it is generated.
+    
+    The row is inserted with status ``streaming`` when the first chunk
+    arrives. Text generated since is appended as a separate chunk at most
+    every ``interval`` seconds, or sooner once ``max_chars`` new
+    characters have accumulated, so the number of writes stays bounded
+    however fast tokens arrive and each writes only new text. ``finish``
+    and ``fail`` write the final content, status and stats in one
+    statement, the only write that counts as a change for sync.
+    """
+    
+    def __init__(
+        self,
+        storage: StorageManager,
+        message: Message,
+        interval: float = DATABASE["STREAM_FLUSH_INTERVAL"],
+        max_chars: int = DATABASE["STREAM_FLUSH_CHARS"]
+    ):
+        """Initialize stream persister.
+        
+        Args:
+            storage: Storage manager to write to
+            message: Message being streamed, its content is extended in place
+            interval: Minimum seconds between writes
+            max_chars: Unwritten characters forcing a write before ``interval``
+        """
+        self.storage = storage
+        self.message = message
+        self.interval = interval
+        self.max_chars = max_chars
+        
+        self.writes = 0
+        self._last_write = 0.0
+        self._written_chars = 0
+    
+    async def _write(self) -> None:
+        """Write the current state of the message."""
+        await self.storage.save_message(self.message)
+        self._written(len(self.message.content))
+    
+    async def _flush(self) -> None:
+        """Append the text generated since the last write."""
+        content = self.message.content
+        await self.storage.append_message_chunk(
+            self.message.id, self.writes, content[self._written_chars:]
+        )
+        self._written(len(content))
+    
+    def _written(self, chars: int) -> None:
+        """Record a write covering the first ``chars`` characters."""
+        self.writes += 1
+        self._last_write = time.monotonic()
+        self._written_chars = chars
+    
+    async def append(self, chunk: str) -> None:
+        """Add a chunk, writing the message if a flush is due.
+        
+        Args:
+            chunk: Generated text
+        """
+        self.message.content += chunk
+        if self.writes == 0:
+            self.message.status = MessageStatus.STREAMING
+            await self._write()
+            return
+        
+        pending = len(self.message.content) - self._written_chars
+        if (
+            pending >= self.max_chars
+            or (pending and time.monotonic() - self._last_write >= self.interval)
+        ):
+            await self._flush()
+    
+    async def finish(self, stats: Optional[Dict[str, Any]] = None) -> None:
+        """Write the complete message with its generation stats.
+        
+        Args:
+            stats: Optional timing and token stats reported by the model
+        """
+        self.message.status = MessageStatus.COMPLETE
+        if stats:
+            self.message.metadata.update(stats)
+        await self._write()
+        logger.debug(f"Persisted message {self.message.id} in {self.writes} writes")
+    
+    async def fail(self, error: str) -> None:
+        """Write the partial message as failed.
+        
+        Args:
+            error: Error description
+        """
+        self.message.status = MessageStatus.ERROR
+        self.message.error = error
+        await self._write()
@@ -0,0 +1,510 @@
+"""Delta sync module."""
+import asyncio
+import logging
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from nexus_chat.backend.session_handle import MessageCursor
+from nexus_chat.backend.session_io import (
+    JsonlReader, JsonlWriter, session_record, session_values
+)
+from nexus_chat.backend.storage_manager import CURSOR_KEY, MESSAGE_COLUMNS, StorageManager
+from nexus_chat.models.message import Message
+from nexus_chat.utils.constants import DATABASE
+from nexus_chat.utils.timestamps import now_ms
+
+logger = logging.getLogger(__name__)
+
+CHANGES_FORMAT = "nexus-chat-changes"
+# Version 2 stores times as epoch milliseconds instead of local ISO strings
+CHANGES_VERSION = 2
+
+# Drop files are named <replica id>-<changed_at mark>.jsonl.gz
+_DROP_FILE = re.compile(r"([0-9a-f]{32})-(\d+)\.jsonl\.gz")
+
+@dataclass
+class SyncReport:
+    """Outcome of a sync.
+    
+    Sent counts are records passed to peers, received counts rows that
+    changed in this database.
+    """
+    sent_sessions: int = 0
+    sent_messages: int = 0
+    received_sessions: int = 0
+    received_messages: int = 0
+
+class SyncManager:
+    """Merges conversations between databases by exchanging changes.
+    
+    Every row carries a ``version`` counting its changes and a
+    ``changed_at`` time of its last change in the local database. Per
+    peer, the ``changed_at`` high-water mark of the last sync bounds what
+    is sent next, so only rows changed since then travel; rows a peer
+    sent are not echoed back to it. ``apply_changes``
+    merges rows by id and picks the same winner of concurrent edits on
+    both sides.
+    
+    ``sync_with`` syncs two database files directly. ``sync_directory``
+    syncs through a shared directory, for example a network or cloud
+    drive folder: each database drops its changes there as a gzipped
+    JSON lines file and picks up the files of the others.
+    """
+    
+    def __init__(
+        self,
+        storage: StorageManager,
+        sync_dir: Optional[str] = None,
+        interval: float = DATABASE["SYNC_INTERVAL"],
+        batch_size: int = DATABASE["TRANSFER_BATCH_SIZE"]
+    ):
+        """Initialize sync manager.
+        
+        Args:
+            storage: Storage manager of the local database
+            sync_dir: Shared directory for scheduled syncs
+            interval: Hours between scheduled syncs
+            batch_size: Records per batch and transaction
+        """
+        self.storage = storage
+        self.sync_dir = sync_dir
+        self.interval = interval
+        self.batch_size = batch_size
+        
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+    
+    async def get_sync_marks(self, peer: str) -> Tuple[int, int]:
+        """High-water marks of the changes exchanged with a peer.
+        
+        Args:
+            peer: Replica id of the peer, or another key naming it
+        
+        Returns:
+            ``changed_at`` up to which changes were sent to the peer, and
+            the mark of the peer up to which its changes were received
+        """
+        pool = await self.storage.connect()
+        async with pool.reader() as db:
+            async with db.execute(
+                "SELECT sent_at, received_at FROM sync_peers WHERE peer = ?", (peer,)
+            ) as cursor:
+                row = await cursor.fetchone()
+        return (row["sent_at"], row["received_at"]) if row else (0, 0)
+    
+    async def set_sync_marks(
+        self,
+        peer: str,
+        sent_at: Optional[int] = None,
+        received_at: Optional[int] = None
+    ) -> None:
+        """Advance the high-water marks of a peer.
+        
+        Args:
+            peer: Replica id of the peer, or another key naming it
+            sent_at: New sent mark, unchanged if None
+            received_at: New received mark, unchanged if None
+        """
+        pool = await self.storage.connect()
+        async with pool.writer() as db:
+            await db.execute("""
+                INSERT INTO sync_peers (peer, sent_at, received_at)
+                VALUES (?, COALESCE(?, 0), COALESCE(?, 0))
+                ON CONFLICT (peer) DO UPDATE SET
+                    sent_at = COALESCE(?, sent_at),
+                    received_at = COALESCE(?, received_at)
+            """, (peer, sent_at, received_at, sent_at, received_at))
+    
+    async def read_changes(
+        self,
+        since: int,
+        exclude_origins: Iterable[str] = ()
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Stream sessions and messages changed since a high-water mark.
+        
+        Each session with changes is followed by its changed messages,
+        as export records carrying the row ``version``. Every session
+        with changed messages is included, so its messages can be applied
+        to a database that lacks it. Streaming messages are left out until
+        they complete.
+        
+        Args:
+            since: ``changed_at`` mark, changes at or after it are read
+            exclude_origins: Replica ids whose synced changes are left out,
+                usually the peer receiving them
+        
+        Yields:
+            Lists of session and message records
+        """
+        pool = await self.storage.connect()
+        exclude_origins = list(exclude_origins)
+        changed = (
+            f"changed_at >= ? AND (origin IS NULL OR origin NOT IN "
+            f"({', '.join('?' * len(exclude_origins))}))"
+        )
+        changed_params = [since, *exclude_origins]
+        
+        try:
+            pending = []
+            last_id = ""
+            while True:
+                async with pool.reader() as db:
+                    async with db.execute(f"""
+                        SELECT * FROM chat_sessions
+                        WHERE id > ? AND ({changed} OR id IN (
+                            SELECT session_id FROM messages
+                            WHERE {changed} AND status != 'streaming'
+                        ))
+                        ORDER BY id LIMIT ?
+                    """, (last_id, *changed_params, *changed_params, self.batch_size)) as cursor:
+                        sessions = await cursor.fetchall()
+                if not sessions:
+                    break
+                
+                for session in sessions:
+                    pending.append({**session_record(session), "version": session["version"]})
+                    after = MessageCursor(-1, "")
+                    while True:
+                        async with pool.reader() as db:
+                            async with db.execute(f"""
+                                SELECT {MESSAGE_COLUMNS}, version FROM messages
+                                WHERE session_id = ? AND (created_at, rowid) > {CURSOR_KEY}
+                                    AND {changed} AND status != 'streaming'
+                                ORDER BY created_at, rowid LIMIT ?
+                            """, (
+                                session["id"], after.created_ms, after.id,
+                                *changed_params, self.batch_size
+                            )) as cursor:
+                                cursor.row_factory = None
+                                rows = await cursor.fetchall()
+                        messages = await self.storage.rows_to_messages([row[:-1] for row in rows])
+                        pending.extend(
+                            {"type": "message", **message.to_dict(), "version": row[-1]}
+                            for message, row in zip(messages, rows)
+                        )
+                        if len(pending) >= self.batch_size:
+                            yield pending
+                            pending = []
+                        if len(rows) < self.batch_size:
+                            break
+                        after = MessageCursor.of(messages[-1])
+                last_id = sessions[-1]["id"]
+            
+            if pending:
+                yield pending
+        except Exception as e:
+            logger.error(f"Error reading changes: {e}")
+            raise
+    
+    async def apply_changes(
+        self,
+        records: List[Dict[str, Any]],
+        origin: str
+    ) -> Tuple[int, int]:
+        """Merge changes read from another database in one transaction.
+        
+        Rows are matched by id. A change replaces the local row when its
+        version is higher, and on equal versions when its content sorts
+        after the local one, so every database settles on the same row
+        whichever order changes arrive in.
+        
+        Args:
+            records: Session and message records from ``read_changes``
+            origin: Replica id of the database the changes come from
+        
+        Returns:
+            Numbers of sessions and messages written
+        """
+        pool = await self.storage.connect()
+        changed_at = now_ms()
+        sessions = [
+            session_values(record, record["id"]) + (record["version"], changed_at, origin)
+            for record in records
+            if record["type"] == "session"
+        ]
+        messages = [
+            (Message.from_dict(record), record["version"])
+            for record in records
+            if record["type"] == "message"
+        ]
+        
+        try:
+            async with pool.writer() as db:
+                # Applied changes set changed_at, so they do not count as local changes
+                cursor = await db.executemany("""
+                    INSERT INTO chat_sessions (
+                        id, name, model, system_prompt, active,
+                        created_at, updated_at, metadata,
+                        version, changed_at, origin
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (id) DO UPDATE SET
+                        name = excluded.name,
+                        model = excluded.model,
+                        system_prompt = excluded.system_prompt,
+                        active = excluded.active,
+                        updated_at = excluded.updated_at,
+                        metadata = excluded.metadata,
+                        version = excluded.version,
+                        changed_at = max(excluded.changed_at, chat_sessions.changed_at + 1),
+                        origin = excluded.origin
+                    WHERE (
+                        excluded.version, excluded.updated_at, excluded.name,
+                        COALESCE(excluded.metadata, '')
+                    ) > (
+                        chat_sessions.version, chat_sessions.updated_at, chat_sessions.name,
+                        COALESCE(chat_sessions.metadata, '')
+                    )
+                """, sessions)
+                written_sessions = cursor.rowcount
+                
+                rows = await self.storage.message_rows(db, (message for message, _ in messages))
+                cursor = await db.executemany("""
+                    INSERT INTO messages (
+                        id, session_id, content, role, model,
+                        parent_id, status, error,
+                        created_at, metadata, blob_hash,
+                        version, changed_at, origin
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (id) DO UPDATE SET
+                        session_id = excluded.session_id,
+                        content = excluded.content,
+                        role = excluded.role,
+                        model = excluded.model,
+                        parent_id = excluded.parent_id,
+                        status = excluded.status,
+                        error = excluded.error,
+                        created_at = excluded.created_at,
+                        metadata = excluded.metadata,
+                        blob_hash = excluded.blob_hash,
+                        version = excluded.version,
+                        changed_at = max(excluded.changed_at, messages.changed_at + 1),
+                        origin = excluded.origin
+                    WHERE (
+                        excluded.version, COALESCE(excluded.blob_hash, excluded.content),
+                        excluded.status, COALESCE(excluded.error, ''),
+                        COALESCE(excluded.metadata, '')
+                    ) > (
+                        messages.version, COALESCE(messages.blob_hash, messages.content),
+                        messages.status, COALESCE(messages.error, ''),
+                        COALESCE(messages.metadata, '')
+                    )
+                """, [
+                    row + (version, changed_at, origin)
+                    for row, (_, version) in zip(rows, messages)
+                ])
+                written_messages = cursor.rowcount
+            return written_sessions, written_messages
+        except Exception as e:
+            logger.error(f"Error applying changes: {e}")
+            raise
+    
+    @staticmethod
+    async def _send(
+        source: "SyncManager",
+        target: "SyncManager",
+        source_id: str,
+        target_id: str
+    ) -> Tuple[int, int]:
+        """Apply the changes of one database the other has not seen."""
+        mark = now_ms()
+        since, _ = await source.get_sync_marks(target_id)
+        written = [0, 0]
+        async for records in source.read_changes(since, (target_id,)):
+            sessions, messages = await target.apply_changes(records, source_id)
+            written[0] += sessions
+            written[1] += messages
+        await source.set_sync_marks(target_id, sent_at=mark)
+        return written[0], written[1]
+    
+    async def sync_with(self, db_path: str) -> SyncReport:
+        """Exchange changes with another database file in both directions.
+        
+        Args:
+            db_path: Path of the other database
+        
+        Returns:
+            Rows written to each database
+        """
+        async with self._lock:
+            peer = StorageManager(db_path)
+            try:
+                local_id = await self.storage.get_replica_id()
+                peer_id = await peer.get_replica_id()
+                if local_id == peer_id:
+                    raise ValueError(f"{db_path} is a copy of this database")
+                
+                peer_sync = SyncManager(peer, batch_size=self.batch_size)
+                report = SyncReport()
+                report.sent_sessions, report.sent_messages = await self._send(
+                    self, peer_sync, local_id, peer_id
+                )
+                report.received_sessions, report.received_messages = await self._send(
+                    peer_sync, self, peer_id, local_id
+                )
+                logger.info(
+                    f"Synced with {db_path}: sent {report.sent_sessions} sessions and "
+                    f"{report.sent_messages} messages, received {report.received_sessions} "
+                    f"sessions and {report.received_messages} messages"
+                )
+                return report
+            
+            except Exception as e:
+                logger.error(f"Error syncing with {db_path}: {e}")
+                raise
+            finally:
+                await peer.close()
+    
+    @staticmethod
+    def _drop_files(sync_dir: Path) -> Dict[str, List[Tuple[int, Path]]]:
+        """Files in a sync directory by replica id, oldest first."""
+        files: Dict[str, List[Tuple[int, Path]]] = {}
+        for path in sync_dir.iterdir():
+            match = _DROP_FILE.fullmatch(path.name)
+            if match:
+                files.setdefault(match.group(1), []).append((int(match.group(2)), path))
+        for replica_files in files.values():
+            replica_files.sort()
+        return files
+    
+    async def _publish(
+        self,
+        sync_dir: Path,
+        local_id: str,
+        peers: List[str],
+        report: SyncReport
+    ) -> None:
+        """Drop the local changes since the last sync into the directory."""
+        key = f"dir:{sync_dir.resolve()}"
+        mark = now_ms()
+        since, _ = await self.get_sync_marks(key)
+        path = sync_dir / f"{local_id}-{mark}.jsonl.gz"
+        # Hidden until complete, so peers never read a partial file
+        partial = sync_dir / f".{path.name}.partial"
+        
+        writer = await asyncio.to_thread(JsonlWriter, partial, True)
+        written = False
+        try:
+            await asyncio.to_thread(writer.write, [{
+                "type": "header",
+                "format": CHANGES_FORMAT,
+                "version": CHANGES_VERSION,
+                "replica": local_id,
+                "since": since,
+                "until": mark
+            }])
+            # Peers read each other's files, so only local and relayed changes go out
+            async for records in self.read_changes(since, peers):
+                await asyncio.to_thread(writer.write, records)
+                written = True
+                for record in records:
+                    if record["type"] == "session":
+                        report.sent_sessions += 1
+                    else:
+                        report.sent_messages += 1
+        finally:
+            await asyncio.to_thread(writer.close)
+        
+        if written:
+            os.replace(partial, path)
+        else:
+            partial.unlink()
+        await self.set_sync_marks(key, sent_at=mark)
+    
+    async def _receive(self, path: Path, peer_id: str, report: SyncReport) -> None:
+        """Apply a peer's drop file."""
+        reader = await asyncio.to_thread(JsonlReader, path, True, self.batch_size)
+        try:
+            batches = reader.batches()
+            header = None
+            while True:
+                records = await asyncio.to_thread(next, batches, None)
+                if records is None:
+                    break
+                if header is None:
+                    header, records = records[0], records[1:]
+                    if header.get("format") != CHANGES_FORMAT:
+                        raise ValueError(f"{path} is not a changes file")
+                    if header.get("version", 0) > CHANGES_VERSION:
+                        raise ValueError(
+                            f"Changes version {header['version']} is newer than supported"
+                        )
+                sessions, messages = await self.apply_changes(records, peer_id)
+                report.received_sessions += sessions
+                report.received_messages += messages
+        finally:
+            await asyncio.to_thread(reader.close)
+    
+    async def sync_directory(self, sync_dir: Optional[str] = None) -> SyncReport:
+        """Exchange changes with the databases sharing a directory.
+        
+        Args:
+            sync_dir: Shared directory, defaults to the configured one
+        
+        Returns:
+            Records dropped and rows received
+        """
+        sync_dir = sync_dir or self.sync_dir
+        if sync_dir is None:
+            raise ValueError("No sync directory configured")
+        
+        async with self._lock:
+            try:
+                sync_dir = Path(sync_dir)
+                sync_dir.mkdir(parents=True, exist_ok=True)
+                local_id = await self.storage.get_replica_id()
+                files = await asyncio.to_thread(self._drop_files, sync_dir)
+                peers = [replica_id for replica_id in files if replica_id != local_id]
+                
+                report = SyncReport()
+                await self._publish(sync_dir, local_id, peers, report)
+                
+                for peer_id in peers:
+                    _, received_at = await self.get_sync_marks(peer_id)
+                    for mark, path in files[peer_id]:
+                        if mark <= received_at:
+                            continue
+                        await self._receive(path, peer_id, report)
+                        await self.set_sync_marks(peer_id, received_at=mark)
+                
+                logger.info(
+                    f"Synced through {sync_dir}: dropped {report.sent_sessions} sessions and "
+                    f"{report.sent_messages} messages, received {report.received_sessions} "
+                    f"sessions and {report.received_messages} messages"
+                )
+                return report
+            
+            except Exception as e:
+                logger.error(f"Error syncing through {sync_dir}: {e}")
+                raise
+    
+    async def _run(self) -> None:
+        """Scheduler loop."""
+        while True:
+            try:
+                await self.sync_directory()
+            except Exception:
+                # Already logged, retried after the next interval
+                pass
+            await asyncio.sleep(self.interval * 3600)
+    
+    def start(self) -> None:
+        """Start syncing through the configured directory periodically."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+            logger.info(f"Scheduled sync through {self.sync_dir} every {self.interval}h")
+    
+    async def stop(self) -> None:
+        """Stop the scheduler, waiting for a running sync to finish."""
+        if self._task is None:
+            return
+        
+        async with self._lock:
+            self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
@@ -0,0 +1,295 @@
+"""Session export and import module."""
+import asyncio
+import logging
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import aiosqlite
+
+from nexus_chat.backend.migrations import SCHEMA_VERSION
+from nexus_chat.backend.session_handle import MessageCursor
+from nexus_chat.backend.session_io import (
+    CONFLICT_POLICIES, EXPORT_FORMAT, EXPORT_VERSION, SessionFilter, TransferReport,
+    detect_format, header_record, open_reader, open_writer, session_record, session_values
+)
+from nexus_chat.backend.storage_manager import StorageManager
+from nexus_chat.models.message import Message
+from nexus_chat.utils.constants import DATABASE
+from nexus_chat.utils.progress import ProgressCallback
+from nexus_chat.utils.timestamps import now_ms, to_epoch_ms
+
+logger = logging.getLogger(__name__)
+
+def _renamed_id(session_id: str, message_id: str) -> str:
+    """Id of a message imported into a renamed session, stable per session."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{session_id}/{message_id}"))
+
+class TransferManager:
+    """Exports sessions with their messages to files and imports them back.
+    
+    Files are written and read in batches of ``batch_size`` records
+    through the formats of ``session_io``, so memory does not grow with
+    the size of the history.
+    """
+    
+    def __init__(
+        self,
+        storage: StorageManager,
+        batch_size: int = DATABASE["TRANSFER_BATCH_SIZE"]
+    ):
+        """Initialize transfer manager.
+        
+        Args:
+            storage: Storage manager of the database
+            batch_size: Rows read and records written or imported per batch
+        """
+        self.storage = storage
+        self.batch_size = batch_size
+    
+    @staticmethod
+    def _session_filter_sql(session_filter: SessionFilter) -> Tuple[str, List[Any]]:
+        """WHERE clause and parameters selecting the sessions of a filter."""
+        conditions = ["1"]
+        params: List[Any] = []
+        if session_filter.session_ids is not None:
+            conditions.append(f"id IN ({', '.join('?' * len(session_filter.session_ids))})")
+            params += session_filter.session_ids
+        if session_filter.model is not None:
+            conditions.append("model = ?")
+            params.append(session_filter.model)
+        if session_filter.since is not None:
+            conditions.append("updated_at >= ?")
+            params.append(to_epoch_ms(session_filter.since))
+        if session_filter.until is not None:
+            conditions.append("updated_at < ?")
+            params.append(to_epoch_ms(session_filter.until))
+        if session_filter.active_only:
+            conditions.append("active = 1")
+        return " AND ".join(conditions), params
+    
+    async def export_sessions(
+        self,
+        path: str,
+        session_filter: Optional[SessionFilter] = None,
+        fmt: Optional[str] = None,
+        progress: Optional[ProgressCallback] = None
+    ) -> TransferReport:
+        """Stream sessions and their messages to a file.
+        
+        Sessions are read in pages ordered by id and messages in keyset
+        pages of ``batch_size``, and records are written in batches, so
+        memory does not grow with the size of the history.
+        
+        Args:
+            path: File to write
+            session_filter: Optional selection of sessions, defaults to all
+            fmt: One of ``session_io.FORMATS``, detected from ``path`` if omitted
+            progress: Optional callback receiving exported and total sessions
+        
+        Returns:
+            Numbers of exported sessions and messages
+        """
+        pool = await self.storage.connect()
+        path = Path(path)
+        fmt = fmt or detect_format(path)
+        where, params = self._session_filter_sql(session_filter or SessionFilter())
+        report = TransferReport()
+        
+        try:
+            async with pool.reader() as db:
+                async with db.execute(
+                    f"SELECT COUNT(*) FROM chat_sessions WHERE {where}", params
+                ) as cursor:
+                    total = (await cursor.fetchone())[0]
+            
+            writer = await asyncio.to_thread(open_writer, path, fmt)
+            try:
+                pending = [header_record(SCHEMA_VERSION)]
+                last_id = ""
+                while True:
+                    async with pool.reader() as db:
+                        async with db.execute(
+                            f"SELECT * FROM chat_sessions WHERE {where} AND id > ? "
+                            "ORDER BY id LIMIT ?",
+                            (*params, last_id, self.batch_size)
+                        ) as cursor:
+                            sessions = await cursor.fetchall()
+                    if not sessions:
+                        break
+                    
+                    for row in sessions:
+                        pending.append(session_record(row))
+                        
+                        # Page through the session's messages from its first one
+                        after = MessageCursor(-1, "")
+                        while True:
+                            messages = await self.storage.get_messages(
+                                row["id"], after=after, limit=self.batch_size
+                            )
+                            pending.extend(
+                                {"type": "message", **message.to_dict()} for message in messages
+                            )
+                            report.messages += len(messages)
+                            if len(pending) >= self.batch_size:
+                                await asyncio.to_thread(writer.write, pending)
+                                pending = []
+                            if len(messages) < self.batch_size:
+                                break
+                            after = MessageCursor.of(messages[-1])
+                        
+                        report.sessions += 1
+                        if progress:
+                            progress(report.sessions, total)
+                    last_id = sessions[-1]["id"]
+                
+                if pending:
+                    await asyncio.to_thread(writer.write, pending)
+            finally:
+                await asyncio.to_thread(writer.close)
+            
+            logger.info(
+                f"Exported {report.sessions} sessions with {report.messages} messages to {path}"
+            )
+            return report
+        except Exception as e:
+            logger.error(f"Error exporting sessions: {e}")
+            raise
+    
+    async def import_sessions(
+        self,
+        path: str,
+        fmt: Optional[str] = None,
+        on_conflict: str = "skip",
+        progress: Optional[ProgressCallback] = None
+    ) -> TransferReport:
+        """Stream sessions and their messages from an export file.
+        
+        Each batch of records is written in its own transaction. A
+        session whose id already exists is skipped, replaced, or imported
+        under a new id with ``on_conflict`` set to ``skip``, ``replace``
+        or ``rename``; messages of a renamed session get new ids derived
+        from the old ones. Messages whose id exists in another session
+        are skipped.
+        
+        Args:
+            path: File to read
+            fmt: One of ``session_io.FORMATS``, detected from ``path`` if omitted
+            on_conflict: One of ``session_io.CONFLICT_POLICIES``
+            progress: Optional callback receiving the processed and total
+                bytes (rows for parquet) of the file
+        
+        Returns:
+            Numbers of imported, skipped and renamed records
+        """
+        if on_conflict not in CONFLICT_POLICIES:
+            raise ValueError(
+                f"Unknown conflict policy {on_conflict}, expected one of "
+                f"{', '.join(CONFLICT_POLICIES)}"
+            )
+        pool = await self.storage.connect()
+        path = Path(path)
+        fmt = fmt or detect_format(path)
+        report = TransferReport()
+        # Id each exported session is imported under, None if skipped
+        targets: Dict[str, Optional[str]] = {}
+        
+        try:
+            reader = await asyncio.to_thread(open_reader, path, fmt, self.batch_size)
+            try:
+                batches = reader.batches()
+                header = None
+                while True:
+                    records = await asyncio.to_thread(next, batches, None)
+                    if records is None:
+                        break
+                    if header is None:
+                        header, records = records[0], records[1:]
+                        if header.get("type") != "header" or header.get("format") != EXPORT_FORMAT:
+                            raise ValueError(f"{path} is not a session export")
+                        if header.get("version", 0) > EXPORT_VERSION:
+                            raise ValueError(
+                                f"Export version {header['version']} is newer than supported"
+                            )
+                    
+                    async with pool.writer() as db:
+                        await self._import_records(db, records, on_conflict, targets, report)
+                    if progress:
+                        progress(reader.done, reader.total)
+            finally:
+                await asyncio.to_thread(reader.close)
+            
+            logger.info(
+                f"Imported {report.sessions} sessions with {report.messages} messages "
+                f"from {path}, skipped {report.skipped_sessions} sessions and "
+                f"{report.skipped_messages} messages"
+            )
+            return report
+        except Exception as e:
+            logger.error(f"Error importing sessions: {e}")
+            raise
+    
+    async def _import_records(
+        self,
+        db: aiosqlite.Connection,
+        records: List[Dict[str, Any]],
+        on_conflict: str,
+        targets: Dict[str, Optional[str]],
+        report: TransferReport
+    ) -> None:
+        """Write a batch of imported records in the caller's transaction."""
+        sessions = [record for record in records if record["type"] == "session"]
+        existing = set()
+        if sessions:
+            ids = [record["id"] for record in sessions]
+            async with db.execute(
+                f"SELECT id FROM chat_sessions WHERE id IN ({', '.join('?' * len(ids))})",
+                ids
+            ) as cursor:
+                existing = {row[0] async for row in cursor}
+        
+        session_rows = []
+        for record in sessions:
+            session_id = target = record["id"]
+            if session_id in existing:
+                if on_conflict == "skip":
+                    targets[session_id] = None
+                    report.skipped_sessions += 1
+                    continue
+                if on_conflict == "replace":
+                    await db.execute("DELETE FROM messages WHERE session_id = ?", (session_id,))
+                    await db.execute("DELETE FROM chat_sessions WHERE id = ?", (session_id,))
+                else:
+                    target = str(uuid.uuid4())
+                    report.renamed_sessions.append((session_id, target))
+            targets[session_id] = target
+            session_rows.append(session_values(record, target) + (now_ms(),))
+        if session_rows:
+            await db.executemany("""
+                INSERT INTO chat_sessions (
+                    id, name, model, system_prompt, active,
+                    created_at, updated_at, metadata, changed_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, session_rows)
+            report.sessions += len(session_rows)
+        
+        messages = []
+        for record in records:
+            if record["type"] != "message":
+                continue
+            target = targets.get(record["session_id"])
+            if target is None:
+                # Session skipped or missing from the export
+                report.skipped_messages += 1
+                continue
+            message = Message.from_dict(record)
+            if target != message.session_id:
+                message.id = _renamed_id(target, message.id)
+                if message.parent_id is not None:
+                    message.parent_id = _renamed_id(target, message.parent_id)
+                message.session_id = target
+            messages.append(message)
+        if messages:
+            written = await self.storage.insert_messages(db, messages, replace=False)
+            report.messages += written
+            report.skipped_messages += len(messages) - written
@@ -0,0 +1,298 @@
+"""Embedding vector index.
+
+Embeddings are stored in SQLite as unit length float16 values, half
+the size of float32. The search matrix is kept as float32 instead:
+NumPy has no BLAS kernel for float16, and a float16 matrix-vector
+product runs an order of magnitude slower than the float32 one.
+"""
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Collection, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# (slot, key, group, label) of a stored embedding: for messages the
+# message id, session id and chat model
+SlotRow = Tuple[int, str, str, str]
+
+# A group or label to search in, or any of several
+Filter = Union[str, Collection[str], None]
+
+def require_numpy() -> None:
+    """Fail early when semantic search is used without numpy."""
+    if np is None:
+        raise ImportError("Semantic search requires numpy (pip install numpy)")
+
+def encode_vector(values: Sequence[float]) -> bytes:
+    """Scale an embedding to unit length and pack it as float16.
+    
+    Args:
+        values: Embedding as returned by the model
+    
+    Returns:
+        Little-endian float16 bytes
+    """
+    vector = np.asarray(values, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    if norm:
+        vector /= norm
+    return vector.astype("<f2").tobytes()
+
+def decode_vectors(blobs: Iterable[bytes], dim: int) -> "np.ndarray":
+    """Unpack float16 embeddings into a float32 matrix, one row each."""
+    return np.frombuffer(b"".join(blobs), dtype="<f2").reshape(-1, dim).astype(np.float32)
+
+class VectorIndex:
+    """Embeddings as rows of one matrix, searched with a single dot product.
+    
+    Row ``slot`` of the matrix holds the embedding stored with that slot
+    in its table, such as ``message_embeddings``. Each row is found by a
+    key and can be filtered by a group and a label. Removed rows are masked out and their
+    slots handed out again, so adding and removing never rebuilds the
+    matrix; it grows by doubling. The matrix is memory-mapped from a
+    cache file next to the database, and ``seq`` records the last
+    embedding change it reflects, so a restart only reloads rows
+    changed since the cache was flushed.
+    """
+    
+    def __init__(
+        self,
+        path: Path,
+        model: str,
+        dim: int,
+        replica_id: str,
+        capacity: int = 1024
+    ):
+        """Open the cache file, starting a new one if it does not match.
+        
+        Args:
+            path: Cache file, a ``.npy`` matrix with a ``.json`` state file beside it
+            model: Embedding model
+            dim: Embedding dimensions
+            replica_id: Id of the database the cache belongs to
+            capacity: Initial number of rows of a new cache
+        """
+        require_numpy()
+        self.path = Path(path)
+        self.state_path = self.path.with_suffix(".json")
+        self.model = model
+        self.dim = dim
+        self.replica_id = replica_id
+        self.seq = 0
+        
+        # Per slot; a slot past ``size`` was never used
+        self.size = 0
+        self.ids: List[Optional[str]] = []
+        self.slots: Dict[str, int] = {}
+        self.free: List[int] = []
+        # Groups and labels as small integer codes for vectorized filters
+        self.group_codes: Dict[str, int] = {}
+        self.label_codes: Dict[str, int] = {}
+        
+        self.matrix = self._open_cache(capacity)
+        capacity = len(self.matrix)
+        self.live = np.zeros(capacity, dtype=bool)
+        self.groups = np.zeros(capacity, dtype=np.int32)
+        self.labels = np.zeros(capacity, dtype=np.int32)
+    
+    def __len__(self) -> int:
+        return len(self.slots)
+    
+    def _open_cache(self, capacity: int) -> "np.memmap":
+        """Map the cache file if it belongs to this database, else create it."""
+        try:
+            state = json.loads(self.state_path.read_text())
+            if (state["model"], state["dim"], state["replica"]) == (
+                self.model, self.dim, self.replica_id
+            ):
+                matrix = np.load(self.path, mmap_mode="r+")
+                self.seq = state["seq"]
+                return matrix
+        except (OSError, ValueError, KeyError):
+            pass
+        return np.lib.format.open_memmap(
+            self.path, mode="w+", dtype=np.float32, shape=(capacity, self.dim)
+        )
+    
+    def _grow(self, capacity: int) -> None:
+        """Move the rows to a larger cache file."""
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        matrix = np.lib.format.open_memmap(
+            temp_path, mode="w+", dtype=np.float32, shape=(capacity, self.dim)
+        )
+        matrix[:len(self.matrix)] = self.matrix
+        matrix.flush()
+        del self.matrix
+        os.replace(temp_path, self.path)
+        self.matrix = np.load(self.path, mmap_mode="r+")
+        
+        for name in ("live", "groups", "labels"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        logger.debug(f"Grew vector index to {capacity} rows")
+    
+    def _code(self, codes: Dict[str, int], value: str) -> int:
+        return codes.setdefault(value, len(codes))
+    
+    def allocate(self, count: int) -> List[int]:
+        """Reserve slots for new embeddings, reusing removed ones first.
+        
+        Args:
+            count: Number of slots
+        
+        Returns:
+            Slots to store the embeddings with
+        """
+        slots = [self.free.pop() for _ in range(min(count, len(self.free)))]
+        slots += range(self.size, self.size + count - len(slots))
+        self.size = max(self.size, slots[-1] + 1) if slots else self.size
+        if self.size > len(self.ids):
+            self.ids.extend([None] * (self.size - len(self.ids)))
+        return slots
+    
+    def set_rows(self, rows: Iterable[SlotRow], vectors: Optional["np.ndarray"] = None) -> None:
+        """Index stored embeddings.
+        
+        Args:
+            rows: Slot, key, group and label of each embedding
+            vectors: Their vectors, one row each; None keeps the cached rows
+        """
+        rows = list(rows)
+        if not rows:
+            return
+        top = max(slot for slot, *_ in rows) + 1
+        if top > len(self.matrix):
+            self._grow(max(top, 2 * len(self.matrix)))
+        if top > self.size:
+            self.free += range(self.size, top)
+            self.size = top
+            self.ids.extend([None] * (top - len(self.ids)))
+        
+        slots = np.fromiter((slot for slot, *_ in rows), dtype=np.int64, count=len(rows))
+        if vectors is not None:
+            self.matrix[slots] = vectors
+        moved = []
+        for slot, key, group, label in rows:
+            previous = self.ids[slot]
+            if previous is not None and previous != key:
+                self.slots.pop(previous, None)
+            if self.slots.get(key, slot) != slot:
+                moved.append(self.slots[key])
+            self.ids[slot] = key
+            self.slots[key] = slot
+            self.groups[slot] = self._code(self.group_codes, group)
+            self.labels[slot] = self._code(self.label_codes, label)
+        self.live[slots] = True
+        # Slots freed by a removal but in use again
+        taken = set(slots.tolist())
+        self.free = [slot for slot in self.free if slot not in taken]
+        self.remove_slots(slot for slot in moved if slot not in taken)
+    
+    def release(self, slots: Iterable[int]) -> None:
+        """Hand back allocated slots that were not stored after all.
+        
+        Args:
+            slots: Slots from ``allocate``
+        """
+        free = set(self.free)
+        self.free += [
+            slot for slot in slots
+            if (slot >= len(self.live) or not self.live[slot]) and slot not in free
+        ]
+    
+    def remove_slots(self, slots: Iterable[int]) -> None:
+        """Drop embeddings from the index and free their slots.
+        
+        Args:
+            slots: Slots of removed embeddings
+        """
+        for slot in slots:
+            if slot >= len(self.live) or not self.live[slot]:
+                continue
+            self.live[slot] = False
+            if self.slots.get(self.ids[slot]) == slot:
+                del self.slots[self.ids[slot]]
+            self.ids[slot] = None
+            self.free.append(slot)
+    
+    def search(
+        self,
+        query: Sequence[float],
+        k: int = 10,
+        group: Filter = None,
+        label: Filter = None
+    ) -> List[Tuple[str, float]]:
+        """Find the embeddings closest to a query embedding.
+        
+        Args:
+            query: Query embedding
+            k: Number of results
+            group: Optional group, or groups, to search in, such as a session
+            label: Optional label, or labels, to search in, such as a chat model
+        
+        Returns:
+            Keys and cosine similarities, best first
+        """
+        query = np.asarray(query, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        
+        size = self.size
+        mask = self.live[:size]
+        for codes, column, value in (
+            (self.group_codes, self.groups, group),
+            (self.label_codes, self.labels, label),
+        ):
+            if value is None:
+                continue
+            values = [value] if isinstance(value, str) else value
+            wanted = [codes[item] for item in values if item in codes]
+            if not wanted:
+                return []
+            if len(wanted) == 1:
+                mask = mask & (column[:size] == wanted[0])
+            else:
+                mask = mask & np.isin(column[:size], wanted)
+        count = int(mask.sum())
+        
+        # Gathering rows costs more than it saves unless the filter is selective
+        if count * 4 < size:
+            candidates = np.flatnonzero(mask)
+            scores = self.matrix[candidates] @ query
+        else:
+            candidates = None
+            scores = self.matrix[:size] @ query
+            scores[~mask] = -np.inf
+        
+        k = min(k, count)
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        slots = top if candidates is None else candidates[top]
+        return [(self.ids[slot], float(scores[i])) for slot, i in zip(slots, top)]
+    
+    def flush(self, seq: int) -> None:
+        """Write the matrix to the cache file and record the change it reflects.
+        
+        Args:
+            seq: Last change log entry applied to the index
+        """
+        self.matrix.flush()
+        self.seq = seq
+        self.state_path.write_text(json.dumps({
+            "model": self.model,
+            "dim": self.dim,
+            "replica": self.replica_id,
+            "seq": seq
+        }))
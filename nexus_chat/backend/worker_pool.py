@@ -0,0 +1,27 @@
+"""Worker pool module."""
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+def create_pool(workers: int, thread_name: str) -> Executor:
+    """Pool for CPU-bound work kept off the event loop.
+    
+    Worker processes are forked from a fork server where available
+    rather than from this process and its threads. With a single
+    worker, starting a process costs more than it saves and a thread
+    does the work instead.
+    
+    Args:
+        workers: Number of workers
+        thread_name: Name prefix of the thread used with a single worker
+    
+    Returns:
+        Process pool, or a one-thread pool
+    """
+    if workers > 1:
+        method = (
+            "forkserver"
+            if "forkserver" in multiprocessing.get_all_start_methods()
+            else "spawn"
+        )
+        return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context(method))
+    return ThreadPoolExecutor(1, thread_name_prefix=thread_name)
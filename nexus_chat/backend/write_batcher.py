@@ -0,0 +1,130 @@
+"""Group commit write batcher module."""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from nexus_chat.utils.constants import DATABASE
+
+logger = logging.getLogger(__name__)
+
+# Queue marker asking the worker to stop after committing what precedes it
+_STOP = object()
+
+class WriteBatcher:
+    """Collects concurrent writes and commits them together.
+    
+    Callers ``submit`` items and get a future back. A single worker task
+    takes the first queued item and, when other writers are queued
+    behind it, keeps collecting for ``window`` seconds or until
+    ``max_batch`` items are gathered, then hands the batch to ``flush``
+    in one transaction. A lone writer is committed without waiting. If
+    a batch fails, its items are retried one by one so only the
+    offending writes fail.
+    """
+    
+    def __init__(
+        self,
+        flush: Callable[[List[Any]], Awaitable[Any]],
+        window: float = DATABASE["GROUP_COMMIT_WINDOW"],
+        max_batch: int = DATABASE["GROUP_COMMIT_MAX_BATCH"]
+    ):
+        """Initialize write batcher.
+        
+        Args:
+            flush: Coroutine writing a list of items in one transaction
+            window: Seconds to wait for more items after the first one
+            max_batch: Maximum number of items per transaction
+        """
+        self.flush = flush
+        self.window = window
+        self.max_batch = max_batch
+        
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    def submit(self, item: Any) -> asyncio.Future:
+        """Queue an item for the next group commit.
+        
+        Args:
+            item: Item to write
+        
+        Returns:
+            Future resolved once the item is committed
+        """
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._run())
+        
+        future = loop.create_future()
+        self._queue.put_nowait((item, future))
+        return future
+    
+    async def _collect(self) -> Tuple[List[Tuple[Any, asyncio.Future]], bool]:
+        """Wait for the first item, then gather more until the window closes.
+        
+        Returns:
+            Collected batch and whether the batcher was asked to stop
+        """
+        loop = asyncio.get_running_loop()
+        batch = []
+        item = await self._queue.get()
+        deadline = loop.time() + self.window
+        
+        while item is not _STOP:
+            batch.append(item)
+            if len(batch) >= self.max_batch:
+                break
+            
+            # Take whatever is already queued without waiting
+            if not self._queue.empty():
+                item = self._queue.get_nowait()
+                continue
+            
+            # A lone writer does not pay for the window
+            timeout = deadline - loop.time()
+            if timeout <= 0 or len(batch) == 1:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+        
+        return batch, item is _STOP
+    
+    async def _commit(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        """Flush a batch and resolve its futures."""
+        try:
+            await self.flush([item for item, _ in batch])
+            for _, future in batch:
+                if not future.done():
+                    future.set_result(None)
+        
+        except Exception as e:
+            if len(batch) == 1:
+                if not batch[0][1].done():
+                    batch[0][1].set_exception(e)
+                return
+            
+            logger.warning(f"Batch of {len(batch)} failed, retrying singly: {e}")
+            for entry in batch:
+                await self._commit([entry])
+    
+    async def _run(self) -> None:
+        """Worker loop committing batches."""
+        stopping = False
+        while not stopping:
+            batch, stopping = await self._collect()
+            if batch:
+                await self._commit(batch)
+                logger.debug(f"Group commit of {len(batch)} items")
+    
+    async def close(self) -> None:
+        """Commit queued items and stop the worker."""
+        if self._task is None or self._task.done():
+            self._task = None
+            return
+        
+        self._queue.put_nowait(_STOP)
+        await self._task
+        self._task = None
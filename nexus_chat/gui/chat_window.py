@@ -2,11 +2,13 @@
 import asyncio
 import logging
 import re
-from typing import Optional
+from tkinter import filedialog
+from typing import List, Optional
 
 import customtkinter as ctk
 
 from nexus_chat.backend.service import BackendService
+from nexus_chat.gui.comparison_view import ComparisonView
 from nexus_chat.models.message import Message, MessageRole
 from nexus_chat.utils.constants import CHAT_WINDOW_DEFAULTS
 
@@ -144,6 +146,7 @@ class ChatWindow(ctk.CTkFrame):
             self.is_sending = False
             self.message_queue = []
             self.current_response = ""
+            self.pending_images: List[str] = []
             
             # Create widgets
             self._create_widgets()
@@ -194,6 +197,8 @@ class ChatWindow(ctk.CTkFrame):
             # Configure input frame grid
             self.input_frame.grid_columnconfigure(0, weight=1)
             self.input_frame.grid_columnconfigure(1, weight=0)
+            self.input_frame.grid_columnconfigure(2, weight=0)
+            self.input_frame.grid_columnconfigure(3, weight=0)
             
             # Create message input
             self.message_input = ctk.CTkTextbox(
@@ -206,6 +211,33 @@ class ChatWindow(ctk.CTkFrame):
             )
             self.message_input.grid(row=0, column=0, sticky="ew", padx=10, pady=10)
             
+            # Create attach button, hidden without image support
+            self.attach_button = ctk.CTkButton(
+                self.input_frame,
+                text="Image",
+                font=("Segoe UI", 12),
+                command=self._attach_images,
+                fg_color="#3d3f41",
+                hover_color="#4e5052",
+                width=70,
+                height=35
+            )
+            if self.backend.image_store is not None:
+                self.attach_button.grid(row=0, column=1, sticky="e", padx=(0, 5), pady=10)
+            
+            # Create compare button
+            self.compare_button = ctk.CTkButton(
+                self.input_frame,
+                text="Compare",
+                font=("Segoe UI", 12),
+                command=self._compare_message,
+                fg_color="#3d3f41",
+                hover_color="#4e5052",
+                width=80,
+                height=35
+            )
+            self.compare_button.grid(row=0, column=2, sticky="e", padx=(0, 5), pady=10)
+            
             # Create send button
             self.send_button = ctk.CTkButton(
                 self.input_frame,
@@ -216,7 +248,7 @@ class ChatWindow(ctk.CTkFrame):
                 hover_color="#2952d9",
                 height=35
             )
-            self.send_button.grid(row=0, column=1, sticky="e", padx=10, pady=10)
+            self.send_button.grid(row=0, column=3, sticky="e", padx=10, pady=10)
             
             logger.info("Chat window widgets created")
             
@@ -265,6 +297,23 @@ class ChatWindow(ctk.CTkFrame):
             logger.error(f"Error handling shift+return key press: {str(e)}")
             raise
             
+    def _attach_images(self):
+        """Pick images to send with the next message."""
+        try:
+            paths = filedialog.askopenfilenames(
+                title="Attach images",
+                filetypes=[("Images", "*.png *.jpg *.jpeg *.webp *.gif *.bmp"), ("All files", "*")]
+            )
+            self.pending_images.extend(paths)
+            
+            # Show how many are attached
+            count = len(self.pending_images)
+            self.attach_button.configure(text=f"Image ({count})" if count else "Image")
+            
+        except Exception as e:
+            logger.error(f"Error attaching images: {str(e)}")
+            raise
+            
     def _send_message(self):
         """Send message."""
         try:
@@ -276,14 +325,16 @@ class ChatWindow(ctk.CTkFrame):
             message = self.message_input.get("1.0", "end-1c").strip()
             
             # Check message
-            if not message:
+            if not message and not self.pending_images:
                 return
                 
             # Clear input
             self.message_input.delete("1.0", "end")
             
-            # Add message to queue
-            self.message_queue.append(message)
+            # Add message and its images to queue
+            self.message_queue.append((message, self.pending_images))
+            self.pending_images = []
+            self.attach_button.configure(text="Image")
             
             # Update state
             self.is_sending = True
@@ -295,6 +346,49 @@ class ChatWindow(ctk.CTkFrame):
             logger.error(f"Error sending message: {str(e)}")
             raise
             
+    def _compare_message(self):
+        """Send the message to several models and compare their answers."""
+        try:
+            # Get message
+            message = self.message_input.get("1.0", "end-1c").strip()
+            if not message or self.is_sending:
+                return
+                
+            # Ask for the models, defaulting to the configured ones
+            default = ", ".join(self.backend.config.get("compare_models", []))
+            dialog = ctk.CTkInputDialog(
+                text=f"Models to compare, separated by commas\n{default}",
+                title="Compare models"
+            )
+            answer = dialog.get_input()
+            if answer is None:
+                return
+            models = [model.strip() for model in (answer or default).split(",") if model.strip()]
+            models = list(dict.fromkeys(models))
+            if not models:
+                return
+                
+            # Clear input and show the message
+            self.message_input.delete("1.0", "end")
+            self._display_message(Message(role=MessageRole.USER, content=message))
+            images, self.pending_images = self.pending_images, []
+            self.attach_button.configure(text="Image")
+            
+            # Stream the answers side by side; the chosen one joins the chat
+            ComparisonView(
+                self,
+                self.backend,
+                self.parent.loop,
+                message,
+                models,
+                on_close=lambda answer: answer and self._display_message(answer),
+                images=images
+            )
+            
+        except Exception as e:
+            logger.error(f"Error comparing models: {str(e)}")
+            raise
+            
     def _update_ui_state(self):
         """Update UI state."""
         try:
@@ -327,6 +421,13 @@ class ChatWindow(ctk.CTkFrame):
             role_text = "You" if message.role == MessageRole.USER else "Assistant"
             self.chat_display.insert("end", f"{role_text}\n", ("role_label", tag))
             
+            # Note attached images
+            if message.images:
+                count = len(message.images)
+                self.chat_display.insert(
+                    "end", f"[{count} image{'s' if count > 1 else ''} attached]\n", tag
+                )
+            
             # Process content
             content = message.content.strip()
             
@@ -412,12 +513,13 @@ class ChatWindow(ctk.CTkFrame):
             # Check if there are messages to process
             if self.message_queue and not self.is_sending:
                 # Get message
-                message = self.message_queue.pop(0)
+                message, images = self.message_queue.pop(0)
                 
                 # Create user message
                 user_message = Message(
                     role=MessageRole.USER,
-                    content=message
+                    content=message,
+                    metadata={"images": images} if images else None
                 )
                 
                 # Display user message
@@ -428,7 +530,9 @@ class ChatWindow(ctk.CTkFrame):
                 
                 # Send message
                 asyncio.run_coroutine_threadsafe(
-                    self.backend.send_message(message, self._update_streaming_response),
+                    self.backend.send_message(
+                        message, self._update_streaming_response, images
+                    ),
                     self.parent.loop
                 )
                 
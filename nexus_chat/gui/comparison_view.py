@@ -0,0 +1,178 @@
+"""Model comparison view module."""
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional
+
+import customtkinter as ctk
+
+from nexus_chat.backend.fan_out import FanOut, ModelRun
+from nexus_chat.backend.service import BackendService
+from nexus_chat.models.message import Message
+
+logger = logging.getLogger(__name__)
+
+class ComparisonView(ctk.CTkToplevel):
+    """Answers of several models to one message, streamed side by side.
+    
+    Each column shows a model's answer as it streams, its time to first
+    token and speed once done, and a button picking it as the answer to
+    continue with; picking cancels the answers still streaming.
+    """
+    
+    def __init__(
+        self,
+        parent,
+        backend: BackendService,
+        loop: asyncio.AbstractEventLoop,
+        message: str,
+        models: List[str],
+        on_close: Optional[Callable[[Optional[Message]], None]] = None,
+        images: Optional[List[str]] = None
+    ):
+        """Initialize comparison view and start the fan-out.
+        
+        Args:
+            parent: Parent widget
+            backend: Backend service
+            loop: Event loop running the backend
+            message: Message to send
+            models: Models to compare
+            on_close: Optional callback receiving the selected answer on close
+            images: Optional image files sent with the message
+        """
+        try:
+            super().__init__(parent)
+            self.backend = backend
+            self.loop = loop
+            self.models = models
+            self.on_close = on_close
+            self.fan_out: Optional[FanOut] = None
+            
+            self._create_widgets(message)
+            self.protocol("WM_DELETE_WINDOW", self._close)
+            
+            future = asyncio.run_coroutine_threadsafe(
+                self.backend.fan_out(message, models, self._append, images), loop
+            )
+            future.add_done_callback(self._started)
+            self.after(200, self._refresh)
+            
+            logger.info(f"Comparing {len(models)} models")
+        
+        except Exception as e:
+            logger.error(f"Error initializing comparison view: {str(e)}")
+            raise
+    
+    def _create_widgets(self, message: str):
+        """Create a column per model."""
+        self.title(f"Compare: {message[:60]}")
+        self.geometry(f"{min(420 * len(self.models), 1600)}x600")
+        self.grid_rowconfigure(0, weight=1)
+        
+        self.outputs: Dict[str, ctk.CTkTextbox] = {}
+        self.stats: Dict[str, ctk.CTkLabel] = {}
+        self.pick_buttons: Dict[str, ctk.CTkButton] = {}
+        for column, model in enumerate(self.models):
+            self.grid_columnconfigure(column, weight=1, uniform="answers")
+            frame = ctk.CTkFrame(self, fg_color="#2b2d30")
+            frame.grid(row=0, column=column, sticky="nsew", padx=5, pady=5)
+            frame.grid_rowconfigure(1, weight=1)
+            frame.grid_columnconfigure(0, weight=1)
+            
+            ctk.CTkLabel(
+                frame, text=model, font=("Segoe UI", 12, "bold")
+            ).grid(row=0, column=0, sticky="w", padx=10, pady=(10, 5))
+            
+            output = ctk.CTkTextbox(
+                frame, font=("Segoe UI", 12), fg_color="#1e1f22", wrap="word"
+            )
+            output.grid(row=1, column=0, sticky="nsew", padx=10)
+            output.configure(state="disabled")
+            self.outputs[model] = output
+            
+            stats = ctk.CTkLabel(frame, text="Waiting...", text_color="#8a8f99")
+            stats.grid(row=2, column=0, sticky="w", padx=10, pady=5)
+            self.stats[model] = stats
+            
+            button = ctk.CTkButton(
+                frame,
+                text="Pick",
+                command=lambda model=model: self._pick(model),
+                fg_color="#4a72f5",
+                hover_color="#2952d9"
+            )
+            button.grid(row=3, column=0, sticky="ew", padx=10, pady=(0, 10))
+            self.pick_buttons[model] = button
+    
+    def _started(self, future):
+        """Keep the fan-out once the message is sent."""
+        try:
+            self.fan_out = future.result()
+        except Exception as e:
+            for model in self.models:
+                self.stats[model].configure(text=f"Error: {e}")
+    
+    def _append(self, model: str, chunk: str):
+        """Show a chunk of a model's answer."""
+        output = self.outputs[model]
+        output.configure(state="normal")
+        output.insert("end", chunk)
+        output.see("end")
+        output.configure(state="disabled")
+    
+    @staticmethod
+    def _describe(run: ModelRun) -> str:
+        """Status line of a model's answer."""
+        if run.error:
+            return run.error
+        if not run.done:
+            return "Streaming..."
+        parts = []
+        if run.time_to_first_token is not None:
+            parts.append(f"first token {run.time_to_first_token:.2f}s")
+        if run.tokens_per_second is not None:
+            parts.append(f"{run.tokens_per_second:.1f} tokens/s")
+        return ", ".join(parts) or "Done"
+    
+    def _refresh(self):
+        """Update the status lines until every answer is done."""
+        try:
+            if not self.winfo_exists():
+                return
+            if self.fan_out is not None:
+                for model, run in self.fan_out.runs.items():
+                    text = self._describe(run)
+                    if model == self.fan_out.winner:
+                        text = f"Picked - {text}"
+                    self.stats[model].configure(text=text)
+                if all(run.done for run in self.fan_out.runs.values()):
+                    return
+            self.after(200, self._refresh)
+        
+        except Exception as e:
+            logger.error(f"Error refreshing comparison view: {str(e)}")
+    
+    def _pick(self, model: str):
+        """Continue with a model's answer and stop the others."""
+        if self.fan_out is None:
+            return
+        self.loop.call_soon_threadsafe(self.fan_out.pick, model)
+        for button in self.pick_buttons.values():
+            button.configure(state="disabled")
+    
+    def _close(self):
+        """Stop answers still streaming and hand over the selected one."""
+        selected = None
+        if self.fan_out is not None:
+            # A picked answer finishes streaming, the others already stopped
+            if self.fan_out.winner is None:
+                self.loop.call_soon_threadsafe(self.fan_out.cancel)
+            run = (
+                self.fan_out.runs[self.fan_out.winner]
+                if self.fan_out.winner
+                else self.fan_out.selected
+            )
+            selected = run.message if run else None
+        if self.on_close:
+            self.on_close(selected)
+        self.destroy()
@@ -4,7 +4,7 @@ from typing import Callable, List, Optional
 import logging
 from datetime import datetime
 
-from nexus_chat.models.chat_session import ChatSession
+from nexus_chat.models.chat_session import SessionSummary
 from nexus_chat.utils.constants import GUI_CONSTANTS
 
 logger = logging.getLogger(__name__)
@@ -21,7 +21,7 @@ class HistoryView(ctk.CTkScrollableFrame):
         )
         
         self.command = command
-        self.sessions: List[ChatSession] = []
+        self.sessions: List[SessionSummary] = []
         self.session_frames = {}
         
         # Configure grid
@@ -60,7 +60,7 @@ class HistoryView(ctk.CTkScrollableFrame):
         else:
             return timestamp.strftime("%Y-%m-%d")
     
-    def _create_session_frame(self, session: ChatSession) -> ctk.CTkFrame:
+    def _create_session_frame(self, session: SessionSummary) -> ctk.CTkFrame:
         """Create a frame for a chat session."""
         frame = ctk.CTkFrame(self)
         frame.grid_columnconfigure(0, weight=1)
@@ -79,7 +79,7 @@ class HistoryView(ctk.CTkScrollableFrame):
         
         time_label = ctk.CTkLabel(
             header_frame,
-            text=self._format_timestamp(session.created_at),
+            text=self._format_timestamp(session.last_message_at or session.created_at),
             font=(GUI_CONSTANTS["DEFAULT_FONT"], GUI_CONSTANTS["DEFAULT_FONT_SIZE"]-2),
             text_color="gray"
         )
@@ -95,7 +95,7 @@ class HistoryView(ctk.CTkScrollableFrame):
         model_label.grid(row=1, column=0, sticky="w", padx=5, pady=(0, 2))
         
         # Message count
-        msg_count = len(session.messages)
+        msg_count = session.message_count
         msg_label = ctk.CTkLabel(
             frame,
             text=f"{msg_count} message{'s' if msg_count != 1 else ''}",
@@ -120,13 +120,17 @@ class HistoryView(ctk.CTkScrollableFrame):
         """Handle mouse leave on session frame."""
         frame.configure(fg_color=("gray90", "gray13"))
     
-    def _on_session_click(self, session: ChatSession):
+    def _on_session_click(self, session: SessionSummary):
         """Handle session click."""
         if self.command:
             self.command(session.id)
     
-    def update_sessions(self, sessions: List[ChatSession]):
-        """Update the displayed sessions."""
+    def update_sessions(self, sessions: List[SessionSummary]):
+        """Update the displayed sessions.
+        
+        Args:
+            sessions: Summaries from StorageManager.list_session_summaries
+        """
         # Clear existing frames
         for frame in self.session_frames.values():
             frame.destroy()
@@ -141,7 +145,7 @@ class HistoryView(ctk.CTkScrollableFrame):
             frame.grid(row=i, column=0, sticky="ew", padx=5, pady=2)
             self.session_frames[session.id] = frame
     
-    def get_selected_session(self) -> Optional[ChatSession]:
+    def get_selected_session(self) -> Optional[SessionSummary]:
         """Get the currently selected session."""
         # Implement session selection if needed
         return None
@@ -0,0 +1,368 @@
+"""Database maintenance commands.
+
+Usage:
+    python -m nexus_chat.manage [--db PATH] rebuild-search
+    python -m nexus_chat.manage [--db PATH] backup [--dir DIR] [--keep N]
+    python -m nexus_chat.manage [--db PATH] retention [--max-age DAYS]
+        [--max-sessions N] [--max-size MB] [--include-active] [--inactive-after DAYS]
+    python -m nexus_chat.manage [--db PATH] restore ID [ID ...]
+    python -m nexus_chat.manage [--db PATH] vacuum
+    python -m nexus_chat.manage [--db PATH] export PATH [--format FORMAT]
+        [--session ID ...] [--model NAME] [--since DATE] [--until DATE] [--active-only]
+    python -m nexus_chat.manage [--db PATH] import PATH [--format FORMAT]
+        [--on-conflict {skip,replace,rename}]
+    python -m nexus_chat.manage [--db PATH] sync (--with PATH | --dir DIR)
+    python -m nexus_chat.manage [--db PATH] ingest [--source PATH ...] [--model NAME]
+        [--workers N]
+    python -m nexus_chat.manage tune MODEL [--host URL] [--threads N ...] [--batch N ...]
+        [--ctx N ...] [--trials N] [--dry-run]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from datetime import datetime
+
+from nexus_chat.backend.backup_manager import BackupManager
+from nexus_chat.backend.document_manager import DocumentManager
+from nexus_chat.backend.ollama_client import OllamaClient
+from nexus_chat.backend.option_profiles import OptionProfiles
+from nexus_chat.backend.option_tuner import OptionTuner
+from nexus_chat.backend.retention_manager import RetentionManager, RetentionPolicy
+from nexus_chat.backend.session_io import CONFLICT_POLICIES, FORMATS, SessionFilter
+from nexus_chat.backend.storage_manager import StorageManager
+from nexus_chat.backend.sync_manager import SyncManager
+from nexus_chat.backend.transfer_manager import TransferManager
+from nexus_chat.utils.config import load_config, save_config
+from nexus_chat.utils.constants import API_CONSTANTS, DATABASE, MODEL_DEFAULTS, TUNER
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+
+logger = logging.getLogger(__name__)
+
+def progress_logger(action: str, unit: str):
+    """Progress callback logging every 10 percent."""
+    reported = -1
+    
+    def progress(done: int, total: int) -> None:
+        nonlocal reported
+        percent = done * 100 // total if total else 100
+        if percent // 10 > reported // 10:
+            reported = percent
+            logger.info(f"{action} {percent}% ({done}/{total} {unit})")
+    
+    return progress
+
+async def rebuild_search(storage: StorageManager, args: argparse.Namespace) -> None:
+    """Rebuild the full-text search index."""
+    await storage.rebuild_search_index()
+
+async def backup(storage: StorageManager, args: argparse.Namespace) -> None:
+    """Take a compressed backup of the database."""
+    manager = BackupManager(
+        storage.db_path,
+        storage.archive_path,
+        backup_dir=args.dir,
+        max_count=args.keep
+    )
+    path = await manager.backup(progress_logger("Backup", "pages"))
+    print(path)
+
+def add_backup_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add arguments of the backup command."""
+    parser.add_argument("--dir", help="Backup directory, defaults to backups next to the database")
+    parser.add_argument(
+        "--keep",
+        type=int,
+        default=DATABASE["MAX_BACKUP_COUNT"],
+        help="Number of backups to keep"
+    )
+
+async def retention(storage: StorageManager, args: argparse.Namespace) -> None:
+    """Archive expired sessions and reclaim their space."""
+    policy = RetentionPolicy(
+        max_age=args.max_age,
+        max_sessions=args.max_sessions,
+        max_size=args.max_size,
+        inactive_only=not args.include_active,
+        inactive_after=args.inactive_after
+    )
+    report = await RetentionManager(storage, policy).run()
+    print(
+        f"Archived {report.archived_sessions} sessions "
+        f"({report.archived_messages} messages), collected {report.collected_blobs} blobs, "
+        f"released {report.freed_pages} pages"
+    )
+
+def add_retention_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add arguments of the retention command."""
+    parser.add_argument(
+        "--max-age",
+        type=float,
+        default=DATABASE["RETENTION_MAX_AGE"],
+        help="Archive sessions inactive for more days than this"
+    )
+    parser.add_argument("--max-sessions", type=int, help="Number of sessions to keep")
+    parser.add_argument("--max-size", type=float, help="Database size to keep under, in MB")
+    parser.add_argument(
+        "--include-active",
+        action="store_true",
+        help="Also archive sessions that are still active"
+    )
+    parser.add_argument(
+        "--inactive-after",
+        type=float,
+        default=DATABASE["RETENTION_INACTIVE_AFTER"],
+        help="Count open sessions idle for more days than this as inactive"
+    )
+
+async def restore(storage: StorageManager, args: argparse.Namespace) -> None:
+    """Move archived sessions back to the live database."""
+    count = await RetentionManager(storage).restore_sessions(args.session)
+    print(f"Restored {count} messages")
+
+def add_restore_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add arguments of the restore command."""
+    parser.add_argument("session", nargs="+", help="Id of an archived session")
+
+async def vacuum(storage: StorageManager, args: argparse.Namespace) -> None:
+    """Switch the database to incremental auto-vacuum."""
+    if await storage.enable_incremental_vacuum():
+        print("Converted the database to incremental auto-vacuum")
+    else:
+        print("The database already uses incremental auto-vacuum")
+
+async def export(storage: StorageManager, args: argparse.Namespace) -> None:
+    """Export sessions and their messages to a file."""
+    session_filter = SessionFilter(
+        session_ids=args.session,
+        model=args.model,
+        since=args.since,
+        until=args.until,
+        active_only=args.active_only
+    )
+    report = await TransferManager(storage).export_sessions(
+        args.path, session_filter, args.format, progress=progress_logger("Export", "sessions")
+    )
+    print(f"Exported {report.sessions} sessions ({report.messages} messages)")
+
+def add_export_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add arguments of the export command."""
+    parser.add_argument("path", help="File to write")
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        help="File format, detected from the file name by default"
+    )
+    parser.add_argument(
+        "--session",
+        action="append",
+        help="Id of a session to export, may be repeated"
+    )
+    parser.add_argument("--model", help="Only export sessions of this model")
+    parser.add_argument(
+        "--since",
+        type=datetime.fromisoformat,
+        help="Only export sessions updated at or after this ISO date"
+    )
+    parser.add_argument(
+        "--until",
+        type=datetime.fromisoformat,
+        help="Only export sessions updated before this ISO date"
+    )
+    parser.add_argument("--active-only", action="store_true", help="Only export active sessions")
+
+async def import_(storage: StorageManager, args: argparse.Namespace) -> None:
+    """Import sessions and their messages from an export file."""
+    report = await TransferManager(storage).import_sessions(
+        args.path,
+        args.format,
+        args.on_conflict,
+        progress=progress_logger("Import", "rows" if args.path.endswith(".parquet") else "bytes")
+    )
+    print(
+        f"Imported {report.sessions} sessions ({report.messages} messages), "
+        f"skipped {report.skipped_sessions} sessions ({report.skipped_messages} messages), "
+        f"renamed {len(report.renamed_sessions)} sessions"
+    )
+
+def add_import_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add arguments of the import command."""
+    parser.add_argument("path", help="Export file to read")
+    parser.add_argument(
+        "--format",
+        choices=FORMATS,
+        help="File format, detected from the file name by default"
+    )
+    parser.add_argument(
+        "--on-conflict",
+        choices=CONFLICT_POLICIES,
+        default="skip",
+        help="What to do with sessions whose id already exists"
+    )
+
+async def sync(storage: StorageManager, args: argparse.Namespace) -> None:
+    """Exchange changed sessions and messages with another database."""
+    manager = SyncManager(storage)
+    if args.peer:
+        report = await manager.sync_with(args.peer)
+    else:
+        report = await manager.sync_directory(args.dir)
+    print(
+        f"Sent {report.sent_sessions} sessions ({report.sent_messages} messages), "
+        f"received {report.received_sessions} sessions ({report.received_messages} messages)"
+    )
+
+def add_sync_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add arguments of the sync command."""
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--with", dest="peer", metavar="PATH", help="Database to sync with")
+    target.add_argument("--dir", help="Shared directory to sync through")
+
+async def ingest(storage: StorageManager, args: argparse.Namespace) -> None:
+    """Read, chunk and embed the documents attached to sessions."""
+    client = OllamaClient()
+    try:
+        manager = DocumentManager(storage, client, model=args.model, workers=args.workers)
+        report = await manager.ingest(args.source, progress_logger("Ingested", "files"))
+    finally:
+        await client.close()
+    print(
+        f"{report.files} files: {report.indexed} indexed into {report.chunks} passages, "
+        f"{report.unchanged} unchanged, {report.removed} removed, {report.failed} failed"
+    )
+
+def add_ingest_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add arguments of the ingest command."""
+    parser.add_argument(
+        "--source",
+        action="append",
+        metavar="PATH",
+        help="Attached file or folder to scan, repeatable; all by default"
+    )
+    parser.add_argument(
+        "--model",
+        default=MODEL_DEFAULTS["EMBEDDING_MODEL"],
+        help="Embedding model"
+    )
+    parser.add_argument("--workers", type=int, help="Processes reading files")
+
+async def tune(args: argparse.Namespace) -> None:
+    """Find the fastest num_thread, num_batch and num_ctx of a model and save them."""
+    config = load_config()
+    model_options = config.setdefault("model_options", {})
+    profiles = OptionProfiles(config.get("options"), model_options)
+    cpus = os.cpu_count() or 1
+    candidates = {
+        "num_thread": args.threads or sorted({max(1, cpus // 4), max(1, cpus // 2), cpus}),
+        "num_batch": args.batch or list(TUNER["BATCHES"]),
+        "num_ctx": args.ctx or list(TUNER["CONTEXTS"]),
+    }
+    client = OllamaClient(args.host)
+    try:
+        tuner = OptionTuner(
+            client,
+            args.model,
+            base_options=profiles.resolve(args.model)["options"],
+            trials=args.trials
+        )
+        report = await tuner.tune(candidates, progress_logger("Measured", "option sets"))
+    finally:
+        await client.close()
+    print(report.format())
+    if not args.dry_run:
+        model_options[args.model] = {**model_options.get(args.model, {}), **report.best}
+        save_config(config)
+        print(f"Saved to the profile of {args.model}")
+
+def add_tune_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add arguments of the tune command."""
+    parser.add_argument("model", help="Model to tune, as listed by Ollama")
+    parser.add_argument(
+        "--host",
+        default=API_CONSTANTS["OLLAMA_API_URL"],
+        help="Ollama host to tune for"
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        nargs="+",
+        help="num_thread values to try, defaults to a quarter, half and all of this machine's CPUs"
+    )
+    parser.add_argument("--batch", type=int, nargs="+", help="num_batch values to try")
+    parser.add_argument("--ctx", type=int, nargs="+", help="num_ctx values to try")
+    parser.add_argument(
+        "--trials",
+        type=int,
+        default=TUNER["TRIALS"],
+        help="Timed rounds of the prompts per set of options"
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Report without saving the best values"
+    )
+
+# name: (handler, help, function adding the command's arguments)
+COMMANDS = {
+    "rebuild-search": (rebuild_search, "Rebuild the full-text search index", None),
+    "backup": (backup, "Take a compressed online backup", add_backup_arguments),
+    "retention": (
+        retention,
+        "Archive expired sessions and reclaim space",
+        add_retention_arguments
+    ),
+    "restore": (restore, "Move archived sessions back", add_restore_arguments),
+    "vacuum": (
+        vacuum,
+        "Convert the database to incremental auto-vacuum (rewrites the file once)",
+        None
+    ),
+    "export": (export, "Export sessions to a file", add_export_arguments),
+    "import": (import_, "Import sessions from an export file", add_import_arguments),
+    "sync": (sync, "Exchange changes with another database", add_sync_arguments),
+    "ingest": (ingest, "Ingest documents attached to sessions", add_ingest_arguments),
+    "tune": (tune, "Find the fastest generation options of a model", add_tune_arguments),
+}
+
+# Commands that do not use the database; their handlers take only the arguments
+STANDALONE_COMMANDS = {"tune"}
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command line parser."""
+    parser = argparse.ArgumentParser(prog="python -m nexus_chat.manage")
+    parser.add_argument("--db", help="Database path, defaults to the app database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, (_, help_text, add_arguments) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=help_text)
+        if add_arguments:
+            add_arguments(subparser)
+    return parser
+
+async def run(args: argparse.Namespace) -> None:
+    """Run a command, against the database unless it needs none."""
+    handler = COMMANDS[args.command][0]
+    if args.command in STANDALONE_COMMANDS:
+        await handler(args)
+        return
+    storage = StorageManager(args.db)
+    try:
+        await handler(storage, args)
+    finally:
+        await storage.close()
+
+def main(argv=None):
+    """Run maintenance command."""
+    args = build_parser().parse_args(argv)
+    try:
+        asyncio.run(run(args))
+    except Exception as e:
+        logger.error(f"Error running {args.command}: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
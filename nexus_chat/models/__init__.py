@@ -1,5 +1,7 @@
 """Models package."""
 from .message import Message
-from .chat_session import ChatSession
+from .chat_session import ChatSession, SessionSummary
+from .conversation_tree import ConversationTree
+from .search import SearchHit
 
-__all__ = ["Message", "ChatSession"]
\ No newline at end of file
+__all__ = ["Message", "ChatSession", "SessionSummary", "ConversationTree", "SearchHit"]
\ No newline at end of file
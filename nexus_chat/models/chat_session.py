@@ -1,45 +1,120 @@
 """Chat session model."""
 import uuid
+from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import Dict, Any, Iterable, List, Optional, Union
+
+from nexus_chat.models.conversation_tree import ConversationTree
+from nexus_chat.models.message import Message, MessageRole
+from nexus_chat.utils.constants import DATABASE
+from nexus_chat.utils.message_ring import MessageRing
+from nexus_chat.utils.timestamps import from_epoch_ms, parse_epoch_ms, to_epoch_ms
 
 class ChatSession:
-    """Chat session model."""
+    """Chat session model.
+    
+    Messages in memory are indexed by ``tree``, which follows their
+    ``parent_id`` links so the session can hold several branches that
+    share a prefix. Messages evicted from the ring leave the index too.
+    """
     
-    def __init__(self, model: str):
-        """Initialize chat session."""
-        self.id = str(uuid.uuid4())
+    def __init__(
+        self,
+        model: str,
+        id: Optional[str] = None,
+        name: Optional[str] = None,
+        system_prompt: Optional[str] = None,
+        active: bool = True,
+        created_at: Optional[datetime] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        max_messages: Optional[int] = DATABASE["MAX_HISTORY"]
+    ):
+        """Initialize chat session.
+        
+        Args:
+            model: Model name
+            id: Optional session id, generated if omitted
+            name: Optional display name
+            system_prompt: Optional system prompt
+            active: Whether the session is active
+            created_at: Optional creation time
+            metadata: Optional session metadata
+            max_messages: Messages kept in memory, older ones stay in storage
+        """
+        self.id = id or str(uuid.uuid4())
         self.model = model
-        self.name = f"Chat with {model}"
-        self.created_at = datetime.now().isoformat()
-        self.messages: List[Dict[str, Any]] = []
-    
-    def add_message(self, role: str, content: str) -> Dict[str, Any]:
-        """Add a message to the session."""
-        message = {
-            "role": role,
-            "content": content,
-            "timestamp": datetime.now().isoformat()
-        }
+        self.name = name or f"Chat with {model}"
+        self.system_prompt = system_prompt
+        self.active = active
+        self.created_at = created_at or datetime.now()
+        self.metadata = metadata or {}
+        self.tree = ConversationTree()
+        self.messages = MessageRing(capacity=max_messages, on_evict=self.tree.discard)
+    
+    @property
+    def branch(self) -> List[Message]:
+        """Messages of the selected branch in memory, oldest first."""
+        return self.tree.path(self.tree.leaf_id)
+    
+    def add(self, message: Message, select: bool = True) -> None:
+        """Add an existing message to the session.
+        
+        Args:
+            message: Message to add, linked to its parent by ``parent_id``
+            select: Whether the message becomes the tip of the selected branch
+        """
+        self.tree.add(message, select)
         self.messages.append(message)
+    
+    def extend(self, messages: Iterable[Message]) -> None:
+        """Add messages, oldest first, selecting the branch of the last one."""
+        for message in messages:
+            self.add(message)
+    
+    def add_message(self, role: Union[MessageRole, str], content: str) -> Message:
+        """Add a message to the session, continuing the selected branch."""
+        message = Message(
+            role=role,
+            content=content,
+            model=self.model,
+            session_id=self.id,
+            parent_id=self.tree.leaf_id
+        )
+        self.add(message)
         return message
     
     def to_dict(self) -> Dict[str, Any]:
-        """Convert session to dictionary."""
+        """Convert session to dictionary, with ``created_at`` in epoch milliseconds."""
         return {
             "id": self.id,
             "model": self.model,
             "name": self.name,
-            "created_at": self.created_at,
-            "messages": self.messages
+            "created_at": to_epoch_ms(self.created_at),
+            "messages": [message.to_dict() for message in self.messages]
         }
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "ChatSession":
         """Create session from dictionary."""
-        session = cls(data["model"])
-        session.id = data["id"]
-        session.name = data["name"]
-        session.created_at = data["created_at"]
-        session.messages = data["messages"]
+        session = cls(
+            data["model"],
+            id=data["id"],
+            name=data["name"],
+            created_at=from_epoch_ms(parse_epoch_ms(data["created_at"]))
+        )
+        session.extend(Message.from_dict(message) for message in data["messages"])
         return session
+
+@dataclass
+class SessionSummary:
+    """Session listing entry with message statistics."""
+    id: str
+    name: str
+    model: str
+    active: bool
+    created_at: datetime
+    updated_at: datetime
+    message_count: int = 0
+    total_tokens: int = 0
+    last_message_at: Optional[datetime] = None
+    last_message_preview: Optional[str] = None
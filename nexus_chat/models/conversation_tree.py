@@ -0,0 +1,125 @@
+"""Conversation tree model."""
+from typing import Dict, Iterable, List, Optional
+
+from .message import Message
+
+class ConversationTree:
+    """In-memory index of a session's messages by ``parent_id``.
+    
+    Each message points at the message it follows, so editing a message
+    or regenerating an answer adds a sibling and the branches share
+    their common prefix without copying it. ``leaf_id`` marks the tip of
+    the selected branch; its path is found by following parents, in
+    O(depth).
+    """
+    
+    def __init__(self):
+        """Initialize conversation tree."""
+        self.nodes: Dict[str, Message] = {}
+        # Child ids per parent id in insertion order, None holds the roots
+        self.children: Dict[Optional[str], List[str]] = {}
+        self.leaf_id: Optional[str] = None
+    
+    def __len__(self) -> int:
+        return len(self.nodes)
+    
+    def __contains__(self, message_id: str) -> bool:
+        return message_id in self.nodes
+    
+    def add(self, message: Message, select: bool = True) -> None:
+        """Index a message under its parent.
+        
+        Args:
+            message: Message to index
+            select: Whether the message becomes the tip of the selected branch
+        """
+        if message.id not in self.nodes:
+            self.children.setdefault(message.parent_id, []).append(message.id)
+        self.nodes[message.id] = message
+        if select:
+            self.leaf_id = message.id
+    
+    def discard(self, messages: Iterable[Message]) -> None:
+        """Drop messages from the index, keeping their children.
+        
+        Args:
+            messages: Messages to drop, such as those evicted from memory
+        """
+        for message in messages:
+            if self.nodes.pop(message.id, None) is None:
+                continue
+            siblings = self.children.get(message.parent_id)
+            if siblings and message.id in siblings:
+                siblings.remove(message.id)
+                if not siblings and message.parent_id not in self.nodes:
+                    del self.children[message.parent_id]
+    
+    def path(self, leaf_id: Optional[str]) -> List[Message]:
+        """Messages from the root down to a message.
+        
+        Stops early at an ancestor that is not in memory.
+        
+        Args:
+            leaf_id: Last message of the path, such as ``leaf_id``; None,
+                the parent of a root message, gives an empty path
+        
+        Returns:
+            Messages of the branch, oldest first
+        """
+        path = []
+        message = self.nodes.get(leaf_id)
+        while message is not None:
+            path.append(message)
+            message = self.nodes.get(message.parent_id)
+        path.reverse()
+        return path
+    
+    def get_children(self, message_id: Optional[str]) -> List[Message]:
+        """Messages following a message, oldest first.
+        
+        Args:
+            message_id: Parent message id, None for the roots
+        """
+        return [
+            self.nodes[child_id]
+            for child_id in self.children.get(message_id, ())
+            if child_id in self.nodes
+        ]
+    
+    def siblings(self, message_id: str) -> List[Message]:
+        """Alternatives of a message, itself included, oldest first.
+        
+        Args:
+            message_id: Message id
+        """
+        return self.get_children(self.nodes[message_id].parent_id)
+    
+    def latest_leaf(self, message_id: str) -> str:
+        """Tip of the newest branch below a message.
+        
+        Args:
+            message_id: Message id
+        
+        Returns:
+            Id of the last message reached by following the newest children
+        """
+        while True:
+            children = self.children.get(message_id)
+            live = [child_id for child_id in children or () if child_id in self.nodes]
+            if not live:
+                return message_id
+            message_id = live[-1]
+    
+    def select(self, message_id: str) -> List[Message]:
+        """Switch to the branch through a message.
+        
+        Args:
+            message_id: Message on the branch, usually one of several siblings
+        
+        Returns:
+            Messages of the selected branch, oldest first
+        """
+        if message_id not in self.nodes:
+            raise KeyError(message_id)
+        self.leaf_id = self.latest_leaf(message_id)
+        return self.path(self.leaf_id)
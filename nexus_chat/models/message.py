@@ -1,8 +1,12 @@
 """Message model."""
-from dataclasses import dataclass
+import json
+import sys
+import uuid
 from datetime import datetime
-from enum import Enum, auto
-from typing import Optional, Dict, Any
+from enum import Enum
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+from nexus_chat.utils.timestamps import from_epoch_ms, now_ms, parse_epoch_ms, to_epoch_ms
 
 class MessageRole(Enum):
     """Message role enum."""
@@ -13,44 +17,235 @@ class MessageRole(Enum):
     def __str__(self):
         return self.value
 
-@dataclass
+class MessageStatus(Enum):
+    """Message status enum."""
+    PENDING = "pending"
+    STREAMING = "streaming"
+    COMPLETE = "complete"
+    ERROR = "error"
+    
+    def __str__(self):
+        return self.value
+
+# Lookup tables for decoding stored values without calling the enums
+ROLES_BY_VALUE = {role.value: role for role in MessageRole}
+STATUSES_BY_VALUE = {status.value: status for status in MessageStatus}
+ROLES_BY_VALUE.update({role: role for role in MessageRole})
+STATUSES_BY_VALUE.update({status: status for status in MessageStatus})
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    """Intern a string repeated across many messages, such as a model name."""
+    return sys.intern(value) if value is not None else None
+
 class Message:
-    """Message model."""
-    
-    role: MessageRole
-    content: str
-    model: Optional[str] = None
-    created_at: datetime = None
-    id: Optional[str] = None
-    
-    def __post_init__(self):
-        """Initialize message."""
-        if self.created_at is None:
-            self.created_at = datetime.now()
-            
-        # Convert string role to enum if needed
-        if isinstance(self.role, str):
-            self.role = MessageRole(self.role)
+    """Message model.
+    
+    The one message type used by the GUI, history, storage and the
+    Ollama client. Instances use ``__slots__`` instead of a per-instance
+    dict; roles and statuses are shared enum members, and model names
+    and session ids are interned. The creation time is held as epoch
+    milliseconds and ``created_at`` builds the datetime on access.
+    Metadata read from storage stays as JSON until first accessed and is
+    written back unchanged if never touched.
+    """
+    
+    __slots__ = (
+        "id", "session_id", "content", "role", "model",
+        "parent_id", "status", "error", "_created_ms",
+        "_metadata", "_metadata_json"
+    )
+    
+    # Column order of the rows ``from_row`` reads and ``to_row`` writes
+    ROW_COLUMNS: Tuple[str, ...] = (
+        "id", "session_id", "content", "role", "model",
+        "parent_id", "status", "error", "created_at", "metadata"
+    )
+    
+    def __init__(
+        self,
+        role: Union[MessageRole, str],
+        content: str,
+        model: Optional[str] = None,
+        created_at: Optional[datetime] = None,
+        id: Optional[str] = None,
+        session_id: Optional[str] = None,
+        parent_id: Optional[str] = None,
+        status: Union[MessageStatus, str] = MessageStatus.COMPLETE,
+        error: Optional[str] = None,
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        """Initialize message.
+        
+        Args:
+            role: Message role, enum member or value
+            content: Message text
+            model: Optional model name
+            created_at: Optional creation time, defaults to now
+            id: Optional message id, generated if omitted
+            session_id: Optional session id
+            parent_id: Optional id of the message this one answers
+            status: Message status, enum member or value
+            error: Optional error of a failed message
+            metadata: Optional message metadata
+        """
+        self.id = id or str(uuid.uuid4())
+        self.session_id = _intern(session_id)
+        self.content = content
+        self.role = ROLES_BY_VALUE[role]
+        self.model = _intern(model)
+        self.parent_id = parent_id
+        self.status = STATUSES_BY_VALUE[status]
+        self.error = error
+        self._created_ms = now_ms() if created_at is None else to_epoch_ms(created_at)
+        self._metadata = metadata or None
+        self._metadata_json = None
+    
+    @property
+    def created_at(self) -> datetime:
+        """Creation time, built from the stored milliseconds."""
+        return from_epoch_ms(self._created_ms)
+    
+    @created_at.setter
+    def created_at(self, value: datetime) -> None:
+        self._created_ms = to_epoch_ms(value)
+    
+    @property
+    def created_ms(self) -> int:
+        """Creation time in milliseconds since the epoch."""
+        return self._created_ms
+    
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        """Message metadata, parsed from stored JSON on first access."""
+        if self._metadata is None:
+            raw, self._metadata_json = self._metadata_json, None
+            self._metadata = json.loads(raw) if raw else {}
+        return self._metadata
+    
+    @metadata.setter
+    def metadata(self, value: Dict[str, Any]) -> None:
+        self._metadata = value
+        self._metadata_json = None
+    
+    @property
+    def images(self) -> List[str]:
+        """Hashes of the images attached to the message, see ``ImageStore``."""
+        if self._metadata is None and '"images"' not in (self._metadata_json or ""):
+            # Most messages have none; their metadata stays unparsed
+            return []
+        return self.metadata.get("images", [])
+    
+    @property
+    def message_id(self) -> str:
+        """Storage-facing alias for ``id``."""
+        return self.id
+    
+    @property
+    def timestamp(self) -> datetime:
+        """Storage-facing alias for ``created_at``."""
+        return self.created_at
+    
+    def __eq__(self, other: Any) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self.to_row()[:-1] == other.to_row()[:-1] and self.metadata == other.metadata
+    
+    __hash__ = None
+    
+    def __repr__(self) -> str:
+        return (
+            f"Message(id={self.id!r}, role={self.role.value!r}, "
+            f"status={self.status.value!r}, content={self.content[:40]!r})"
+        )
+    
+    @classmethod
+    def from_row(cls, row: Sequence[Any]) -> "Message":
+        """Create message from a database row.
+        
+        Args:
+            row: Values of ``ROW_COLUMNS``, in that order
+        """
+        message = cls.__new__(cls)
+        (
+            message.id, session_id, message.content, role, model,
+            message.parent_id, status, message.error,
+            message._created_ms, message._metadata_json
+        ) = row
+        message.session_id = _intern(session_id)
+        message.role = ROLES_BY_VALUE[role]
+        message.model = _intern(model)
+        message.status = STATUSES_BY_VALUE[status]
+        message._metadata = None
+        return message
+    
+    def to_row(self) -> Tuple:
+        """Convert message to database row values, in ``ROW_COLUMNS`` order."""
+        if self._metadata is None:
+            metadata = self._metadata_json
+        else:
+            metadata = json.dumps(self._metadata) if self._metadata else None
+        return (
+            self.id,
+            self.session_id,
+            self.content,
+            self.role.value,
+            self.model,
+            self.parent_id,
+            self.status.value,
+            self.error,
+            self._created_ms,
+            metadata
+        )
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> "Message":
-        """Create message from dictionary."""
-        return cls(
+        """Create message from dictionary.
+        
+        ``created_at`` is in epoch milliseconds; the ISO strings and the
+        ``timestamp`` key of dicts written by older versions of
+        ``ChatSession`` and the history file are read too.
+        """
+        created_at = data.get("created_at") or data.get("timestamp")
+        message = cls(
             id=data.get("id"),
-            role=MessageRole(data["role"]),
+            role=data["role"],
             content=data["content"],
             model=data.get("model"),
-            created_at=datetime.fromisoformat(data["created_at"])
-            if "created_at" in data
-            else None
+            session_id=data.get("session_id"),
+            parent_id=data.get("parent_id"),
+            status=data.get("status", MessageStatus.COMPLETE),
+            error=data.get("error"),
+            metadata=data.get("metadata")
         )
+        if created_at:
+            message._created_ms = parse_epoch_ms(created_at)
+        return message
     
     def to_dict(self) -> Dict[str, Any]:
-        """Convert message to dictionary."""
+        """Convert message to dictionary, with ``created_at`` in epoch milliseconds."""
         return {
             "id": self.id,
-            "role": str(self.role),
+            "role": self.role.value,
             "content": self.content,
             "model": self.model,
-            "created_at": self.created_at.isoformat()
+            "created_at": self._created_ms,
+            "session_id": self.session_id,
+            "parent_id": self.parent_id,
+            "status": self.status.value,
+            "error": self.error,
+            "metadata": self.metadata
         }
+    
+    def to_api(self, images: Optional[Mapping[str, str]] = None) -> Dict[str, Any]:
+        """Convert message to an Ollama chat API message.
+        
+        Args:
+            images: Optional base64 images by hash; the message's images
+                found there are sent with it
+        """
+        data: Dict[str, Any] = {"role": self.role.value, "content": self.content}
+        if images:
+            attached = [images[image] for image in self.images if image in images]
+            if attached:
+                data["images"] = attached
+        return data
@@ -0,0 +1,18 @@
+"""Search result model."""
+from dataclasses import dataclass
+from datetime import datetime
+
+from .message import MessageRole
+
+@dataclass
+class SearchHit:
+    """A message matching a search query."""
+    message_id: str
+    session_id: str
+    session_name: str
+    role: MessageRole
+    model: str
+    created_at: datetime
+    snippet: str
+    score: float
+    archived: bool = False
@@ -45,6 +45,7 @@ class AppSettings:
         "academic": "You are a knowledgeable academic assistant."
     })
     max_history: int = 100
+    max_history_memory: int = 64  # MB
     stream_responses: bool = True
     
     # Storage Settings
@@ -53,6 +54,10 @@ class AppSettings:
     auto_save: bool = True
     backup_enabled: bool = True
     backup_interval: int = 24  # hours
+    retention_enabled: bool = True
+    retention_max_age: Optional[int] = 180  # days
+    retention_max_sessions: Optional[int] = None
+    retention_max_size: Optional[int] = None  # MB
     
     # Logging Settings
     log_level: str = "INFO"
@@ -276,3 +281,7 @@ class AppSettings:
         """Remove model from favorites."""
         if model_name in self.favorite_models:
             self.favorite_models.remove(model_name)
+
+def default_model_configs() -> Dict[str, ModelConfig]:
+    """Built-in model configurations, without creating the data directory."""
+    return AppSettings.__dataclass_fields__["model_configs"].default_factory()
@@ -92,6 +92,53 @@ MODEL_SELECTOR_DEFAULTS = {
     "BUTTON_WIDTH": 100,
 }
 
+# Generation requests sent to the Ollama host at once
+SCHEDULER = {
+    "MAX_PARALLEL": 4,  # generations running at once, as OLLAMA_NUM_PARALLEL
+    "MAX_MODELS": 3,  # models generating at once, as OLLAMA_MAX_LOADED_MODELS
+    "MAX_WAIT": 10.0,  # seconds a request waits before it is served first
+}
+
+# Best-of-N sampling of one model
+BEST_OF = {
+    "N": 4,  # candidates sampled per message
+    "CHECK_CHARS": 200,  # characters generated between scores of a candidate
+    "MARGIN": 0.15,  # score gap behind the best at which a candidate is cancelled
+    "COMMIT_CHARS": 1200,  # length at which the leading candidate wins
+    "STOP_PHRASES": ("as an ai language model", "i cannot help with"),
+}
+
+# Routing of prompts to the smallest adequate model
+ROUTER = {
+    "LONG_PROMPT": 600,  # characters past which a prompt needs a large model
+    "LARGE_SIZE": 6.0,  # billions of parameters of a large model
+    "REFRESH": 30,  # seconds the lists of installed and loaded models are reused
+    "LATENCY_WEIGHT": 0.2,  # weight of the latest answer in a model's average latency
+}
+
+# Tuning of num_thread, num_batch and num_ctx for a host
+TUNER = {
+    "PROMPTS": (
+        "Summarize the causes of the French Revolution in a paragraph.",
+        "Write a Python function that merges two sorted lists, with a docstring.",
+        "Explain how a hash table handles collisions, with an example.",
+    ),
+    "TRIALS": 3,  # timed rounds of the prompts per set of options
+    "NUM_PREDICT": 128,  # tokens generated per prompt
+    "BATCHES": (128, 256, 512),  # num_batch values tried
+    "CONTEXTS": (2048, 4096, 8192),  # num_ctx values tried
+    "OUTLIER_LIMIT": 3.0,  # median absolute deviations past which a trial is dropped
+    "TOLERANCE": 0.03,  # relative slowdown within which options count as fastest
+    "REFERENCE_PROMPT_TOKENS": 512,  # prompt of the request options are ranked by
+    "REFERENCE_EVAL_TOKENS": 256,  # answer of the request options are ranked by
+}
+
+# Metadata of installed models from /api/show
+MODEL_METADATA = {
+    "REFRESH": 30,  # seconds before /api/tags is checked for changed digests
+    "LOAD_RATE": 200,  # MB/s a model is assumed to load at, for timeouts
+}
+
 API_CONSTANTS = {
     # API settings
     "OLLAMA_API_URL": "http://localhost:11434",
@@ -111,6 +158,7 @@ CHAT_WINDOW = {
 
 MODEL_DEFAULTS = {
     "DEFAULT_MODEL": "llama2",
+    "EMBEDDING_MODEL": "nomic-embed-text",
     "CONTEXT_LENGTH": 4096,
     "MAX_TOKENS": 2048,
     "TEMPERATURE": 0.7,
@@ -154,8 +202,58 @@ LOGGING = {
 
 # Storage Constants
 DATABASE = {
-    "MAX_HISTORY": 100,
+    "MAX_HISTORY": 100,  # messages kept in memory per session
+    "MAX_HISTORY_MEMORY": 64,  # MB of message content kept in memory overall
     "BACKUP_INTERVAL": 24,  # hours
     "MAX_BACKUP_AGE": 30,   # days
-    "MAX_BACKUP_SIZE": 100  # MB
+    "MAX_BACKUP_SIZE": 100,  # MB
+    "MAX_BACKUP_COUNT": 10,
+    "BACKUP_STEP_PAGES": 1024,  # pages copied per online backup step
+    "BACKUP_STEP_SLEEP": 0.01,  # seconds between backup steps
+    "READER_POOL_SIZE": 4,
+    "CACHE_SIZE": 64,  # MB per connection
+    "MMAP_SIZE": 256,  # MB
+    "CACHED_STATEMENTS": 256,
+    "GROUP_COMMIT_WINDOW": 0.002,  # seconds
+    "GROUP_COMMIT_MAX_BATCH": 500,
+    "PAGE_SIZE": 50,  # messages per lazily loaded page
+    "MAX_LOADED_PAGES": 4,
+    "PREVIEW_LENGTH": 120,  # characters of last message in session summaries
+    "STREAM_FLUSH_INTERVAL": 0.5,  # seconds between writes of a streaming message
+    "STREAM_FLUSH_CHARS": 4096,  # new characters forcing an earlier write
+    "RETENTION_INTERVAL": 6,  # hours between retention runs
+    "RETENTION_MAX_AGE": 180,  # days of inactivity before a session is archived
+    "RETENTION_INACTIVE_AFTER": 7,  # days without activity before an open session counts as inactive
+    "ARCHIVE_BATCH_SIZE": 50,  # sessions archived per transaction
+    "VACUUM_STEP_PAGES": 256,  # pages released per incremental vacuum step
+    "VACUUM_STEP_SLEEP": 0.05,  # seconds between vacuum steps
+    "BLOB_THRESHOLD": 8192,  # bytes of content stored once in the blob table
+    "BLOB_CACHE_SIZE": 32,  # MB of decompressed blobs kept in memory
+    "TRANSFER_BATCH_SIZE": 1000,  # records per batch of session exports, imports and syncs
+    "SYNC_INTERVAL": 0.25,  # hours between syncs through the shared directory
+    "EMBEDDING_BATCH_SIZE": 64,  # messages embedded per request and transaction
+    "EMBEDDING_INTERVAL": 0.25  # hours between indexing passes over new messages
+}
+
+# Documents attached to sessions for retrieval
+DOCUMENTS = {
+    "SUFFIXES": (
+        ".txt", ".md", ".markdown", ".rst", ".py", ".js", ".ts", ".java", ".c",
+        ".h", ".cpp", ".go", ".rs", ".json", ".yaml", ".yml", ".toml", ".csv",
+        ".html", ".css", ".sh", ".sql",
+    ),
+    "MAX_FILE_SIZE": 16,  # MB, larger files are skipped
+    "CHUNK_TOKENS": 300,  # estimated tokens per passage
+    "CONTEXT_TOKENS": 1024,  # estimated tokens of passages added to a prompt
+    "TOP_K": 8,  # passages retrieved per prompt
+    "INGEST_INTERVAL": 1,  # hours between scans of attached folders
+}
+
+# Images attached to messages for vision models
+IMAGES = {
+    "MAX_SIDE": 1344,  # pixels of the longer side, larger images are scaled down
+    "QUALITY": 90,  # JPEG quality of re-encoded images
+    "MAX_FILE_SIZE": 32,  # MB, larger files are refused
+    "CACHE_SIZE": 32,  # MB of encoded images kept in memory
+    "GC_GRACE": 24,  # hours an image no message refers to is kept
 }
@@ -0,0 +1,120 @@
+"""Bounded message ring module."""
+import logging
+from collections import deque
+from typing import Any, Callable, Deque, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+def message_size(message: Any) -> int:
+    """Approximate in-memory size of a message's content in bytes.
+    
+    Args:
+        message: Message object
+    
+    Returns:
+        Size of the message content
+    """
+    return len(message.content or "")
+
+class MessageRing:
+    """Bounded in-memory tail of a conversation.
+    
+    Holds at most ``capacity`` of the newest messages. When a new message
+    pushes the ring over capacity, the oldest messages are evicted and
+    handed to ``on_evict`` so the owner can spill them to storage.
+    ``evicted`` counts how many older messages exist outside the ring.
+    """
+    
+    def __init__(
+        self,
+        capacity: Optional[int] = None,
+        on_evict: Optional[Callable[[List[Any]], None]] = None
+    ):
+        """Initialize message ring.
+        
+        Args:
+            capacity: Maximum number of messages kept in memory, None for unbounded
+            on_evict: Optional callback receiving evicted messages, oldest first
+        """
+        self.capacity = capacity
+        self.on_evict = on_evict
+        self.evicted = 0
+        self.nbytes = 0
+        self._items: Deque[Any] = deque()
+    
+    def append(self, message: Any) -> List[Any]:
+        """Append message, evicting the oldest ones if over capacity.
+        
+        Args:
+            message: Message to append
+        
+        Returns:
+            Evicted messages, oldest first
+        """
+        self._items.append(message)
+        self.nbytes += message_size(message)
+        if self.capacity is not None and len(self._items) > self.capacity:
+            return self.evict(len(self._items) - self.capacity)
+        return []
+    
+    def extend(self, messages: Iterable[Any]) -> List[Any]:
+        """Append several messages.
+        
+        Args:
+            messages: Messages to append, oldest first
+        
+        Returns:
+            Evicted messages, oldest first
+        """
+        evicted = []
+        for message in messages:
+            evicted.extend(self.append(message))
+        return evicted
+    
+    def evict(self, count: int = 1) -> List[Any]:
+        """Evict the oldest messages from the ring.
+        
+        Args:
+            count: Number of messages to evict
+        
+        Returns:
+            Evicted messages, oldest first
+        """
+        evicted = []
+        while self._items and len(evicted) < count:
+            message = self._items.popleft()
+            self.nbytes -= message_size(message)
+            evicted.append(message)
+        
+        if evicted:
+            self.evicted += len(evicted)
+            logger.debug(f"Evicted {len(evicted)} messages from ring")
+            if self.on_evict:
+                self.on_evict(evicted)
+        
+        return evicted
+    
+    def clear(self) -> None:
+        """Drop all messages, in memory and spilled."""
+        self._items.clear()
+        self.evicted = 0
+        self.nbytes = 0
+    
+    def __len__(self) -> int:
+        return len(self._items)
+    
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._items)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(self._items)[index]
+        return self._items[index]
+    
+    def __bool__(self) -> bool:
+        return bool(self._items)
+    
+    @property
+    def total(self) -> int:
+        """Total messages in the conversation, in memory and spilled."""
+        return self.evicted + len(self._items)
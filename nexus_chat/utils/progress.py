@@ -0,0 +1,6 @@
+"""Progress reporting types."""
+from typing import Callable
+
+# Receives (done, total) units of work, such as copied pages or
+# processed sessions, bytes or files
+ProgressCallback = Callable[[int, int], None]
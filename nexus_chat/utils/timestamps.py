@@ -0,0 +1,45 @@
+"""Epoch millisecond timestamp helpers."""
+from datetime import datetime
+from typing import Union
+
+def to_epoch_ms(value: datetime) -> int:
+    """Convert a naive local datetime to milliseconds since the epoch.
+    
+    Args:
+        value: Datetime to convert
+    
+    Returns:
+        Integer milliseconds, as stored in the database
+    """
+    return round(value.timestamp() * 1000)
+
+def from_epoch_ms(value: int) -> datetime:
+    """Convert milliseconds since the epoch to a naive local datetime.
+    
+    Args:
+        value: Integer milliseconds, as stored in the database
+    
+    Returns:
+        Local datetime
+    """
+    return datetime.fromtimestamp(value / 1000)
+
+def parse_epoch_ms(value: Union[int, str]) -> int:
+    """Read a timestamp from an export or history file.
+    
+    Current files store epoch milliseconds; older ones ISO strings,
+    which are naive local times unless they carry an offset.
+    
+    Args:
+        value: Epoch milliseconds or ISO timestamp
+    
+    Returns:
+        Integer milliseconds since the epoch
+    """
+    if isinstance(value, str):
+        return to_epoch_ms(datetime.fromisoformat(value))
+    return int(value)
+
+def now_ms() -> int:
+    """Current time in milliseconds since the epoch."""
+    return to_epoch_ms(datetime.now())
@@ -11,5 +11,14 @@ setup(
         "pytest>=7.0.0",
         "pytest-asyncio>=0.20.0",
     ],
+    extras_require={
+        # Semantic search and document retrieval
+        "semantic": ["numpy>=1.24"],
+        # Parquet session export and import
+        "parquet": ["pyarrow>=14.0"],
+        # Image attachments for vision models
+        "images": ["Pillow>=10.0"],
+        "all": ["numpy>=1.24", "pyarrow>=14.0", "Pillow>=10.0"],
+    },
     python_requires=">=3.8",
 )
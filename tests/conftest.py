@@ -0,0 +1,67 @@
+"""Shared fixtures."""
+import asyncio
+import json
+
+import pytest_asyncio
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from nexus_chat.backend.ollama_client import OllamaClient
+from nexus_chat.backend.storage_manager import StorageManager
+
+class FakeOllama:
+    """Ollama server answering ``/api/chat`` and recording each request.
+    
+    ``answer`` and ``stats`` hold the reply and the timings of the final
+    chunk, or functions computing them from the request. ``delay`` seconds pass before each
+    word, and ``max_running`` records the most requests answered at once.
+    """
+    
+    def __init__(self):
+        self.requests = []
+        self.answer = "Hello"
+        self.stats = {"eval_count": 1, "eval_duration": 1_000_000}
+        self.delay = 0.0
+        self.running = 0
+        self.max_running = 0
+    
+    async def chat(self, request: web.Request) -> web.StreamResponse:
+        payload = await request.json()
+        self.requests.append(payload)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            response = web.StreamResponse()
+            await response.prepare(request)
+            answer = self.answer(payload) if callable(self.answer) else self.answer
+            for word in answer.split(" "):
+                await asyncio.sleep(self.delay)
+                chunk = {"message": {"role": "assistant", "content": word + " "}, "done": False}
+                await response.write(json.dumps(chunk).encode() + b"\n")
+            stats = self.stats(payload) if callable(self.stats) else self.stats
+            done = {"message": {"role": "assistant", "content": ""}, "done": True, **stats}
+            await response.write(json.dumps(done).encode() + b"\n")
+            await response.write_eof()
+            return response
+        finally:
+            self.running -= 1
+
+@pytest_asyncio.fixture
+async def ollama():
+    """Fake Ollama server and a client pointed at it."""
+    fake = FakeOllama()
+    app = web.Application()
+    app.router.add_post("/api/chat", fake.chat)
+    server = TestServer(app)
+    await server.start_server()
+    client = OllamaClient(str(server.make_url("")))
+    yield fake, client
+    await client.close()
+    await server.close()
+
+@pytest_asyncio.fixture
+async def storage(tmp_path):
+    """Storage manager on a fresh database."""
+    manager = StorageManager(tmp_path / "chat.db")
+    yield manager
+    await manager.close()
@@ -0,0 +1,79 @@
+"""Tests for the backup manager."""
+import gzip
+import os
+import shutil
+import sqlite3
+import time
+
+import pytest
+
+from nexus_chat.backend.backup_manager import BackupManager
+from nexus_chat.backend.retention_manager import RetentionManager
+from nexus_chat.models.chat_session import ChatSession
+from nexus_chat.models.message import Message, MessageRole
+
+def restore(snapshot, target):
+    """Gunzip a snapshot and open it."""
+    with gzip.open(snapshot, "rb") as src, open(target, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    db = sqlite3.connect(target)
+    assert db.execute("PRAGMA integrity_check").fetchone() == ("ok",)
+    return db
+
+@pytest.mark.asyncio
+async def test_snapshots_restore_with_their_archive(storage, tmp_path):
+    sessions = [ChatSession(model="llama3.2") for _ in range(2)]
+    for session in sessions:
+        await storage.save_session(session)
+        await storage.save_messages([
+            Message(
+                role=MessageRole.USER, content=f"message {i}", model="llama3.2",
+                session_id=session.id
+            )
+            for i in range(3)
+        ])
+    await RetentionManager(storage).archive_sessions([sessions[0].id])
+    manager = BackupManager(
+        storage.db_path, storage.archive_path, backup_dir=tmp_path / "backups",
+        step_pages=1, step_sleep=0
+    )
+    progress = []
+    
+    snapshot = await manager.backup(lambda copied, total: progress.append((copied, total)))
+    
+    assert manager.list_backups() == [snapshot]
+    assert progress[-1][0] == progress[-1][1]
+    db = restore(snapshot, tmp_path / "restored.db")
+    assert db.execute("SELECT id FROM chat_sessions").fetchall() == [(sessions[1].id,)]
+    assert db.execute("SELECT COUNT(*) FROM messages").fetchone() == (3,)
+    db.close()
+    archive = restore(manager.archive_snapshot(snapshot), tmp_path / "restored-archive.db")
+    assert archive.execute("SELECT id FROM archived_sessions").fetchall() == [(sessions[0].id,)]
+    assert archive.execute("SELECT COUNT(*) FROM archived_messages").fetchone() == (3,)
+    archive.close()
+
+@pytest.mark.asyncio
+async def test_rotation_removes_old_snapshots_with_their_archives(storage, tmp_path):
+    await storage.save_session(ChatSession(model="llama3.2"))
+    manager = BackupManager(
+        storage.db_path, storage.archive_path, backup_dir=tmp_path, max_age=1, max_count=2
+    )
+    now = time.time()
+    old = {}
+    # Within max_age, beyond max_count, and older than max_age
+    for stamp, age in [
+        ("20250103-000000", 3600), ("20250102-000000", 7200), ("20250101-000000", 2 * 86400)
+    ]:
+        snapshot = manager.backup_dir / f"chat-{stamp}.db.gz"
+        for path in (snapshot, manager.archive_snapshot(snapshot)):
+            path.write_bytes(b"")
+            os.utime(path, (now - age, now - age))
+        old[stamp] = snapshot
+    
+    snapshot = await manager.backup()
+    
+    assert manager.list_backups() == [snapshot, old["20250103-000000"]]
+    assert sorted(path.name for path in tmp_path.glob("*.gz")) == sorted([
+        snapshot.name, manager.archive_snapshot(snapshot).name,
+        "chat-20250103-000000.db.gz", "chat-archive-20250103-000000.db.gz",
+    ])
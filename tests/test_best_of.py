@@ -0,0 +1,94 @@
+"""Tests for best-of-N sampling."""
+import asyncio
+
+import pytest
+
+from nexus_chat.backend.best_of import BestOfSampler
+from nexus_chat.backend.chat_manager import ChatManager
+from nexus_chat.backend.history_manager import HistoryManager
+from nexus_chat.backend.request_scheduler import RequestScheduler
+from nexus_chat.models.message import MessageStatus
+
+# Distinct words score high, a loop of one word low
+GOOD = " ".join(f"word{i}" for i in range(120))
+LOOP = " ".join(["again"] * 120)
+
+class ScriptedClient:
+    """Ollama client answering by the temperature of each candidate."""
+    
+    def __init__(self, answers):
+        self.answers = answers
+        self.started = []
+        self.running = 0
+        self.max_running = 0
+    
+    async def chat_stream(self, model, message, context=None, options=None, **kwargs):
+        temperature = options["temperature"]
+        self.started.append(temperature)
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            for word in self.answers[temperature].split(" "):
+                await asyncio.sleep(0.001)
+                yield word + " "
+        finally:
+            self.running -= 1
+
+@pytest.mark.asyncio
+async def test_pruned_candidates_hand_their_slot_on():
+    client = ScriptedClient({0.1: GOOD, 0.5: LOOP, 0.9: GOOD.replace("word", "term")})
+    scheduler = RequestScheduler(max_parallel=2)
+    sampler = BestOfSampler(client, check_chars=40, commit_chars=300)
+    streamed = []
+    running = []
+    
+    async def stream(text):
+        streamed.append(text)
+        running.append(scheduler.running)
+    
+    candidates = await sampler.sample(
+        "llama3.2", "hi", 3,
+        temperatures=[0.1, 0.5, 0.9],
+        stream=stream,
+        slots=lambda count: scheduler.slots("s", "llama3.2", count)
+    )
+    
+    winner, *losers = candidates
+    # Two slots granted together; the third candidate took the looping one's
+    assert client.started == [0.1, 0.5, 0.9]
+    assert client.max_running == 2
+    assert winner.options["temperature"] in (0.1, 0.9)
+    assert "".join(streamed) == winner.text
+    looping = next(c for c in losers if c.options["temperature"] == 0.5)
+    assert looping.lost and not looping.done
+    assert len(looping.text) < len(LOOP)
+    # Only the winner holds a slot once decided
+    assert running[-1] == 1
+    assert scheduler.running == 0
+
+@pytest.mark.asyncio
+async def test_best_of_streams_the_winner_through_storage(ollama, storage):
+    fake, client = ollama
+    fake.answer = lambda payload: LOOP if payload["options"]["temperature"] > 0.5 else GOOD
+    fake.delay = 0.001
+    scheduler = RequestScheduler(max_parallel=4)
+    manager = ChatManager(
+        client, HistoryManager(storage_manager=storage), storage, scheduler=scheduler
+    )
+    manager.set_model("llama3.2")
+    chunks = []
+    
+    answer = await manager.best_of(
+        "hi", n=2, callback=chunks.append, temperatures=[0.2, 0.8]
+    )
+    
+    assert fake.max_running == 2
+    assert answer == "".join(chunks) == GOOD + " "
+    session = manager.current_session
+    [stored_prompt, stored_answer] = await storage.get_messages(session.id)
+    assert stored_answer.content == answer
+    assert stored_answer.status is MessageStatus.COMPLETE
+    assert stored_answer.metadata["best_of"]["temperature"] == 0.2
+    assert stored_answer.metadata["best_of"]["cancelled"] == 1
+    assert session.branch[-1].id == stored_answer.id
+    assert scheduler.running == 0
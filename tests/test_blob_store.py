@@ -0,0 +1,77 @@
+"""Tests for the blob store."""
+import pytest
+
+from nexus_chat.backend.blob_store import BlobStore, content_hash
+from nexus_chat.models.chat_session import ChatSession
+from nexus_chat.models.message import Message, MessageRole, MessageStatus
+
+LOG = "\n".join(f"line {i}: request handled" for i in range(1000))
+
+async def blob_rows(storage):
+    async with storage.pool.reader() as db:
+        async with db.execute("SELECT hash, refcount FROM blobs") as cursor:
+            return {row[0]: row[1] for row in await cursor.fetchall()}
+
+async def stored_content(storage, message_id):
+    async with storage.pool.reader() as db:
+        async with db.execute(
+            "SELECT content, blob_hash FROM messages WHERE id = ?", (message_id,)
+        ) as cursor:
+            return tuple(await cursor.fetchone())
+
+async def session_with(storage, *contents):
+    session = ChatSession(model="llama3.2")
+    await storage.save_session(session)
+    messages = [
+        Message(role=MessageRole.USER, content=content, model="llama3.2", session_id=session.id)
+        for content in contents
+    ]
+    await storage.save_messages(messages)
+    return session, messages
+
+@pytest.mark.asyncio
+async def test_shared_bodies_are_counted_and_collected(storage):
+    first, [pasted, small] = await session_with(storage, LOG, "short")
+    second, [again] = await session_with(storage, LOG)
+    
+    assert await blob_rows(storage) == {content_hash(LOG): 2}
+    assert await stored_content(storage, pasted.id) == ("", content_hash(LOG))
+    assert await stored_content(storage, small.id) == ("short", None)
+    
+    # An edit moves its reference to the new body
+    again.content = LOG + "\nline 1000"
+    await storage.save_message(again)
+    assert await blob_rows(storage) == {content_hash(LOG): 1, content_hash(again.content): 1}
+    
+    await storage.delete_messages(second.id)
+    assert await storage.collect_garbage() == 1
+    assert await blob_rows(storage) == {content_hash(LOG): 1}
+    
+    storage.blobs._cache.clear()
+    [read, _] = await storage.get_messages(first.id)
+    assert read.content == LOG
+
+@pytest.mark.asyncio
+async def test_streaming_bodies_stay_inline_until_complete(storage):
+    session, [answer] = await session_with(storage, "")
+    answer.content = LOG
+    answer.status = MessageStatus.STREAMING
+    await storage.save_message(answer)
+    assert await stored_content(storage, answer.id) == (LOG, None)
+    
+    answer.status = MessageStatus.COMPLETE
+    await storage.save_message(answer)
+    
+    assert await stored_content(storage, answer.id) == ("", content_hash(LOG))
+    assert await blob_rows(storage) == {content_hash(LOG): 1}
+
+def test_cache_evicts_least_recently_used_bodies():
+    store = BlobStore(pool=None, cache_size=2500 / 1024 / 1024)
+    for name in "abc":
+        store._remember(name, name * 1000)
+    
+    assert list(store._cache) == ["b", "c"]
+    assert store._cached_bytes == 2000
+    # Bodies larger than the whole cache are not kept
+    store._remember("d", "d" * 3000)
+    assert "d" not in store._cache
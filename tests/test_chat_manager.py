@@ -0,0 +1,60 @@
+"""Tests for the chat manager."""
+import pytest
+
+from nexus_chat.backend.chat_manager import ChatManager
+from nexus_chat.backend.history_manager import HistoryManager
+from nexus_chat.backend.request_scheduler import RequestScheduler
+from nexus_chat.models.chat_session import ChatSession
+
+def sent(payload):
+    return [(message["role"], message["content"]) for message in payload["messages"]]
+
+@pytest.mark.asyncio
+async def test_prompt_is_sent_once_with_its_branch(ollama):
+    fake, client = ollama
+    manager = ChatManager(client, HistoryManager())
+    manager.set_model("llama3.2")
+    
+    answer = await manager.send_message("hi there")
+    assert sent(fake.requests[0]) == [("user", "hi there")]
+    
+    await manager.send_message("and again")
+    assert sent(fake.requests[1]) == [
+        ("user", "hi there"),
+        ("assistant", answer),
+        ("user", "and again")
+    ]
+    
+    # Editing the first message starts a branch from the root
+    first, = manager.current_session.tree.get_children(None)
+    await manager.edit_message(first.id, "hello there")
+    assert sent(fake.requests[2]) == [("user", "hello there")]
+    
+    await manager.regenerate(first.id)
+    assert sent(fake.requests[3]) == [("user", "hi there")]
+
+@pytest.mark.asyncio
+async def test_fan_out_respects_limits_and_stays_in_its_session(ollama):
+    fake, client = ollama
+    fake.answer = "one two three"
+    fake.delay = 0.02
+    history = HistoryManager()
+    scheduler = RequestScheduler(max_parallel=2, max_models=3)
+    manager = ChatManager(client, history, scheduler=scheduler)
+    manager.set_model("llama3.2")
+    
+    fan_out = await manager.fan_out("compare", ["a", "b", "c"])
+    session = manager.current_session
+    # Another session is opened while the answers stream
+    manager.current_session = ChatSession(model="llama3.2")
+    await history.open_session(manager.current_session)
+    runs = await fan_out.wait()
+    
+    assert fake.max_running == 2
+    assert [run.message.content for run in runs] == ["one two three "] * 3
+    assert {run.message.session_id for run in runs} == {session.id}
+    assert {m.id for m in session.tree.get_children(fan_out.prompt.id)} == {
+        run.message.id for run in runs
+    }
+    assert len(manager.current_session.tree) == 0
+    assert scheduler.running == scheduler.waiting == 0
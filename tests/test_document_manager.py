@@ -0,0 +1,120 @@
+"""Tests for document chunking and retrieval."""
+import os
+import re
+import zlib
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from nexus_chat.backend.document_manager import DocumentManager
+from nexus_chat.backend.document_reader import chunk_text
+from nexus_chat.models.chat_session import ChatSession
+
+MARKDOWN = """# Setup
+Install the package.
+
+## Database
+Run the migrations.
+
+```
+# not a heading
+
+still the same block
+```
+
+# Usage
+Start the server.
+"""
+
+PYTHON = """import os
+
+def load(path):
+    return open(path).read()
+
+class Store:
+    pass
+"""
+
+class HashingEmbedder:
+    """Ollama client embedding texts as bags of hashed words."""
+    
+    def __init__(self):
+        self.batches = []
+    
+    async def embed(self, model, texts):
+        self.batches.append(len(texts))
+        vectors = []
+        for text in texts:
+            vector = [0.0] * 64
+            vector[0] = 0.01
+            for word in re.findall(r"\w+", text.lower()):
+                vector[zlib.crc32(word.encode()) % 63 + 1] += 1.0
+            vectors.append(vector)
+        return vectors
+
+def test_markdown_is_cut_along_headings_and_fences():
+    chunks = chunk_text(MARKDOWN, ".md", max_tokens=300)
+    
+    assert [(heading, content) for heading, content, _ in chunks] == [
+        ("Setup", "# Setup\nInstall the package."),
+        (
+            "Setup > Database",
+            "## Database\nRun the migrations.\n\n```\n# not a heading\n\n"
+            "still the same block\n```"
+        ),
+        ("Usage", "# Usage\nStart the server."),
+    ]
+
+def test_python_is_cut_per_definition_and_long_blocks_are_split():
+    headings = [heading for heading, _, _ in chunk_text(PYTHON, ".py", max_tokens=300)]
+    assert headings == [None, "def load", "class Store"]
+    
+    text = "\n".join(f"line {i:03}" for i in range(100))
+    chunks = chunk_text(text, ".txt", max_tokens=20)
+    assert all(tokens <= 20 for _, _, tokens in chunks)
+    assert "\n".join(content for _, content, _ in chunks) == text
+
+@pytest.mark.asyncio
+async def test_ingestion_skips_unchanged_files_and_retrieval_follows_attachments(
+    storage, tmp_path
+):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "guide.md").write_text(MARKDOWN)
+    (docs / "store.py").write_text(PYTHON)
+    (docs / "image.png").write_bytes(b"\x89PNG\0")
+    session = ChatSession(model="llama3.2")
+    other = ChatSession(model="llama3.2")
+    for s in (session, other):
+        await storage.save_session(s)
+    manager = DocumentManager(storage, HashingEmbedder(), workers=1, batch_size=4)
+    try:
+        await manager.attach(session.id, str(docs))
+        
+        report = await manager.ingest()
+        assert (report.files, report.indexed, report.chunks) == (2, 2, 6)
+        
+        [best, *_] = await manager.retrieve(session.id, "how do I run the migrations")
+        assert best.path == str(docs / "guide.md")
+        assert best.heading == "Setup > Database"
+        assert await manager.retrieve(other.id, "run the migrations") == []
+        # Passages beyond the token budget are left out
+        passages = await manager.retrieve(session.id, "migrations", budget=20)
+        assert sum(passage.tokens for passage in passages) <= 20
+        
+        # Same size and mtime: not opened; new mtime, same content: not embedded
+        assert (await manager.ingest()).unchanged == 2
+        os.utime(docs / "store.py", ns=(0, 10 ** 18))
+        report = await manager.ingest()
+        assert (report.unchanged, report.indexed, report.chunks) == (2, 0, 0)
+        
+        (docs / "store.py").write_text(PYTHON + "\ndef save(path):\n    pass\n")
+        os.remove(docs / "guide.md")
+        report = await manager.ingest()
+        assert (report.indexed, report.removed, report.chunks) == (1, 1, 4)
+        assert [p.path for p in await manager.retrieve(session.id, "migrations")] == [
+            str(docs / "store.py")
+        ] * 4
+    finally:
+        await manager.stop()
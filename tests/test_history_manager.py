@@ -0,0 +1,115 @@
+"""Tests for the history manager."""
+import pytest
+
+from nexus_chat.backend.history_manager import HistoryManager
+from nexus_chat.models.chat_session import ChatSession
+from nexus_chat.models.message import Message, MessageRole
+
+class FakeStorage:
+    """Storage manager recording spilled messages."""
+    
+    def __init__(self):
+        self.saved = []
+    
+    async def save_session(self, session):
+        pass
+    
+    async def save_messages(self, messages):
+        self.saved.extend(messages)
+    
+    async def delete_messages(self, session_id):
+        count = len(self.saved)
+        self.saved = [m for m in self.saved if m.session_id != session_id]
+        return count - len(self.saved)
+
+def add(manager, session, content):
+    message = Message(
+        role=MessageRole.USER,
+        content=content,
+        session_id=session.id,
+        parent_id=session.tree.leaf_id
+    )
+    manager.add_message(message, session.id)
+    return message
+
+@pytest.mark.asyncio
+async def test_session_ring_is_capped_by_max_history():
+    storage = FakeStorage()
+    manager = HistoryManager(storage_manager=storage, max_history=3)
+    session = ChatSession(model="llama3.2")
+    await manager.open_session(session)
+    
+    messages = [add(manager, session, f"message {i}") for i in range(5)]
+    
+    assert manager.rings[session.id] is session.messages
+    assert [m.id for m in session.messages] == [m.id for m in messages[2:]]
+    # Evicted messages are no longer reachable from the tree
+    assert set(session.tree.nodes) == {m.id for m in messages[2:]}
+    assert [m.id for m in session.branch] == [m.id for m in messages[2:]]
+    
+    assert await manager.spill() == 2
+    assert storage.saved == messages[:2]
+
+@pytest.mark.asyncio
+async def test_global_memory_cap_releases_least_recent_session():
+    manager = HistoryManager(storage_manager=FakeStorage(), max_history=100)
+    manager.max_memory_bytes = 3000
+    old = ChatSession(model="llama3.2")
+    await manager.open_session(old)
+    for i in range(2):
+        add(manager, old, "x" * 1000)
+    
+    new = ChatSession(model="llama3.2")
+    await manager.open_session(new)
+    for i in range(2):
+        add(manager, new, "y" * 1000)
+    
+    assert manager.memory_bytes <= 3000
+    assert len(old.messages) == 1
+    assert len(old.tree) == 1
+    assert len(new.messages) == 2
+
+@pytest.mark.asyncio
+async def test_memory_total_follows_rings_and_drops_emptied_ones():
+    manager = HistoryManager(storage_manager=FakeStorage(), max_history=2)
+    manager.max_memory_bytes = 2500
+    old = ChatSession(model="llama3.2")
+    await manager.open_session(old)
+    for i in range(3):
+        add(manager, old, "x" * 1000)
+    assert manager.memory_bytes == 2000
+    
+    new = ChatSession(model="llama3.2")
+    await manager.open_session(new)
+    for i in range(2):
+        add(manager, new, "y" * 1000)
+    
+    # The emptied ring of the other session is forgotten
+    assert list(manager.rings) == [new.id]
+    assert old.id not in manager.sessions
+    assert manager.memory_bytes == 2000
+    
+    await manager.open_session(old)
+    assert manager.rings[old.id] is old.messages
+    manager.close_session(new.id)
+    assert list(manager.rings) == [old.id]
+    assert manager.memory_bytes == 0
+
+@pytest.mark.asyncio
+async def test_clear_history_deletes_spilled_messages():
+    storage = FakeStorage()
+    manager = HistoryManager(storage_manager=storage, max_history=2)
+    session = ChatSession(model="llama3.2")
+    await manager.open_session(session)
+    for i in range(4):
+        add(manager, session, f"message {i}")
+    await manager.spill()
+    add(manager, session, "queued")
+    
+    await manager.clear_history()
+    
+    assert session.messages.total == 0
+    assert len(session.tree) == 0
+    assert manager.memory_bytes == 0
+    assert storage.saved == []
+    assert await manager.spill() == 0
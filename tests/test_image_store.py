@@ -0,0 +1,77 @@
+"""Tests for image attachments."""
+import io
+
+import pytest
+import pytest_asyncio
+
+Image = pytest.importorskip("PIL.Image")
+
+from nexus_chat.backend import image_store
+from nexus_chat.backend.image_store import ImageStore
+from nexus_chat.models.chat_session import ChatSession
+from nexus_chat.models.message import Message, MessageRole
+
+def png(width, height, color=(200, 30, 30)):
+    output = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(output, "PNG")
+    return output.getvalue()
+
+async def refcounts(storage):
+    async with storage.pool.reader() as db:
+        async with db.execute("SELECT hash, refcount FROM images") as cursor:
+            return {row[0]: row[1] for row in await cursor.fetchall()}
+
+@pytest_asyncio.fixture
+async def images(storage):
+    store = ImageStore(storage, max_side=64, workers=1)
+    yield store
+    await store.close()
+
+@pytest.mark.asyncio
+async def test_images_are_scaled_and_encoded_once(images, tmp_path, monkeypatch):
+    encoded = []
+    encode = image_store.encode_image
+    monkeypatch.setattr(
+        image_store, "encode_image", lambda *args: encoded.append(1) or encode(*args)
+    )
+    photo = tmp_path / "photo.png"
+    photo.write_bytes(png(256, 128))
+    
+    first, other = await images.add_many([photo, png(8, 8)])
+    again = await images.add(photo.read_bytes())
+    
+    assert first == again != other
+    assert len(encoded) == 2
+    assert await images.storage.find_image("missing") is None
+    data = (await images.storage.get_images([first]))[first]
+    assert Image.open(io.BytesIO(data)).size == (64, 32)
+    # Payloads are read back from storage once the cache is gone
+    images._cache.clear()
+    payloads = await images.payloads([first, first, "removed"])
+    assert list(payloads) == [first]
+
+@pytest.mark.asyncio
+async def test_unreferenced_images_are_collected_after_the_grace_period(images, storage):
+    kept, dropped = await images.add_many([png(8, 8), png(8, 8, (0, 0, 255))])
+    session = ChatSession(model="llava")
+    await storage.save_session(session)
+    both = Message(
+        role=MessageRole.USER, content="compare", model="llava", session_id=session.id,
+        metadata={"images": [kept, dropped]}
+    )
+    one = Message(
+        role=MessageRole.USER, content="again", model="llava", session_id=session.id,
+        metadata={"images": [kept]}
+    )
+    await storage.save_messages([both, one])
+    assert await refcounts(storage) == {kept: 2, dropped: 1}
+    
+    both.metadata = {"images": [kept]}
+    await storage.save_message(both)
+    assert await refcounts(storage) == {kept: 2, dropped: 0}
+    
+    # Unreferenced images stay until the grace period is over
+    assert await storage.collect_garbage() == 0
+    assert await storage.collect_garbage(image_grace=-1) == 1
+    await storage.delete_messages(session.id)
+    assert await refcounts(storage) == {kept: 0}
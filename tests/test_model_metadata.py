@@ -0,0 +1,81 @@
+"""Tests for the model metadata cache."""
+import json
+
+import pytest
+
+from nexus_chat.backend.model_metadata import ModelMetadataCache, parse_show
+from nexus_chat.utils.constants import API_CONSTANTS
+
+def show(context_length=8192, parameter_count=3_200_000_000):
+    return {
+        "model_info": {
+            "general.architecture": "llama",
+            "general.parameter_count": parameter_count,
+            "llama.context_length": context_length,
+        },
+        "details": {"family": "llama", "quantization_level": "Q4_K_M"},
+    }
+
+class FakeClient:
+    """Ollama client listing fixed tags and counting /api/show requests."""
+    
+    def __init__(self, tags):
+        self.tags = tags
+        self.listed = 0
+        self.shown = []
+    
+    async def list_model_details(self):
+        self.listed += 1
+        return self.tags
+    
+    async def show_model(self, name):
+        self.shown.append(name)
+        return show()
+
+def test_show_response_is_parsed_with_fallbacks():
+    meta = parse_show("abc", 2_000_000_000, show())
+    assert (meta.family, meta.context_length, meta.quantization) == ("llama", 8192, "Q4_K_M")
+    assert meta.billions == pytest.approx(3.2)
+    # Older servers report a rounded size and no model info
+    old = parse_show("def", 0, {"details": {"family": "qwen2", "parameter_size": "500M"}})
+    assert (old.family, old.context_length, old.parameter_count) == ("qwen2", None, 500_000_000)
+
+@pytest.mark.asyncio
+async def test_show_is_queried_once_per_digest(tmp_path):
+    path = tmp_path / "model_metadata.json"
+    client = FakeClient([
+        {"name": "llama3.2:latest", "digest": "d1", "size": 2 << 30},
+        {"name": "llama3.2:3b", "digest": "d1", "size": 2 << 30},
+        {"name": "qwen2.5:0.5b", "digest": "d2", "size": 400 << 20},
+    ])
+    cache = ModelMetadataCache(client, path, refresh=60)
+    
+    models = await cache.refresh()
+    
+    assert client.shown == ["llama3.2:latest", "qwen2.5:0.5b"]
+    assert set(json.loads(path.read_text())) == {"d1", "d2"}
+    assert cache.get("llama3.2") is models["llama3.2:latest"]
+    assert cache.get("qwen2.5").digest == "d2"
+    assert cache.get("mistral") is None
+    assert cache.timeout("qwen2.5:0.5b") > API_CONSTANTS["REQUEST_TIMEOUT"]
+    assert cache.timeout("mistral") is None
+    # Recently checked: /api/tags is not listed again
+    await cache.refresh()
+    assert (client.listed, cache.generation) == (1, 1)
+    
+    # A new run reads the file, and only a pulled digest is fetched
+    client.tags[2] = {"name": "qwen2.5:0.5b", "digest": "d3", "size": 400 << 20}
+    restarted = ModelMetadataCache(client, path, refresh=60)
+    await restarted.refresh()
+    assert client.shown[2:] == ["qwen2.5:0.5b"]
+    assert set(json.loads(path.read_text())) == {"d1", "d3"}
+    
+    await restarted.refresh(force=True)
+    assert len(client.shown) == 3
+    assert restarted.generation == 1
+
+def test_unreadable_file_is_ignored(tmp_path):
+    path = tmp_path / "model_metadata.json"
+    path.write_text("{not json")
+    
+    assert ModelMetadataCache(FakeClient([]), path)._digests == {}
@@ -0,0 +1,93 @@
+"""Tests for model routing."""
+import pytest
+
+from nexus_chat.backend.model_router import ModelRouter
+from nexus_chat.models.settings import ModelConfig
+
+CONFIGS = {
+    name: ModelConfig(name, size, [], [], category)
+    for name, size, category in [
+        ("tiny", 1, "General"), ("mid", 3, "General"), ("large", 8, "General"),
+        ("huge", 70, "General"), ("coder", 7, "Programming"), ("mathy", 7, "Mathematics"),
+    ]
+}
+
+class FakeClient:
+    """Ollama client with fixed installed and loaded models."""
+    
+    def __init__(self, installed, running=(), reply=""):
+        self.installed = list(installed)
+        self.running = list(running)
+        self.reply = reply
+        self.prompts = []
+    
+    async def list_models(self):
+        return self.installed
+    
+    async def running_models(self):
+        return self.running
+    
+    async def chat_stream(self, model, prompt, options=None):
+        self.prompts.append(prompt)
+        yield self.reply
+
+def router(installed=CONFIGS, running=(), **kwargs):
+    return ModelRouter(FakeClient(installed, running), CONFIGS, **kwargs)
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("prompt, kind, model", [
+    ("What is the capital of France?", "simple", "tiny"),
+    ("Why does this raise?\n```\nimport os\n```", "code", "coder"),
+    ("Solve 3 * 4 = x", "math", "mathy"),
+    ("Explain why the sky is blue", "complex", "large"),
+    ("x" * 700, "complex", "large"),
+    ("Wie spät ist es in München? Grüße", "simple", "large"),
+])
+async def test_prompts_go_to_the_smallest_capable_model(prompt, kind, model):
+    decision = await router().route(prompt, "huge")
+    
+    assert (decision.traits.kind, decision.model) == (kind, model)
+    assert decision.to_metadata()["baseline"] == "huge"
+
+@pytest.mark.asyncio
+async def test_loaded_models_are_preferred_and_savings_are_estimated():
+    models = router(running=["mid"])
+    models.observe("tiny", {"total_duration": 1e9})
+    models.observe("huge", {"total_duration": 10e9})
+    models.observe("huge", {"total_duration": 20e9})
+    assert models.latency["huge"] == pytest.approx(12.0)
+    
+    decision = await models.route("Hello there", "huge")
+    
+    assert decision.model == "mid"
+    assert decision.reason.endswith("loaded")
+    # Estimated by size from the models answered before: 13s per 71B
+    assert decision.saving == pytest.approx(12.0 - 13 / 71 * 3)
+    # Without a capable installed model, the default answers
+    decision = await router(installed=["tiny", "mid"]).route("Compare the two", "huge")
+    assert (decision.model, decision.reason) == ("huge", "no capable model installed")
+
+@pytest.mark.asyncio
+async def test_classifier_model_refines_plain_prompts():
+    models = router(classifier_model="tiny")
+    models.client.reply = " Complex.\n"
+    
+    traits = await models.classify("Tell me about Rome")
+    
+    assert (traits.kind, traits.source) == ("complex", "tiny")
+    # Prompts the heuristics recognize are not sent to it
+    assert (await models.classify("def main(): pass")).source == "heuristic"
+    assert len(models.client.prompts) == 1
+    models.client.reply = "dunno"
+    assert (await models.classify("Tell me about Rome")).kind == "simple"
+
+@pytest.mark.asyncio
+async def test_escalation_picks_the_next_larger_model():
+    models = router()
+    
+    assert await models.escalate("Fix this function", "tiny") == "coder"
+    assert await models.escalate("Tell me about Rome", "tiny") == "mid"
+    # Smaller specialists answer only when no generalist is larger
+    assert await models.escalate("Tell me about Rome", "mid") == "large"
+    assert await models.escalate("Tell me about Rome", "large") == "huge"
+    assert await models.escalate("Tell me about Rome", "huge") is None
@@ -0,0 +1,67 @@
+"""Tests for generation option profiles."""
+import pytest
+
+from nexus_chat.backend.option_profiles import OptionProfiles, validate_options
+from nexus_chat.models.settings import ModelConfig
+
+CONFIGS = {
+    "llama3.2": ModelConfig(
+        "llama3.2", 3, [], [], "General",
+        parameters={"temperature": 0.5, "max_tokens": 512, "context_length": 4096}
+    ),
+}
+
+def test_later_profiles_override_earlier_ones():
+    profiles = OptionProfiles(
+        defaults={"temperature": 0.9, "top_k": 10, "num_ctx": 2048},
+        models={"llama3.2": {"top_k": 20, "num_ctx": 8192}, "llama3.2:1b": {"top_p": 0.5}},
+        model_configs=CONFIGS
+    )
+    profiles.set_session("s1", {"top_k": 30, "keep_alive": "10m"})
+    
+    options = profiles.resolve("llama3.2:1b")["options"]
+    # The model configuration, then the profile without and with the tag
+    assert (options["temperature"], options["num_predict"]) == (0.5, 512)
+    assert (options["top_k"], options["top_p"]) == (20, 0.5)
+    # The context length caps num_ctx
+    assert options["num_ctx"] == 4096
+    assert "context_length" not in options
+    
+    fields = profiles.resolve("llama3.2:1b", "s1")
+    assert fields["options"]["top_k"] == 30
+    assert fields["keep_alive"] == "10m"
+    assert "keep_alive" not in fields["options"]
+    # Unknown models get the global defaults only
+    assert profiles.resolve("mistral")["options"]["num_ctx"] == 2048
+
+def test_merged_options_are_cached_until_a_profile_changes():
+    profiles = OptionProfiles(model_configs=CONFIGS)
+    first = profiles.resolve("llama3.2", "s1")
+    other = profiles.resolve("llama3.2", "s2")
+    assert profiles.resolve("llama3.2", "s1") is first
+    
+    profiles.set_session("s1", {"seed": 7})
+    assert profiles.resolve("llama3.2", "s1")["options"]["seed"] == 7
+    assert profiles.resolve("llama3.2", "s2") is other
+    
+    profiles.set_model("llama3.2", {"seed": 1})
+    assert profiles.resolve("llama3.2", "s2")["options"]["seed"] == 1
+    profiles.set_defaults({"temperature": 0.1})
+    assert profiles.resolve("mistral")["options"]["temperature"] == 0.1
+
+@pytest.mark.parametrize("options", [
+    {"temprature": 0.5},
+    {"top_p": 1.5},
+    {"num_ctx": 2048.0},
+    {"use_mmap": 1},
+    {"stop": "END"},
+    {"keep_alive": True},
+])
+def test_invalid_options_are_refused(options):
+    with pytest.raises(ValueError):
+        validate_options(options)
+
+def test_integers_are_accepted_for_float_options():
+    assert validate_options({"temperature": 1, "keep_alive": -1}) == {
+        "temperature": 1.0, "keep_alive": -1
+    }
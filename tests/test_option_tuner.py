@@ -0,0 +1,107 @@
+"""Tests for the generation option tuner."""
+import pytest
+
+from nexus_chat.backend.option_tuner import Measurement, OptionTuner, reject_outliers
+from nexus_chat.manage import build_parser, run
+from nexus_chat.utils.config import load_config
+
+# Tokens per second by option value; 4 threads and a 1024 token context
+# are within the tolerance of 2 threads and 512 tokens
+THREAD_RATES = {1: 10.0, 2: 20.0, 4: 20.2}
+BATCH_FACTORS = {8: 0.5, 16: 1.0}
+CONTEXT_FACTORS = {512: 1.0, 1024: 0.99}
+
+def timings(payload):
+    options = payload["options"]
+    rate = (
+        THREAD_RATES[options["num_thread"]]
+        * BATCH_FACTORS[options["num_batch"]]
+        * CONTEXT_FACTORS[options["num_ctx"]]
+    )
+    # One trial of the first options is disturbed, e.g. by another process
+    if options["num_thread"] == 1 and payload["messages"][-1]["content"].startswith("[2] "):
+        rate /= 20
+    return {
+        "prompt_eval_count": 100,
+        "prompt_eval_duration": int(100 / (rate * 10) * 1e9),
+        "eval_count": 50,
+        "eval_duration": int(50 / rate * 1e9)
+    }
+
+def measurement(seconds, **options):
+    # Prompt time is negligible next to the answer's
+    return Measurement(options, prompt_rate=1e12, eval_rate=256 / seconds, trials=3, rejected=0)
+
+def test_reject_outliers():
+    assert reject_outliers([10.0, 11.0, 9.0, 10.5, 50.0]) == ([10.0, 11.0, 9.0, 10.5], 1)
+    # Most values equal: mean absolute deviation instead of the median one
+    assert reject_outliers([10.0, 10.0, 10.0, 100.0]) == ([10.0, 10.0, 10.0], 1)
+    assert reject_outliers([5.0, 5.0, 5.0]) == ([5.0, 5.0, 5.0], 0)
+    assert reject_outliers([1.0, 100.0]) == ([1.0, 100.0], 0)
+
+def test_best_prefers_larger_context_then_fewer_threads():
+    tuner = OptionTuner(None, "llama3.2")
+    fastest = measurement(10.0, num_ctx=2048, num_thread=4)
+    larger = measurement(10.2, num_ctx=4096, num_thread=8)
+    fewer = measurement(10.2, num_ctx=4096, num_thread=4)
+    slow = measurement(20.0, num_ctx=8192, num_thread=2)
+    assert tuner._best([fastest, slow]) is fastest
+    assert tuner._best([fastest, larger, slow]) is larger
+    assert tuner._best([fastest, larger, fewer, slow]) is fewer
+
+@pytest.mark.asyncio
+async def test_tune_sweeps_one_option_at_a_time(ollama):
+    fake, client = ollama
+    fake.stats = timings
+    tuner = OptionTuner(client, "llama3.2", prompts=["Say hi."], trials=5, num_predict=50)
+    progress = []
+    
+    report = await tuner.tune(
+        {"num_thread": [1, 2, 4], "num_batch": [8, 16], "num_ctx": [512, 1024]},
+        lambda done, total: progress.append((done, total))
+    )
+    
+    assert [m.options for m in report.measurements] == [
+        {"num_thread": 1, "num_batch": 8, "num_ctx": 512},
+        {"num_thread": 2, "num_batch": 8, "num_ctx": 512},
+        {"num_thread": 4, "num_batch": 8, "num_ctx": 512},
+        {"num_thread": 2, "num_batch": 16, "num_ctx": 512},
+        {"num_thread": 2, "num_batch": 16, "num_ctx": 1024},
+    ]
+    assert report.best == {"num_thread": 2, "num_batch": 16, "num_ctx": 1024}
+    assert progress[-1] == (5, 5)
+    
+    # One untimed warm-up, then every trial, with the base options
+    assert len(fake.requests) == 5 * (1 + 5)
+    assert fake.requests[0]["messages"][-1]["content"] == "Say hi."
+    assert fake.requests[1]["messages"][-1]["content"] == "[0] Say hi."
+    assert all(
+        request["options"]["temperature"] == 0 and request["options"]["num_predict"] == 50
+        for request in fake.requests
+    )
+    
+    disturbed = report.measurements[0]
+    assert disturbed.rejected == 1
+    assert disturbed.eval_rate == pytest.approx(5.0, rel=1e-3)
+
+@pytest.mark.asyncio
+async def test_tune_command_saves_profile_without_opening_database(ollama, tmp_path, monkeypatch):
+    fake, client = ollama
+    fake.stats = timings
+    monkeypatch.setenv("HOME", str(tmp_path))
+    db_path = tmp_path / "data" / "chat.db"
+    
+    await run(build_parser().parse_args([
+        "--db", str(db_path),
+        "tune", "llama3.2",
+        "--host", client.base_url,
+        "--threads", "2", "4",
+        "--batch", "16",
+        "--ctx", "512",
+        "--trials", "1"
+    ]))
+    
+    assert load_config()["model_options"]["llama3.2"] == {
+        "num_thread": 2, "num_batch": 16, "num_ctx": 512
+    }
+    assert not db_path.parent.exists()
@@ -0,0 +1,93 @@
+"""Tests for the request scheduler."""
+import asyncio
+
+import pytest
+
+from nexus_chat.backend.request_scheduler import RequestScheduler
+
+class Requests:
+    """Generation requests holding their slot until released."""
+    
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.started = []
+        self.releases = {}
+        self.tasks = {}
+    
+    def send(self, name, session_id, model):
+        release = asyncio.Event()
+        self.releases[name] = release
+        
+        async def hold():
+            async with self.scheduler.slot(session_id, model):
+                self.started.append(name)
+                await release.wait()
+        
+        self.tasks[name] = asyncio.get_running_loop().create_task(hold())
+    
+    async def finish(self, name):
+        self.releases[name].set()
+        await self.tasks[name]
+        # Let granted waiters resume
+        await asyncio.sleep(0)
+
+@pytest.mark.asyncio
+async def test_freed_slot_goes_to_the_session_with_fewest_running():
+    requests = Requests(RequestScheduler(max_parallel=2, max_models=3, max_wait=60))
+    requests.send("fan-out 1", "a", "m1")
+    requests.send("fan-out 2", "a", "m2")
+    requests.send("fan-out 3", "a", "m3")
+    requests.send("single", "b", "m1")
+    await asyncio.sleep(0)
+    assert requests.started == ["fan-out 1", "fan-out 2"]
+    
+    await requests.finish("fan-out 1")
+    
+    assert requests.started[2:] == ["single"]
+    await requests.finish("fan-out 2")
+    assert requests.started[3:] == ["fan-out 3"]
+    await requests.finish("single")
+    await requests.finish("fan-out 3")
+    assert requests.scheduler.running == requests.scheduler.waiting == 0
+
+@pytest.mark.asyncio
+async def test_overdue_request_is_not_starved_by_loaded_models():
+    scheduler = RequestScheduler(max_parallel=2, max_models=1, max_wait=0)
+    requests = Requests(scheduler)
+    requests.send("first", "a", "m1")
+    requests.send("second", "b", "m1")
+    await asyncio.sleep(0)
+    requests.send("other model", "c", "m2")
+    requests.send("same model", "d", "m1")
+    await asyncio.sleep(0)
+    
+    # m1 fits the freed slot, but the older request for m2 goes first
+    await requests.finish("first")
+    requests.send("newcomer", "e", "m1")
+    await asyncio.sleep(0)
+    assert requests.started == ["first", "second"]
+    
+    await requests.finish("second")
+    assert requests.started[2:] == ["other model"]
+    await requests.finish("other model")
+    assert requests.started[3:] == ["same model", "newcomer"]
+    await requests.finish("same model")
+    await requests.finish("newcomer")
+    assert scheduler.running == scheduler.waiting == 0
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_the_queue():
+    scheduler = RequestScheduler(max_parallel=1, max_models=1)
+    requests = Requests(scheduler)
+    requests.send("running", "a", "m1")
+    requests.send("cancelled", "b", "m1")
+    requests.send("next", "c", "m1")
+    await asyncio.sleep(0)
+    
+    requests.tasks["cancelled"].cancel()
+    await asyncio.sleep(0)
+    await requests.finish("running")
+    
+    assert requests.started == ["running", "next"]
+    assert scheduler.waiting == 0
+    await requests.finish("next")
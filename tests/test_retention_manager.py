@@ -0,0 +1,90 @@
+"""Tests for the retention manager."""
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from nexus_chat.backend.retention_manager import RetentionManager, RetentionPolicy
+from nexus_chat.backend.storage_manager import StorageManager
+from nexus_chat.models.chat_session import ChatSession
+from nexus_chat.models.message import Message, MessageRole
+from nexus_chat.utils.timestamps import to_epoch_ms
+
+async def aged_session(storage, days, active=True, contents=("zebra crossing",)):
+    """Session whose last activity was ``days`` ago."""
+    then = datetime.now() - timedelta(days=days)
+    session = ChatSession(model="llama3.2", active=active, created_at=then)
+    await storage.save_session(session)
+    await storage.save_messages([
+        Message(
+            role=MessageRole.USER, content=content, model="llama3.2",
+            session_id=session.id, created_at=then + timedelta(seconds=i)
+        )
+        for i, content in enumerate(contents)
+    ])
+    async with storage.pool.writer() as db:
+        await db.execute(
+            "UPDATE chat_sessions SET updated_at = ? WHERE id = ?",
+            (to_epoch_ms(then), session.id)
+        )
+    return session
+
+async def live_sessions(storage):
+    return {s.id for s in await storage.list_sessions(active_only=False)}
+
+@pytest.mark.asyncio
+async def test_archive_and_restore_round_trip(storage):
+    closed = await aged_session(
+        storage, 10, active=False, contents=("zebra crossing", "x" * 10000)
+    )
+    open_idle = await aged_session(storage, 10)
+    open_abandoned = await aged_session(storage, 30)
+    recent = await aged_session(storage, 1, active=False)
+    manager = RetentionManager(
+        storage, RetentionPolicy(max_age=5, inactive_after=20), vacuum_sleep=0
+    )
+    
+    report = await manager.run()
+    
+    # Open sessions count as inactive only after inactive_after days
+    assert await live_sessions(storage) == {open_idle.id, recent.id}
+    assert (report.archived_sessions, report.archived_messages) == (2, 3)
+    assert report.collected_blobs == 1
+    hits = await storage.search("zebra", archived=True)
+    assert {hit.session_id for hit in hits} == {closed.id, open_abandoned.id}
+    
+    assert await manager.restore_sessions([closed.id]) == 2
+    
+    assert [m.content for m in await storage.get_messages(closed.id)] == [
+        "zebra crossing", "x" * 10000
+    ]
+    assert [hit.session_id for hit in await storage.search("zebra", archived=True)] == [
+        open_abandoned.id
+    ]
+    assert closed.id in {hit.session_id for hit in await storage.search("zebra")}
+    # Restored sessions count as used now and stay live
+    assert (await manager.run()).archived_sessions == 0
+    assert closed.id in await live_sessions(storage)
+
+@pytest.mark.asyncio
+async def test_scheduled_runs_leave_vacuum_mode_alone(tmp_path):
+    path = tmp_path / "old.db"
+    # A database created before incremental auto-vacuum was the default
+    db = sqlite3.connect(path)
+    db.execute("CREATE TABLE legacy (x)")
+    db.close()
+    storage = StorageManager(path)
+    try:
+        await aged_session(storage, 200, active=False)
+        
+        report = await RetentionManager(storage).run()
+        
+        assert report.archived_sessions == 1
+        assert report.freed_pages == 0
+        assert not await storage.incremental_vacuum_enabled()
+        
+        assert await storage.enable_incremental_vacuum()
+        assert await storage.incremental_vacuum_enabled()
+        assert not await storage.enable_incremental_vacuum()
+    finally:
+        await storage.close()
@@ -0,0 +1,134 @@
+"""Tests for the storage manager."""
+from datetime import datetime
+
+import pytest
+
+from nexus_chat.backend.session_handle import MessageCursor
+from nexus_chat.backend.storage_manager import CURSOR_KEY
+from nexus_chat.models.chat_session import ChatSession
+from nexus_chat.models.message import Message, MessageRole, MessageStatus
+
+async def versions(storage, session_id):
+    async with storage.pool.reader() as db:
+        async with db.execute(
+            "SELECT id, version, changed_at FROM messages WHERE session_id = ?",
+            (session_id,)
+        ) as cursor:
+            return {row[0]: (row[1], row[2]) for row in await cursor.fetchall()}
+
+@pytest.mark.asyncio
+async def test_resaving_unchanged_messages_keeps_their_version(storage):
+    session = ChatSession(model="llama3.2")
+    await storage.save_session(session)
+    messages = [
+        Message(
+            role=MessageRole.USER, content=f"message {i}", model="llama3.2", session_id=session.id
+        )
+        for i in range(3)
+    ]
+    messages.append(Message(
+        role=MessageRole.USER, content="x" * 10000, model="llama3.2", session_id=session.id
+    ))
+    await storage.save_messages(messages)
+    saved = await versions(storage, session.id)
+    
+    # Spilling messages already written must not count as changes
+    assert await storage.save_messages(messages) == 0
+    await storage.save_message(messages[0])
+    assert await versions(storage, session.id) == saved
+    assert all(version == 1 for version, _ in saved.values())
+    
+    messages[1].content = "edited"
+    assert await storage.save_messages(messages) == 1
+    after = await versions(storage, session.id)
+    assert after[messages[1].id][0] == 2
+    assert after[messages[1].id][1] > saved[messages[1].id][1]
+    assert after[messages[0].id] == saved[messages[0].id]
+
+@pytest.mark.asyncio
+async def test_messages_of_the_same_millisecond_keep_their_write_order(storage):
+    session = ChatSession(model="llama3.2")
+    await storage.save_session(session)
+    created_at = datetime(2025, 3, 1, 12, 0, 0)
+    # Ids sort in reverse of the order the messages are written in
+    messages = [
+        Message(
+            role=MessageRole.USER,
+            content=f"message {i}",
+            model="llama3.2",
+            id=f"{9 - i}",
+            session_id=session.id,
+            created_at=created_at
+        )
+        for i in range(10)
+    ]
+    for message in messages:
+        await storage.save_message(message)
+    ids = [message.id for message in messages]
+    
+    assert [m.id for m in await storage.get_messages(session.id)] == ids
+    assert [m.id for m in await storage.get_children(session.id, None)] == ids
+    loaded = await storage.get_session(session.id)
+    assert [m.id for m in loaded.messages] == ids
+    
+    # Keyset pages in both directions
+    handle = await storage.get_session_handle(session.id, page_size=3, max_pages=10)
+    await handle.load_latest()
+    while handle.has_older:
+        await handle.load_older()
+    assert [m.id for m in handle.messages] == ids
+    newer = await storage.get_messages(session.id, after=MessageCursor.of(messages[4]), limit=3)
+    assert [m.id for m in newer] == ids[5:8]
+    
+    summary, = await storage.list_session_summaries()
+    assert summary.last_message_preview == "message 9"
+
+@pytest.mark.asyncio
+async def test_search_follows_edited_and_streamed_messages(storage):
+    session = ChatSession(model="llama3.2")
+    await storage.save_session(session)
+    message = Message(
+        role=MessageRole.USER, content="the quick brown fox", model="llama3.2", session_id=session.id
+    )
+    await storage.save_message(message)
+    assert [hit.message_id for hit in await storage.search("fox")] == [message.id]
+    
+    message.content = "a lazy dog sleeps"
+    await storage.save_message(message)
+    assert await storage.search("fox") == []
+    assert [hit.message_id for hit in await storage.search("dog")] == [message.id]
+    
+    # Streaming answers are indexed once complete, large ones from their blob
+    answer = Message(
+        role=MessageRole.ASSISTANT,
+        content="partial otter",
+        model="llama3.2",
+        session_id=session.id,
+        parent_id=message.id,
+        status=MessageStatus.STREAMING
+    )
+    await storage.save_message(answer)
+    assert await storage.search("otter") == []
+    answer.content = "otter " * 2000
+    answer.status = MessageStatus.COMPLETE
+    await storage.save_message(answer)
+    assert [hit.message_id for hit in await storage.search("otter")] == [answer.id]
+    
+    async with storage.pool.writer() as db:
+        await db.execute("INSERT INTO messages_fts (messages_fts) VALUES ('integrity-check')")
+
+@pytest.mark.asyncio
+async def test_message_pages_are_read_in_index_order(storage):
+    await storage.get_messages("missing")
+    queries = [
+        f"SELECT id FROM messages WHERE session_id = ? AND (created_at, rowid) < {CURSOR_KEY} "
+        "ORDER BY created_at DESC, rowid DESC LIMIT ?",
+        f"SELECT id FROM messages WHERE session_id = ? AND (created_at, rowid) > {CURSOR_KEY} "
+        "ORDER BY created_at ASC, rowid ASC LIMIT ?",
+    ]
+    async with storage.pool.reader() as db:
+        for query in queries:
+            async with db.execute(f"EXPLAIN QUERY PLAN {query}", ("s", 0, "m", 10)) as cursor:
+                plan = " ".join(row[3] for row in await cursor.fetchall())
+            assert "idx_messages_session_created " in plan + " "
+            assert "TEMP B-TREE" not in plan
@@ -0,0 +1,63 @@
+"""Tests for the stream persister."""
+import pytest
+
+from nexus_chat.backend.stream_persister import StreamPersister
+from nexus_chat.models.chat_session import ChatSession
+from nexus_chat.models.message import Message, MessageRole, MessageStatus
+
+async def stored(storage, message_id):
+    async with storage.pool.reader() as db:
+        async with db.execute(
+            "SELECT content, status, version, changed_at FROM messages WHERE id = ?",
+            (message_id,)
+        ) as cursor:
+            row = await cursor.fetchone()
+        async with db.execute(
+            "SELECT content FROM message_chunks WHERE message_id = ? ORDER BY seq",
+            (message_id,)
+        ) as cursor:
+            chunks = [chunk for (chunk,) in await cursor.fetchall()]
+    return tuple(row), chunks
+
+async def stream(storage, chunks):
+    session = ChatSession(model="llama3.2")
+    await storage.save_session(session)
+    message = Message(
+        role=MessageRole.ASSISTANT, content="", model="llama3.2", session_id=session.id
+    )
+    persister = StreamPersister(storage, message, interval=0, max_chars=1)
+    for chunk in chunks:
+        await persister.append(chunk)
+    return session, message, persister
+
+@pytest.mark.asyncio
+async def test_flushes_append_only_new_text_without_new_versions(storage):
+    session, message, persister = await stream(storage, ["Hello", " wide", " world"])
+    
+    (content, status, version, changed_at), chunks = await stored(storage, message.id)
+    assert (content, status, version) == ("Hello", "streaming", 1)
+    assert chunks == [" wide", " world"]
+    # Readers see the text streamed so far
+    [read] = await storage.get_messages(session.id)
+    assert read.content == "Hello wide world"
+    
+    await persister.finish({"eval_count": 3})
+    
+    (content, status, version, finished_at), chunks = await stored(storage, message.id)
+    assert (content, status, version) == ("Hello wide world", "complete", 2)
+    assert finished_at > changed_at
+    assert chunks == []
+    assert persister.writes == 4
+
+@pytest.mark.asyncio
+async def test_recovery_keeps_streamed_chunks(storage):
+    session, message, persister = await stream(storage, ["Par", "tial"])
+    
+    assert await storage.recover_streaming() == 1
+    
+    (content, status, _, _), chunks = await stored(storage, message.id)
+    assert (content, status) == ("Partial", "error")
+    assert chunks == []
+    [read] = await storage.get_messages(session.id)
+    assert read.status == MessageStatus.ERROR
+    assert read.error == "Interrupted"
@@ -0,0 +1,86 @@
+"""Tests for the sync manager."""
+import pytest
+
+from nexus_chat.backend.storage_manager import StorageManager
+from nexus_chat.backend.stream_persister import StreamPersister
+from nexus_chat.backend.sync_manager import SyncManager
+from nexus_chat.models.chat_session import ChatSession
+from nexus_chat.models.message import Message, MessageRole
+
+async def state(storage, session_id):
+    async with storage.pool.reader() as db:
+        async with db.execute(
+            "SELECT id, content, status, version FROM messages WHERE session_id = ? ORDER BY id",
+            (session_id,)
+        ) as cursor:
+            messages = [tuple(row) for row in await cursor.fetchall()]
+        async with db.execute(
+            "SELECT name, version FROM chat_sessions WHERE id = ?", (session_id,)
+        ) as cursor:
+            session = tuple(await cursor.fetchone())
+    return session, messages
+
+@pytest.mark.asyncio
+async def test_concurrent_edits_on_both_replicas_converge(storage, tmp_path):
+    peer_path = str(tmp_path / "peer.db")
+    session = ChatSession(model="llama3.2")
+    await storage.save_session(session)
+    messages = [
+        Message(
+            role=MessageRole.USER, content=f"message {i}", model="llama3.2", session_id=session.id
+        )
+        for i in range(3)
+    ]
+    await storage.save_messages(messages)
+    sync = SyncManager(storage)
+    await sync.sync_with(peer_path)
+    
+    peer = StorageManager(peer_path)
+    try:
+        # Local edits: a rename and one edit of each of two messages
+        session.name = "Renamed"
+        await storage.save_session(session)
+        messages[0].content = "apple"
+        messages[1].content = "edited once"
+        await storage.save_messages(messages[:2])
+        
+        # Peer edits: reopening the session saves it unchanged, the first
+        # message is edited once and the second twice
+        await peer.save_session(await peer.get_session(session.id))
+        first, second, _ = await peer.get_messages(session.id)
+        first.content = "banana"
+        await peer.save_message(first)
+        for content in ("edited", "edited twice"):
+            second.content = content
+            await peer.save_message(second)
+        # An answer still streaming on the peer stays there
+        answer = Message(
+            role=MessageRole.ASSISTANT, content="", model="llama3.2",
+            session_id=session.id, parent_id=messages[-1].id
+        )
+        persister = StreamPersister(peer, answer, interval=0, max_chars=1)
+        for chunk in ("Par", "tial", " answer"):
+            await persister.append(chunk)
+        
+        await sync.sync_with(peer_path)
+        
+        local_session, local_messages = await state(storage, session.id)
+        peer_session, peer_messages = await state(peer, session.id)
+        # The rename is the only change of the session; equal versions
+        # of the first message settle on the same content on both sides
+        assert local_session == peer_session == ("Renamed", 2)
+        assert sorted(content for _, content, _, _ in local_messages) == [
+            "banana", "edited twice", "message 2"
+        ]
+        assert local_messages == [m for m in peer_messages if m[0] != answer.id]
+        # Its row holds the first chunk, the rest waits in message_chunks
+        assert (answer.id, "Par", "streaming", 1) in peer_messages
+        
+        await persister.finish()
+        report = await sync.sync_with(peer_path)
+        
+        assert (report.received_sessions, report.received_messages) == (0, 1)
+        assert await state(storage, session.id) == await state(peer, session.id)
+        assert (answer.id, "Partial answer", "complete", 2) in (await state(storage, session.id))[1]
+    finally:
+        await peer.close()
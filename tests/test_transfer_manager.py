@@ -0,0 +1,117 @@
+"""Tests for the transfer manager."""
+import json
+import time
+from datetime import datetime, timezone as dt_timezone
+
+import pytest
+
+from nexus_chat.backend.storage_manager import StorageManager
+from nexus_chat.backend.transfer_manager import TransferManager
+from nexus_chat.models.chat_session import ChatSession
+from nexus_chat.models.message import Message, MessageRole
+from nexus_chat.utils.timestamps import to_epoch_ms
+
+@pytest.fixture
+def timezone(monkeypatch):
+    """Switch the local time zone, restoring it afterwards."""
+    def switch(name):
+        monkeypatch.setenv("TZ", name)
+        time.tzset()
+    yield switch
+    monkeypatch.undo()
+    time.tzset()
+
+async def stored_times(storage):
+    async with storage.pool.reader() as db:
+        async with db.execute("""
+            SELECT 'session', id, created_at, updated_at FROM chat_sessions
+            UNION ALL
+            SELECT 'message', id, created_at, NULL FROM messages
+        """) as cursor:
+            return sorted(tuple(row) for row in await cursor.fetchall())
+
+async def saved_session(storage, count=2):
+    session = ChatSession(model="llama3.2")
+    await storage.save_session(session)
+    await storage.save_messages([
+        Message(
+            role=MessageRole.USER, content=f"message {i}", model="llama3.2",
+            session_id=session.id, created_at=datetime(2025, 3, 1, 12, 0, i)
+        )
+        for i in range(count)
+    ])
+    return session
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("fmt", ["jsonl.gz", "parquet"])
+async def test_export_import_keeps_times_across_time_zones(storage, tmp_path, timezone, fmt):
+    timezone("America/New_York")
+    await saved_session(storage)
+    path = tmp_path / f"export.{fmt}"
+    await TransferManager(storage).export_sessions(path)
+    exported = await stored_times(storage)
+    
+    timezone("Asia/Tokyo")
+    target = StorageManager(tmp_path / "target.db")
+    try:
+        report = await TransferManager(target).import_sessions(path)
+        assert (report.sessions, report.messages) == (1, 2)
+        assert await stored_times(target) == exported
+    finally:
+        await target.close()
+
+@pytest.mark.asyncio
+async def test_import_reads_iso_times_of_older_exports(storage, tmp_path, timezone):
+    timezone("Asia/Tokyo")
+    path = tmp_path / "old.jsonl"
+    path.write_text("\n".join(json.dumps(record) for record in [
+        {"type": "header", "format": "nexus-chat-export", "version": 1},
+        {
+            "type": "session", "id": "s1", "name": "Old", "model": "llama3.2",
+            "created_at": "2025-03-01T12:00:00+00:00", "updated_at": "2025-03-01T12:00:00"
+        },
+        {
+            "type": "message", "id": "m1", "session_id": "s1", "role": "user",
+            "content": "hi", "model": "llama3.2", "created_at": "2025-03-01T12:00:00+00:00"
+        },
+    ]))
+    
+    await TransferManager(storage).import_sessions(path)
+    
+    utc_noon = to_epoch_ms(datetime(2025, 3, 1, 12, tzinfo=dt_timezone.utc))
+    assert await stored_times(storage) == [
+        ("message", "m1", utc_noon, None),
+        # Naive times of older exports are local
+        ("session", "s1", utc_noon, utc_noon - 9 * 3600 * 1000),
+    ]
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("policy", ["skip", "replace", "rename"])
+async def test_import_conflict_policies(storage, tmp_path, policy):
+    session = await saved_session(storage)
+    path = tmp_path / "export.jsonl"
+    await TransferManager(storage).export_sessions(path)
+    [first, second] = await storage.get_messages(session.id)
+    first.content = "edited"
+    await storage.save_message(first)
+    
+    report = await TransferManager(storage).import_sessions(path, on_conflict=policy)
+    
+    sessions = {s.id for s in await storage.list_sessions(active_only=False)}
+    contents = {
+        session_id: [m.content for m in await storage.get_messages(session_id)]
+        for session_id in sessions
+    }
+    if policy == "skip":
+        assert report.skipped_sessions == 1
+        assert contents == {session.id: ["edited", "message 1"]}
+    elif policy == "replace":
+        assert report.messages == 2
+        assert contents == {session.id: ["message 0", "message 1"]}
+    else:
+        [(old_id, new_id)] = report.renamed_sessions
+        assert old_id == session.id
+        assert contents == {
+            session.id: ["edited", "message 1"],
+            new_id: ["message 0", "message 1"],
+        }
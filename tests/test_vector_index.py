@@ -0,0 +1,79 @@
+"""Tests for the vector index."""
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from nexus_chat.backend.vector_index import VectorIndex, decode_vectors, encode_vector
+
+DIM = 16
+
+def build(tmp_path, count, capacity=4):
+    """Index of ``count`` random unit vectors in four sessions and two models."""
+    rng = np.random.default_rng(7)
+    vectors = decode_vectors(
+        [encode_vector(v) for v in rng.standard_normal((count, DIM))], DIM
+    )
+    index = VectorIndex(tmp_path / "index.npy", "embed", DIM, "replica", capacity=capacity)
+    slots = index.allocate(count)
+    index.set_rows(
+        [(slot, f"m{i}", f"s{i % 4}", f"model{i % 2}") for i, slot in enumerate(slots)],
+        vectors
+    )
+    return index, vectors
+
+def brute_force(vectors, query, keep, k):
+    scores = vectors @ (query / np.linalg.norm(query))
+    ranked = sorted((i for i in range(len(vectors)) if keep(i)), key=lambda i: -scores[i])
+    return [f"m{i}" for i in ranked[:k]]
+
+@pytest.mark.parametrize("group, label, keep", [
+    (None, None, lambda i: True),
+    ("s1", None, lambda i: i % 4 == 1),
+    (["s1", "s2"], None, lambda i: i % 4 in (1, 2)),
+    (None, "model0", lambda i: i % 2 == 0),
+    (["s0", "s1"], "model1", lambda i: i % 4 == 1),
+])
+def test_search_returns_top_k_of_filtered_rows(tmp_path, group, label, keep):
+    index, vectors = build(tmp_path, 200)
+    query = np.random.default_rng(1).standard_normal(DIM)
+    
+    hits = index.search(query, k=5, group=group, label=label)
+    
+    assert [key for key, _ in hits] == brute_force(vectors, query, keep, 5)
+    scores = [score for _, score in hits]
+    assert scores == sorted(scores, reverse=True)
+    assert all(-1.0001 <= score <= 1.0001 for score in scores)
+
+def test_search_skips_unknown_filters_and_removed_rows(tmp_path):
+    index, vectors = build(tmp_path, 20)
+    assert index.search(vectors[3], k=3, group="missing") == []
+    # k is capped by the rows passing the filter
+    assert len(index.search(vectors[3], k=50, group="s3")) == 5
+    removed = index.slots["m3"]
+    
+    index.remove_slots([removed])
+    
+    assert "m3" not in [key for key, _ in index.search(vectors[3], k=20)]
+    assert len(index) == 19
+    # The freed slot is handed out again before the matrix grows
+    [slot] = index.allocate(1)
+    assert slot == removed
+    index.set_rows([(slot, "new", "s0", "model0")], vectors[3:4])
+    assert index.search(vectors[3], k=1)[0][0] == "new"
+    assert index.size == 20
+
+def test_flushed_cache_is_reused_only_by_the_same_database(tmp_path):
+    index, vectors = build(tmp_path, 10)
+    index.flush(42)
+    
+    reopened = VectorIndex(tmp_path / "index.npy", "embed", DIM, "replica")
+    assert reopened.seq == 42
+    np.testing.assert_array_equal(reopened.matrix[:10], vectors)
+    # Without its rows reloaded nothing is live yet
+    assert reopened.search(vectors[0], k=3) == []
+    reopened.set_rows([(index.slots["m0"], "m0", "s0", "model0")])
+    assert reopened.search(vectors[0], k=1)[0][0] == "m0"
+    
+    other = VectorIndex(tmp_path / "index.npy", "embed", DIM, "other replica")
+    assert other.seq == 0
+    assert not other.matrix.any()